@@ -0,0 +1,60 @@
+"""
+Benchmark: audit trail append throughput and proof cost
+
+Compares signing every entry individually against the hash-chained Merkle
+trail with one signed checkpoint per interval, signed by the trail's
+background thread while entries are appended.
+
+Usage:
+    python benchmarks/bench_audit.py
+"""
+
+import asyncio
+import time
+
+from ztso.audit import AuditTrail, verify_inclusion
+from ztso.crypto import QuantumSafeCrypto
+
+ENTRIES = 500_000
+SIGNED_ENTRIES = 5_000
+
+
+async def main():
+    crypto = QuantumSafeCrypto({'keypair_pool_depth': 0})
+    
+    # Baseline: one signature per entry
+    started = time.perf_counter()
+    for i in range(SIGNED_ENTRIES):
+        crypto.generate_quantum_safe_signature(f"user-{i % 100}|zerotrust.verify|db|{i}".encode())
+    per_entry = SIGNED_ENTRIES / (time.perf_counter() - started)
+    
+    audit = AuditTrail({'audit_checkpoint_seconds': 0}, crypto)
+    await audit.start()
+    started = time.perf_counter()
+    for i in range(ENTRIES):
+        audit.record(f"user-{i % 100}", "zerotrust.verify", "db", True)
+    elapsed = time.perf_counter() - started
+    await audit.stop()
+    stats = audit.get_stats()
+    
+    print(f"sign every entry:   {per_entry:>12,.0f} entries/s")
+    print(f"merkle checkpoints: {ENTRIES / elapsed:>12,.0f} entries/s "
+          f"({stats['checkpoints']} signatures for {stats['entries']:,} entries, "
+          f"{stats['in_memory']:,} held in memory)")
+    
+    checkpoint = audit.checkpoint()
+    started = time.perf_counter()
+    proofs = 10_000
+    for i in range(proofs):
+        proof = audit.prove(ENTRIES - 1 - (i * 7919) % stats['in_memory'])
+        assert verify_inclusion(proof['entry_hash'], proof['index'], proof['size'],
+                                proof['path'], checkpoint['root'])
+    elapsed = time.perf_counter() - started
+    print(f"prove + verify:     {elapsed / proofs * 1e6:>12.1f} us/entry "
+          f"({len(proof['path'])} hashes per proof)")
+    
+    crypto.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,59 @@
+"""
+Benchmark: event-loop responsiveness while crypto saturates the CPU
+
+Measures how late a 1 ms periodic task wakes up while a batch of large
+payloads is encrypted inline on the loop vs. on the crypto thread pool.
+
+Usage:
+    python benchmarks/bench_crypto_offload.py
+"""
+
+import asyncio
+import os
+import statistics
+import time
+
+from ztso.crypto import QuantumSafeCrypto
+
+
+async def probe(lags, stop):
+    """Record wake-up lag of a 1 ms periodic task."""
+    while not stop.is_set():
+        started = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append((time.perf_counter() - started - 0.001) * 1000)
+
+
+async def run(crypto, payloads, offload):
+    lags, stop = [], asyncio.Event()
+    task = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(0.01)
+    
+    started = time.perf_counter()
+    if offload:
+        await crypto.encrypt_many(payloads)
+    else:
+        for data in payloads:
+            crypto.encrypt_pqc(data)
+            await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+    
+    stop.set()
+    await task
+    return elapsed, lags
+
+
+async def main():
+    crypto = QuantumSafeCrypto({})
+    payloads = [os.urandom(8 * 1024 * 1024) for _ in range(64)]
+    
+    for name, offload in (("inline", False), ("thread pool", True)):
+        elapsed, lags = await run(crypto, payloads, offload)
+        print(f"{name:>12}: {len(payloads) * 8 / elapsed:,.0f} MB/s, "
+              f"loop lag p50 {statistics.median(lags):.2f} ms, max {max(lags):.2f} ms")
+    
+    crypto.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
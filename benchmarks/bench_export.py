@@ -0,0 +1,144 @@
+"""
+Benchmark: streaming Parquet / Arrow IPC export vs dumping JSON
+
+Loads a week of synthetic threats into the columnar store and exports
+them to Parquet and Arrow IPC files, reporting throughput, file size,
+peak Arrow memory and an incremental export of the last 1%. The same
+rows are then written as JSON lines on a sample, scaled up, for
+comparison. Finally the threats table is exported from a SQLite copy.
+
+Usage:
+    python benchmarks/bench_export.py [threats, default 10000000] [table rows, default 1000000]
+"""
+
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pyarrow as pa
+import sqlalchemy
+
+from ztso.export import HistoryExporter
+from ztso.threat_store import ThreatStore
+
+TYPES = np.array(['malware_detected', 'network_anomaly', 'unauthorized_access', 'data_exfiltration', 'ddos_attack'])
+SEVERITIES = np.array(['low', 'medium', 'high', 'critical'])
+STATUSES = np.array(['resolved', 'partially_resolved', 'escalated'])
+BATCH = 1_000_000
+WEEK = 7 * 86400
+JSON_SAMPLE = 200_000
+
+
+def load_store(count: int) -> ThreatStore:
+    rng = np.random.default_rng(7)
+    now = time.time()
+    store = ThreatStore({'threat_store_max_rows': count})
+    for first in range(0, count, BATCH):
+        size = min(BATCH, count - first)
+        store.extend({
+            'timestamp': now - WEEK + (first + np.arange(size)) * (WEEK / count),
+            'type': TYPES[rng.integers(0, len(TYPES), size)],
+            'severity': SEVERITIES[rng.integers(0, len(SEVERITIES), size)],
+            'source': rng.integers(0, 20000, size).astype(str),
+            'status': STATUSES[rng.integers(0, len(STATUSES), size)],
+            'score': rng.random(size),
+            'response_ms': rng.lognormal(3, 1, size)
+        })
+    return store
+
+
+def report(label: str, result, path: str):
+    rows = result['rows']
+    print(f"{label:<34} {rows:>10,} rows {result['row_groups']:>4} groups {result['seconds']:>7.2f} s "
+          f"{rows / max(result['seconds'], 1e-9) / 1e6:>6.2f} M rows/s {os.path.getsize(path) / 2**20:>8.1f} MiB")
+
+
+def json_lines(store: ThreatStore, path: str, rows: int) -> float:
+    """Write the first rows as JSON lines, the way a dict-based dump would."""
+    values = {name: dictionary.values for name, dictionary in store.dictionaries.items()}
+    started = time.perf_counter()
+    with open(path, 'w') as f:
+        for batch in store.scan(until=rows):
+            columns = {name: array.tolist() for name, array in batch.items()}
+            for i in range(len(columns['timestamp'])):
+                f.write(json.dumps({
+                    'timestamp': datetime.utcfromtimestamp(columns['timestamp'][i]).isoformat(),
+                    **{name: values[name][columns[name][i]] for name in values},
+                    'score': columns['score'][i],
+                    'response_ms': columns['response_ms'][i]
+                }) + '\n')
+    return time.perf_counter() - started
+
+
+def fill_table(engine, rows: int):
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE threats (id INTEGER PRIMARY KEY, threat_type VARCHAR(100), severity VARCHAR(20), "
+            "score FLOAT, detected_at DATETIME, resolved BOOLEAN, resolved_at DATETIME)"
+        )
+        rng = np.random.default_rng(3)
+        start = datetime(2026, 1, 1).timestamp()
+        for first in range(0, rows, 100_000):
+            size = min(100_000, rows - first)
+            stamps = start + (first + np.arange(size)) * 0.5
+            connection.exec_driver_sql(
+                "INSERT INTO threats (threat_type, severity, score, detected_at, resolved, resolved_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(str(TYPES[i % 5]), str(SEVERITIES[i % 4]), float(score),
+                  datetime.utcfromtimestamp(stamp).isoformat(sep=' '), i % 2,
+                  datetime.utcfromtimestamp(stamp + 30).isoformat(sep=' ') if i % 2 else None)
+                 for i, (score, stamp) in enumerate(zip(rng.random(size), stamps))]
+            )
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    table_rows = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    logging.disable(logging.INFO)
+    started = time.perf_counter()
+    store = load_store(count)
+    print(f"loaded {count:,} threats in {time.perf_counter() - started:.1f} s")
+    
+    with tempfile.TemporaryDirectory() as directory:
+        exporter = HistoryExporter({'export_state_file': os.path.join(directory, 'state.json')})
+        pool = pa.default_memory_pool()
+        for format, name in (('parquet', 'threats.parquet'), ('arrow', 'threats.arrow')):
+            path = os.path.join(directory, name)
+            baseline = pool.bytes_allocated()
+            report(f"store -> {format}", exporter.export_store(store, path, format=format), path)
+            print(f"{'':<34} peak Arrow memory {(pool.max_memory() - baseline) / 2**20:.1f} MiB")
+            os.remove(path)
+        
+        path = os.path.join(directory, 'columns.parquet')
+        report("store -> parquet (3 columns, 24h)",
+               exporter.export_store(store, path, start=time.time() - 86400,
+                                     columns=['timestamp', 'severity', 'response_ms']), path)
+        
+        exporter.export_store(store, os.path.join(directory, 'full.parquet'), incremental=True)
+        os.remove(os.path.join(directory, 'full.parquet'))
+        new = count // 100
+        store.extend({'timestamp': np.full(new, time.time()), 'type': TYPES[np.arange(new) % 5],
+                      'severity': SEVERITIES[np.arange(new) % 4]})
+        path = os.path.join(directory, 'increment.parquet')
+        report("store -> parquet (incremental 1%)", exporter.export_store(store, path, incremental=True), path)
+        
+        path = os.path.join(directory, 'sample.jsonl')
+        sample = min(JSON_SAMPLE, count)
+        seconds = json_lines(store, path, sample) * count / sample
+        size = os.path.getsize(path) * count / sample
+        print(f"{'JSON lines (scaled from sample)':<34} {count:>10,} rows {'':>11}{seconds:>7.2f} s "
+              f"{count / seconds / 1e6:>6.2f} M rows/s {size / 2**20:>8.1f} MiB")
+        
+        engine = sqlalchemy.create_engine(f"sqlite:///{os.path.join(directory, 'ztso.db')}")
+        fill_table(engine, table_rows)
+        path = os.path.join(directory, 'table.parquet')
+        report("threats table -> parquet", exporter.export_table(engine, 'threats', path), path)
+
+
+if __name__ == "__main__":
+    main()
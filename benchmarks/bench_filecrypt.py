@@ -0,0 +1,55 @@
+"""
+Benchmark: bulk file encryption throughput and memory
+
+Encrypts and decrypts a scratch file with one worker and with one worker
+per CPU, reporting throughput and peak RSS of the parent and the largest
+worker. RSS stays near one region per worker regardless of file size.
+
+Usage:
+    python benchmarks/bench_filecrypt.py [size in MiB, default 1024]
+"""
+
+import os
+import resource
+import sys
+import tempfile
+
+from ztso import filecrypt
+from ztso.crypto import QuantumSafeCrypto
+
+
+def peak_rss_mib(who) -> float:
+    """Peak resident set size in MiB (Linux reports KiB)."""
+    return resource.getrusage(who).ru_maxrss / 1024
+
+
+def main():
+    size = int(sys.argv[1]) * 1024 * 1024 if len(sys.argv) > 1 else 1024 * 1024 * 1024
+    crypto = QuantumSafeCrypto({'keypair_pool_depth': 0})
+    public_key, private_key = crypto.generate_keypair()
+    
+    with tempfile.TemporaryDirectory() as scratch:
+        source = os.path.join(scratch, "input.bin")
+        container = os.path.join(scratch, "input.ztsx")
+        restored = os.path.join(scratch, "restored.bin")
+        with open(source, 'wb') as f:
+            block = os.urandom(16 * 1024 * 1024)
+            for _ in range(size // len(block)):
+                f.write(block)
+            f.write(block[:size % len(block)])
+        
+        print(f"file: {size / 2 ** 20:,.0f} MiB, CPUs: {os.cpu_count()}")
+        print(f"{'op':>8} {'workers':>8} {'MB/s':>9} {'parent RSS':>11} {'worker RSS':>11}")
+        for workers in sorted({1, os.cpu_count() or 1}):
+            stats = filecrypt.encrypt_file(crypto, source, container, public_key, workers=workers)
+            print(f"{'encrypt':>8} {stats['workers']:>8} {size / stats['seconds'] / 1e6:>9,.0f} "
+                  f"{peak_rss_mib(resource.RUSAGE_SELF):>9.0f}Mi {peak_rss_mib(resource.RUSAGE_CHILDREN):>9.0f}Mi")
+            stats = filecrypt.decrypt_file(crypto, container, restored, private_key, workers=workers)
+            print(f"{'decrypt':>8} {stats['workers']:>8} {size / stats['seconds'] / 1e6:>9,.0f} "
+                  f"{peak_rss_mib(resource.RUSAGE_SELF):>9.0f}Mi {peak_rss_mib(resource.RUSAGE_CHILDREN):>9.0f}Mi")
+    
+    crypto.close()
+
+
+if __name__ == "__main__":
+    main()
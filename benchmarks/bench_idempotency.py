@@ -0,0 +1,82 @@
+"""
+Benchmark: replayed incidents with and without the action ledger
+
+Delivers each incident several times, as at-least-once ingest and client
+retries do, with enforcement actions that take a fixed time. Reports
+action executions and total time, plus the ledger's own overhead per
+lookup.
+
+Usage:
+    python benchmarks/bench_idempotency.py [incidents, default 200]
+"""
+
+import asyncio
+import logging
+import sys
+import time
+
+from ztso.idempotency import ActionLedger
+from ztso.response import ACTION_DESCRIPTIONS, AutomatedResponse
+
+ACTION_LATENCY = 0.01
+DELIVERIES = 5
+LOOKUPS = 100000
+
+
+async def replay(config, incidents):
+    engine = AutomatedResponse({'coalesce_window': 0, **config})
+    executions = 0
+    
+    def delayed(description):
+        async def action(context):
+            nonlocal executions
+            executions += 1
+            await asyncio.sleep(ACTION_LATENCY)
+            return description
+        return action
+    
+    for name, description in ACTION_DESCRIPTIONS.items():
+        engine.register_action(name, delayed(description))
+    await engine.start()
+    
+    started = time.perf_counter()
+    for delivery in range(DELIVERIES):
+        await asyncio.gather(*(
+            engine.respond({'type': 'ddos_attack', 'target': f'service-{i}', 'delivery_id': delivery}, 'high')
+            for i in range(incidents)
+        ))
+    elapsed = time.perf_counter() - started
+    await engine.stop()
+    return executions, elapsed
+
+
+async def main():
+    incidents = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    logging.disable(logging.WARNING)
+    
+    print(f"{incidents} incidents x {DELIVERIES} deliveries, {ACTION_LATENCY * 1000:.0f} ms per action")
+    print(f"{'mode':>10} {'executions':>11} {'seconds':>8}")
+    for mode, config in (('no ledger', {'idempotency_ttl': 0}), ('ledger', {})):
+        executions, elapsed = await replay(config, incidents)
+        print(f"{mode:>10} {executions:>11,} {elapsed:>8.2f}")
+    
+    ledger = ActionLedger({})
+    
+    async def execute():
+        return "ok"
+    
+    await ledger.run('f', 'block_sources', 't', 0, execute)
+    fingerprint = ledger.fingerprint({'type': 'ddos_attack', 'target': 'service-1', 'delivery_id': 1})
+    started = time.perf_counter()
+    for _ in range(LOOKUPS):
+        await ledger.run('f', 'block_sources', 't', 0, execute)
+    lookup = (time.perf_counter() - started) / LOOKUPS * 1e6
+    started = time.perf_counter()
+    for _ in range(LOOKUPS):
+        ledger.fingerprint({'type': 'ddos_attack', 'target': 'service-1', 'delivery_id': 1})
+    print(f"replayed lookup: {lookup:.2f} us, fingerprint: "
+          f"{(time.perf_counter() - started) / LOOKUPS * 1e6:.2f} us ({fingerprint[:8]}...)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
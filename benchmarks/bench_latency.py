@@ -0,0 +1,74 @@
+"""
+Benchmark: streaming latency quantiles vs keeping every sample
+
+Records lognormal response latencies across threat types and severities,
+then reports record throughput, traced memory, p50/p95/p99 error against
+exact quantiles from the full sample list, and the cost of window
+queries and of merging per-worker trackers.
+
+Usage:
+    python benchmarks/bench_latency.py [samples, default 1000000]
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+
+from ztso.latency import LatencyTracker
+
+TYPES = ('malware_detected', 'network_anomaly', 'unauthorized_access', 'data_exfiltration', 'ddos_attack')
+SEVERITIES = ('low', 'medium', 'high', 'critical')
+QUERIES = 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    rng = random.Random(1)
+    samples = [rng.lognormvariate(-3, 1.2) for _ in range(count)]
+    now = time.time()
+    step = 3000 / count
+    
+    def fill() -> LatencyTracker:
+        tracker = LatencyTracker({})
+        for i, value in enumerate(samples):
+            tracker.record('time_to_respond', value, TYPES[i % 5], SEVERITIES[i % 4], now=now - 3000 + i * step)
+        return tracker
+    
+    started = time.perf_counter()
+    tracker = fill()
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    fill()
+    traced = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"record: {count / elapsed:,.0f} samples/s, {len(tracker.series)} series, "
+          f"{traced / 2 ** 20:.1f} MiB peak traced (a list of the samples: {count * 32 / 2 ** 20:.0f} MiB)")
+    
+    exact = sorted(samples)
+    summary = tracker.summary('time_to_respond', '1h', now=now)
+    for q in (50, 95, 99):
+        true = exact[int(q / 100 * (count - 1))] * 1000
+        error = abs(summary[f"p{q}_ms"] - true) / true * 100
+        print(f"p{q}: {summary[f'p{q}_ms']:8.3f} ms, exact {true:8.3f} ms, error {error:.2f}%")
+    
+    for window in ('1h', '24h'):
+        started = time.perf_counter()
+        for _ in range(QUERIES):
+            tracker.summary('time_to_respond', window, now=now)
+        print(f"summary {window:>3}: {(time.perf_counter() - started) / QUERIES * 1e6:.0f} us")
+    
+    started = time.perf_counter()
+    breakdown = tracker.breakdown('time_to_respond', '1h', now=now)
+    print(f"breakdown 1h: {len(breakdown['by_type']) + len(breakdown['by_severity'])} series "
+          f"in {(time.perf_counter() - started) * 1000:.1f} ms")
+    
+    merged = LatencyTracker({})
+    started = time.perf_counter()
+    for _ in range(8):
+        merged.merge(tracker)
+    print(f"merge 8 workers: {(time.perf_counter() - started) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
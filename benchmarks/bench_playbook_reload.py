@@ -0,0 +1,77 @@
+"""
+Benchmark: playbook registry load, reload and selection
+
+Generates 1,000 playbook files, then times a cold load, a poll with no
+changes, a reload after editing one file, and playbook selection.
+
+Usage:
+    python benchmarks/bench_playbook_reload.py [playbooks, default 1000]
+"""
+
+import logging
+import os
+import sys
+import tempfile
+import time
+
+from ztso.analytics import SEVERITY_LEVELS
+from ztso.playbook_registry import PlaybookRegistry
+from ztso.response import ACTION_DESCRIPTIONS, AutomatedResponse
+
+SELECTIONS = 1_000_000
+
+
+def playbook(i: int, extra: str = '') -> str:
+    actions = sorted(name for name in ACTION_DESCRIPTIONS if not name.startswith('notify_'))
+    return (f"name: playbook_{i}\n"
+            f"threat_types: [threat_{i}{extra}]\n"
+            f"steps:\n"
+            f"  - action: {actions[i % len(actions)]}\n"
+            f"  - action: {actions[(i + 1) % len(actions)]}\n"
+            f"    depends_on: [{actions[i % len(actions)]}]\n"
+            f"  - action: notify_security_team\n"
+            f"    critical: false\n")
+
+
+def timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return (time.perf_counter() - started) * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    logging.disable(logging.INFO)
+    actions = AutomatedResponse({}).actions
+    
+    with tempfile.TemporaryDirectory() as directory:
+        with open(os.path.join(directory, "default.yaml"), 'w') as f:
+            f.write("name: default\nthreat_types: [default]\nsteps:\n  - action: log_incident\n")
+        for i in range(count):
+            with open(os.path.join(directory, f"playbook_{i}.yaml"), 'w') as f:
+                f.write(playbook(i))
+        
+        registry = PlaybookRegistry(actions, {'playbook_dir': directory})
+        print(f"{'operation':>24} {'ms':>9}")
+        print(f"{'cold load':>24} {timed(registry.reload):>9.1f}")
+        print(f"{'poll, no changes':>24} {timed(registry.reload):>9.1f}")
+        
+        with open(os.path.join(directory, "playbook_7.yaml"), 'w') as f:
+            f.write(playbook(7, ', threat_extra'))
+        stat = os.stat(os.path.join(directory, "playbook_7.yaml"))
+        os.utime(os.path.join(directory, "playbook_7.yaml"), ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        print(f"{'reload, one file edited':>24} {timed(registry.reload):>9.1f}")
+        print(f"{'forced full reload':>24} {timed(lambda: registry.reload(force=True)):>9.1f}")
+        
+        keys = [(f"threat_{i % (count + 10)}", SEVERITY_LEVELS[i % 4]) for i in range(1000)]
+        started = time.perf_counter()
+        for _ in range(SELECTIONS // len(keys)):
+            for threat_type, severity in keys:
+                registry.select(threat_type, severity)
+        per_select = (time.perf_counter() - started) / SELECTIONS * 1e9
+        print(f"{'select (ns)':>24} {per_select:>9.0f}")
+        print(f"playbooks: {len(registry.playbooks)}, index entries: {len(registry.index)}")
+
+
+if __name__ == "__main__":
+    main()
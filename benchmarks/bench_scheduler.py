@@ -0,0 +1,65 @@
+"""
+Benchmark: critical response latency during a low-severity flood
+
+Queues a flood of low-severity threats, each taking a few milliseconds to
+respond to, then submits critical threats and measures how long each
+waits to start: inline in arrival order (the previous behaviour) and
+through the severity scheduler.
+
+Usage:
+    python benchmarks/bench_scheduler.py [flood size, default 5000]
+"""
+
+import asyncio
+import sys
+import time
+
+from ztso.scheduler import ResponseScheduler
+
+RESPONSE_LATENCY = 0.005
+CRITICAL = 20
+
+
+async def main():
+    flood = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    started = {}
+    
+    async def handler(threat_data, severity):
+        started.setdefault(threat_data['id'], time.perf_counter())
+        await asyncio.sleep(RESPONSE_LATENCY)
+        return severity
+    
+    # Arrival order on 8 concurrent handlers: criticals queue behind the flood
+    lock = asyncio.Semaphore(8)
+    
+    async def inline(threat_data, severity):
+        async with lock:
+            return await handler(threat_data, severity)
+    
+    scheduler = ResponseScheduler(handler, {'scheduler_workers': 8, 'scheduler_max_queue': flood * 2})
+    await scheduler.start()
+    
+    print(f"flood: {flood:,} low-severity threats at {RESPONSE_LATENCY * 1000:.0f} ms each")
+    print(f"{'mode':>10} {'critical p50 ms':>16} {'critical max ms':>16}")
+    for mode, submit in (('fifo', inline), ('scheduled', scheduler.submit)):
+        started.clear()
+        low = [asyncio.create_task(submit({'id': ('low', i)}, 'low')) for i in range(flood)]
+        await asyncio.sleep(0.01)
+        
+        submitted = {}
+        critical = []
+        for i in range(CRITICAL):
+            submitted[('critical', i)] = time.perf_counter()
+            critical.append(asyncio.create_task(submit({'id': ('critical', i)}, 'critical')))
+            await asyncio.sleep(0.005)
+        await asyncio.gather(*critical, *low)
+        
+        waits = [(started[key] - at) * 1000 for key, at in submitted.items()]
+        waits.sort()
+        print(f"{mode:>10} {waits[len(waits) // 2]:>16.2f} {waits[-1]:>16.2f}")
+    
+    await scheduler.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
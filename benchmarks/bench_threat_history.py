@@ -0,0 +1,49 @@
+"""
+Benchmark: threat history memory and windowed queries under a flood
+
+Records a sustained flood of threats spread over a week, sampling
+traced memory as it goes, then times 1h/24h/7d window queries.
+Memory levels off once the raw-event buffer is full.
+
+Usage:
+    python benchmarks/bench_threat_history.py [threats, default 1000000]
+"""
+
+import sys
+import time
+import tracemalloc
+
+from ztso.threat_history import DAY, HOUR, WEEK, ThreatHistory
+
+QUERIES = 10000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    history = ThreatHistory({})
+    response = {'status': 'resolved'}
+    start = time.time() - WEEK
+    step = WEEK / count
+    
+    tracemalloc.start()
+    print(f"{'threats':>10} {'traced MiB':>11}")
+    started = time.perf_counter()
+    for i in range(count):
+        history.record({'type': 'ddos_attack', 'source': '198.51.100.7'}, response, 'high',
+                       timestamp=start + i * step)
+        if (i + 1) % (count // 5) == 0:
+            print(f"{i + 1:>10,} {tracemalloc.get_traced_memory()[0] / 2 ** 20:>11.1f}")
+    elapsed = time.perf_counter() - started
+    tracemalloc.stop()
+    print(f"record: {count / elapsed:,.0f} threats/s")
+    
+    for label, window in (('1h', HOUR), ('24h', DAY), ('7d', WEEK)):
+        started = time.perf_counter()
+        for _ in range(QUERIES):
+            total = history.count(window)
+        per_query = (time.perf_counter() - started) / QUERIES * 1e6
+        print(f"count {label:>3}: {total:>9,} threats in {per_query:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Benchmark: trust-state snapshot compaction and restore
+
+Usage:
+    python benchmarks/bench_trust_state.py [entries]
+"""
+
+import sys
+import tempfile
+import time
+
+from ztso.trust import TrustScoreTable, TRUST_FACTORS
+from ztso.trust_state import TrustStateStore
+
+
+def main():
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000_000
+    thresholds = {'verified': 0.75, 'requires_mfa': 0.90}
+    factors = {name: 0.9 for name in TRUST_FACTORS}
+    
+    with tempfile.TemporaryDirectory() as directory:
+        store = TrustStateStore({
+            'trust_state_path': directory,
+            'continuous_auth_interval': 3600,
+            'trust_state_compact_threshold': entries + 1
+        })
+        store.start()
+        
+        now = time.time()
+        started = time.perf_counter()
+        for i in range(entries):
+            # Every tenth entry is already expired
+            store.record(f"user-{i}", now - 7200 if i % 10 == 0 else now, 0.9, factors)
+        enqueue = time.perf_counter() - started
+        print(f"enqueue {entries:,} records: {enqueue:.2f} s "
+              f"({enqueue / entries * 1e6:.2f} us/record on the request path)")
+        
+        store.stop()
+        
+        started = time.perf_counter()
+        store.compact()
+        print(f"compaction: {time.perf_counter() - started:.2f} s")
+        
+        table = TrustScoreTable()
+        loaded = store.load_into(table, thresholds)
+        print(f"restore via mmap: {store.stats['last_load_ms']:.0f} ms, "
+              f"{loaded:,} loaded, {store.stats['skipped_expired']:,} expired skipped")
+
+
+if __name__ == "__main__":
+    main()
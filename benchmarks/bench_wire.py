@@ -0,0 +1,69 @@
+"""
+Benchmark: hex JSON vs. octet-stream vs. msgpack on /crypto/encrypt
+
+Reports request and response bytes on the wire and median latency per
+payload size, using the in-process test client.
+
+Usage:
+    python benchmarks/bench_wire.py
+"""
+
+import json
+import statistics
+import string
+import random
+import time
+
+import msgpack
+from fastapi.testclient import TestClient
+
+from ztso.main import app, orchestrator
+
+SIZES = [1024, 64 * 1024, 1024 * 1024, 8 * 1024 * 1024]
+ROUNDS = 15
+PUBLIC_KEY, _ = orchestrator.crypto_engine._generate_pqc_keypair('CRYSTALS-Kyber')
+
+
+def hex_json(client, payload):
+    body = json.dumps({"data": payload.decode()}).encode()
+    response = client.post("/crypto/encrypt", content=body, headers={"Content-Type": "application/json"})
+    return len(body), len(response.content)
+
+
+def octet_stream(client, payload):
+    response = client.post("/crypto/encrypt", content=payload,
+                           headers={"Content-Type": "application/octet-stream",
+                                    "X-ZTSO-Public-Key": PUBLIC_KEY.hex()})
+    return len(payload), len(response.content)
+
+
+def msgpack_batch(client, payload):
+    body = msgpack.packb({"items": [payload]}, use_bin_type=True)
+    response = client.post("/crypto/encrypt/batch", content=body,
+                           headers={"Content-Type": "application/msgpack"})
+    return len(body), len(response.content)
+
+
+def main():
+    formats = {'hex-json': hex_json, 'octet': octet_stream, 'msgpack': msgpack_batch}
+    
+    with TestClient(app) as client:
+        print(f"{'size':>9} {'format':>9} {'request':>10} {'response':>10} {'latency ms':>11} {'speedup':>8}")
+        for size in SIZES:
+            # Printable payload so the JSON variant can carry it as a string
+            payload = ''.join(random.choices(string.ascii_letters, k=size)).encode()
+            baseline = None
+            for name, send in formats.items():
+                timings = []
+                for _ in range(ROUNDS):
+                    started = time.perf_counter()
+                    request_bytes, response_bytes = send(client, payload)
+                    timings.append(time.perf_counter() - started)
+                latency = statistics.median(timings) * 1000
+                baseline = baseline or latency
+                print(f"{size:>9} {name:>9} {request_bytes:>10} {response_bytes:>10} "
+                      f"{latency:>11.2f} {baseline / latency:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
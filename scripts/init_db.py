@@ -4,7 +4,7 @@ Database initialization script
 
 import asyncio
 import logging
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Float, Boolean
+from sqlalchemy import create_engine, Column, Integer, BigInteger, String, Text, DateTime, Float, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
@@ -55,15 +55,37 @@ class Incident(Base):
 
 
 class AuditLog(Base):
-    """Audit log records."""
+    """Audit log records (hash-chained, see ztso/audit.py)."""
     __tablename__ = 'audit_logs'
     
     id = Column(Integer, primary_key=True)
+    seq = Column(BigInteger, unique=True, index=True)
     user_id = Column(String(100))
     action = Column(String(200))
     resource = Column(String(200))
     timestamp = Column(DateTime, default=datetime.utcnow)
     success = Column(Boolean)
+    details = Column(Text, nullable=True)
+    record = Column(Text)  # canonical encoding covered by entry_hash
+    entry_hash = Column(String(64), unique=True)
+    prev_hash = Column(String(64))
+
+
+class AuditCheckpoint(Base):
+    """Signed Merkle roots over the audit log."""
+    __tablename__ = 'audit_checkpoints'
+    
+    id = Column(Integer, primary_key=True)
+    size = Column(BigInteger, unique=True, index=True)
+    root = Column(String(64))
+    head = Column(String(64))
+    peaks = Column(Text)  # complete subtree roots, to resume the tree
+    timestamp = Column(Float)
+    signature = Column(Text)
+    algorithm = Column(String(50))
+    key_id = Column(String(16))
+    public_key = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
 
 
 def init_database():
@@ -0,0 +1,221 @@
+"""
+API tests for the FastAPI application
+"""
+
+import io
+import os
+
+import cbor2
+import msgpack
+import pyarrow.parquet as pq
+import pytest
+from fastapi.testclient import TestClient
+
+from ztso.main import app, orchestrator
+
+
+@pytest.fixture
+def client():
+    """Create test client with application lifecycle."""
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_encrypt_endpoint(client):
+    """Test single-payload encryption."""
+    response = client.post("/crypto/encrypt", json={"data": "hello"})
+    
+    assert response.status_code == 200
+    body = response.json()
+    assert body['algorithm'] == 'CRYSTALS-Kyber'
+    assert bytes.fromhex(body['encrypted_data']).startswith(b'ZTSE')
+
+
+def test_encrypt_batch_endpoint(client):
+    """Test batch encryption returns one result per item."""
+    response = client.post("/crypto/encrypt/batch", json={"items": ["a", "b", "c"]})
+    
+    assert response.status_code == 200
+    assert len(response.json()['results']) == 3
+
+
+def test_encrypt_rejects_unknown_algorithm(client):
+    """Test unsupported algorithms return 400."""
+    response = client.post("/crypto/encrypt", json={"data": "x", "algorithm": "RSA"})
+    
+    assert response.status_code == 400
+
+
+def test_policy_reload_and_rollback(client):
+    """Test policy hot-reload and rollback endpoints."""
+    version = client.get("/zerotrust/policies").json()['version']
+    
+    response = client.post("/zerotrust/policies/reload", json={"policies": {"micro_segmentation": True}})
+    assert response.json()['version'] == version + 1
+    
+    response = client.post("/zerotrust/policies/rollback", json={})
+    assert response.json()['version'] == version
+    
+    response = client.post("/zerotrust/policies/reload", json={"weights": {"credentials": 1.0}})
+    assert response.status_code == 400
+
+
+def test_encrypt_batch_limits(client, monkeypatch):
+    """Test batches over the item or byte limit are rejected with 413."""
+    engine = orchestrator.crypto_engine
+    monkeypatch.setattr(engine, 'batch_max_items', 2)
+    response = client.post("/crypto/encrypt/batch", json={"items": ["a", "b", "c"]})
+    assert response.status_code == 413
+    
+    monkeypatch.setattr(engine, 'batch_max_items', 100)
+    monkeypatch.setattr(engine, 'batch_max_bytes', 1024)
+    response = client.post("/crypto/encrypt/batch", json={"items": ["x" * 2048]})
+    assert response.status_code == 413
+    
+    response = client.post("/crypto/encrypt/batch", json={"items": ["a", "b"]})
+    assert response.status_code == 200
+
+
+def test_encrypt_octet_stream(client):
+    """Test raw binary bodies are streamed back in the chunked format with metadata headers."""
+    payload = os.urandom(3 * 1024 * 1024 + 17)
+    public_key, private_key = orchestrator.crypto_engine._generate_pqc_keypair('CRYSTALS-Kyber')
+    
+    response = client.post(
+        "/crypto/encrypt",
+        content=iter([payload[i:i + 65536] for i in range(0, len(payload), 65536)]),
+        headers={"Content-Type": "application/octet-stream", "X-ZTSO-Public-Key": public_key.hex()}
+    )
+    
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/octet-stream'
+    assert response.headers['x-ztso-algorithm'] == 'CRYSTALS-Kyber'
+    assert response.headers['x-ztso-format'] == 'stream'
+    assert response.content.startswith(b'ZTSF')
+    assert orchestrator.crypto_engine.decrypt_pqc(response.content, private_key) == payload
+    
+    # Without a recipient key nobody could decrypt the result
+    response = client.post("/crypto/encrypt", content=payload[:1024],
+                           headers={"Content-Type": "application/octet-stream"})
+    assert response.status_code == 400
+
+
+def test_encrypt_json_with_binary_response(client):
+    """Test JSON requests can ask for the raw envelope instead of hex."""
+    response = client.post(
+        "/crypto/encrypt", json={"data": "hello"}, headers={"Accept": "application/octet-stream"}
+    )
+    
+    assert response.status_code == 200
+    assert response.content.startswith(b'ZTSE')
+    assert response.headers['x-ztso-hybrid-mode'] == 'true'
+
+
+def test_encrypt_rejects_unknown_media_type(client):
+    """Test unsupported request encodings return 415."""
+    response = client.post("/crypto/encrypt", content=b"x", headers={"Content-Type": "text/plain"})
+    
+    assert response.status_code == 415
+
+
+def test_encrypt_batch_msgpack(client):
+    """Test msgpack batches carry raw bytes both ways."""
+    body = msgpack.packb({"items": [b"\x00\x01", b"\xff"]}, use_bin_type=True)
+    
+    response = client.post("/crypto/encrypt/batch", content=body,
+                           headers={"Content-Type": "application/msgpack"})
+    
+    assert response.status_code == 200
+    results = msgpack.unpackb(response.content, raw=False)['results']
+    assert [r['encrypted_data'][:4] for r in results] == [b'ZTSE', b'ZTSE']
+
+
+def test_encrypt_batch_cbor(client):
+    """Test CBOR batches carry raw bytes both ways and reject malformed bodies."""
+    body = cbor2.dumps({"items": [b"\x00" * 32, b""], "algorithm": "CRYSTALS-Kyber"})
+    
+    response = client.post("/crypto/encrypt/batch", content=body,
+                           headers={"Content-Type": "application/cbor"})
+    
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/cbor'
+    results = cbor2.loads(response.content)['results']
+    assert len(results) == 2
+    assert all(r['encrypted_data'].startswith(b'ZTSE') for r in results)
+    assert results[0]['metadata']['data_size'] == len(results[0]['encrypted_data'])
+    
+    response = client.post("/crypto/encrypt/batch", content=b"\xff\xff",
+                           headers={"Content-Type": "application/cbor"})
+    assert response.status_code == 400
+
+
+def test_verify_is_audited(client):
+    """Test identity verification is recorded and provable from the audit trail."""
+    client.post("/zerotrust/verify", json={"user_id": "auditor", "context": {"resource": "vault"}})
+    seq = client.get("/metrics").json()['audit']['entries'] - 1
+    
+    response = client.get(f"/audit/entries/{seq}")
+    
+    assert response.status_code == 200
+    body = response.json()
+    assert body['entry']['user_id'] == "auditor"
+    assert body['entry']['resource'] == "vault"
+    assert body['proof']['root'] == body['proof']['checkpoint']['root']
+    assert client.get("/audit/entries/999999999").status_code == 404
+
+
+def test_posture_revalidation(client, monkeypatch):
+    """Test posture is served with an ETag, 304 while unchanged and a new ETag after a threat."""
+    from ztso.main import orchestrator
+    monkeypatch.setattr(orchestrator.analytics.posture, 'refresh_interval', 0)
+    
+    first = client.get("/security-posture")
+    etag = first.headers['etag']
+    assert first.status_code == 200 and 'overall_score' in first.json()
+    assert client.get("/security-posture", headers={"If-None-Match": etag}).status_code == 304
+    
+    orchestrator.analytics.record_threat({'type': 'malware_detected', 'score': 0.95},
+                                         {'status': 'resolved', 'severity': 'critical'})
+    changed = client.get("/security-posture", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers['etag'] != etag
+    assert changed.json()['threat_level'] == 'critical'
+    assert client.get("/dashboard", headers={"If-None-Match": "*"}).status_code == 304
+
+
+def test_prometheus_metrics(client):
+    """Test /metrics serves Prometheus text to scrapers and stays JSON for everyone else."""
+    client.post("/zerotrust/verify", json={"user_id": "alice", "context": {"device_id": "laptop"}})
+    client.post("/crypto/encrypt", json={"data": "hello"})
+    client.post("/threat/analyze", json={"data": {"bytes": 100}})
+    response = client.get("/metrics", headers={
+        "Accept": "application/openmetrics-text;version=1.0.0,text/plain;version=0.0.4;q=0.5,*/*;q=0.1"
+    })
+    
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain')
+    text = response.text
+    assert 'ztso_stage_calls_total{stage="policy_verify"}' in text
+    assert 'ztso_stage_duration_seconds_count{stage="crypto_encrypt"}' in text
+    assert 'ztso_stage_calls_total{stage="detection"}' in text
+    assert 'ztso_cache_hit_ratio{cache="data_key"}' in text
+    assert 'ztso_queue_depth{queue="response_critical"}' in text
+    assert 'security_score' in client.get("/metrics").json()
+    assert 'security_score' in client.get("/metrics", headers={"Accept": "application/json, text/plain, */*"}).json()
+
+
+def test_threat_export(client):
+    """Test threats download as Parquet with a cursor for the next incremental export."""
+    from ztso.main import orchestrator
+    orchestrator.analytics.record_threat({'type': 'ddos_attack', 'score': 0.8}, {'status': 'resolved'})
+    
+    response = client.get("/analytics/threats/export", params={"columns": "type,score"})
+    assert response.status_code == 200
+    assert response.headers['content-type'] == 'application/vnd.apache.parquet'
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.column_names == ['type', 'score'] and table.num_rows >= 1
+    
+    cursor = response.headers['x-ztso-export-cursor']
+    newer = client.get("/analytics/threats/export", params={"since": cursor})
+    assert pq.read_table(io.BytesIO(newer.content)).num_rows == 0
+    assert client.get("/analytics/threats/export", params={"format": "csv"}).status_code == 400
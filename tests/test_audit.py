@@ -0,0 +1,155 @@
+"""
+Unit tests for the tamper-evident audit trail
+"""
+
+import asyncio
+import json
+
+import pytest
+from ztso.audit import AuditTrail, verify_inclusion
+from ztso.crypto import QuantumSafeCrypto
+
+
+@pytest.fixture
+def crypto():
+    """Create crypto engine instance."""
+    engine = QuantumSafeCrypto({'keypair_pool_depth': 0})
+    yield engine
+    engine.close()
+
+
+@pytest.fixture
+def audit(crypto):
+    """Create audit trail that only checkpoints on demand."""
+    return AuditTrail({'audit_checkpoint_interval': 0, 'audit_checkpoint_seconds': 0}, crypto)
+
+
+def test_inclusion_proofs(audit):
+    """Test every entry can be proven against every tree size that contains it."""
+    for i in range(37):
+        audit.record(f"user-{i}", "zerotrust.verify", "db", i % 3 != 0, {"attempt": i})
+    
+    for size in range(1, 38):
+        root = audit.root(size)
+        for index in range(size):
+            proof = audit.prove(index, size)
+            assert len(proof['path']) <= size.bit_length()
+            assert verify_inclusion(proof['entry_hash'], index, size, proof['path'], root)
+            other = audit.entry((index + 1) % 37)['entry_hash']
+            assert not verify_inclusion(other, index, size, proof['path'], root)
+
+
+def test_proof_against_signed_checkpoint(audit):
+    """Test proofs default to a signed checkpoint covering the entry."""
+    seq = audit.record("alice", "policy.reload")
+    
+    proof = audit.prove(seq)
+    checkpoint = proof['checkpoint']
+    
+    assert checkpoint['size'] == 1
+    assert checkpoint['root'] == proof['root']
+    assert audit.verify_checkpoint(checkpoint)
+    assert audit.entry(seq)['user_id'] == "alice"
+
+
+@pytest.mark.asyncio
+async def test_checkpoints_signed_off_the_record_path(crypto):
+    """Test record() never signs and the background thread covers the interval in one signature."""
+    audit = AuditTrail({'audit_checkpoint_interval': 100, 'audit_checkpoint_seconds': 0}, crypto)
+    
+    for i in range(250):
+        audit.record("svc", "access", f"resource-{i}")
+    assert audit.get_stats()['checkpoints'] == 0
+    
+    await audit.start()
+    for _ in range(200):
+        if audit.checkpoints:
+            break
+        await asyncio.sleep(0.01)
+    await audit.stop()
+    
+    assert [c['size'] for c in audit.checkpoints] == [250]
+    assert audit.get_stats()['pending'] == 0
+
+
+def test_memory_is_bounded(crypto):
+    """Test only the recent tail is held while it stays provable against the full tree."""
+    audit = AuditTrail({'audit_checkpoint_interval': 0, 'audit_memory_entries': 16}, crypto)
+    
+    for i in range(100):
+        audit.record("svc", "access", f"resource-{i}")
+    
+    assert audit.size == 100
+    assert audit.get_stats()['in_memory'] <= 20
+    with pytest.raises(IndexError):
+        audit.entry(0)
+    assert audit.verify_chain()
+    
+    root = audit.root()
+    for index in range(audit.size - 16, audit.size):
+        proof = audit.prove(index, 100)
+        assert verify_inclusion(proof['entry_hash'], index, 100, proof['path'], root)
+    assert audit.verify_checkpoint(audit.checkpoint())
+
+
+@pytest.mark.asyncio
+async def test_persisted_trail_resumes(crypto, tmp_path):
+    """Test entries and checkpoints are written to the database and the chain resumes from it."""
+    config = {
+        'audit_checkpoint_interval': 0,
+        'audit_memory_entries': 8,
+        'audit_database_url': f"sqlite:///{tmp_path / 'audit.db'}"
+    }
+    audit = AuditTrail(config, crypto)
+    await audit.start()
+    for i in range(40):
+        audit.record("svc", "access", f"resource-{i}")
+    checkpoint = audit.checkpoint()
+    audit.record("svc", "access", "after-checkpoint")
+    await audit.stop()
+    assert audit.get_stats()['persisted'] == 41
+    
+    resumed = AuditTrail(config, crypto)
+    await resumed.start()
+    seq = resumed.record("svc", "access", "resumed")
+    await resumed.stop()
+    
+    assert seq == 41
+    assert resumed.entry(3)['resource'] == "resource-3"
+    assert resumed.entry(seq)['prev_hash'] == audit.entry(40)['entry_hash']
+    assert resumed.verify_checkpoint(resumed.latest_checkpoint())
+    
+    proof = resumed.prove(seq)
+    assert proof['checkpoint']['size'] == 42
+    assert verify_inclusion(proof['entry_hash'], seq, 42, proof['path'], proof['root'])
+    assert resumed.root(checkpoint['size'] + 1) == audit.root(41)
+
+
+def test_tampering_is_detected(audit, crypto):
+    """Test altering a stored entry breaks the chain and the signed root."""
+    for i in range(10):
+        audit.record("bob", "read", f"file-{i}")
+    checkpoint = audit.checkpoint()
+    
+    audit._records[4] = audit._records[4].replace(b'file-4', b'file-X')
+    
+    assert not audit.verify_chain()
+    
+    # Rehashing the altered log still does not match the signed root
+    forged = AuditTrail({'audit_checkpoint_interval': 0}, crypto)
+    for record in audit._records:
+        forged.record(*json.loads(record)[2:])
+    assert forged.verify_chain()
+    assert not forged.verify_checkpoint(checkpoint)
+
+
+@pytest.mark.asyncio
+async def test_stop_signs_pending_entries(crypto):
+    """Test stopping the trail checkpoints unsigned entries."""
+    audit = AuditTrail({'audit_checkpoint_interval': 0}, crypto)
+    await audit.start()
+    audit.record("carol", "login")
+    
+    await audit.stop()
+    
+    assert audit.get_stats()['signed_size'] == 1
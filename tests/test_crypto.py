@@ -0,0 +1,343 @@
+"""
+Unit tests for Quantum-Safe Cryptography
+"""
+
+import io
+import mmap
+import os
+import time
+import pytest
+from ztso import streaming
+from ztso.crypto import QuantumSafeCrypto
+
+
+@pytest.fixture
+def crypto():
+    """Create crypto engine instance."""
+    engine = QuantumSafeCrypto({'keypair_pool_depth': 4})
+    yield engine
+    engine.close()
+
+
+def test_encrypt_uses_keypair_pool(crypto):
+    """Test encryption draws keypairs from the pool and reports stats."""
+    crypto.encrypt_pqc(b"warm-up")
+    
+    deadline = time.time() + 5
+    while crypto.get_keypair_pool_stats()['CRYSTALS-Kyber']['depth'] < 4:
+        assert time.time() < deadline
+        time.sleep(0.01)
+    
+    result = crypto.encrypt_pqc(b"secret")
+    stats = crypto.get_keypair_pool_stats()['CRYSTALS-Kyber']
+    
+    assert result['algorithm'] == 'CRYSTALS-Kyber'
+    assert stats['hits'] + stats['stalls'] == 2
+    assert stats['hits'] >= 1
+    assert stats['generated'] >= 4
+
+
+def test_encrypt_without_pool():
+    """Test pooling can be disabled."""
+    engine = QuantumSafeCrypto({'keypair_pool_depth': 0})
+    
+    result = engine.encrypt_pqc(b"secret")
+    
+    assert engine.keypair_pool is None
+    assert engine.get_keypair_pool_stats() == {}
+    assert len(result['public_key']) == 1568
+
+
+def test_unsupported_algorithm(crypto):
+    """Test unsupported algorithms are rejected."""
+    with pytest.raises(ValueError):
+        crypto.encrypt_pqc(b"secret", algorithm="RSA")
+
+
+@pytest.mark.parametrize("size", [0, 1, 4096, 4096 * 3, 4096 * 3 + 7])
+def test_stream_roundtrip(size):
+    """Test streaming encryption round-trips across chunk boundaries."""
+    engine = QuantumSafeCrypto({'keypair_pool_depth': 0, 'stream_chunk_size': 4096})
+    plaintext = os.urandom(size)
+    
+    encrypted = io.BytesIO()
+    result = engine.encrypt_stream(io.BytesIO(plaintext), encrypted)
+    
+    decrypted = io.BytesIO()
+    encrypted.seek(0)
+    engine.decrypt_stream(encrypted, decrypted, result['key'])
+    
+    assert decrypted.getvalue() == plaintext
+    assert result['chunks'] == max(1, -(-size // 4096))
+
+
+def test_stream_random_access_and_tamper():
+    """Test decryption can start at any chunk and detects tampering."""
+    engine = QuantumSafeCrypto({'keypair_pool_depth': 0, 'stream_chunk_size': 1024})
+    plaintext = os.urandom(1024 * 5 + 100)
+    
+    encrypted = io.BytesIO()
+    key = engine.encrypt_stream(io.BytesIO(plaintext), encrypted)['key']
+    
+    decrypted = io.BytesIO()
+    encrypted.seek(0)
+    engine.decrypt_stream(encrypted, decrypted, key, start_chunk=3, end_chunk=4)
+    assert decrypted.getvalue() == plaintext[3072:4096]
+    
+    # Dropping the final frame must be detected
+    header = streaming.read_header(io.BytesIO(encrypted.getvalue()))
+    truncated = encrypted.getvalue()[:header.frame_offset(5)]
+    with pytest.raises(ValueError):
+        engine.decrypt_stream(io.BytesIO(truncated), io.BytesIO(), key)
+
+
+@pytest.mark.asyncio
+async def test_stream_rejects_oversized_chunk_header():
+    """Test a crafted header cannot make readers buffer more than the configured chunk limit."""
+    engine = QuantumSafeCrypto({'keypair_pool_depth': 0, 'stream_chunk_size': 1024, 'stream_max_chunk_size': 4096})
+    key = os.urandom(32)
+    header = streaming.HEADER.pack(
+        streaming.STREAM_MAGIC, streaming.STREAM_VERSION, streaming.AEAD_AES_256_GCM,
+        2 ** 32 - 1, os.urandom(8), 0
+    )
+    
+    with pytest.raises(ValueError):
+        engine.decrypt_stream(io.BytesIO(header + b'\x00' * 64), io.BytesIO(), key)
+    
+    async def pieces():
+        yield header
+        yield b'\x00' * 64
+    
+    with pytest.raises(ValueError):
+        async for _ in engine.decrypt_async_stream(pieces(), key):
+            pass
+    
+    with pytest.raises(ValueError):
+        QuantumSafeCrypto({'stream_chunk_size': 8192, 'stream_max_chunk_size': 4096})
+
+
+@pytest.mark.asyncio
+async def test_async_stream_roundtrip():
+    """Test async streams re-chunk arbitrary pieces and round-trip."""
+    engine = QuantumSafeCrypto({'keypair_pool_depth': 0, 'stream_chunk_size': 1000})
+    plaintext = os.urandom(5000)
+    key = os.urandom(32)
+    
+    async def pieces(data, size):
+        for i in range(0, len(data), size):
+            yield data[i:i + size]
+    
+    encrypted = b''.join([f async for f in engine.encrypt_async_stream(pieces(plaintext, 333), key)])
+    decrypted = b''.join([c async for c in engine.decrypt_async_stream(pieces(encrypted, 777), key)])
+    
+    assert decrypted == plaintext
+    
+    sync_out = io.BytesIO()
+    engine.decrypt_stream(io.BytesIO(encrypted), sync_out, key)
+    assert sync_out.getvalue() == plaintext
+
+
+@pytest.mark.parametrize("cipher", ["AES-256-GCM", "ChaCha20-Poly1305"])
+def test_envelope_roundtrip(cipher):
+    """Test AEAD envelopes round-trip and carry a versioned header."""
+    engine = QuantumSafeCrypto({'keypair_pool_depth': 0, 'aead_cipher': cipher})
+    public_key, private_key = engine._generate_pqc_keypair('CRYSTALS-Kyber')
+    
+    result = engine.encrypt_pqc(b"top secret", public_key=public_key)
+    encrypted = result['encrypted_data']
+    
+    assert encrypted.startswith(b'ZTSE\x02')
+    assert engine.decrypt_pqc(encrypted, private_key) == b"top secret"
+    
+    tampered = bytearray(encrypted)
+    tampered[-1] ^= 1
+    with pytest.raises(ValueError):
+        engine.decrypt_pqc(bytes(tampered), private_key)
+
+
+def test_legacy_ciphertexts_still_decrypt():
+    """Test ciphertexts in the legacy double-CBC format still decrypt."""
+    legacy = QuantumSafeCrypto({'keypair_pool_depth': 0, 'envelope_mode': 'legacy'})
+    current = QuantumSafeCrypto({'keypair_pool_depth': 0})
+    public_key, private_key = legacy._generate_pqc_keypair('CRYSTALS-Kyber')
+    
+    encrypted = legacy.encrypt_pqc(b"archived", public_key=public_key)['encrypted_data']
+    
+    assert not encrypted.startswith(b'ZTSE')
+    assert current.decrypt_pqc(encrypted, private_key) == b"archived"
+
+
+def test_envelope_rejects_wrong_key():
+    """Test decrypting with another recipient's key fails."""
+    engine = QuantumSafeCrypto({'keypair_pool_depth': 0})
+    public_key, _ = engine._generate_pqc_keypair('CRYSTALS-Kyber')
+    _, other_private = engine._generate_pqc_keypair('CRYSTALS-Kyber')
+    
+    encrypted = engine.encrypt_pqc(b"secret", public_key=public_key)['encrypted_data']
+    
+    with pytest.raises(ValueError):
+        engine.decrypt_pqc(encrypted, other_private)
+
+
+@pytest.mark.asyncio
+async def test_encrypt_many(crypto):
+    """Test batch encryption runs on the crypto pool and keeps input order."""
+    public_key, private_key = crypto._generate_pqc_keypair('CRYSTALS-Kyber')
+    payloads = [f"payload-{i}".encode() for i in range(20)]
+    
+    results = await crypto.encrypt_many(payloads, public_key=public_key)
+    
+    assert [crypto.decrypt_pqc(r['encrypted_data'], private_key) for r in results] == payloads
+    
+    with pytest.raises(ValueError):
+        await crypto.encrypt_many(payloads, algorithm="RSA")
+
+
+@pytest.mark.parametrize("envelope_mode", ["aead", "legacy"])
+def test_buffer_protocol_inputs(tmp_path, envelope_mode):
+    """Test bytearray, memoryview and mmap inputs encrypt without conversion."""
+    engine = QuantumSafeCrypto({'keypair_pool_depth': 0, 'envelope_mode': envelope_mode})
+    public_key, private_key = engine._generate_pqc_keypair('CRYSTALS-Kyber')
+    payload = os.urandom(100_003)
+    
+    path = tmp_path / "payload.bin"
+    path.write_bytes(payload)
+    
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for data in (bytearray(payload), memoryview(payload)[:], mm):
+            encrypted = engine.encrypt_pqc(data, public_key=public_key)['encrypted_data']
+            
+            assert engine.decrypt_pqc(encrypted, private_key) == payload
+            assert engine.decrypt_pqc(memoryview(encrypted), private_key) == payload
+
+
+def test_signature_roundtrip_and_cache(crypto):
+    """Test signatures verify, tampering is rejected and hot signatures hit the cache."""
+    signed = crypto.generate_quantum_safe_signature(b"policy-bundle")
+    public_key = signed['public_key']
+    
+    assert crypto.verify_quantum_safe_signature(b"policy-bundle", signed['signature'], public_key)
+    assert not crypto.verify_quantum_safe_signature(b"policy-bundle!", signed['signature'], public_key)
+    assert not crypto.verify_quantum_safe_signature(b"policy-bundle", signed['signature'], b"bogus")
+    
+    stats = crypto.signatures.get_stats()
+    assert stats['cache_hits'] == 1
+    assert stats['failures'] == 2
+
+
+@pytest.mark.asyncio
+async def test_verify_many(crypto):
+    """Test batch verification keeps input order and only caches valid signatures."""
+    payloads = [f"playbook-{i}".encode() for i in range(100)]
+    signatures = crypto.sign_many(payloads)
+    crypto.signatures.clear_cache()
+    
+    items = [(data, sig, None) for data, sig in zip(payloads, signatures)]
+    items[7] = (b"forged", signatures[7], None)
+    
+    results = await crypto.verify_many(items)
+    assert results == [i != 7 for i in range(100)]
+    
+    await crypto.verify_many(items)
+    stats = crypto.signatures.get_stats()
+    assert stats['cache_hits'] == 99
+    assert stats['verified'] == 101
+
+
+def test_verify_many_chunks_and_cache_key():
+    """Test batches split into the configured worker count and cache entries are per full key."""
+    from ztso.signing import SignatureEngine
+    
+    class RecordingExecutor:
+        def __init__(self):
+            self.chunks = 0
+        
+        def map(self, fn, chunks):
+            chunks = list(chunks)
+            self.chunks = len(chunks)
+            return map(fn, chunks)
+    
+    engine = SignatureEngine({'signature_workers': 4, 'signature_parallel_threshold': 8})
+    other = SignatureEngine({})
+    payloads = [f"bundle-{i}".encode() for i in range(16)]
+    signatures = engine.sign_many(payloads)
+    engine.clear_cache()
+    
+    executor = RecordingExecutor()
+    assert all(engine.verify_many([(p, s, None) for p, s in zip(payloads, signatures)], executor))
+    assert executor.chunks == 4
+    
+    # A cached verification under our key must not answer for another key
+    assert engine.verify(payloads[0], signatures[0]) is True
+    assert engine.verify(payloads[0], signatures[0], other.public_key) is False
+
+
+def test_signing_key_persists(tmp_path):
+    """Test the signing key is created once and reloaded on restart."""
+    config = {'keypair_pool_depth': 0, 'signing_key_path': str(tmp_path / "signing.key")}
+    first = QuantumSafeCrypto(config)
+    signed = first.generate_quantum_safe_signature(b"bundle")
+    
+    second = QuantumSafeCrypto(config)
+    
+    assert second.signatures.key_id == first.signatures.key_id
+    assert second.verify_quantum_safe_signature(b"bundle", signed['signature'], signed['public_key'])
+
+
+def test_tenant_data_key_cache():
+    """Test tenant DEKs are reused, rotate at their message limit and decrypt from the envelope."""
+    # Rotate only on exhaustion so key boundaries are deterministic
+    engine = QuantumSafeCrypto({'keypair_pool_depth': 0, 'dek_max_messages': 10, 'dek_rotate_ahead': 2.0})
+    public_key, private_key = engine._generate_pqc_keypair('CRYSTALS-Kyber')
+    
+    results = [engine.encrypt_for_tenant(f"record-{i}".encode(), "acme", public_key, purpose="records")
+               for i in range(25)]
+    other = engine.encrypt_for_tenant(b"backup", "acme", public_key, purpose="backups")
+    
+    assert len({r['key_id'] for r in results}) == 3
+    assert other['key_id'] not in {r['key_id'] for r in results}
+    assert [engine.decrypt_pqc(r['encrypted_data'], private_key) for r in results] == \
+        [f"record-{i}".encode() for i in range(25)]
+    
+    stats = engine.get_data_key_stats()
+    assert stats['hits'] == 22
+    assert stats['unwrap_misses'] == 3
+    assert stats['unwrap_hits'] == 22
+    
+    _, other_private = engine._generate_pqc_keypair('CRYSTALS-Kyber')
+    with pytest.raises(ValueError):
+        engine.decrypt_pqc(results[0]['encrypted_data'], other_private)
+    engine.close()
+
+
+def test_tenant_data_key_background_rotation():
+    """Test keys near their limit are replaced in the background before callers hit it."""
+    engine = QuantumSafeCrypto({'keypair_pool_depth': 0, 'dek_max_messages': 10, 'dek_rotate_ahead': 0.5})
+    public_key, _ = engine._generate_pqc_keypair('CRYSTALS-Kyber')
+    
+    first = [engine.encrypt_for_tenant(b"x", "acme", public_key)['key_id'] for _ in range(5)]
+    deadline = time.time() + 5
+    while engine.get_data_key_stats()['rotations'] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    
+    assert engine.encrypt_for_tenant(b"x", "acme", public_key)['key_id'] != first[0]
+    assert engine.get_data_key_stats()['misses'] == 1
+    engine.close()
+
+
+@pytest.mark.asyncio
+async def test_pqc_stream_roundtrip(crypto):
+    """Test streams carry their wrapped data key and decrypt with the private key."""
+    public_key, private_key = crypto._generate_pqc_keypair('CRYSTALS-Kyber')
+    payload = os.urandom(2 * crypto.stream_chunk_size + 5)
+    
+    async def pieces(data, size):
+        for i in range(0, len(data), size):
+            yield data[i:i + size]
+    
+    metadata, stream = crypto.encrypt_pqc_stream(pieces(payload, 100_000), public_key=public_key)
+    encrypted = b''.join([frame async for frame in stream])
+    
+    assert metadata['format'] == 'stream'
+    assert b''.join([chunk async for chunk in crypto.decrypt_pqc_stream(pieces(encrypted, 4096), private_key)]) == payload
+    assert crypto.decrypt_pqc(encrypted, private_key) == payload
@@ -0,0 +1,127 @@
+"""
+Unit tests for batched network enforcement
+"""
+
+import asyncio
+import ipaddress
+import random
+
+import pytest
+from ztso.enforcement import (BLOCK, compact, EnforcementBackend, EnforcementFull, Enforcer, IptablesFileBackend,
+                              MemoryBackend)
+from ztso.response import AutomatedResponse
+
+
+class FailingBackend(EnforcementBackend):
+    """Backend whose enforcement point is down."""
+    
+    async def apply(self, delta):
+        raise ConnectionError("firewall API unavailable")
+
+
+def net(cidr):
+    return ipaddress.ip_network(cidr)
+
+
+@pytest.mark.asyncio
+async def test_burst_is_compacted_into_one_push():
+    """Test concurrent blocks are batched and collapsed into covering CIDRs."""
+    backend = MemoryBackend()
+    enforcer = Enforcer({'enforcement_batch_window': 0.01}, backend)
+    
+    await asyncio.gather(*(enforcer.block([f'10.1.2.{i}']) for i in range(256)),
+                         enforcer.block(['10.1.3.0/25', '10.1.3.128/25', '2001:db8::1']))
+    
+    assert backend.rules == {(BLOCK, net('10.1.2.0/23')), (BLOCK, net('2001:db8::1/128'))}
+    stats = enforcer.get_stats()
+    assert stats['pushes'] == 1
+    assert stats['blocked_entries'] == 259 and stats['block_rules'] == 2
+
+
+@pytest.mark.asyncio
+async def test_only_deltas_are_pushed(tmp_path):
+    """Test unblocking splits a covering rule and pushes just the changed rules."""
+    path = str(tmp_path / "rules")
+    enforcer = Enforcer({'enforcement_batch_window': 0}, IptablesFileBackend(path))
+    
+    await enforcer.block([f'192.0.2.{i}' for i in range(4)])
+    await enforcer.allow(['192.0.2.200'])
+    await enforcer.unblock(['192.0.2.3'])
+    await enforcer.block(['192.0.2.0'])
+    
+    batches = open(path).read().split("COMMIT\n")
+    assert batches[0] == "*filter\n-A ZTSO -s 192.0.2.0/30 -j DROP\n"
+    assert batches[1] == "*filter\n-I ZTSO -s 192.0.2.200/32 -j ACCEPT\n"
+    assert batches[2] == ("*filter\n-D ZTSO -s 192.0.2.0/30 -j DROP\n"
+                          "-A ZTSO -s 192.0.2.0/31 -j DROP\n-A ZTSO -s 192.0.2.2/32 -j DROP\n")
+    assert batches[3] == ""
+    assert enforcer.get_stats()['pushes'] == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_push_keeps_previous_rules():
+    """Test a failing backend surfaces to callers and leaves applied rules untouched."""
+    enforcer = Enforcer({'enforcement_batch_window': 0}, FailingBackend())
+    
+    with pytest.raises(ConnectionError):
+        await enforcer.block(['198.51.100.7'])
+    with pytest.raises(ValueError):
+        await enforcer.block(['not-an-address'])
+    
+    stats = enforcer.get_stats()
+    assert stats['failed_pushes'] == 1 and stats['block_rules'] == 0
+
+
+@pytest.mark.asyncio
+async def test_playbook_blocks_threat_sources():
+    """Test the ddos playbook blocks every reported source through the enforcer."""
+    backend = MemoryBackend()
+    enforcer = Enforcer({'enforcement_batch_window': 0.005}, backend)
+    engine = AutomatedResponse({})
+    for name, action in enforcer.actions().items():
+        engine.register_action(name, action)
+    
+    sources = [f'203.0.113.{i}' for i in range(64)]
+    result = await engine.respond({'type': 'ddos_attack', 'sources': sources + ['bogus']}, 'critical')
+    
+    assert "Blocked 64 attack sources" in result['actions_taken']
+    assert backend.rules == {(BLOCK, net('203.0.113.0/26'))}
+    await engine.stop()
+    await enforcer.stop()
+
+
+@pytest.mark.asyncio
+async def test_block_without_sources_fails_and_sets_are_bounded():
+    """Test blocking no valid sources is not reported as done and requested sets stay capped."""
+    backend = MemoryBackend()
+    enforcer = Enforcer({'enforcement_batch_window': 0, 'enforcement_max_entries': 100}, backend)
+    engine = AutomatedResponse({})
+    for name, action in enforcer.actions().items():
+        engine.register_action(name, action)
+    
+    result = await engine.respond({'type': 'ddos_attack', 'sources': ['bogus']}, 'critical')
+    assert result['steps']['block_sources']['status'] == 'failed'
+    assert not any(action.startswith("Blocked") for action in result['actions_taken'])
+    
+    await enforcer.block([f'10.0.0.{i}' for i in range(60)])
+    with pytest.raises(EnforcementFull):
+        await enforcer.block([f'10.0.1.{i}' for i in range(60)])
+    await enforcer.unblock([f'10.0.0.{i}' for i in range(30)])
+    await enforcer.block([f'10.0.1.{i}' for i in range(60)])
+    
+    stats = enforcer.get_stats()
+    assert stats['blocked_entries'] == 90 and stats['rejected'] == 1
+    await engine.stop()
+
+
+def test_compact_matches_collapse_addresses():
+    """Test compaction gives the same CIDRs as ipaddress.collapse_addresses."""
+    rng = random.Random(3)
+    networks = [ipaddress.ip_network(f'10.{rng.randrange(4)}.{rng.randrange(8)}.{rng.randrange(256)}/'
+                                     f'{rng.choice([32, 31, 30, 28, 24])}', strict=False) for _ in range(500)]
+    networks += [ipaddress.ip_network(f'2001:db8::{rng.randrange(64):x}/{rng.choice([128, 126])}', strict=False)
+                 for _ in range(50)]
+    
+    expected = (list(ipaddress.collapse_addresses(n for n in networks if n.version == 4))
+                + list(ipaddress.collapse_addresses(n for n in networks if n.version == 6)))
+    assert compact(networks) == expected
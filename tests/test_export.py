@@ -0,0 +1,108 @@
+"""
+Unit tests for Parquet and Arrow IPC history export
+"""
+
+import io
+from datetime import datetime
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+import sqlalchemy
+from ztso.export import HistoryExporter
+from ztso.threat_store import ThreatStore
+
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture
+def store():
+    """Create a store with small chunks and 10 threats a minute apart."""
+    store = ThreatStore({'threat_store_chunk_size': 4, 'threat_store_max_rows': 0})
+    for i in range(10):
+        store.append(NOW + i * 60, ('ddos_attack', 'malware_detected')[i % 2], 'high', f"10.0.0.{i}",
+                     'resolved', None if i == 3 else i / 10, 10.0 * i)
+    return store
+
+
+def test_store_round_trip_in_row_groups(store, tmp_path):
+    """Test every row comes back from Parquet in fixed-size row groups with nulls and dictionaries."""
+    exporter = HistoryExporter({'export_row_group_size': 3})
+    path = str(tmp_path / "threats.parquet")
+    result = exporter.export_store(store, path)
+    
+    assert result['rows'] == 10 and result['row_groups'] == 4 and result['cursor'] == 10
+    parquet = pq.ParquetFile(path)
+    assert [parquet.metadata.row_group(i).num_rows for i in range(4)] == [3, 3, 3, 1]
+    table = parquet.read()
+    assert table.column('type').to_pylist()[:2] == ['ddos_attack', 'malware_detected']
+    assert table.column('source').to_pylist()[9] == '10.0.0.9'
+    assert table.column('score').null_count == 1
+    assert table.column('timestamp')[0].as_py().timestamp() == NOW
+
+
+def test_arrow_selection_and_time_range(store):
+    """Test columns and time range select what is written to an Arrow IPC stream."""
+    exporter = HistoryExporter({'export_row_group_size': 4})
+    sink = io.BytesIO()
+    result = exporter.export_store(store, sink, format='arrow', start=NOW + 120, end=NOW + 420,
+                                   columns=['response_ms', 'severity'])
+    
+    table = pa.ipc.open_file(pa.BufferReader(sink.getvalue())).read_all()
+    assert result['rows'] == 5
+    assert table.column_names == ['response_ms', 'severity']
+    assert table.column('response_ms').to_pylist() == [20.0, 30.0, 40.0, 50.0, 60.0]
+    
+    with pytest.raises(ValueError):
+        exporter.export_store(store, io.BytesIO(), columns=['password'])
+    with pytest.raises(ValueError):
+        exporter.export_store(store, io.BytesIO(), format='csv')
+
+
+def test_incremental_store_export(store, tmp_path):
+    """Test incremental runs resume from the saved cursor, also in a new exporter."""
+    config = {'export_state_file': str(tmp_path / "state.json")}
+    first = HistoryExporter(config).export_store(store, str(tmp_path / "1.parquet"), incremental=True)
+    store.append(NOW + 900, 'data_exfiltration', 'critical')
+    second = HistoryExporter(config).export_store(store, str(tmp_path / "2.parquet"), incremental=True)
+    
+    assert (first['rows'], second['rows'], second['since'], second['cursor']) == (10, 1, 10, 11)
+    assert pq.read_table(tmp_path / "2.parquet").column('type').to_pylist() == ['data_exfiltration']
+
+
+def test_stream_store(store):
+    """Test a streamed export is a complete file and reports its cursor."""
+    chunks, cursor = HistoryExporter({'export_row_group_size': 4}).stream_store(store, since=6)
+    data = b''.join(chunks)
+    
+    assert cursor == 10
+    assert pq.read_table(io.BytesIO(data)).num_rows == 4
+
+
+def test_table_export(tmp_path):
+    """Test the threats table exports by id, with time range and incremental cursor."""
+    engine = sqlalchemy.create_engine(f"sqlite:///{tmp_path / 'ztso.db'}")
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE threats (id INTEGER PRIMARY KEY, threat_type VARCHAR(100), severity VARCHAR(20), "
+            "score FLOAT, detected_at DATETIME, resolved BOOLEAN, resolved_at DATETIME)"
+        )
+        for i in range(5):
+            connection.exec_driver_sql(
+                "INSERT INTO threats (threat_type, severity, score, detected_at, resolved) VALUES (?, ?, ?, ?, ?)",
+                (f"type{i}", 'high', i / 10, f"2026-01-01 00:0{i}:00.000000", i % 2)
+            )
+    exporter = HistoryExporter({'export_row_group_size': 2})
+    
+    path = str(tmp_path / "threats.parquet")
+    result = exporter.export_table(engine, 'threats', path, incremental=True)
+    table = pq.read_table(path)
+    assert (result['rows'], result['row_groups'], result['cursor']) == (5, 3, 5)
+    assert table.column('detected_at')[1].as_py().replace(tzinfo=None) == datetime(2026, 1, 1, 0, 1)
+    assert table.column('resolved').to_pylist() == [False, True, False, True, False]
+    
+    window = datetime(2026, 1, 1, 0, 1).timestamp() - datetime(1970, 1, 1).timestamp()
+    selected = exporter.export_table(engine, 'threats', io.BytesIO(), start=window, end=window + 120,
+                                     columns=['threat_type'])
+    assert selected['rows'] == 2
+    assert exporter.export_table(engine, 'threats', io.BytesIO(), incremental=True)['rows'] == 0
@@ -0,0 +1,91 @@
+"""
+Unit tests for bulk file encryption
+"""
+
+import os
+
+import pytest
+from ztso import filecrypt
+from ztso.crypto import QuantumSafeCrypto
+
+
+@pytest.fixture
+def crypto():
+    """Create crypto engine with small chunks so files span many regions."""
+    engine = QuantumSafeCrypto({'keypair_pool_depth': 0, 'stream_chunk_size': 4096})
+    yield engine
+    engine.close()
+
+
+@pytest.fixture
+def plaintext(tmp_path):
+    """Write a file that does not end on a chunk boundary."""
+    path = tmp_path / "evidence.bin"
+    path.write_bytes(os.urandom(4096 * 37 + 123))
+    return path
+
+
+def test_parallel_roundtrip(crypto, plaintext, tmp_path):
+    """Test regions encrypted and decrypted across worker processes reassemble."""
+    public_key, private_key = crypto.generate_keypair()
+    container = tmp_path / "evidence.ztsx"
+    restored = tmp_path / "restored.bin"
+    
+    stats = filecrypt.encrypt_file(crypto, str(plaintext), str(container), public_key,
+                                   region_size=4096 * 8, workers=2)
+    filecrypt.decrypt_file(crypto, str(container), str(restored), private_key,
+                           region_size=4096 * 5, workers=2)
+    
+    assert stats['chunks'] == 38
+    assert stats['regions'] == 5
+    assert stats['bytes_out'] == os.path.getsize(container)
+    assert restored.read_bytes() == plaintext.read_bytes()
+
+
+def test_random_access_range(crypto, plaintext, tmp_path):
+    """Test a byte range spanning chunk boundaries is decrypted on its own."""
+    public_key, private_key = crypto.generate_keypair()
+    container = tmp_path / "evidence.ztsx"
+    filecrypt.encrypt_file(crypto, str(plaintext), str(container), public_key, workers=1)
+    data = plaintext.read_bytes()
+    
+    assert filecrypt.read_range(crypto, str(container), private_key, 4000, 10000) == data[4000:14000]
+    assert filecrypt.read_range(crypto, str(container), private_key, len(data) - 5, 100) == data[-5:]
+    assert filecrypt.read_range(crypto, str(container), private_key, len(data), 10) == b''
+
+
+def test_tampered_chunk_is_rejected(crypto, plaintext, tmp_path):
+    """Test a modified frame fails authentication and leaves no partial output."""
+    public_key, private_key = crypto.generate_keypair()
+    container = tmp_path / "evidence.ztsx"
+    restored = tmp_path / "restored.bin"
+    filecrypt.encrypt_file(crypto, str(plaintext), str(container), public_key, workers=1)
+    
+    offset = filecrypt.read_index(str(container)).offsets[20] + 10
+    with open(container, 'r+b') as f:
+        f.seek(offset)
+        byte = f.read(1)
+        f.seek(offset)
+        f.write(bytes([byte[0] ^ 1]))
+    
+    with pytest.raises(ValueError):
+        filecrypt.decrypt_file(crypto, str(container), str(restored), private_key, workers=1)
+    assert not restored.exists()
+    assert filecrypt.read_range(crypto, str(container), private_key, 0, 100) == plaintext.read_bytes()[:100]
+
+
+def test_cli_roundtrip(plaintext, tmp_path, capsys):
+    """Test keygen, encrypt and decrypt through the command line."""
+    keyfile = str(tmp_path / "recipient")
+    container = str(tmp_path / "evidence.ztsx")
+    restored = tmp_path / "restored.bin"
+    
+    assert filecrypt.main(["keygen", keyfile]) == 0
+    assert oct(os.stat(keyfile).st_mode & 0o777) == '0o600'
+    assert filecrypt.main(["encrypt", str(plaintext), container, "--public-key", keyfile + ".pub",
+                           "--workers", "1"]) == 0
+    assert filecrypt.main(["decrypt", container, str(restored), "--private-key", keyfile]) == 0
+    assert restored.read_bytes() == plaintext.read_bytes()
+    
+    assert filecrypt.main(["decrypt", str(plaintext), str(restored), "--private-key", keyfile]) == 1
+    assert "error" in capsys.readouterr().err
@@ -0,0 +1,109 @@
+"""
+Unit tests for idempotent response actions
+"""
+
+import asyncio
+
+import pytest
+from ztso.idempotency import ActionLedger
+from ztso.response import AutomatedResponse
+
+
+def counting(calls, name, seconds=0.0, fail=0):
+    """Action that counts its executions and fails the first `fail` times."""
+    async def action(context):
+        calls.append(name)
+        await asyncio.sleep(seconds)
+        if calls.count(name) <= fail:
+            raise RuntimeError(f"{name} rate limited")
+        return f"ran {name}"
+    return action
+
+
+@pytest.fixture
+def engine():
+    """Create response engine without storm coalescing, so every replay reaches the playbook."""
+    return AutomatedResponse({'coalesce_window': 0})
+
+
+def test_fingerprint_ignores_delivery_metadata():
+    """Test replays of an event share a fingerprint and different events do not."""
+    ledger = ActionLedger({})
+    event = {'type': 'ddos_attack', 'sources': ['192.0.2.1'], 'timestamp': 1, 'delivery_id': 'a'}
+    
+    assert ledger.fingerprint(event) == ledger.fingerprint({**event, 'timestamp': 2, 'delivery_id': 'b'})
+    assert ledger.fingerprint(event) != ledger.fingerprint({**event, 'sources': ['192.0.2.2']})
+    assert ledger.fingerprint({'fingerprint': 'siem-123', 'x': 1}) == 'siem-123'
+    assert ledger.key('f', 'block', 'h') == ledger.key('f', 'block', 'h') != ledger.key('f', 'block', 'h2')
+
+
+@pytest.mark.asyncio
+async def test_replayed_incident_does_not_act_twice(engine):
+    """Test a redelivered incident reuses recorded results for every action."""
+    calls = []
+    engine.register_action('block_sources', counting(calls, 'block_sources'))
+    threat = {'type': 'ddos_attack', 'sources': ['192.0.2.1'], 'delivery_id': 1}
+    
+    first = await engine.respond(threat, 'critical')
+    replay = await engine.respond({**threat, 'delivery_id': 2}, 'critical')
+    
+    assert calls == ['block_sources']
+    assert first['replayed_steps'] == []
+    assert 'block_sources' in replay['replayed_steps']
+    assert replay['actions_taken'] == first['actions_taken']
+    
+    records = engine.ledger.query(action='block_sources')
+    assert len(records) == 1
+    assert records[0]['incident_id'] == first['incident_id'] and records[0]['replays'] == 1
+    await engine.stop()
+
+
+@pytest.mark.asyncio
+async def test_concurrent_duplicates_run_once(engine):
+    """Test duplicate in-flight actions collapse into a single execution."""
+    calls = []
+    engine.register_action('rate_limit', counting(calls, 'rate_limit', seconds=0.05))
+    threat = {'type': 'ddos_attack', 'target': 'api-gw'}
+    
+    results = await asyncio.gather(*(engine.respond(dict(threat), 'high') for _ in range(10)))
+    
+    assert calls == ['rate_limit']
+    assert all("ran rate_limit" in result['actions_taken'] for result in results)
+    assert engine.ledger.query(action='rate_limit')[0]['replays'] == 9
+    await engine.stop()
+
+
+@pytest.mark.asyncio
+async def test_failures_and_compensation_are_not_cached():
+    """Test failed attempts are retried and compensated actions run again on replay."""
+    calls = []
+    ledger = ActionLedger({})
+    
+    async def flaky():
+        return await counting(calls, 'block', fail=1)({})
+    
+    with pytest.raises(RuntimeError):
+        await ledger.run('f', 'block', 'h', 1, flaky)
+    assert await ledger.run('f', 'block', 'h', 2, flaky) == ("ran block", False)
+    assert await ledger.run('f', 'block', 'h', 3, flaky) == ("ran block", True)
+    assert ledger.forget('f', 'block', 'h')
+    assert await ledger.run('f', 'block', 'h', 4, flaky) == ("ran block", False)
+    assert calls == ['block'] * 3
+
+
+@pytest.mark.asyncio
+async def test_records_expire_and_stay_bounded():
+    """Test records expire after the TTL and the store keeps at most max_entries."""
+    ledger = ActionLedger({'idempotency_ttl': 0.05, 'idempotency_max_entries': 3})
+    
+    async def execute():
+        return "ok"
+    
+    for i in range(5):
+        await ledger.run(f'f{i}', 'block', None, i, execute)
+    assert ledger.get_stats()['records'] == 3 and ledger.stats['evicted'] == 2
+    assert [record['fingerprint'] for record in ledger.query()] == ['f4', 'f3', 'f2']
+    
+    await asyncio.sleep(0.06)
+    assert ledger.get_stats()['records'] == 0
+    assert await ledger.run('f4', 'block', None, 9, execute) == ("ok", False)
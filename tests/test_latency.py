@@ -0,0 +1,117 @@
+"""
+Unit tests for streaming latency quantiles
+"""
+
+import json
+import random
+import time
+from datetime import datetime, timezone
+
+import pytest
+from ztso.analytics import SecurityAnalytics
+from ztso.latency import DDSketch, LatencyTracker
+
+NOW = 1_700_000_000.0
+
+
+def test_quantiles_within_relative_accuracy():
+    """Test sketch quantiles stay within the configured relative error."""
+    rng = random.Random(5)
+    values = sorted(rng.lognormvariate(-3, 1.5) for _ in range(20000))
+    sketch = DDSketch(0.01)
+    for value in values:
+        sketch.add(value)
+    
+    for q in (0.5, 0.95, 0.99):
+        exact = values[int(q * (len(values) - 1))]
+        assert abs(sketch.quantile(q) - exact) <= 0.01 * exact + 1e-12
+    assert len(sketch.bins) < 2048
+    assert sketch.sum / sketch.count == pytest.approx(sum(values) / len(values))
+
+
+def test_merged_sketches_match_single_sketch():
+    """Test sketches built on separate workers merge into the same result."""
+    rng = random.Random(9)
+    values = [rng.expovariate(20) for _ in range(9000)]
+    whole, parts = DDSketch(), [DDSketch() for _ in range(3)]
+    for i, value in enumerate(values):
+        whole.add(value)
+        parts[i % 3].add(value)
+    
+    merged = DDSketch()
+    for part in parts:
+        merged.merge(DDSketch.from_dict(json.loads(json.dumps(part.to_dict()))))
+    
+    assert merged.bins == whole.bins and merged.count == whole.count
+    assert merged.quantile(0.99) == whole.quantile(0.99)
+    with pytest.raises(ValueError):
+        merged.merge(DDSketch(0.05))
+
+
+def test_bins_are_bounded():
+    """Test a sketch keeps at most max_bins bins and upper quantiles stay accurate."""
+    sketch = DDSketch(0.01, max_bins=100)
+    for exponent in range(-60, 60):
+        sketch.add(10 ** (exponent / 10))
+    
+    assert len(sketch.bins) == 100
+    assert sketch.quantile(1.0) == pytest.approx(10 ** 5.9)
+
+
+def test_tracker_windows_and_breakdowns():
+    """Test series per type and severity, sliding windows and merging across workers."""
+    tracker = LatencyTracker({})
+    other = LatencyTracker({})
+    for i in range(100):
+        tracker.record('time_to_respond', 0.010, 'malware_detected', 'critical', now=NOW - 2 * 3600)
+        tracker.record('time_to_respond', 0.200, 'ddos_attack', 'high', now=NOW - 60)
+        other.record('time_to_respond', 0.400, 'ddos_attack', 'high', now=NOW - 30)
+    tracker.load(json.loads(json.dumps(other.to_dict())))
+    
+    last_hour = tracker.summary('time_to_respond', '1h', now=NOW)
+    assert last_hour['count'] == 200
+    assert last_hour['p50_ms'] == pytest.approx(200, rel=0.02)
+    assert last_hour['p99_ms'] == pytest.approx(400, rel=0.02)
+    assert tracker.summary('time_to_respond', '24h', now=NOW)['count'] == 300
+    
+    breakdown = tracker.breakdown('time_to_respond', '24h', now=NOW)
+    assert breakdown['by_type']['malware_detected']['p95_ms'] == pytest.approx(10, rel=0.02)
+    assert breakdown['by_severity']['high']['count'] == 200
+
+
+def test_posture_reports_measured_latencies():
+    """Test posture reports detect and respond quantiles instead of fixed strings."""
+    analytics = SecurityAnalytics({})
+    now = time.time()
+    analytics.record_threat({'type': 'port_scan', 'timestamp': datetime.utcfromtimestamp(now - 2.0).isoformat()},
+                            {'status': 'resolved', 'severity': 'low'}, detected_at=now, responded_at=now + 0.05)
+    analytics.record_threat({'type': 'port_scan'}, {'status': 'resolved', 'severity': 'low'},
+                            detected_at=now, responded_at=now + 0.05)
+    
+    metrics = analytics.get_security_posture()['metrics']
+    
+    assert metrics['time_to_detect']['1h']['count'] == 1
+    assert metrics['time_to_detect']['1h']['p50_ms'] == pytest.approx(2000, rel=0.02)
+    assert metrics['time_to_respond']['24h']['count'] == 2
+    assert metrics['time_to_respond']['24h']['p99_ms'] == pytest.approx(50, rel=0.02)
+    assert analytics.get_latency_stats()['time_to_respond']['by_type']['port_scan']['count'] == 2
+
+
+def test_naive_timestamps_are_utc(monkeypatch):
+    """Test naive timestamps are read as UTC whatever the local timezone."""
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time.tzset()
+    try:
+        analytics = SecurityAnalytics({})
+        now = time.time()
+        occurred = datetime.fromtimestamp(now - 2.0, timezone.utc).replace(tzinfo=None)
+        for timestamp in (occurred, occurred.isoformat(), occurred.isoformat() + 'Z'):
+            analytics.record_threat({'type': 'port_scan', 'timestamp': timestamp},
+                                    {'status': 'resolved', 'severity': 'low'}, detected_at=now)
+        
+        detect = analytics.get_security_posture()['metrics']['time_to_detect']['1h']
+        assert detect['count'] == 3
+        assert detect['p99_ms'] == pytest.approx(2000, rel=0.02)
+    finally:
+        monkeypatch.undo()
+        time.tzset()
@@ -0,0 +1,98 @@
+"""
+Unit tests for materialized views
+"""
+
+from ztso.analytics import SecurityAnalytics
+from ztso.materialized import MaterializedView, etag_matches
+
+
+class Source:
+    """Mutable state a view is built from."""
+    
+    def __init__(self):
+        self.version = 0
+        self.value = 'a'
+        self.builds = 0
+    
+    def build(self):
+        self.builds += 1
+        return {"value": self.value}
+
+
+def test_rebuilds_only_when_inputs_change():
+    """Test reads reuse the snapshot until the key changes, and versions follow content."""
+    source = Source()
+    view = MaterializedView('test', source.build, lambda: source.version, refresh_interval=0)
+    
+    first = view.snapshot()
+    for _ in range(100):
+        assert view.snapshot() is first
+    assert source.builds == 1 and first.body == b'{"value":"a"}'
+    
+    source.version += 1
+    assert view.snapshot() is first
+    assert source.builds == 2 and view.get_stats()['version'] == 1
+    
+    source.version += 1
+    source.value = 'b'
+    second = view.snapshot()
+    assert second.version == 2 and second.etag != first.etag and second.document == {"value": "b"}
+
+
+def test_refresh_interval_limits_rebuilds():
+    """Test a change is picked up only once the refresh interval has passed."""
+    source = Source()
+    view = MaterializedView('test', source.build, lambda: source.version, refresh_interval=60)
+    view.get()
+    source.version += 1
+    source.value = 'b'
+    
+    assert view.get() == {"value": "a"}
+    view.snapshot().built_at -= 60
+    assert view.get() == {"value": "b"}
+    assert source.builds == 2
+
+
+def test_stale_snapshot_is_never_revalidated():
+    """Test a throttled view answers 200, not 304, once its inputs have moved on."""
+    source = Source()
+    view = MaterializedView('test', source.build, lambda: source.version, refresh_interval=60)
+    etag = view.snapshot().etag
+    assert view.revalidate(etag)[1]
+    
+    source.version += 1
+    source.value = 'b'
+    snapshot, not_modified = view.revalidate(etag)
+    
+    assert not not_modified and snapshot.etag == etag
+    assert source.builds == 1 and view.get_stats()['stale'] == 1
+    snapshot.built_at -= 60
+    snapshot, not_modified = view.revalidate(etag)
+    assert not not_modified and snapshot.document == {"value": "b"}
+
+
+def test_etag_matching():
+    """Test If-None-Match handling of lists, weak tags and wildcards."""
+    source = Source()
+    view = MaterializedView('test', source.build, lambda: source.version)
+    etag = view.snapshot().etag
+    
+    assert etag_matches(etag, etag)
+    assert etag_matches(f'"other", {etag.removeprefix("W/")}', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches(None, etag) and not etag_matches('"other"', etag)
+    assert view.revalidate(etag)[1] and not view.revalidate('"other"')[1]
+    assert view.get_stats()['not_modified'] == 1
+
+
+def test_posture_version_follows_threats():
+    """Test each recorded threat bumps the analytics version and refreshes the posture."""
+    analytics = SecurityAnalytics({'posture_refresh_interval': 0})
+    before = analytics.posture.snapshot()
+    
+    analytics.record_threat({'type': 'port_scan', 'score': 0.2}, {'status': 'resolved'})
+    
+    after = analytics.posture.snapshot()
+    assert analytics.version == 1
+    assert after.version == before.version + 1
+    assert after.document['metrics']['threats_detected_1h'] == 1
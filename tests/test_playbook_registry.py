@@ -0,0 +1,154 @@
+"""
+Unit tests for the declarative playbook registry
+"""
+
+import asyncio
+import os
+
+import pytest
+from ztso.playbook_registry import PlaybookRegistry
+from ztso.response import AutomatedResponse
+
+DEFAULT = """
+name: default
+threat_types: [default]
+steps:
+  - action: log_incident
+"""
+
+
+def write(directory, name, text):
+    """Write a playbook file with a fresh modification time."""
+    path = os.path.join(directory, name)
+    with open(path, 'w') as f:
+        f.write(text)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    return path
+
+
+async def noop(context):
+    return "done"
+
+
+@pytest.fixture
+def playbook_dir(tmp_path):
+    """Directory with just a default playbook."""
+    write(str(tmp_path), "default.yaml", DEFAULT)
+    return str(tmp_path)
+
+
+def test_builtin_playbooks_compile():
+    """Test the shipped playbooks load and cover every threat type and severity."""
+    registry = AutomatedResponse({}).registry
+    registry.reload()
+    
+    assert set(registry.playbooks) == {'default', 'malware_detected', 'network_anomaly', 'unauthorized_access',
+                                       'data_exfiltration', 'ddos_attack'}
+    assert registry.select('malware_detected', 'low').order[0] == 'isolate_host'
+    assert registry.select('port_scan', 'critical').name == 'default'
+    assert not registry.errors
+
+
+def test_severity_specific_playbooks_take_precedence(playbook_dir):
+    """Test playbooks listing severities override general ones for those severities."""
+    write(playbook_dir, "scan.yaml", """
+name: scan_watch
+threat_types: [port_scan]
+steps:
+  - action: log
+---
+name: scan_block
+threat_types: [port_scan]
+severities: [high, critical]
+steps:
+  - action: block
+  - action: log
+    depends_on: [block]
+    critical: false
+""")
+    registry = PlaybookRegistry({'log_incident': noop, 'log': noop, 'block': noop}, {'playbook_dir': playbook_dir})
+    registry.reload()
+    
+    assert registry.select('port_scan', 'low').name == 'scan_watch'
+    assert registry.select('port_scan', 'critical').name == 'scan_block'
+    assert registry.select('port_scan', 'critical').steps['log'].critical is False
+
+
+def test_invalid_files_are_rejected(playbook_dir):
+    """Test validation errors name the file and keep the previous playbooks."""
+    actions = {'log_incident': noop}
+    registry = PlaybookRegistry(actions, {'playbook_dir': playbook_dir})
+    path = write(playbook_dir, "scan.yaml", "name: scan\nthreat_types: [port_scan]\nsteps:\n  - action: log_incident\n")
+    registry.reload()
+    scan = registry.select('port_scan', 'low')
+    
+    write(playbook_dir, "scan.yaml", "name: scan\nthreat_types: [port_scan]\nsteps:\n  - action: launch_missiles\n")
+    registry.reload()
+    assert registry.select('port_scan', 'low') is scan
+    assert "unknown action launch_missiles" in registry.errors[path]
+    
+    write(playbook_dir, "scan.yaml", "name: scan\nthreat_types: [port_scan]\nsteps: [{action: log_incident\n")
+    registry.reload()
+    assert registry.select('port_scan', 'low') is scan
+    
+    write(playbook_dir, "other.yaml", "name: other\nthreat_types: [port_scan]\nsteps:\n  - action: log_incident\n")
+    with pytest.raises(ValueError, match="both handle port_scan"):
+        registry.reload()
+    assert registry.select('port_scan', 'low') is scan
+    
+    empty = os.path.join(playbook_dir, "empty")
+    os.mkdir(empty)
+    with pytest.raises(ValueError, match="No default playbook"):
+        PlaybookRegistry(actions, {'playbook_dir': empty}).reload()
+
+
+def test_unchanged_files_are_not_reparsed(playbook_dir):
+    """Test reload only recompiles files whose modification time or size changed."""
+    for i in range(5):
+        write(playbook_dir, f"p{i}.yaml", f"name: p{i}\nthreat_types: [t{i}]\nsteps:\n  - action: log_incident\n")
+    registry = PlaybookRegistry({'log_incident': noop}, {'playbook_dir': playbook_dir})
+    registry.reload()
+    compiled = registry.stats['files_compiled']
+    
+    assert registry.reload() is False
+    write(playbook_dir, "p3.yaml", "name: p3\nthreat_types: [t3, t33]\nsteps:\n  - action: log_incident\n")
+    os.remove(os.path.join(playbook_dir, "p4.yaml"))
+    assert registry.reload() is True
+    
+    assert registry.stats['files_compiled'] == compiled + 1
+    assert registry.select('t33', 'low').name == 'p3'
+    assert registry.select('t4', 'low').name == 'default'
+
+
+@pytest.mark.asyncio
+async def test_hot_reload_leaves_inflight_runs_alone(playbook_dir):
+    """Test a watched change applies to new incidents while a running one finishes its old steps."""
+    calls = []
+    
+    def recorder(label, seconds=0):
+        async def action(context):
+            calls.append(label)
+            await asyncio.sleep(seconds)
+            return label
+        return action
+    
+    write(playbook_dir, "scan.yaml", "name: scan\nthreat_types: [port_scan]\nsteps:\n"
+                                     "  - action: old\n  - action: slow\n    critical: false\n")
+    engine = AutomatedResponse({'playbook_dir': playbook_dir, 'playbook_reload_interval': 0.01,
+                                'coalesce_window': 0})
+    engine.register_action('old', recorder('old'))
+    engine.register_action('new', recorder('new'))
+    engine.register_action('slow', recorder('slow', 0.1))
+    await engine.start()
+    
+    first = await engine.respond({'type': 'port_scan'}, 'low')
+    write(playbook_dir, "scan.yaml", "name: scan\nthreat_types: [port_scan]\nsteps:\n  - action: new\n")
+    await asyncio.sleep(0.05)
+    second = await engine.respond({'type': 'port_scan'}, 'low')
+    await engine.stop()
+    
+    assert first['actions_taken'] == ['old'] and first['background_steps'] == ['slow']
+    assert second['actions_taken'] == ['new']
+    assert calls.count('slow') == 1
+    assert engine.get_response_stats()['background_runs'] == 0
@@ -0,0 +1,175 @@
+"""
+Unit tests for the Automated Response Engine
+"""
+
+import asyncio
+
+import pytest
+from ztso.playbook import Playbook, PlaybookRun, Step
+from ztso.response import AutomatedResponse
+
+
+def sleeper(seconds, result=None, calls=None):
+    """Action that takes a while and records its calls."""
+    async def action(context):
+        if calls is not None:
+            calls.append(result)
+        await asyncio.sleep(seconds)
+        return result
+    return action
+
+
+def failing(calls):
+    """Action that always fails."""
+    async def action(context):
+        calls.append('fail')
+        raise RuntimeError("enforcement point unreachable")
+    return action
+
+
+@pytest.fixture
+def engine():
+    """Create response engine instance."""
+    return AutomatedResponse({})
+
+
+def test_playbook_rejects_bad_graphs():
+    """Test unknown dependencies, cycles and critical-on-background edges are refused."""
+    noop = sleeper(0)
+    with pytest.raises(ValueError, match="unknown"):
+        Playbook("p", [Step("a", noop, depends_on=["missing"])])
+    with pytest.raises(ValueError, match="cycle"):
+        Playbook("p", [Step("a", noop, depends_on=["b"]), Step("b", noop, depends_on=["a"])])
+    with pytest.raises(ValueError, match="non-critical"):
+        Playbook("p", [Step("notify", noop, critical=False), Step("block", noop, depends_on=["notify"])])
+
+
+@pytest.mark.asyncio
+async def test_independent_steps_run_concurrently():
+    """Test containment time follows the critical path, not the sum of steps."""
+    playbook = Playbook("p", [
+        Step("isolate", sleeper(0.1, "isolated")),
+        Step("block", sleeper(0.1, "blocked")),
+        Step("quarantine", sleeper(0.05, "quarantined"), depends_on=["isolate"]),
+    ])
+    run = PlaybookRun(playbook, {})
+    
+    await run.start()
+    
+    assert run.containment_ms < 250
+    assert run.critical_path == ["isolate", "quarantine"]
+    assert all(outcome['status'] == 'succeeded' for outcome in run.outcomes.values())
+
+
+@pytest.mark.asyncio
+async def test_timeout_retry_and_compensation():
+    """Test a failing critical step is retried, then completed steps are compensated."""
+    calls = []
+    playbook = Playbook("p", [
+        Step("isolate", sleeper(0, "isolated"), compensate=sleeper(0, "released", calls)),
+        Step("slow", sleeper(1.0), timeout=0.02, retries=1, backoff=0.01),
+        Step("block", failing(calls), depends_on=["isolate"], retries=2, backoff=0.001),
+        Step("after_block", sleeper(0), depends_on=["block"]),
+    ])
+    run = PlaybookRun(playbook, {})
+    
+    await run.start()
+    
+    assert calls.count('fail') == 3
+    assert 'released' in calls
+    assert run.containment_failed
+    assert run.outcomes['isolate']['status'] == 'compensated'
+    assert run.outcomes['block']['attempts'] == 3
+    assert run.outcomes['after_block']['status'] == 'skipped'
+    assert run.outcomes['slow']['status'] in ('cancelled', 'timed_out')
+
+
+@pytest.mark.asyncio
+async def test_respond_returns_before_notifications(engine):
+    """Test respond() returns after containment while notifications continue."""
+    engine.register_action('notify_security_team', sleeper(0.2, "Notified security team"))
+    await engine.start()
+    
+    result = await engine.respond({'type': 'malware_detected'}, 'critical')
+    
+    assert result['status'] == 'resolved'
+    assert "Quarantined malware sample" in result['actions_taken']
+    assert 'notify_security_team' in result['background_steps']
+    assert result['critical_path'] == ['isolate_host', 'terminate_process', 'quarantine_sample']
+    assert engine.get_response_stats()['background_runs'] == 1
+    
+    await engine.stop()
+    assert engine.get_response_stats()['background_runs'] == 0
+
+
+@pytest.mark.asyncio
+async def test_unknown_threat_uses_default_playbook(engine):
+    """Test unknown threat types fall back to the default playbook."""
+    result = await engine.respond({'type': 'novel'}, 'low')
+    
+    assert result['actions_taken'][0] == "Logged incident details"
+    assert engine.get_incident_count() == 1
+    await engine.stop()
+
+
+@pytest.mark.asyncio
+async def test_storm_is_coalesced_into_one_incident():
+    """Test concurrent repeats share one playbook run and report the occurrence count."""
+    calls = []
+    engine = AutomatedResponse({})
+    engine.register_action('block_traffic', sleeper(0.05, "Blocked suspicious traffic", calls))
+    threat = {'type': 'network_anomaly', 'source': '203.0.113.7', 'target': 'api'}
+    
+    results = await asyncio.gather(*(engine.respond(dict(threat), 'high') for _ in range(200)))
+    other = await engine.respond({**threat, 'source': '198.51.100.1'}, 'high')
+    
+    assert len(calls) == 2
+    assert engine.get_incident_count() == 2
+    assert {result['incident_id'] for result in results} == {1}
+    assert max(result['occurrences'] for result in results) == 200
+    assert other['incident_id'] == 2 and other['occurrences'] == 1
+    stats = engine.get_response_stats()['coalescing']
+    assert stats['coalesced'] == 199 and stats['open_groups'] == 2
+    await engine.stop()
+
+
+@pytest.mark.asyncio
+async def test_coalescing_window_escalation_and_bound():
+    """Test expiry and escalation open new incidents and open groups stay bounded."""
+    engine = AutomatedResponse({'coalesce_window': 0.05, 'coalesce_max_groups': 3})
+    threat = {'type': 'network_anomaly', 'source': '203.0.113.7'}
+    
+    first = await engine.respond(threat, 'medium')
+    repeat = await engine.respond(threat, 'low')
+    escalated = await engine.respond(threat, 'critical')
+    await asyncio.sleep(0.06)
+    expired = await engine.respond(threat, 'critical')
+    
+    assert repeat['incident_id'] == first['incident_id'] and repeat['occurrences'] == 2
+    assert escalated['incident_id'] != first['incident_id']
+    assert expired['incident_id'] != escalated['incident_id']
+    
+    for i in range(10):
+        await engine.respond({'type': 'network_anomaly', 'source': f'10.0.0.{i}'}, 'high')
+    stats = engine.coalescer.get_stats()
+    assert stats['open_groups'] == 3
+    assert stats['evicted'] == 8
+    await engine.stop()
+
+
+@pytest.mark.asyncio
+async def test_coalescing_keys_on_target_fields():
+    """Test host-only threats on different hosts stay separate and unkeyed threats never coalesce."""
+    engine = AutomatedResponse({})
+    
+    first = await engine.respond({'type': 'malware', 'host': 'web-1'}, 'high')
+    second = await engine.respond({'type': 'malware', 'host': 'web-2'}, 'high')
+    repeat = await engine.respond({'type': 'malware', 'host': 'web-1'}, 'high')
+    unkeyed = [await engine.respond({'type': 'malware'}, 'high') for _ in range(2)]
+    
+    assert first['incident_id'] != second['incident_id']
+    assert repeat['incident_id'] == first['incident_id'] and repeat['occurrences'] == 2
+    assert unkeyed[0]['incident_id'] != unkeyed[1]['incident_id']
+    assert all(result['occurrences'] == 1 for result in unkeyed)
+    assert engine.coalescer.get_stats()['unkeyed'] == 2
+    await engine.stop()
@@ -0,0 +1,140 @@
+"""
+Unit tests for the Response Scheduler
+"""
+
+import asyncio
+import time
+
+import pytest
+from ztso.orchestrator import SecurityOrchestrator
+from ztso.scheduler import ResponseScheduler, SchedulerFull
+
+
+def recording_handler(order, seconds=0.01):
+    """Handler that records the order threats started in."""
+    async def handler(threat_data, severity):
+        order.append((severity, time.monotonic()))
+        await asyncio.sleep(seconds)
+        return {"type": threat_data['type'], "severity": severity}
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_critical_overtakes_queued_flood():
+    """Test a critical threat starts ahead of queued low-severity work."""
+    order = []
+    scheduler = ResponseScheduler(recording_handler(order, 0.02), {'scheduler_workers': 4})
+    await scheduler.start()
+    
+    flood = [asyncio.create_task(scheduler.submit({'type': 'scan'}, 'low')) for _ in range(40)]
+    await asyncio.sleep(0.005)
+    submitted = time.monotonic()
+    result = await scheduler.submit({'type': 'malware_detected'}, 'critical')
+    
+    started = next(at for severity, at in order if severity == 'critical')
+    assert result == {"type": "malware_detected", "severity": "critical"}
+    assert (started - submitted) * 1000 < 10
+    assert sum(1 for severity, _ in order if severity == 'low') < 10
+    stats = scheduler.get_stats()['severities']
+    assert stats['low']['running'] <= scheduler.caps['low']
+    
+    await asyncio.gather(*flood)
+    assert scheduler.get_stats()['severities']['low']['completed'] == 40
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_aging_prevents_starvation():
+    """Test low-severity work that has waited long enough runs before new critical work."""
+    order = []
+    scheduler = ResponseScheduler(recording_handler(order, 0.01), {
+        'scheduler_workers': 1, 'scheduler_aging_seconds': 0.01
+    })
+    await scheduler.start()
+    
+    blocker = asyncio.create_task(scheduler.submit({'type': 'busy'}, 'critical'))
+    await asyncio.sleep(0)
+    low = asyncio.create_task(scheduler.submit({'type': 'old'}, 'low'))
+    await asyncio.sleep(0.05)
+    critical = asyncio.create_task(scheduler.submit({'type': 'new'}, 'critical'))
+    await asyncio.gather(blocker, low, critical)
+    
+    assert [severity for severity, _ in order] == ['critical', 'low', 'critical']
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("overflow", ['reject', 'drop_lowest', 'block'])
+async def test_overflow_policies(overflow):
+    """Test reject, drop_lowest and block when the queue is full."""
+    order = []
+    scheduler = ResponseScheduler(recording_handler(order, 0.02), {
+        'scheduler_workers': 1, 'scheduler_max_queue': 2, 'scheduler_overflow': overflow
+    })
+    await scheduler.start()
+    
+    queued = [asyncio.create_task(scheduler.submit({'type': 'scan'}, 'medium'))]
+    await asyncio.sleep(0.005)
+    queued += [asyncio.create_task(scheduler.submit({'type': 'scan'}, 'medium')) for _ in range(2)]
+    await asyncio.sleep(0)
+    critical = asyncio.create_task(scheduler.submit({'type': 'ddos_attack'}, 'critical'))
+    results = await asyncio.gather(*queued, critical, return_exceptions=True)
+    
+    refused = [result for result in results if isinstance(result, SchedulerFull)]
+    counters = scheduler.get_stats()['severities']
+    if overflow == 'reject':
+        assert results[-1] is refused[0] and len(refused) == 1
+        assert counters['critical']['rejected'] == 1
+    elif overflow == 'drop_lowest':
+        assert results[-1]['severity'] == 'critical' and len(refused) == 1
+        assert counters['medium']['shed'] == 1
+    else:
+        assert not refused
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_handler_errors_reach_submitter():
+    """Test a failing response surfaces to its caller and frees the worker."""
+    async def handler(threat_data, severity):
+        if threat_data['type'] == 'bad':
+            raise RuntimeError("playbook missing")
+        return severity
+    
+    scheduler = ResponseScheduler(handler, {'scheduler_workers': 1})
+    with pytest.raises(RuntimeError, match="playbook missing"):
+        await scheduler.submit({'type': 'bad'}, 'high')
+    assert await scheduler.submit({'type': 'ok'}, 'high') == 'high'
+    assert scheduler.get_stats()['severities']['high']['failed'] == 1
+    await scheduler.stop()
+
+
+@pytest.mark.asyncio
+async def test_orchestrator_coalesces_before_queueing():
+    """Test repeats of an open incident take no queue slot and refused threats are still recorded."""
+    orchestrator = SecurityOrchestrator({'scheduler_workers': 1, 'scheduler_max_queue': 1,
+                                         'scheduler_overflow': 'reject'})
+    release = asyncio.Event()
+    
+    async def block(context):
+        await release.wait()
+        return "Blocked suspicious traffic"
+    orchestrator.response_engine.register_action('block_traffic', block)
+    
+    def threat(source):
+        return {'type': 'network_anomaly', 'source': source, 'score': 0.8}
+    
+    storm = [asyncio.create_task(orchestrator.handle_threat(threat('203.0.113.7'))) for _ in range(20)]
+    await asyncio.sleep(0.01)
+    queued = asyncio.create_task(orchestrator.handle_threat(threat('198.51.100.1')))
+    await asyncio.sleep(0.01)
+    with pytest.raises(SchedulerFull):
+        await orchestrator.handle_threat(threat('192.0.2.1'))
+    
+    release.set()
+    results = await asyncio.gather(*storm, queued)
+    
+    assert {result['incident_id'] for result in results[:-1]} == {1}
+    assert results[-1]['incident_id'] == 2
+    assert orchestrator.get_security_posture()['metrics']['threats_detected_24h'] == 22
+    await orchestrator.scheduler.stop()
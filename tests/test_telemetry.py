@@ -0,0 +1,92 @@
+"""
+Unit tests for Prometheus telemetry
+"""
+
+import asyncio
+
+from ztso.telemetry import Stage, Telemetry, stage
+
+
+def sample_value(telemetry, name, **labels):
+    return telemetry.registry.get_sample_value(name, labels)
+
+
+def test_stage_times_one_call_in_sample_every():
+    """Test a stage times the first call and every sample_every-th after it."""
+    timed = Stage('test_sampled', sample_every=6)
+    
+    for _ in range(61):
+        timed.stop(timed.start())
+    assert timed.timed == 11 and timed.calls == 66
+    assert len(timed.samples) == 11 and all(sample >= 0 for sample in timed.samples)
+    assert len(timed.drain()) == 11 and timed.samples == []
+    
+    timed.samples = [0.0] * Stage.MAX_SAMPLES
+    timed.record(0.5)
+    assert timed.dropped == 1 and len(timed.samples) == Stage.MAX_SAMPLES
+    
+    assert stage('test_shared', 4) is stage('test_shared')
+    
+    batched = Stage('test_batched', sample_every=6)
+    batched.record_batch(0.5, 100)
+    batched.record_batch(0.5, 0)
+    assert batched.calls == 100 and batched.samples == [0.005]
+
+
+def test_sync_moves_stages_into_histograms():
+    """Test sync adds call deltas and sampled durations once."""
+    telemetry = Telemetry({})
+    timed = stage('test_sync', sample_every=2)
+    for _ in range(10):
+        timed.stop(timed.start())
+    
+    telemetry.sync()
+    telemetry.sync()
+    assert sample_value(telemetry, 'ztso_stage_calls_total', stage='test_sync') == 10
+    assert sample_value(telemetry, 'ztso_stage_duration_seconds_count', stage='test_sync') == 5
+
+
+def test_counters_follow_deltas_and_resets():
+    """Test counters read from components advance by delta and survive a source reset."""
+    telemetry = Telemetry({})
+    source = {'hit': 5, 'miss': 1}
+    telemetry.counter('test_lookups', 'Lookups', lambda: dict(source), ['result'])
+    telemetry.gauge('test_depth', 'Depth', lambda: source['miss'])
+    
+    telemetry.sync()
+    source['hit'] = 8
+    source['miss'] = 0
+    telemetry.sync()
+    source['miss'] = 2
+    telemetry.sync()
+    
+    assert sample_value(telemetry, 'test_lookups_total', result='hit') == 8
+    assert sample_value(telemetry, 'test_lookups_total', result='miss') == 3
+    assert sample_value(telemetry, 'test_depth') == 2
+
+
+def test_failing_reader_does_not_stop_sync():
+    """Test one broken source is skipped while the others are still exported."""
+    telemetry = Telemetry({})
+    telemetry.gauge('test_broken', 'Broken', lambda: 1 / 0)
+    telemetry.gauge('test_working', 'Working', lambda: 3)
+    
+    body, content_type = telemetry.render()
+    assert content_type.startswith('text/plain')
+    assert b'test_working 3.0' in body
+
+
+def test_background_sampling_measures_loop_lag():
+    """Test the sampler records event-loop lag and syncs on its own."""
+    async def run():
+        telemetry = Telemetry({'metrics_sample_interval': 0.01})
+        timed = stage('test_background')
+        await telemetry.start()
+        timed.stop(timed.start())
+        await asyncio.sleep(0.05)
+        await telemetry.stop()
+        return telemetry
+    
+    telemetry = asyncio.run(run())
+    assert sample_value(telemetry, 'ztso_event_loop_lag_seconds_count') >= 2
+    assert sample_value(telemetry, 'ztso_stage_calls_total', stage='test_background') == 1
@@ -0,0 +1,59 @@
+"""
+Unit tests for the bounded threat history
+"""
+
+import pytest
+from ztso.analytics import SecurityAnalytics
+from ztso.threat_history import DAY, HOUR, WEEK, ThreatHistory
+
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture
+def history():
+    """Create threat history with a small raw-event buffer."""
+    return ThreatHistory({'threat_history_capacity': 100})
+
+
+def test_windowed_counts(history):
+    """Test 1h, 24h and 7d counts include only threats inside each window."""
+    for age, severity in ((30, 'critical'), (20 * 60, 'low'), (5 * HOUR, 'high'),
+                          (3 * DAY, 'medium'), (8 * DAY, 'critical')):
+        history.record({'type': 't'}, {'status': 'resolved'}, severity, timestamp=NOW - age)
+    
+    assert history.count(HOUR, now=NOW) == 2
+    assert history.count(DAY, now=NOW) == 3
+    assert history.count(WEEK, now=NOW) == 4
+    assert history.count(WEEK, severity='critical', now=NOW) == 1
+    assert history.by_severity(DAY, now=NOW) == {'critical': 1, 'low': 1, 'high': 1}
+    assert history.resolved(HOUR, now=NOW) == 2
+
+
+def test_memory_stays_flat_under_flood(history):
+    """Test a flood keeps a bounded raw buffer and exact counts."""
+    for i in range(50000):
+        history.record({'type': 'ddos_attack', 'n': i}, {'status': 'resolved'}, 'high',
+                       timestamp=NOW - HOUR + i * (HOUR / 50000))
+    
+    assert len(history.recent) == 100
+    assert history.recent[-1]['threat']['n'] == 49999
+    assert history.total == 50000
+    assert history.count(DAY, now=NOW) == 50000
+    assert len(history.minutes.buckets) == 120 and len(history.hours.buckets) == 169
+
+
+def test_posture_uses_windowed_history():
+    """Test score and posture count recent threats rather than everything ever recorded."""
+    analytics = SecurityAnalytics({})
+    assert analytics.calculate_security_score() == 85.0
+    
+    analytics.record_threat({'type': 'malware_detected', 'score': 0.95}, {'status': 'resolved', 'severity': 'critical'})
+    analytics.record_threat({'type': 'port_scan', 'score': 0.2}, {'status': 'containment_failed'})
+    posture = analytics.get_security_posture()
+    
+    assert analytics.calculate_security_score() == 81.0
+    assert posture['threat_level'] == 'critical'
+    assert posture['metrics']['threats_detected_24h'] == 2
+    assert posture['metrics']['threats_by_severity_24h'] == {'critical': 1, 'low': 1}
+    assert posture['metrics']['incidents_resolved_24h'] == 1
+    assert len(analytics.threats) == 2
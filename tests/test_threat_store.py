@@ -0,0 +1,119 @@
+"""
+Unit tests for the columnar threat store
+"""
+
+import math
+
+import numpy as np
+import pytest
+from ztso import threat_store
+from ztso.analytics import SecurityAnalytics
+from ztso.threat_store import ThreatStore
+
+NOW = 1_700_000_000.0
+
+
+@pytest.fixture
+def store():
+    """Create a store with small chunks holding a known set of threats."""
+    store = ThreatStore({'threat_store_chunk_size': 4, 'threat_store_max_rows': 0})
+    rows = [
+        (NOW - 7200, 'ddos_attack', 'high', '10.0.0.1', 'resolved', 0.8, 10.0),
+        (NOW - 7000, 'ddos_attack', 'high', '10.0.0.2', 'resolved', 0.9, 30.0),
+        (NOW - 3000, 'ddos_attack', 'critical', '10.0.0.1', 'escalated', 0.95, None),
+        (NOW - 1000, 'malware_detected', 'low', None, 'resolved', 0.4, 20.0),
+        (NOW - 500, 'malware_detected', 'high', '10.0.0.3', 'resolved', None, 40.0),
+        (NOW - 10, 'ddos_attack', 'high', '10.0.0.1', 'resolved', 0.7, 50.0),
+    ]
+    for timestamp, threat_type, severity, source, status, score, response_ms in rows:
+        store.append(timestamp, threat_type, severity, source, status, score, response_ms)
+    return store
+
+
+def test_group_by_with_aggregates(store):
+    """Test counts, means and quantiles per group, ignoring unknown values."""
+    rows = store.query(group_by=['type'], metrics=['count', 'mean:score', 'p50:response_ms', 'max:response_ms'])
+    
+    assert rows == [
+        {'type': 'ddos_attack', 'count': 4, 'mean_score': pytest.approx((0.8 + 0.9 + 0.95 + 0.7) / 4),
+         'p50_response_ms': 30.0, 'max_response_ms': 50.0},
+        {'type': 'malware_detected', 'count': 2, 'mean_score': pytest.approx(0.4),
+         'p50_response_ms': 30.0, 'max_response_ms': 40.0},
+    ]
+
+
+def test_time_range_filters_and_buckets(store):
+    """Test time-range and categorical filters and grouping by hour and two columns."""
+    rows = store.query(start=NOW - 3600, where={'severity': ['high', 'critical']}, group_by=['type'])
+    assert rows == [{'type': 'ddos_attack', 'count': 2}, {'type': 'malware_detected', 'count': 1}]
+    
+    assert store.query(end=NOW - 7000) == [{'count': 1}]
+    assert store.query(where={'source': 'nowhere'}) == []
+    
+    hours = store.query(group_by=['hour'])
+    assert [row['hour'] for row in hours] == sorted({math.floor((NOW - age) / 3600) * 3600
+                                                     for age in (7200, 7000, 3000, 1000, 500, 10)})
+    assert sum(row['count'] for row in hours) == 6
+    
+    pairs = store.query(group_by=['source', 'severity'])
+    assert {'source': '10.0.0.1', 'severity': 'high', 'count': 2} in pairs
+    assert {'source': 'unknown', 'severity': 'low', 'count': 1} in pairs
+
+
+def test_matches_naive_computation(monkeypatch):
+    """Test vectorized results equal a plain loop over random data, dense and sparse."""
+    rng = np.random.default_rng(3)
+    count = 5000
+    columns = {
+        'timestamp': NOW - rng.random(count) * 86400,
+        'type': rng.choice(['a', 'b', 'c'], count),
+        'severity': rng.choice(['low', 'high'], count),
+        'source': rng.integers(0, 300, count).astype(str),
+        'response_ms': np.where(rng.random(count) < 0.1, np.nan, rng.random(count) * 100)
+    }
+    store = ThreatStore({'threat_store_chunk_size': 700})
+    store.extend(columns)
+    
+    for dense_limit in (threat_store.DENSE_GROUPS, 1):
+        monkeypatch.setattr(threat_store, 'DENSE_GROUPS', dense_limit)
+        rows = store.query(start=NOW - 43200, group_by=['type', 'source'], metrics=['count', 'p90:response_ms'])
+        assert len(rows) == len({(t, s) for t, s, ts in zip(columns['type'], columns['source'], columns['timestamp'])
+                                 if ts >= NOW - 43200})
+        for row in rows[::25]:
+            selected = ((columns['type'] == row['type']) & (columns['source'] == row['source'])
+                        & (columns['timestamp'] >= NOW - 43200))
+            assert row['count'] == selected.sum()
+            values = columns['response_ms'][selected].astype(np.float32)
+            values = values[~np.isnan(values)]
+            expected = float(np.quantile(values, 0.9)) if len(values) else None
+            assert row['p90_response_ms'] == pytest.approx(expected)
+
+
+def test_bounded_rows_and_invalid_queries():
+    """Test old chunks are dropped past max_rows and bad queries are rejected."""
+    store = ThreatStore({'threat_store_chunk_size': 10, 'threat_store_max_rows': 25})
+    for i in range(100):
+        store.append(NOW + i, 'port_scan', 'low')
+    
+    assert 25 <= len(store) <= 35
+    assert store.query(metrics=['min:score']) == [{'min_score': None}]
+    assert store.get_stats()['dropped_rows'] == 100 - len(store)
+    for bad in ({'group_by': ['score']}, {'metrics': ['median:score']}, {'metrics': ['mean:type']},
+                {'where': {'score': 1}}):
+        with pytest.raises(ValueError):
+            store.query(**bad)
+
+
+def test_analytics_records_into_store():
+    """Test recorded threats are queryable through analytics."""
+    analytics = SecurityAnalytics({})
+    for threat_type, severity in (('ddos_attack', 'high'), ('ddos_attack', 'high'), ('port_scan', 'low')):
+        analytics.record_threat({'type': threat_type, 'source': '192.0.2.1', 'score': 0.8},
+                                {'status': 'resolved', 'severity': severity},
+                                detected_at=NOW, responded_at=NOW + 0.02)
+    
+    result = analytics.query_threats(group_by=['type', 'severity'], metrics=['count', 'mean:response_ms'])
+    
+    assert result['threats_stored'] == 3
+    assert result['groups'][0] == {'type': 'ddos_attack', 'severity': 'high', 'count': 2,
+                                   'mean_response_ms': pytest.approx(20, rel=0.01)}
@@ -0,0 +1,297 @@
+"""
+Unit tests for Zero-Trust Policy Engine
+"""
+
+import gc
+import time
+import pytest
+import asyncio
+from ztso.trust import TrustScoreTable, DEFAULT_TRUST_WEIGHTS
+from ztso.zerotrust import PolicyEngine, DEFAULT_POLICIES
+
+
+@pytest.fixture
+def engine():
+    """Create policy engine instance."""
+    return PolicyEngine({'policy_history_size': 2})
+
+
+@pytest.mark.asyncio
+async def test_policies_loaded_on_start(engine):
+    """Test default policies are published as the first snapshot."""
+    await engine.start()
+    
+    assert engine.snapshot.version == 1
+    assert engine.get_policy_count() == len(DEFAULT_POLICIES)
+    
+    with pytest.raises(TypeError):
+        engine.policies['micro_segmentation'] = False
+    
+    await engine.stop()
+
+
+@pytest.mark.asyncio
+async def test_reload_keeps_in_flight_snapshot(engine):
+    """Test a reload does not change the snapshot held by an in-flight request."""
+    await engine.start()
+    
+    pinned = engine.snapshot
+    result = await engine.reload_policies({'continuous_authentication': True})
+    
+    assert result['version'] == 2
+    assert engine.get_policy_count() == 1
+    assert len(pinned.active_policies) == len(DEFAULT_POLICIES)
+    assert engine.get_reload_stats()['last_reload_ms'] > 0
+
+
+@pytest.mark.asyncio
+async def test_reload_thresholds_apply_to_verification(engine):
+    """Test trust thresholds come from the active snapshot."""
+    await engine.start()
+    await engine.reload_policies(thresholds={'verified': 0.95, 'requires_mfa': 0.99})
+    
+    result = await engine.verify_identity('user-1', {'device': {'id': 'd1'}})
+    
+    assert result['verified'] is False
+    assert result['policy_version'] == 2
+
+
+@pytest.mark.asyncio
+async def test_invalid_reload_keeps_current_snapshot(engine):
+    """Test a rejected reload leaves the active snapshot untouched."""
+    await engine.start()
+    
+    with pytest.raises(ValueError):
+        await engine.reload_policies(thresholds={'verified': 1.5})
+    
+    assert engine.snapshot.version == 1
+
+
+@pytest.mark.asyncio
+async def test_rollback_and_retirement(engine):
+    """Test rollback restores older snapshots and evicted ones are retired."""
+    await engine.start()
+    for i in range(3):
+        await engine.reload_policies({f'policy_{i}': True})
+    
+    assert engine.get_reload_stats()['history'] == [2, 3]
+    
+    result = await engine.rollback_policies()
+    assert result['version'] == 3
+    assert 'policy_1' in engine.policies
+    
+    with pytest.raises(ValueError):
+        await engine.rollback_policies(version=42)
+    
+    gc.collect()
+    assert engine.get_reload_stats()['retired_snapshots'] >= 1
+
+
+@pytest.mark.asyncio
+async def test_rollback_rescores_sessions(engine):
+    """Test rolling back thresholds re-scores sessions against the restored snapshot."""
+    await engine.start()
+    await engine.verify_identity('user-1', {'device': {'id': 'd1'}})
+    
+    await engine.reload_policies(thresholds={'verified': 0.95, 'requires_mfa': 0.99})
+    assert engine.trust_scores['user-1']['verified'] is False
+    
+    result = await engine.rollback_policies()
+    
+    assert result['rescored_sessions'] == 1
+    assert engine.trust_scores['user-1']['verified'] is True
+
+
+@pytest.mark.asyncio
+async def test_weighted_trust_score(engine):
+    """Test verification uses the documented weighted trust formula."""
+    await engine.start()
+    
+    context = {'device': {'id': 'd1', 'type': 'laptop'}, 'location': {'country': 'US'}}
+    result = await engine.verify_identity('user-1', context)
+    
+    expected = 1.0 * 0.3 + 0.85 * 0.25 + 0.90 * 0.2 + 0.80 * 0.25
+    assert result['trust_score'] == pytest.approx(expected)
+    assert engine.trust_scores['user-1']['score'] == pytest.approx(expected)
+
+
+@pytest.mark.asyncio
+async def test_recompute_reports_threshold_crossings(engine):
+    """Test a weight change re-scores sessions and reports crossings."""
+    await engine.start()
+    
+    await engine.verify_identity('user-1', {'device': {'id': 'd1'}, 'location': {}})
+    await engine.verify_identity('user-2', {'location': {}})
+    assert engine.trust_scores['user-2']['score'] < 0.75
+    
+    await engine.reload_policies(weights={
+        'credentials': 0.7, 'device': 0.1, 'location': 0.1, 'behavior': 0.1
+    })
+    
+    result = await engine.recompute_trust_scores()
+    assert result['sessions'] == 2
+    assert engine.trust_scores['user-2']['score'] >= 0.75
+
+
+@pytest.mark.asyncio
+async def test_flag_device_class(engine):
+    """Test flagging a device class drops trust for its sessions only."""
+    await engine.start()
+    
+    await engine.verify_identity('user-1', {'device': {'id': 'd1', 'type': 'kiosk'}, 'location': {}})
+    await engine.verify_identity('user-2', {'device': {'id': 'd2', 'type': 'laptop'}, 'location': {}})
+    
+    result = await engine.flag_device_class('kiosk', 0.0)
+    
+    assert result['verified_lost'] == ['user-1']
+    assert engine.trust_scores['user-2']['score'] > engine.trust_scores['user-1']['score']
+    
+    # Re-authenticating from a flagged device class must not restore trust
+    reverified = await engine.verify_identity('user-1', {'device': {'id': 'd1', 'type': 'kiosk'}, 'location': {}})
+    assert reverified['verified'] is False
+    assert reverified['factors']['device'] == 0.0
+    assert engine.trust_scores['user-1']['verified'] is False
+
+
+def test_recompute_skips_rows_written_meanwhile():
+    """Test an off-thread re-score does not overwrite sessions verified after it started."""
+    table = TrustScoreTable(capacity=2)
+    factors = {'credentials': 0.9, 'device': 0.9, 'location': 0.9, 'behavior': 0.9}
+    table.upsert('user-1', factors, 0.9, True, False, timestamp=100.0)
+    table.upsert('user-2', factors, 0.9, True, False, timestamp=100.0)
+    strict = {'verified': 0.95, 'requires_mfa': 0.99}
+    
+    state = table.begin_recompute()
+    scores = table.score_rows(state, DEFAULT_TRUST_WEIGHTS)
+    # Concurrent re-verification grows the table and rewrites user-1
+    table.upsert('user-1', dict(factors, device=0.0), 0.75, False, True, timestamp=200.0)
+    table.upsert('user-3', factors, 0.9, True, False, timestamp=200.0)
+    result = table.apply_scores(state, scores, strict)
+    
+    assert table['user-1']['score'] == 0.75
+    assert result['verified_lost'] == ['user-2']
+    assert result['mfa_required'] == ['user-2']
+    
+    state = table.begin_recompute()
+    table.remove('user-3')
+    assert table.apply_scores(state, table.score_rows(state, DEFAULT_TRUST_WEIGHTS), strict) is None
+
+
+@pytest.mark.asyncio
+async def test_recompute_evicts_expired_sessions():
+    """Test sessions past the continuous-authentication interval are dropped before re-scoring."""
+    engine = PolicyEngine({'continuous_auth_interval': 60})
+    await engine.start()
+    await engine.verify_identity('user-1', {'device': {'id': 'd1'}})
+    await engine.verify_identity('user-2', {'device': {'id': 'd2'}})
+    engine.trust_scores._timestamps[0] -= 120
+    
+    result = await engine.recompute_trust_scores()
+    
+    assert result['evicted'] == 1
+    assert result['sessions'] == 1
+    assert 'user-1' not in engine.trust_scores
+    
+    status = await engine.continuous_authentication('user-1')
+    assert status['reason'] == 'auth_expired'
+    status = await engine.continuous_authentication('user-3')
+    assert status['reason'] == 'no_previous_auth'
+
+
+def test_bulk_load_keeps_device_class():
+    """Test bulk loads carry device classes so device-class flags still apply."""
+    import numpy as np
+    
+    table = TrustScoreTable()
+    factors = np.full((4, 2), 0.9, dtype=np.float32)
+    thresholds = {'verified': 0.75, 'requires_mfa': 0.90}
+    table.bulk_load(['user-1', 'user-2'], factors, np.full(2, 0.9, dtype=np.float32),
+                    np.full(2, 100.0), thresholds, device_classes=['kiosk', None])
+    # Reloading without classes keeps the ones already known
+    table.bulk_load(['user-1'], factors[:, :1], np.full(1, 0.9, dtype=np.float32),
+                    np.full(1, 200.0), thresholds)
+    
+    table.flag_device_class('kiosk', 0.0)
+    result = table.recompute(DEFAULT_TRUST_WEIGHTS, thresholds)
+    
+    assert result['verified_lost'] == ['user-1']
+    assert table['user-2']['verified'] is True
+
+
+@pytest.mark.asyncio
+async def test_trust_state_survives_restart(tmp_path):
+    """Test trust state is restored on restart and expired entries are skipped."""
+    config = {'trust_state_path': str(tmp_path), 'trust_state_flush_interval': 0.01}
+    
+    engine = PolicyEngine(config)
+    await engine.start()
+    await engine.verify_identity('user-1', {'device': {'id': 'd1'}, 'location': {}})
+    await engine.stop()
+    
+    engine.trust_store.compact()
+    engine.trust_store.start()
+    engine.trust_store.record('user-2', 0.0, 0.9, {
+        'credentials': 1.0, 'device': 1.0, 'location': 1.0, 'behavior': 1.0
+    })
+    engine.trust_store.stop()
+    
+    restarted = PolicyEngine(config)
+    await restarted.start()
+    
+    assert 'user-1' in restarted.trust_scores
+    assert 'user-2' not in restarted.trust_scores
+    assert restarted.trust_store.stats['skipped_expired'] == 1
+    
+    status = await restarted.continuous_authentication('user-1')
+    assert status['requires_auth'] is False
+    
+    await restarted.stop()
+
+
+def test_trust_state_record_guards(tmp_path):
+    """Test records are dropped before start and user IDs with NUL are rejected."""
+    from ztso.trust_state import TrustStateStore
+    
+    store = TrustStateStore({'trust_state_path': str(tmp_path), 'trust_state_flush_interval': 0.01})
+    factors = {'credentials': 0.9, 'device': 0.9, 'location': 0.9, 'behavior': 0.9}
+    store.record('user-1', time.time(), 0.9, factors)
+    assert store.stats['dropped'] == 1
+    assert store.get_stats()['pending'] == 0
+    
+    store.start()
+    store.record('user-1\x00user-2', time.time(), 0.9, factors)
+    store.record('user-3', time.time(), 0.9, factors)
+    store.stop()
+    store.compact()
+    
+    assert store.stats['rejected'] == 1
+    table = TrustScoreTable()
+    store.load_into(table, {'verified': 0.75, 'requires_mfa': 0.90})
+    assert list(table) == ['user-3']
+
+
+def test_restored_sessions_index():
+    """Test sessions loaded by key stay addressable through updates and removals."""
+    import numpy as np
+    from ztso.trust import TrustScoreTable, session_key
+    
+    user_ids = sorted((f'user-{i}' for i in range(100)), key=session_key)
+    table = TrustScoreTable()
+    table.bulk_load(
+        user_ids,
+        np.full((4, 100), 0.9, dtype=np.float32),
+        np.full(100, 0.9, dtype=np.float32),
+        np.arange(100, dtype=np.float64),
+        {'verified': 0.75, 'requires_mfa': 0.90},
+        keys=np.array([session_key(u) for u in user_ids], dtype=np.uint64)
+    )
+    
+    assert 'user-42' in table
+    assert table.remove(user_ids[0])
+    assert user_ids[0] not in table
+    assert table[user_ids[-1]]['score'] == pytest.approx(0.9)
+    
+    assert table.evict_before(50.0) == 49
+    assert len(table) == 50
+    assert table.columns()['timestamps'].min() >= 50.0
+    assert all(u in table for u in table)
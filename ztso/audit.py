@@ -0,0 +1,710 @@
+"""
+Tamper-Evident Audit Trail
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import queue
+import struct
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from json.encoder import encode_basestring
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+
+try:
+    import sqlalchemy
+except ImportError:  # optional: only needed to persist the trail
+    sqlalchemy = None
+
+logger = logging.getLogger(__name__)
+
+
+# Field order of the canonical entry encoding (a JSON array)
+ENTRY_FIELDS = ('seq', 'timestamp', 'user_id', 'action', 'resource', 'success', 'details')
+
+# Domain separation, as in RFC 6962
+LEAF_PREFIX = b'\x00'
+NODE_PREFIX = b'\x01'
+CHECKPOINT_CONTEXT = b'ztso-audit-checkpoint-v1'
+CHECKPOINT = struct.Struct('>Qd')
+
+GENESIS = bytes(32)
+
+_encode_details = json.JSONEncoder(separators=(',', ':'), ensure_ascii=False, sort_keys=True).encode
+_sha256 = hashlib.sha256
+
+
+def encode_entry(seq: int, timestamp: float, user_id: str, action: str, resource: str,
+                 success: bool, details: Optional[Dict[str, Any]]) -> bytes:
+    """
+    Canonical entry encoding: a compact JSON array in ENTRY_FIELDS order.
+    
+    Built by hand rather than through json.dumps, which is several times
+    slower per call and dominates append cost.
+    """
+    return (f'[{seq},{timestamp!r},{encode_basestring(str(user_id))},'
+            f'{encode_basestring(str(action))},{encode_basestring(str(resource))},'
+            f'{"true" if success else "false"},'
+            f'{"null" if details is None else _encode_details(details)}]').encode()
+
+
+def entry_hash(previous: bytes, record: bytes) -> bytes:
+    """Hash of an entry; links to the previous entry and is the Merkle leaf."""
+    return _sha256(LEAF_PREFIX + previous + record).digest()
+
+
+def node_hash(left: bytes, right: bytes) -> bytes:
+    """Hash of an interior Merkle node."""
+    return _sha256(NODE_PREFIX + left + right).digest()
+
+
+def _split(n: int) -> int:
+    """Largest power of two smaller than n (n > 1)."""
+    return 1 << ((n - 1).bit_length() - 1)
+
+
+def verify_inclusion(leaf: bytes, index: int, size: int, path: List[bytes], root: bytes) -> bool:
+    """
+    Check a Merkle inclusion proof (RFC 9162, section 2.1.3.2).
+    
+    Args:
+        leaf: Entry hash
+        index: Entry position
+        size: Tree size the proof was made for
+        path: Sibling hashes from the leaf upwards
+        root: Tree root for `size` entries
+    
+    Returns:
+        True if the entry is at `index` in the tree with that root
+    """
+    if index >= size:
+        return False
+    
+    fn, sn = index, size - 1
+    result = leaf
+    for sibling in path:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            result = node_hash(sibling, result)
+            while not fn & 1 and fn != 0:
+                fn >>= 1
+                sn >>= 1
+        else:
+            result = node_hash(result, sibling)
+        fn >>= 1
+        sn >>= 1
+    
+    return sn == 0 and result == root
+
+
+
+
+class AuditDatabase:
+    """
+    Audit entries and checkpoints in the audit_logs and audit_checkpoints
+    tables (see scripts/init_db.py).
+    
+    Each entry row keeps the canonical record its hash covers, so the chain
+    can be re-verified from the database alone.
+    """
+    
+    def __init__(self, url: str):
+        """
+        Initialize audit database.
+        
+        Args:
+            url: SQLAlchemy database URL
+        """
+        if sqlalchemy is None:
+            raise RuntimeError("sqlalchemy is required to persist the audit trail")
+        
+        self.engine = sqlalchemy.create_engine(url)
+        metadata = sqlalchemy.MetaData()
+        self.logs = sqlalchemy.Table(
+            'audit_logs', metadata,
+            sqlalchemy.Column('id', sqlalchemy.Integer, primary_key=True),
+            sqlalchemy.Column('seq', sqlalchemy.BigInteger, unique=True, index=True),
+            sqlalchemy.Column('user_id', sqlalchemy.String(100)),
+            sqlalchemy.Column('action', sqlalchemy.String(200)),
+            sqlalchemy.Column('resource', sqlalchemy.String(200)),
+            sqlalchemy.Column('timestamp', sqlalchemy.DateTime),
+            sqlalchemy.Column('success', sqlalchemy.Boolean),
+            sqlalchemy.Column('details', sqlalchemy.Text, nullable=True),
+            sqlalchemy.Column('record', sqlalchemy.Text),
+            sqlalchemy.Column('entry_hash', sqlalchemy.String(64), unique=True),
+            sqlalchemy.Column('prev_hash', sqlalchemy.String(64))
+        )
+        self.checkpoints = sqlalchemy.Table(
+            'audit_checkpoints', metadata,
+            sqlalchemy.Column('id', sqlalchemy.Integer, primary_key=True),
+            sqlalchemy.Column('size', sqlalchemy.BigInteger, unique=True, index=True),
+            sqlalchemy.Column('root', sqlalchemy.String(64)),
+            sqlalchemy.Column('head', sqlalchemy.String(64)),
+            sqlalchemy.Column('peaks', sqlalchemy.Text),
+            sqlalchemy.Column('timestamp', sqlalchemy.Float),
+            sqlalchemy.Column('signature', sqlalchemy.Text),
+            sqlalchemy.Column('algorithm', sqlalchemy.String(50)),
+            sqlalchemy.Column('key_id', sqlalchemy.String(16)),
+            sqlalchemy.Column('public_key', sqlalchemy.Text),
+            sqlalchemy.Column('created_at', sqlalchemy.DateTime)
+        )
+        metadata.create_all(self.engine)
+    
+    def write(self, entries: List[Dict[str, Any]], checkpoints: List[Dict[str, Any]]):
+        """Insert entry and checkpoint rows in one transaction."""
+        with self.engine.begin() as conn:
+            if entries:
+                conn.execute(self.logs.insert(), entries)
+            if checkpoints:
+                conn.execute(self.checkpoints.insert(), checkpoints)
+    
+    def latest_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Get the checkpoint row with the largest tree size."""
+        query = self.checkpoints.select().order_by(self.checkpoints.c.size.desc()).limit(1)
+        with self.engine.connect() as conn:
+            row = conn.execute(query).mappings().first()
+        return dict(row) if row else None
+    
+    def records_from(self, seq: int, batch_rows: int = 10000) -> Iterator[Tuple[int, bytes, bytes]]:
+        """Yield (seq, record, entry hash) for entries from `seq` on, in order."""
+        logs = self.logs
+        while True:
+            query = (sqlalchemy.select(logs.c.seq, logs.c.record, logs.c.entry_hash)
+                     .where(logs.c.seq >= seq).order_by(logs.c.seq).limit(batch_rows))
+            with self.engine.connect() as conn:
+                rows = conn.execute(query).all()
+            for row in rows:
+                yield row.seq, row.record.encode(), bytes.fromhex(row.entry_hash)
+            if len(rows) < batch_rows:
+                return
+            seq = rows[-1].seq + 1
+    
+    def entry(self, seq: int) -> Optional[Dict[str, Any]]:
+        """Get one persisted entry in the shape returned by AuditTrail.entry()."""
+        logs = self.logs
+        query = sqlalchemy.select(logs.c.record, logs.c.entry_hash, logs.c.prev_hash).where(logs.c.seq == seq)
+        with self.engine.connect() as conn:
+            row = conn.execute(query).first()
+        if row is None:
+            return None
+        entry = dict(zip(ENTRY_FIELDS, json.loads(row.record)))
+        entry['entry_hash'] = bytes.fromhex(row.entry_hash)
+        entry['prev_hash'] = bytes.fromhex(row.prev_hash)
+        return entry
+
+
+class AuditTrail:
+    """
+    Append-only, hash-chained audit log.
+    
+    Each entry hash covers the previous entry hash, so the entries form a
+    chain, and doubles as a leaf of an incremental Merkle tree. Complete
+    subtrees are kept per level, which makes an append cost one hash plus
+    one amortized node hash, and lets any tree size be rooted and any entry
+    be proven in O(log n). Tree roots are signed in periodic checkpoints,
+    so one signature covers every entry appended since the last one.
+    
+    Only the most recent audit_memory_entries entries are held in memory,
+    together with the tree nodes needed to root and prove them. A background
+    thread signs checkpoints and, when audit_database_url is set, writes
+    entries and checkpoints to the database; on start the trail resumes from
+    the last persisted checkpoint.
+    """
+    
+    def __init__(self, config: Dict[str, Any], crypto):
+        """
+        Initialize audit trail.
+        
+        Args:
+            config: Configuration dictionary
+            crypto: QuantumSafeCrypto engine used to sign checkpoints
+        """
+        self.config = config
+        self.crypto = crypto
+        self.checkpoint_interval = config.get('audit_checkpoint_interval', 4096)
+        self.checkpoint_seconds = config.get('audit_checkpoint_seconds', 5.0)
+        self.flush_interval = config.get('audit_flush_interval', 1.0)
+        self.memory_entries = max(1, config.get('audit_memory_entries', 65536))
+        
+        database_url = config.get('audit_database_url')
+        self.database = AuditDatabase(database_url) if database_url else None
+        self._queue = queue.SimpleQueue() if self.database else None
+        self._unwritten: Tuple[List[Dict[str, Any]], List[Dict[str, Any]]] = ([], [])
+        
+        self._records: List[bytes] = []
+        # Entries before _base are no longer held in memory; _base_head is
+        # the chain head just before the first held entry
+        self._base = 0
+        self._base_head = GENESIS
+        # _levels[k][i] is the root of the complete subtree over entries
+        # [j * 2^k, (j + 1) * 2^k) for j = _offsets[k] + i
+        self._levels: List[List[bytes]] = [[]]
+        self._offsets: List[int] = [0]
+        self._head = GENESIS
+        self._lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+        
+        self.checkpoints = deque(maxlen=config.get('audit_checkpoint_memory', 1024))
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        
+        self.stats = {
+            'persisted': 0,
+            'write_errors': 0
+        }
+        
+        logger.info("Audit trail initialized")
+    
+    async def start(self):
+        """Resume from the database and start the checkpoint/writer thread."""
+        if self._thread is not None:
+            return
+        if self.database:
+            await asyncio.get_running_loop().run_in_executor(None, self._restore)
+        if self.database or self.checkpoint_interval or self.checkpoint_seconds:
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="ztso-audit", daemon=True)
+            self._thread.start()
+    
+    async def stop(self):
+        """Sign any remaining entries, flush them and stop the background thread."""
+        if self._thread is not None:
+            self._stopping = True
+            self._wake.set()
+            await asyncio.get_running_loop().run_in_executor(None, self._thread.join)
+            self._thread = None
+        elif self.pending:
+            self.checkpoint()
+            self._flush()
+    
+    def _run(self):
+        """Sign checkpoints when due and write queued rows, off the request path."""
+        timeout = min(t for t in (self.checkpoint_seconds, self.flush_interval, 1.0) if t)
+        last_checkpoint = time.monotonic()
+        while not self._stopping:
+            self._wake.wait(timeout)
+            self._wake.clear()
+            
+            pending = self.pending
+            due = self.checkpoint_seconds and time.monotonic() - last_checkpoint >= self.checkpoint_seconds
+            if pending and (due or (self.checkpoint_interval and pending >= self.checkpoint_interval)):
+                try:
+                    self.checkpoint()
+                except Exception as e:
+                    logger.error(f"Audit checkpoint failed: {e}")
+                last_checkpoint = time.monotonic()
+            self._flush()
+        
+        if self.pending:
+            self.checkpoint()
+        self._flush()
+    
+    def _flush(self):
+        """Write queued entries and checkpoints to the database in order."""
+        if not self.database:
+            return
+        # Rows from a failed write go first, so the table stays in sequence order
+        entries, checkpoints = self._unwritten
+        while True:
+            try:
+                kind, row = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            (entries if kind == 'entry' else checkpoints).append(row)
+        if not entries and not checkpoints:
+            return
+        try:
+            self.database.write(entries, checkpoints)
+            self.stats['persisted'] += len(entries)
+            self._unwritten = ([], [])
+        except Exception as e:
+            self.stats['write_errors'] += 1
+            self._unwritten = (entries, checkpoints)
+            logger.error(f"Audit trail write failed, will retry: {e}")
+    
+    def _restore(self):
+        """Resume the chain and tree from the last persisted checkpoint and later entries."""
+        checkpoint = self.database.latest_checkpoint()
+        if checkpoint:
+            size = checkpoint['size']
+            self._load_frontier(size, bytes.fromhex(checkpoint['peaks']), bytes.fromhex(checkpoint['head']))
+            self.checkpoints.append({
+                "size": size,
+                "timestamp": checkpoint['timestamp'],
+                "root": bytes.fromhex(checkpoint['root']),
+                "head": bytes.fromhex(checkpoint['head']),
+                "signature": bytes.fromhex(checkpoint['signature']),
+                "algorithm": checkpoint['algorithm'],
+                "key_id": checkpoint['key_id'],
+                "public_key": bytes.fromhex(checkpoint['public_key'])
+            })
+        
+        with self._lock:
+            for seq, record, stored in self.database.records_from(self.size):
+                leaf = entry_hash(self._head, record)
+                if seq != self.size or leaf != stored:
+                    raise ValueError(f"Persisted audit chain does not verify at entry {seq}")
+                self._append(record, leaf)
+        
+        if self.size:
+            logger.info(f"Audit trail resumed at {self.size} entries")
+    
+    def _load_frontier(self, size: int, peaks: bytes, head: bytes):
+        """Start the tree from the roots of the complete subtrees covering `size` entries."""
+        peaks = [peaks[i:i + 32] for i in range(0, len(peaks), 32)]
+        self._levels, self._offsets = [], []
+        for height in reversed(range(max(1, size.bit_length()))):
+            count = size >> height
+            self._levels.insert(0, [peaks.pop(0)] if count & 1 else [])
+            self._offsets.insert(0, count - 1 if count & 1 else count)
+        self._records = []
+        self._base = size
+        self._base_head = self._head = head
+    
+    @property
+    def size(self) -> int:
+        """Number of entries."""
+        return self._base + len(self._records)
+    
+    @property
+    def pending(self) -> int:
+        """Entries not yet covered by a signed checkpoint."""
+        signed = self.checkpoints[-1]['size'] if self.checkpoints else 0
+        return self.size - signed
+    
+    def record(self, user_id: str, action: str, resource: str = '', success: bool = True,
+               details: Optional[Dict[str, Any]] = None) -> int:
+        """
+        Append an audit entry.
+        
+        Never signs; once audit_checkpoint_interval entries are pending the
+        background thread is woken to sign a checkpoint.
+        
+        Args:
+            user_id: Acting user
+            action: Action performed
+            resource: Resource acted on
+            success: Whether the action succeeded
+            details: Additional JSON-serializable context
+        
+        Returns:
+            Sequence number of the entry
+        """
+        with self._lock:
+            seq = self.size
+            timestamp = time.time()
+            record = encode_entry(seq, timestamp, user_id, action, resource, success, details)
+            previous = self._head
+            leaf = entry_hash(previous, record)
+            self._append(record, leaf)
+            
+            if self._queue is not None:
+                self._queue.put(('entry', {
+                    'seq': seq,
+                    'user_id': user_id,
+                    'action': action,
+                    'resource': resource,
+                    'timestamp': datetime.utcfromtimestamp(timestamp),
+                    'success': success,
+                    'details': None if details is None else _encode_details(details),
+                    'record': record.decode(),
+                    'entry_hash': leaf.hex(),
+                    'prev_hash': previous.hex()
+                }))
+        
+        if self.checkpoint_interval and self.pending >= self.checkpoint_interval:
+            self._wake.set()
+        return seq
+    
+    def _append(self, record: bytes, leaf: bytes):
+        """Add an entry to the chain and tree, dropping the oldest held entries. Caller holds the lock."""
+        self._records.append(record)
+        self._head = leaf
+        
+        # Merge completed subtrees up the levels
+        levels, offsets = self._levels, self._offsets
+        level = levels[0]
+        level.append(leaf)
+        height = 0
+        while not (offsets[height] + len(level)) & 1:
+            node = node_hash(level[-2], level[-1])
+            height += 1
+            if height == len(levels):
+                levels.append([])
+                offsets.append(0)
+            level = levels[height]
+            level.append(node)
+        
+        # Trim in steps of a quarter so the list copies stay amortized O(1)
+        if len(self._records) >= self.memory_entries + max(1, self.memory_entries // 4):
+            self._trim(len(self._records) - self.memory_entries)
+    
+    def _trim(self, count: int):
+        """Forget the oldest `count` held entries, keeping nodes that later proofs need."""
+        base = self._base + count
+        self._base_head = self._node(0, base - 1)
+        del self._records[:count]
+        self._base = base
+        # Proofs for entries from `base` on use at most the node just left
+        # of their ancestor on each level
+        for height, level in enumerate(self._levels):
+            keep = max(self._offsets[height], (base >> height) - 1)
+            del level[:keep - self._offsets[height]]
+            self._offsets[height] = keep
+    
+    def _node(self, height: int, index: int) -> bytes:
+        """Tree node by absolute index on its level."""
+        position = index - self._offsets[height]
+        if position < 0:
+            raise IndexError(f"Audit tree node {height}/{index} is no longer held in memory")
+        return self._levels[height][position]
+    
+    def _head_at(self, size: int) -> bytes:
+        """Chain head after the first `size` entries. Caller holds the lock."""
+        if size == 0:
+            return GENESIS
+        if size == self._base:
+            return self._base_head
+        return self._node(0, size - 1)
+    
+    def entry(self, index: int) -> Dict[str, Any]:
+        """
+        Get an entry in the AuditLog row shape, with its hashes.
+        
+        Entries no longer held in memory are read from the database.
+        
+        Args:
+            index: Sequence number
+        
+        Returns:
+            Entry fields plus entry_hash and prev_hash
+        """
+        with self._lock:
+            if self._base <= index < self.size:
+                entry = dict(zip(ENTRY_FIELDS, json.loads(self._records[index - self._base])))
+                entry['entry_hash'] = self._node(0, index)
+                entry['prev_hash'] = self._head_at(index)
+                return entry
+        
+        entry = self.database.entry(index) if self.database and 0 <= index < self.size else None
+        if entry is None:
+            raise IndexError(f"No audit entry {index}")
+        return entry
+    
+    # Merkle tree
+    
+    def _subtree(self, start: int, end: int) -> bytes:
+        """Root of entries [start, end); start is aligned to the split points."""
+        n = end - start
+        if not n & (n - 1):
+            height = n.bit_length() - 1
+            return self._node(height, start >> height)
+        k = _split(n)
+        return node_hash(self._subtree(start, start + k), self._subtree(start + k, end))
+    
+    def _path(self, index: int, start: int, end: int) -> List[bytes]:
+        """Inclusion path for `index` within entries [start, end)."""
+        n = end - start
+        if n == 1:
+            return []
+        k = _split(n)
+        if index < start + k:
+            return self._path(index, start, start + k) + [self._subtree(start + k, end)]
+        return self._path(index, start + k, end) + [self._subtree(start, start + k)]
+    
+    def _peaks(self, size: int) -> List[bytes]:
+        """Roots of the complete subtrees covering the first `size` entries, largest first."""
+        peaks, start = [], 0
+        for height in reversed(range(size.bit_length())):
+            if size >> height & 1:
+                peaks.append(self._node(height, start >> height))
+                start += 1 << height
+        return peaks
+    
+    def _root(self, size: int) -> bytes:
+        """Merkle root over the first `size` entries. Caller holds the lock."""
+        if not self._base <= size <= self.size and size != 0:
+            raise ValueError(f"Tree size {size} is not held in memory")
+        if size == 0:
+            return _sha256(b'').digest()
+        return self._subtree(0, size)
+    
+    def root(self, size: Optional[int] = None) -> bytes:
+        """
+        Get the Merkle root over the first `size` entries.
+        
+        Args:
+            size: Tree size (default: all entries); sizes before the
+                in-memory tail cannot be rooted
+        
+        Returns:
+            Root hash
+        """
+        with self._lock:
+            return self._root(self.size if size is None else size)
+    
+    # Checkpoints
+    
+    def _checkpoint_message(self, size: int, timestamp: float, root: bytes, head: bytes) -> bytes:
+        return CHECKPOINT_CONTEXT + CHECKPOINT.pack(size, timestamp) + root + head
+    
+    def checkpoint(self) -> Dict[str, Any]:
+        """
+        Sign the current tree root.
+        
+        Called by the background thread; the API calls it from a worker
+        thread when a proof needs a checkpoint that does not exist yet.
+        
+        Returns:
+            Checkpoint with size, root, chain head and signature
+        """
+        with self._checkpoint_lock:
+            with self._lock:
+                size = self.size
+                if self.checkpoints and self.checkpoints[-1]['size'] == size:
+                    return self.checkpoints[-1]
+                head = self._head
+                root = self._root(size)
+                peaks = self._peaks(size)
+            
+            timestamp = time.time()
+            signed = self.crypto.generate_quantum_safe_signature(
+                self._checkpoint_message(size, timestamp, root, head)
+            )
+            checkpoint = {
+                "size": size,
+                "timestamp": timestamp,
+                "root": root,
+                "head": head,
+                "signature": signed['signature'],
+                "algorithm": signed['algorithm'],
+                "key_id": signed['key_id'],
+                "public_key": signed['public_key']
+            }
+            
+            with self._lock:
+                self.checkpoints.append(checkpoint)
+                # Queued behind every entry it covers, so it is written after them
+                if self._queue is not None:
+                    self._queue.put(('checkpoint', {
+                        'size': size,
+                        'root': root.hex(),
+                        'head': head.hex(),
+                        'peaks': b''.join(peaks).hex(),
+                        'timestamp': timestamp,
+                        'signature': checkpoint['signature'].hex(),
+                        'algorithm': checkpoint['algorithm'],
+                        'key_id': checkpoint['key_id'],
+                        'public_key': checkpoint['public_key'].hex(),
+                        'created_at': datetime.utcfromtimestamp(timestamp)
+                    }))
+        
+        logger.debug(f"Audit checkpoint at {size} entries")
+        return checkpoint
+    
+    def latest_checkpoint(self) -> Optional[Dict[str, Any]]:
+        """Get the most recent signed checkpoint."""
+        return self.checkpoints[-1] if self.checkpoints else None
+    
+    def verify_checkpoint(self, checkpoint: Dict[str, Any]) -> bool:
+        """
+        Check a checkpoint's signature and that it matches this log.
+        
+        Args:
+            checkpoint: Checkpoint as returned by checkpoint()
+        
+        Returns:
+            True if the signature is valid and root and head match the entries
+        """
+        size = checkpoint['size']
+        if size > self.size:
+            return False
+        message = self._checkpoint_message(size, checkpoint['timestamp'],
+                                           checkpoint['root'], checkpoint['head'])
+        if not self.crypto.verify_quantum_safe_signature(message, checkpoint['signature'],
+                                                         checkpoint['public_key']):
+            return False
+        with self._lock:
+            return checkpoint['root'] == self._root(size) and checkpoint['head'] == self._head_at(size)
+    
+    # Proofs
+    
+    def prove(self, index: int, size: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Build an inclusion proof for one entry held in memory.
+        
+        Without a size the proof is made against the latest signed
+        checkpoint, signing a new one if the entry is not yet covered.
+        
+        Args:
+            index: Sequence number
+            size: Tree size to prove against
+        
+        Returns:
+            Entry hash, path, root and the covering checkpoint (if any)
+        """
+        if not 0 <= index < self.size:
+            raise IndexError(f"No audit entry {index}")
+        if index < self._base:
+            raise IndexError(f"Audit entry {index} is no longer held in memory")
+        
+        checkpoint = None
+        if size is None:
+            checkpoint = self.latest_checkpoint()
+            if checkpoint is None or checkpoint['size'] <= index:
+                checkpoint = self.checkpoint()
+            size = checkpoint['size']
+        elif not index < size <= self.size:
+            raise ValueError(f"Tree size {size} does not cover entry {index}")
+        
+        with self._lock:
+            return {
+                "index": index,
+                "size": size,
+                "entry_hash": self._node(0, index),
+                "path": self._path(index, 0, size),
+                "root": self._root(size),
+                "checkpoint": checkpoint
+            }
+    
+    def verify_chain(self, start: Optional[int] = None, end: Optional[int] = None) -> bool:
+        """
+        Recompute entry hashes from the records held in memory.
+        
+        Args:
+            start: First entry to check (default: oldest held)
+            end: Entry after the last one to check (default: all)
+        
+        Returns:
+            True if no record was altered, inserted or removed
+        """
+        with self._lock:
+            start = self._base if start is None else max(start, self._base)
+            end = self.size if end is None else end
+            previous = self._head_at(start)
+            for index in range(start, end):
+                leaf = entry_hash(previous, self._records[index - self._base])
+                if leaf != self._node(0, index):
+                    logger.warning(f"Audit chain broken at entry {index}")
+                    return False
+                previous = leaf
+        return True
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get audit trail statistics."""
+        checkpoint = self.latest_checkpoint()
+        return {
+            "entries": self.size,
+            "in_memory": len(self._records),
+            "checkpoints": len(self.checkpoints),
+            "pending": self.pending,
+            "signed_size": checkpoint['size'] if checkpoint else 0,
+            "unwritten": self._queue.qsize() + len(self._unwritten[0]) if self._queue is not None else 0,
+            **self.stats
+        }
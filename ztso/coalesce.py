@@ -0,0 +1,170 @@
+"""
+Incident Deduplication and Storm Coalescing
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Any, Awaitable, Callable, Optional, Tuple
+
+from .analytics import SEVERITY_RANK
+
+logger = logging.getLogger(__name__)
+
+
+# Fields naming what a threat's response acts on
+TARGET_FIELDS = ('host', 'user_id', 'target', 'source')
+
+
+class IncidentGroup:
+    """Threats that share a key and arrived close together."""
+    
+    __slots__ = ('key', 'severity', 'first_seen', 'last_seen', 'started_at', 'count', 'result')
+    
+    def __init__(self, key: Tuple, severity: str, now: float):
+        self.key = key
+        self.severity = severity
+        self.first_seen = now
+        self.last_seen = now
+        self.started_at = time.time()
+        self.count = 1
+        # Future for the one response run for the group
+        self.result = asyncio.get_running_loop().create_future()
+
+
+class IncidentCoalescer:
+    """
+    Runs one response per group of related threats.
+    
+    Threats are grouped by type and the fields naming what the response
+    acts on (host, user_id, target, source by default); a threat with none
+    of those fields set is never coalesced, since nothing shows it repeats
+    another.
+    A group stays open while occurrences keep arriving within `window`
+    seconds of the previous one, for at most `max_span` seconds, after which
+    the next occurrence opens a new incident so long storms are re-contained.
+    An occurrence more severe than its group also opens a new incident.
+    Open groups are kept in last-seen order and bounded in number, so
+    expiry and eviction are both O(1).
+    """
+    
+    def __init__(self, respond: Callable[[Dict[str, Any], str], Awaitable[Dict[str, Any]]],
+                 config: Dict[str, Any]):
+        """
+        Initialize coalescer.
+        
+        Args:
+            respond: Runs the response for the first threat of a group
+            config: Configuration dictionary
+        """
+        self.respond = respond
+        self.window = config.get('coalesce_window', 60.0)
+        self.max_span = config.get('coalesce_max_span', 600.0)
+        self.key_fields = tuple(config.get('coalesce_key', TARGET_FIELDS))
+        self.max_groups = config.get('coalesce_max_groups', 10000)
+        
+        self._groups: OrderedDict = OrderedDict()
+        
+        self.stats = {
+            'received': 0,
+            'coalesced': 0,
+            'responses': 0,
+            'unkeyed': 0,
+            'evicted': 0
+        }
+    
+    def key(self, threat_data: Dict[str, Any]) -> Optional[Tuple]:
+        """Grouping key for a threat, or None if none of the key fields are set."""
+        values = tuple(threat_data.get(field) for field in self.key_fields)
+        if not any(values):
+            return None
+        return (threat_data.get('type'),) + values
+    
+    async def submit(self, threat_data: Dict[str, Any], severity: str) -> Dict[str, Any]:
+        """
+        Respond to a threat, or attach it to the open incident for its group.
+        
+        Args:
+            threat_data: Threat information
+            severity: Threat severity level
+        
+        Returns:
+            The group's incident, with occurrence count and time span
+        """
+        now = time.monotonic()
+        self.stats['received'] += 1
+        self._expire(now)
+        
+        key = self.key(threat_data)
+        if key is None:
+            self.stats['unkeyed'] += 1
+            self.stats['responses'] += 1
+            result = await self.respond(threat_data, severity)
+            return self._annotate(result, IncidentGroup(key, severity, now))
+        
+        group = self._groups.get(key)
+        if (group is not None and now - group.first_seen <= self.max_span
+                and SEVERITY_RANK.get(severity, 0) <= SEVERITY_RANK.get(group.severity, 0)):
+            group.count += 1
+            group.last_seen = now
+            self._groups.move_to_end(key)
+            self.stats['coalesced'] += 1
+            # Shielded: a cancelled duplicate must not cancel the shared response
+            return self._annotate(await asyncio.shield(group.result), group)
+        
+        group = IncidentGroup(key, severity, now)
+        self._groups[key] = group
+        self._groups.move_to_end(key)
+        while len(self._groups) > self.max_groups:
+            self._groups.popitem(last=False)
+            self.stats['evicted'] += 1
+        
+        self.stats['responses'] += 1
+        try:
+            result = await self.respond(threat_data, severity)
+        except BaseException as e:
+            # Let the next occurrence try again rather than inherit the failure
+            if self._groups.get(key) is group:
+                del self._groups[key]
+            group.result.set_exception(e)
+            group.result.exception()
+            raise
+        group.result.set_result(result)
+        return self._annotate(result, group)
+    
+    def _expire(self, now: float):
+        """Close groups that have been quiet for longer than the window."""
+        groups = self._groups
+        while groups:
+            key, group = next(iter(groups.items()))
+            if now - group.last_seen <= self.window:
+                break
+            del groups[key]
+    
+    def _annotate(self, result: Dict[str, Any], group: IncidentGroup) -> Dict[str, Any]:
+        """Copy of the incident with the group's occurrence count and span."""
+        span = group.last_seen - group.first_seen
+        return {
+            **result,
+            "occurrences": group.count,
+            "first_seen": datetime.utcfromtimestamp(group.started_at).isoformat(),
+            "last_seen": datetime.utcfromtimestamp(group.started_at + span).isoformat(),
+            "span_seconds": round(span, 3)
+        }
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get coalescing statistics.
+        
+        Returns:
+            Threats received, responses run, open groups and the reduction ratio
+        """
+        self._expire(time.monotonic())
+        responses = self.stats['responses']
+        return {
+            "open_groups": len(self._groups),
+            "reduction": self.stats['received'] / responses if responses else 0.0,
+            **self.stats
+        }
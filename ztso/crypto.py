@@ -2,16 +2,66 @@
 Quantum-Safe Cryptography Module
 """
 
+import asyncio
 import logging
 import hashlib
+import io
+import os
 import secrets
-from typing import Dict, Any, Optional, Tuple
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, AsyncIterable, AsyncIterator, BinaryIO, List, Optional, Tuple
+from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.hazmat.primitives.keywrap import aes_key_wrap, aes_key_unwrap, InvalidUnwrap
 from cryptography.hazmat.backends import default_backend
 
+from .keypool import KeypairPool
+from .keycache import DataKeyCache
+from .signing import SignatureEngine
+from .telemetry import stage
+from . import streaming
+
 logger = logging.getLogger(__name__)
 
 
+ENCRYPT_STAGE = stage('crypto_encrypt')
+
+
+# Versioned AEAD envelope:
+#   magic | version | aead id | algorithm id | wrapped key length | wrapped key | nonce | ciphertext + tag
+# The payload is encrypted once with an AEAD cipher under a random data key;
+# only the data key goes through the PQC KEM. The header is authenticated as
+# associated data. Ciphertexts without the magic use the legacy double-CBC format.
+ENVELOPE_MAGIC = b'ZTSE'
+ENVELOPE_VERSION = 2
+ENVELOPE_HEADER = struct.Struct('>4sBBBH')
+NONCE_SIZE = 12
+KEM_ENCAPSULATION_SIZE = 32
+
+AEAD_CIPHERS = {
+    'AES-256-GCM': (1, AESGCM),
+    'ChaCha20-Poly1305': (2, ChaCha20Poly1305),
+}
+AEAD_BY_ID = {cipher_id: cls for cipher_id, cls in AEAD_CIPHERS.values()}
+
+ALGORITHM_IDS = {
+    'CRYSTALS-Kyber': 1,
+    'CRYSTALS-Dilithium': 2,
+    'FALCON': 3,
+    'SPHINCS+': 4,
+}
+ALGORITHM_NAMES = {algorithm_id: name for name, algorithm_id in ALGORITHM_IDS.items()}
+
+# Public key sizes; private keys embed the public key (as Kyber's do)
+PUBLIC_KEY_SIZES = {
+    'CRYSTALS-Kyber': 1568,
+    'CRYSTALS-Dilithium': 2592,
+}
+DEFAULT_PUBLIC_KEY_SIZE = 2048
+
+
 class QuantumSafeCrypto:
     """
     Quantum-resistant cryptography implementation.
@@ -28,6 +78,16 @@ class QuantumSafeCrypto:
         self.config = config
         self.algorithm = config.get('pqc_algorithm', 'CRYSTALS-Kyber')
         self.hybrid_mode = config.get('hybrid_mode', True)
+        self.stream_chunk_size = config.get('stream_chunk_size', streaming.DEFAULT_CHUNK_SIZE)
+        self.stream_max_chunk_size = config.get('stream_max_chunk_size', streaming.MAX_CHUNK_SIZE)
+        if not 0 < self.stream_chunk_size <= self.stream_max_chunk_size:
+            raise ValueError(f"stream_chunk_size must be between 1 and {self.stream_max_chunk_size}")
+        
+        # 'aead' writes versioned envelopes; 'legacy' keeps the double-CBC format
+        self.envelope_mode = config.get('envelope_mode', 'aead')
+        self.aead_cipher = config.get('aead_cipher', 'AES-256-GCM')
+        if self.aead_cipher not in AEAD_CIPHERS:
+            raise ValueError(f"Unsupported AEAD cipher: {self.aead_cipher}")
         
         # Supported PQC algorithms
         self.supported_algorithms = [
@@ -37,16 +97,115 @@ class QuantumSafeCrypto:
             'SPHINCS+',  # Stateless hash-based signatures
         ]
         
+        # Pre-generated keypairs keep keygen off the encryption path
+        pool_depth = config.get('keypair_pool_depth', 16)
+        self.keypair_pool = KeypairPool(self._generate_pqc_keypair, pool_depth) if pool_depth > 0 else None
+        
+        # Dedicated pool for crypto work so it never runs on the event loop;
+        # the cryptography library releases the GIL while encrypting.
+        self.crypto_workers = config.get('crypto_workers') or os.cpu_count() or 4
+        self._executor = None
+        
+        # Largest encrypt_many batch the API accepts
+        self.batch_max_items = config.get('crypto_batch_max_items', 1024)
+        self.batch_max_bytes = config.get('crypto_batch_max_bytes', 64 * 1024 * 1024)
+        
+        # Per-tenant wrapped data keys so repeated encryption skips the KEM
+        self.data_keys = DataKeyCache(self._wrap_data_key, AEAD_CIPHERS[self.aead_cipher][1], config)
+        
+        # Long-lived signing key, loaded once
+        self.signatures = SignatureEngine(config)
+        
         logger.info(f"Quantum-Safe Crypto initialized with {self.algorithm}")
     
-    def encrypt_pqc(self, data: bytes, algorithm: Optional[str] = None) -> Dict[str, Any]:
+    def close(self):
+        """Release background resources."""
+        if self.keypair_pool:
+            self.keypair_pool.stop()
+        self.data_keys.stop()
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+    
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Thread pool used for crypto work off the event loop."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.crypto_workers, thread_name_prefix="ztso-crypto"
+            )
+        return self._executor
+    
+    async def encrypt_async(self, data: bytes, algorithm: Optional[str] = None,
+                            public_key: Optional[bytes] = None) -> Dict[str, Any]:
+        """
+        Encrypt on the crypto thread pool without blocking the event loop.
+        
+        Args:
+            data: Data to encrypt
+            algorithm: PQC algorithm to use
+            public_key: Recipient public key
+        
+        Returns:
+            Encrypted data and metadata
+        """
+        loop = asyncio.get_running_loop()
+        started = ENCRYPT_STAGE.start()
+        try:
+            return await loop.run_in_executor(self.executor, self.encrypt_pqc, data, algorithm, public_key)
+        finally:
+            ENCRYPT_STAGE.stop(started)
+    
+    async def encrypt_many(self, payloads: List[bytes], algorithm: Optional[str] = None,
+                           public_key: Optional[bytes] = None) -> List[Dict[str, Any]]:
+        """
+        Encrypt a list of payloads concurrently across the crypto thread pool.
+        
+        Args:
+            payloads: Data items to encrypt
+            algorithm: PQC algorithm to use
+            public_key: Recipient public key for every item
+        
+        Returns:
+            Encryption results in input order
+        """
+        # Validate once up front rather than failing in every worker
+        algo = algorithm or self.algorithm
+        if algo not in self.supported_algorithms:
+            raise ValueError(f"Unsupported algorithm: {algo}")
+        
+        return await asyncio.gather(*(
+            self.encrypt_async(data, algo, public_key) for data in payloads
+        ))
+    
+    def _acquire_keypair(self, algorithm: str) -> Tuple[bytes, bytes]:
+        """Get a keypair from the pool, or generate one if pooling is disabled."""
+        if self.keypair_pool:
+            return self.keypair_pool.acquire(algorithm)
+        return self._generate_pqc_keypair(algorithm)
+    
+    def get_keypair_pool_stats(self) -> Dict[str, Any]:
+        """Get keypair pool depth, refill rate and stall counts."""
+        return self.keypair_pool.get_stats() if self.keypair_pool else {}
+    
+    def get_data_key_stats(self) -> Dict[str, Any]:
+        """Get tenant data-key cache hit rate and rotation counts."""
+        return self.data_keys.get_stats()
+    
+    def encrypt_pqc(self, data: bytes, algorithm: Optional[str] = None,
+                    public_key: Optional[bytes] = None) -> Dict[str, Any]:
         """
         Encrypt data using post-quantum cryptography.
         
+        Accepts any buffer-protocol object (bytes, bytearray, memoryview,
+        mmap); the payload is read in place and `encrypted_data` is returned
+        as a bytearray.
+        
         Args:
             data: Data to encrypt
             algorithm: PQC algorithm to use (default: CRYSTALS-Kyber)
-            
+            public_key: Recipient public key (default: a fresh pooled keypair)
+        
         Returns:
             Encrypted data and metadata
         """
@@ -57,13 +216,17 @@ class QuantumSafeCrypto:
         
         logger.debug(f"Encrypting with {algo}...")
         
-        # Generate quantum-safe key pair
-        public_key, private_key = self._generate_pqc_keypair(algo)
+        if public_key is None:
+            # Take a pre-generated quantum-safe key pair
+            public_key, private_key = self._acquire_keypair(algo)
         
         # Encrypt data
-        if self.hybrid_mode:
+        if self.envelope_mode == 'aead':
+            # Single AEAD pass; only the data key goes through the KEM
+            encrypted_data = self._envelope_encrypt(data, public_key, algo)
+        elif self.hybrid_mode:
             # Hybrid: Classical + Quantum-resistant
-            encrypted_data = self._hybrid_encrypt(data, public_key)
+            encrypted_data = self._hybrid_encrypt(data, public_key, algo)
         else:
             # Pure post-quantum encryption
             encrypted_data = self._pqc_encrypt(data, public_key, algo)
@@ -80,15 +243,15 @@ class QuantumSafeCrypto:
         }
     
     def decrypt_pqc(self, encrypted_data: bytes, private_key: bytes, 
-                    algorithm: Optional[str] = None) -> bytes:
+                    algorithm: Optional[str] = None) -> bytearray:
         """
         Decrypt data using post-quantum cryptography.
         
         Args:
-            encrypted_data: Encrypted data
+            encrypted_data: Encrypted data (any buffer-protocol object)
             private_key: Private key for decryption
             algorithm: PQC algorithm used
-            
+        
         Returns:
             Decrypted data
         """
@@ -96,18 +259,231 @@ class QuantumSafeCrypto:
         
         logger.debug(f"Decrypting with {algo}...")
         
+        if memoryview(encrypted_data)[:len(ENVELOPE_MAGIC)] == ENVELOPE_MAGIC:
+            return self._envelope_decrypt(encrypted_data, private_key)
+        
+        if memoryview(encrypted_data)[:len(streaming.STREAM_MAGIC)] == streaming.STREAM_MAGIC:
+            source = io.BytesIO(encrypted_data)
+            key = self.stream_data_key(streaming.read_header(source, self.stream_max_chunk_size), private_key)
+            source.seek(0)
+            sink = io.BytesIO()
+            streaming.decrypt_stream(source, sink, key, max_chunk_size=self.stream_max_chunk_size)
+            return bytearray(sink.getbuffer())
+        
         if self.hybrid_mode:
-            return self._hybrid_decrypt(encrypted_data, private_key)
+            return self._hybrid_decrypt(encrypted_data, private_key, algo)
         else:
             return self._pqc_decrypt(encrypted_data, private_key, algo)
     
+    def encrypt_for_tenant(self, data: bytes, tenant: str, public_key: bytes,
+                           purpose: str = 'default', algorithm: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Encrypt with the tenant's cached data key.
+        
+        The data key is wrapped to the tenant's public key once and reused
+        until it reaches its message, byte or age limit, so each call is a
+        single AEAD operation. The wrapped key travels in the envelope header
+        and decrypt_pqc handles the result like any other envelope.
+        
+        Args:
+            data: Data to encrypt
+            tenant: Tenant identifier
+            public_key: Tenant's PQC public key
+            purpose: Key purpose, keeping DEKs separate per use
+            algorithm: PQC algorithm to use
+        
+        Returns:
+            Encrypted data and metadata
+        """
+        algo = algorithm or self.algorithm
+        
+        if algo not in self.supported_algorithms:
+            raise ValueError(f"Unsupported algorithm: {algo}")
+        
+        size = len(memoryview(data).cast('B'))
+        dek = self.data_keys.acquire(tenant, purpose, public_key, algo, size)
+        encrypted_data = self._seal_envelope(data, dek.key, dek.wrapped_key, algo, dek.aead)
+        
+        return {
+            "encrypted_data": encrypted_data,
+            "algorithm": algo,
+            "tenant": tenant,
+            "key_id": dek.key_id,
+            "metadata": {
+                "key_size": len(public_key),
+                "data_size": len(encrypted_data)
+            }
+        }
+    
+    def encrypt_stream(self, source: BinaryIO, sink: BinaryIO, key: Optional[bytes] = None,
+                       key_id: bytes = b'') -> Dict[str, Any]:
+        """
+        Encrypt a file-like object in fixed-size authenticated chunks.
+        
+        Memory stays bounded by the chunk size, so arbitrarily large inputs
+        can be encrypted without loading them.
+        
+        Args:
+            source: Readable binary file
+            sink: Writable binary file
+            key: 256-bit data key (default: generate one)
+            key_id: Key identifier stored in the stream header
+        
+        Returns:
+            Data key and stream statistics
+        """
+        key = key or AESGCM.generate_key(bit_length=256)
+        stats = streaming.encrypt_stream(source, sink, key, self.stream_chunk_size, key_id)
+        return {"key": key, **stats}
+    
+    def decrypt_stream(self, source: BinaryIO, sink: BinaryIO, key: bytes,
+                       start_chunk: int = 0, end_chunk: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Decrypt a chunked stream, optionally from an arbitrary chunk.
+        
+        Args:
+            source: Readable binary file (seekable for start_chunk > 0)
+            sink: Writable binary file
+            key: 256-bit data key
+            start_chunk: First chunk to decrypt
+            end_chunk: Chunk index to stop before
+        
+        Returns:
+            Stream statistics
+        """
+        return streaming.decrypt_stream(
+            source, sink, key, start_chunk, end_chunk, self.stream_max_chunk_size
+        )
+    
+    def encrypt_async_stream(self, chunks: AsyncIterable[bytes], key: bytes,
+                             key_id: bytes = b'') -> AsyncIterator[bytes]:
+        """
+        Encrypt an async byte stream, yielding framed output incrementally.
+        
+        Chunks are sealed on the crypto thread pool.
+        
+        Args:
+            chunks: Async iterable of plaintext pieces
+            key: 256-bit data key
+            key_id: Key identifier stored in the stream header
+        
+        Returns:
+            Async iterator of stream bytes
+        """
+        return streaming.aencrypt_stream(chunks, key, self.stream_chunk_size, key_id, self.executor)
+    
+    def decrypt_async_stream(self, data: AsyncIterable[bytes], key: bytes) -> AsyncIterator[bytes]:
+        """
+        Decrypt an async byte stream, yielding plaintext chunks incrementally.
+        
+        Args:
+            data: Async iterable of stream bytes
+            key: 256-bit data key
+        
+        Returns:
+            Async iterator of plaintext chunks
+        """
+        return streaming.adecrypt_stream(data, key, self.executor, self.stream_max_chunk_size)
+    
+    def encrypt_pqc_stream(self, chunks: AsyncIterable[bytes], algorithm: Optional[str] = None,
+                           public_key: Optional[bytes] = None) -> Tuple[Dict[str, Any], AsyncIterator[bytes]]:
+        """
+        Encrypt an async byte stream to a PQC public key.
+        
+        A fresh data key is wrapped to the public key and stored in the
+        stream header, so the output is self-contained like an envelope but
+        is produced chunk by chunk. Validation happens before the first byte
+        is emitted.
+        
+        Args:
+            chunks: Async iterable of plaintext pieces
+            algorithm: PQC algorithm to use
+            public_key: Recipient public key (default: a fresh pooled keypair)
+        
+        Returns:
+            (metadata, async iterator of stream bytes) tuple
+        """
+        algo = algorithm or self.algorithm
+        
+        if algo not in self.supported_algorithms:
+            raise ValueError(f"Unsupported algorithm: {algo}")
+        
+        if public_key is None:
+            public_key, _ = self._acquire_keypair(algo)
+        
+        data_key, key_id = self.new_stream_key(public_key, algo)
+        
+        metadata = {
+            "algorithm": algo,
+            "format": "stream",
+            "chunk_size": self.stream_chunk_size,
+            "key_size": len(public_key)
+        }
+        return metadata, streaming.aencrypt_stream(
+            chunks, data_key, self.stream_chunk_size, key_id, self.executor
+        )
+    
+    def decrypt_pqc_stream(self, data: AsyncIterable[bytes], private_key: bytes) -> AsyncIterator[bytes]:
+        """
+        Decrypt a stream produced by encrypt_pqc_stream.
+        
+        Args:
+            data: Async iterable of stream bytes
+            private_key: Recipient private key
+        
+        Returns:
+            Async iterator of plaintext chunks
+        """
+        return streaming.adecrypt_stream(
+            data, lambda header: self.stream_data_key(header, private_key), self.executor,
+            self.stream_max_chunk_size
+        )
+    
+    def new_stream_key(self, public_key: bytes, algorithm: Optional[str] = None) -> Tuple[bytes, bytes]:
+        """
+        Create a data key for a stream or container, wrapped to a public key.
+        
+        Args:
+            public_key: Recipient public key
+            algorithm: PQC algorithm to use
+        
+        Returns:
+            (data_key, key_id) tuple; key_id goes in the stream header
+        """
+        algo = algorithm or self.algorithm
+        if algo not in ALGORITHM_IDS:
+            raise ValueError(f"Unsupported algorithm: {algo}")
+        data_key = AESGCM.generate_key(bit_length=256)
+        return data_key, bytes([ALGORITHM_IDS[algo]]) + self._wrap_data_key(data_key, public_key, algo)
+    
+    def stream_data_key(self, header: streaming.StreamHeader, private_key: bytes) -> bytes:
+        """Unwrap the data key stored in a PQC stream header."""
+        if not header.key_id or header.key_id[0] not in ALGORITHM_NAMES:
+            raise ValueError("Stream header carries no wrapped data key")
+        return self._unwrap_data_key(header.key_id[1:], private_key, ALGORITHM_NAMES[header.key_id[0]])
+    
+    def generate_keypair(self, algorithm: Optional[str] = None) -> Tuple[bytes, bytes]:
+        """
+        Generate a long-term recipient keypair.
+        
+        Args:
+            algorithm: PQC algorithm
+        
+        Returns:
+            (public_key, private_key) tuple
+        """
+        algo = algorithm or self.algorithm
+        if algo not in self.supported_algorithms:
+            raise ValueError(f"Unsupported algorithm: {algo}")
+        return self._generate_pqc_keypair(algo)
+    
     def _generate_pqc_keypair(self, algorithm: str) -> Tuple[bytes, bytes]:
         """
         Generate post-quantum key pair.
         
         Args:
             algorithm: PQC algorithm
-            
+        
         Returns:
             (public_key, private_key) tuple
         """
@@ -116,68 +492,221 @@ class QuantumSafeCrypto:
         # Placeholder for actual PQC key generation
         # In production, use liboqs or similar library
         
+        # Private keys end with the public key, as Kyber secret keys do
         if algorithm == 'CRYSTALS-Kyber':
             # Kyber-1024 key sizes
             public_key = secrets.token_bytes(1568)
-            private_key = secrets.token_bytes(3168)
+            private_key = secrets.token_bytes(3168 - 1568) + public_key
         elif algorithm == 'CRYSTALS-Dilithium':
             # Dilithium5 key sizes
             public_key = secrets.token_bytes(2592)
-            private_key = secrets.token_bytes(4864)
+            private_key = secrets.token_bytes(4864 - 2592) + public_key
         else:
             # Default sizes
             public_key = secrets.token_bytes(2048)
-            private_key = secrets.token_bytes(4096)
+            private_key = secrets.token_bytes(4096 - 2048) + public_key
         
         return public_key, private_key
     
-    def _pqc_encrypt(self, data: bytes, public_key: bytes, algorithm: str) -> bytes:
-        """Pure post-quantum encryption."""
-        # Placeholder for actual PQC encryption
-        # This would use liboqs or similar library
+    def _public_key_from_private(self, private_key: bytes, algorithm: str) -> bytes:
+        """Extract the public key embedded in a private key."""
+        return private_key[-PUBLIC_KEY_SIZES.get(algorithm, DEFAULT_PUBLIC_KEY_SIZE):]
+    
+    def _kem_encapsulate(self, public_key: bytes, algorithm: str) -> Tuple[bytes, bytes]:
+        """
+        Encapsulate a shared secret to a public key.
         
-        # For demonstration, using AES-256
-        key = hashlib.sha256(public_key).digest()
-        iv = secrets.token_bytes(16)
+        Returns:
+            (shared_secret, encapsulation) tuple
+        """
+        # Placeholder for Kyber encapsulation (liboqs)
+        encapsulation = secrets.token_bytes(KEM_ENCAPSULATION_SIZE)
+        shared_secret = hashlib.sha3_256(
+            algorithm.encode() + encapsulation + hashlib.sha256(public_key).digest()
+        ).digest()
+        return shared_secret, encapsulation
+    
+    def _kem_decapsulate(self, encapsulation: bytes, private_key: bytes, algorithm: str) -> bytes:
+        """Recover the shared secret for an encapsulation."""
+        # Placeholder for Kyber decapsulation (liboqs)
+        public_key = self._public_key_from_private(private_key, algorithm)
+        return hashlib.sha3_256(
+            algorithm.encode() + encapsulation + hashlib.sha256(public_key).digest()
+        ).digest()
+    
+    def _wrap_data_key(self, data_key: bytes, public_key: bytes, algorithm: str) -> bytes:
+        """Wrap an existing data key under a KEM shared secret (encapsulation || AES-KW)."""
+        shared_secret, encapsulation = self._kem_encapsulate(public_key, algorithm)
+        return encapsulation + aes_key_wrap(shared_secret, data_key)
+    
+    def _unwrap_data_key(self, wrapped_key: bytes, private_key: bytes, algorithm: str) -> bytes:
+        """
+        Recover a data key from its wrapped form.
         
-        cipher = Cipher(
-            algorithms.AES(key),
-            modes.CBC(iv),
-            backend=default_backend()
-        )
+        A bare encapsulation means the KEM shared secret is the data key;
+        otherwise the data key follows, wrapped with AES-KW.
+        """
+        encapsulation = wrapped_key[:KEM_ENCAPSULATION_SIZE]
+        wrapped = wrapped_key[KEM_ENCAPSULATION_SIZE:]
+        shared_secret = self._kem_decapsulate(encapsulation, private_key, algorithm)
+        if not wrapped:
+            return shared_secret
+        try:
+            return aes_key_unwrap(shared_secret, wrapped)
+        except InvalidUnwrap:
+            raise ValueError("Data key unwrap failed: wrong private key")
+    
+    def _envelope_encrypt(self, data: bytes, public_key: bytes, algorithm: str) -> bytes:
+        """
+        Encrypt into a versioned AEAD envelope.
         
-        encryptor = cipher.encryptor()
+        The payload is encrypted once under a fresh data key; the data key is
+        the KEM shared secret, so only the encapsulation is stored.
+        """
+        data_key, wrapped_key = self._kem_encapsulate(public_key, algorithm)
+        return self._seal_envelope(data, data_key, wrapped_key, algorithm)
+    
+    def _seal_envelope(self, data: bytes, data_key: bytes, wrapped_key: bytes,
+                       algorithm: str, aead=None) -> bytearray:
+        """
+        AEAD-encrypt a payload under a data key behind the envelope header.
         
-        # Pad data to block size
-        padding_length = 16 - (len(data) % 16)
-        padded_data = data + bytes([padding_length] * padding_length)
+        The header is written into a buffer sized for the whole envelope and
+        the ciphertext is encrypted straight into it, so the payload is
+        copied exactly once.
+        """
+        cipher_id, aead_cls = AEAD_CIPHERS[self.aead_cipher]
+        aead = aead or aead_cls(data_key)
+        nonce = secrets.token_bytes(NONCE_SIZE)
+        
+        header = ENVELOPE_HEADER.pack(
+            ENVELOPE_MAGIC, ENVELOPE_VERSION, cipher_id, ALGORITHM_IDS[algorithm], len(wrapped_key)
+        ) + wrapped_key + nonce
         
-        encrypted = encryptor.update(padded_data) + encryptor.finalize()
+        payload = memoryview(data).cast('B')
+        out = bytearray(len(header) + len(payload) + streaming.TAG_SIZE)
+        out[:len(header)] = header
         
-        return iv + encrypted
+        with memoryview(out) as target:
+            streaming.aead_encrypt_into(aead, nonce, payload, header, target[len(header):])
+        
+        return out
     
-    def _pqc_decrypt(self, encrypted_data: bytes, private_key: bytes, algorithm: str) -> bytes:
-        """Pure post-quantum decryption."""
-        # Extract IV and ciphertext
-        iv = encrypted_data[:16]
-        ciphertext = encrypted_data[16:]
+    def _envelope_decrypt(self, encrypted_data: bytes, private_key: bytes) -> bytearray:
+        """Decrypt a versioned AEAD envelope."""
+        view = memoryview(encrypted_data).cast('B')
+        if len(view) < ENVELOPE_HEADER.size:
+            raise ValueError("Truncated envelope")
+        
+        magic, version, cipher_id, algorithm_id, wrapped_len = ENVELOPE_HEADER.unpack_from(view)
+        if version != ENVELOPE_VERSION or cipher_id not in AEAD_BY_ID or algorithm_id not in ALGORITHM_NAMES:
+            raise ValueError(f"Unsupported envelope (version {version})")
+        
+        key_end = ENVELOPE_HEADER.size + wrapped_len
+        header_end = key_end + NONCE_SIZE
+        if len(view) < header_end + streaming.TAG_SIZE:
+            raise ValueError("Truncated envelope")
+        
+        wrapped_key = bytes(view[ENVELOPE_HEADER.size:key_end])
+        nonce = bytes(view[key_end:header_end])
+        
+        algorithm = ALGORITHM_NAMES[algorithm_id]
+        if wrapped_len > KEM_ENCAPSULATION_SIZE:
+            # Cached tenant DEK: unwrap once per key, not per message
+            aead = self.data_keys.unwrap(
+                wrapped_key, private_key,
+                lambda: self._unwrap_data_key(wrapped_key, private_key, algorithm),
+                AEAD_BY_ID[cipher_id]
+            )
+        else:
+            aead = AEAD_BY_ID[cipher_id](self._unwrap_data_key(wrapped_key, private_key, algorithm))
+        
+        ciphertext = view[header_end:]
+        out = bytearray(len(ciphertext) - streaming.TAG_SIZE)
+        try:
+            streaming.aead_decrypt_into(aead, nonce, ciphertext, view[:header_end], out)
+        except InvalidTag:
+            raise ValueError("Envelope authentication failed")
         
-        key = hashlib.sha256(private_key).digest()
+        return out
+    
+    def _cbc_encrypt_into(self, key: bytes, data, out: bytearray, offset: int) -> int:
+        """
+        AES-256-CBC encrypt with PKCS#7 padding directly into `out`.
+        
+        Full blocks are encrypted straight from the caller's buffer; only the
+        final partial block is copied to be padded.
+        
+        Args:
+            key: AES key
+            data: Plaintext (any buffer-protocol object)
+            out: Output buffer with room for IV, ciphertext and 15 bytes of slack
+            offset: Where the IV starts in `out`
+        
+        Returns:
+            End offset of the ciphertext in `out`
+        """
+        view = memoryview(data).cast('B')
+        full = len(view) - len(view) % 16
+        padding_length = 16 - (len(view) - full)
         
-        cipher = Cipher(
-            algorithms.AES(key),
-            modes.CBC(iv),
-            backend=default_backend()
+        iv = secrets.token_bytes(16)
+        out[offset:offset + 16] = iv
+        position = offset + 16
+        
+        encryptor = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend()).encryptor()
+        target = memoryview(out)
+        position += encryptor.update_into(view[:full], target[position:])
+        position += encryptor.update_into(
+            bytes(view[full:]) + bytes([padding_length] * padding_length), target[position:]
         )
+        encryptor.finalize()
+        target.release()
+        
+        return position
+    
+    def _cbc_decrypt(self, key, iv, ciphertext) -> bytearray:
+        """AES-256-CBC decrypt into a single buffer and strip padding in place."""
+        decryptor = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend()).decryptor()
         
-        decryptor = cipher.decryptor()
-        padded_data = decryptor.update(ciphertext) + decryptor.finalize()
+        out = bytearray(len(ciphertext) + 15)
+        length = decryptor.update_into(ciphertext, out)
+        decryptor.finalize()
         
         # Remove padding
-        padding_length = padded_data[-1]
-        return padded_data[:-padding_length]
+        padding_length = out[length - 1]
+        del out[length - padding_length:]
+        return out
+    
+    def _pqc_encrypt(self, data: bytes, public_key: bytes, algorithm: str) -> bytearray:
+        """Pure post-quantum encryption."""
+        # Placeholder for actual PQC encryption
+        # This would use liboqs or similar library
+        
+        # For demonstration, using AES-256
+        key = hashlib.sha256(public_key).digest()
+        
+        # IV + padded ciphertext, plus slack required by update_into
+        padded_length = len(memoryview(data).cast('B')) // 16 * 16 + 16
+        out = bytearray(16 + padded_length + 15)
+        end = self._cbc_encrypt_into(key, data, out, 0)
+        del out[end:]
+        
+        return out
+    
+    def _pqc_decrypt(self, encrypted_data: bytes, private_key: bytes, algorithm: str) -> bytearray:
+        """Pure post-quantum decryption."""
+        # Extract IV and ciphertext
+        view = memoryview(encrypted_data).cast('B')
+        iv = view[:16]
+        ciphertext = view[16:]
+        
+        # Legacy ciphertexts are keyed from the public key embedded in the private key
+        key = hashlib.sha256(self._public_key_from_private(private_key, algorithm)).digest()
+        
+        return self._cbc_decrypt(key, iv, ciphertext)
     
-    def _hybrid_encrypt(self, data: bytes, public_key: bytes) -> bytes:
+    def _hybrid_encrypt(self, data: bytes, public_key: bytes, algorithm: Optional[str] = None) -> bytearray:
         """
         Hybrid encryption: Classical + Post-Quantum.
         Provides security against both classical and quantum attacks.
@@ -188,60 +717,45 @@ class QuantumSafeCrypto:
         classical_encrypted = self._classical_encrypt(data)
         
         # Step 2: Post-quantum encryption of the classical key
-        pqc_encrypted = self._pqc_encrypt(classical_encrypted, public_key, self.algorithm)
+        pqc_encrypted = self._pqc_encrypt(classical_encrypted, public_key, algorithm or self.algorithm)
         
         return pqc_encrypted
     
-    def _hybrid_decrypt(self, encrypted_data: bytes, private_key: bytes) -> bytes:
+    def _hybrid_decrypt(self, encrypted_data: bytes, private_key: bytes,
+                        algorithm: Optional[str] = None) -> bytearray:
         """Hybrid decryption."""
         logger.debug("Performing hybrid decryption...")
         
         # Step 1: Post-quantum decryption
-        classical_encrypted = self._pqc_decrypt(encrypted_data, private_key, self.algorithm)
+        classical_encrypted = self._pqc_decrypt(encrypted_data, private_key, algorithm or self.algorithm)
         
         # Step 2: Classical decryption
         data = self._classical_decrypt(classical_encrypted)
         
         return data
     
-    def _classical_encrypt(self, data: bytes) -> bytes:
+    def _classical_encrypt(self, data: bytes) -> bytearray:
         """Classical AES-256 encryption."""
         key = secrets.token_bytes(32)
-        iv = secrets.token_bytes(16)
-        
-        cipher = Cipher(
-            algorithms.AES(key),
-            modes.CBC(iv),
-            backend=default_backend()
-        )
         
-        encryptor = cipher.encryptor()
-        
-        padding_length = 16 - (len(data) % 16)
-        padded_data = data + bytes([padding_length] * padding_length)
-        
-        encrypted = encryptor.update(padded_data) + encryptor.finalize()
+        # key + iv + padded ciphertext, plus slack required by update_into
+        padded_length = len(memoryview(data).cast('B')) // 16 * 16 + 16
+        out = bytearray(32 + 16 + padded_length + 15)
+        out[:32] = key
+        end = self._cbc_encrypt_into(key, data, out, 32)
+        del out[end:]
         
         # Return key + iv + encrypted data
-        return key + iv + encrypted
+        return out
     
-    def _classical_decrypt(self, encrypted_data: bytes) -> bytes:
+    def _classical_decrypt(self, encrypted_data: bytes) -> bytearray:
         """Classical AES-256 decryption."""
-        key = encrypted_data[:32]
-        iv = encrypted_data[32:48]
-        ciphertext = encrypted_data[48:]
-        
-        cipher = Cipher(
-            algorithms.AES(key),
-            modes.CBC(iv),
-            backend=default_backend()
-        )
-        
-        decryptor = cipher.decryptor()
-        padded_data = decryptor.update(ciphertext) + decryptor.finalize()
+        view = memoryview(encrypted_data).cast('B')
+        key = view[:32]
+        iv = view[32:48]
+        ciphertext = view[48:]
         
-        padding_length = padded_data[-1]
-        return padded_data[:-padding_length]
+        return self._cbc_decrypt(bytes(key), iv, ciphertext)
     
     def generate_quantum_safe_signature(self, data: bytes) -> Dict[str, Any]:
         """
@@ -249,22 +763,19 @@ class QuantumSafeCrypto:
         
         Args:
             data: Data to sign
-            
+        
         Returns:
             Signature and metadata
         """
         logger.debug("Generating quantum-safe signature...")
         
-        # Use CRYSTALS-Dilithium or FALCON for signatures
-        public_key, private_key = self._generate_pqc_keypair('CRYSTALS-Dilithium')
-        
-        # Create signature (placeholder)
-        signature = hashlib.sha512(data + private_key).digest()
+        signature = self.signatures.sign(data)
         
         return {
             "signature": signature,
-            "algorithm": "CRYSTALS-Dilithium",
-            "public_key": public_key
+            "algorithm": self.signatures.algorithm,
+            "public_key": self.signatures.public_key,
+            "key_id": self.signatures.key_id
         }
     
     def verify_quantum_safe_signature(self, data: bytes, signature: bytes, 
@@ -276,11 +787,35 @@ class QuantumSafeCrypto:
             data: Original data
             signature: Signature to verify
             public_key: Public key
-            
+        
         Returns:
             True if signature is valid
         """
         logger.debug("Verifying quantum-safe signature...")
         
-        # Placeholder verification
-        return True
+        return self.signatures.verify(data, signature, public_key)
+    
+    def sign_many(self, payloads: List[bytes]) -> List[bytes]:
+        """
+        Sign a batch of payloads with the long-lived signing key.
+        
+        Args:
+            payloads: Data items to sign
+        
+        Returns:
+            Signatures in input order
+        """
+        return self.signatures.sign_many(payloads)
+    
+    async def verify_many(self, items: List[Tuple[bytes, bytes, Optional[bytes]]]) -> List[bool]:
+        """
+        Verify a batch of signatures in parallel on the crypto thread pool.
+        
+        Args:
+            items: (data, signature, public key or None for our own key) tuples
+        
+        Returns:
+            Validity per item, in input order
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.signatures.verify_many, items, self.executor)
@@ -3,14 +3,22 @@ AI-Powered Threat Detection Engine
 """
 
 import logging
+import time
 import numpy as np
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 import asyncio
 
+from .telemetry import stage
+
 logger = logging.getLogger(__name__)
 
 
+# An analysis takes well under a microsecond, less than even a sampled
+# per-call bracket would add, so it is timed per batch and per API request
+DETECTION_STAGE = stage('detection')
+
+
 class ThreatDetector:
     """
     AI-powered threat detection using behavioral analysis and machine learning.
@@ -93,8 +101,32 @@ class ThreatDetector:
         logger.debug("Analyzing network traffic...")
         
         # Simulated analysis
-        anomaly_score = np.random.random()
+        return self._classify(np.random.random())
+    
+    async def analyze_network_traffic_batch(self, traffic: List[Optional[Dict]]) -> List[Dict[str, Any]]:
+        """
+        Analyze a batch of network traffic samples.
+        
+        Scores the whole batch at once and records one detection stage
+        sample for it.
+        
+        Args:
+            traffic: Network traffic data, one entry per sample
+            
+        Returns:
+            Analysis results, in order
+        """
+        if not self.enabled:
+            return [{"status": "disabled"} for _ in traffic]
         
+        started = time.perf_counter()
+        # Simulated analysis
+        results = [self._classify(score) for score in np.random.random(len(traffic)).tolist()]
+        DETECTION_STAGE.record_batch(time.perf_counter() - started, len(results))
+        return results
+    
+    def _classify(self, anomaly_score: float) -> Dict[str, Any]:
+        """Turn an anomaly score into an analysis result."""
         if anomaly_score > self.anomaly_threshold:
             self.threat_count += 1
             return {
@@ -0,0 +1,411 @@
+"""
+Columnar History Export
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import Dict, Any, BinaryIO, Callable, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .threat_store import CATEGORICAL, NUMERIC, ThreatStore
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only needed to export Parquet or Arrow IPC files
+    pa = None
+    pq = None
+
+try:
+    import sqlalchemy
+except ImportError:  # optional: only needed to export database tables
+    sqlalchemy = None
+
+logger = logging.getLogger(__name__)
+
+
+PARQUET = 'parquet'
+ARROW = 'arrow'
+FORMATS = (PARQUET, ARROW)
+
+# Columns of the analytics threat store, in export order
+STORE_COLUMNS = ('timestamp',) + CATEGORICAL + NUMERIC
+STORE_SOURCE = 'threat_store'
+
+# Tables created by scripts/init_db.py: time column and (column, Arrow type) pairs
+TABLES = {
+    'threats': ('detected_at', (
+        ('id', 'int64'),
+        ('threat_type', 'string'),
+        ('severity', 'string'),
+        ('score', 'double'),
+        ('detected_at', 'timestamp'),
+        ('resolved', 'bool'),
+        ('resolved_at', 'timestamp')
+    )),
+    'incidents': ('created_at', (
+        ('id', 'int64'),
+        ('incident_type', 'string'),
+        ('severity', 'string'),
+        ('status', 'string'),
+        ('created_at', 'timestamp'),
+        ('resolved_at', 'timestamp'),
+        ('actions_taken', 'string')
+    ))
+}
+
+Sink = Union[str, BinaryIO]
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed on this server")
+
+
+def _arrow_type(name: str):
+    # Timestamps are UTC; the tables store naive UTC datetimes
+    return pa.timestamp('us', tz='UTC') if name == 'timestamp' else pa.type_for_alias(name)
+
+
+def _naive_utc(epoch: float) -> datetime:
+    return datetime.fromtimestamp(epoch, timezone.utc).replace(tzinfo=None)
+
+
+def _parquet_encodings(schema) -> Dict[str, Any]:
+    """
+    Column encodings by type.
+    
+    Dictionary encoding only pays off for strings; ordered timestamps and
+    ids shrink to small deltas, and float bytes compress better split into
+    streams. About twice as fast and half the size of the defaults.
+    """
+    dictionary, encodings = [], {}
+    for field in schema:
+        if pa.types.is_dictionary(field.type) or pa.types.is_string(field.type):
+            dictionary.append(field.name)
+        elif pa.types.is_timestamp(field.type) or pa.types.is_integer(field.type):
+            encodings[field.name] = 'DELTA_BINARY_PACKED'
+        elif pa.types.is_floating(field.type):
+            encodings[field.name] = 'BYTE_STREAM_SPLIT'
+    return {"use_dictionary": dictionary, "column_encoding": encodings}
+
+
+def _select(available: Sequence[str], columns: Optional[Sequence[str]]) -> List[str]:
+    """Requested columns in the order given, all of them by default."""
+    if not columns:
+        return list(available)
+    unknown = [name for name in columns if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown columns {', '.join(unknown)}; available are {', '.join(available)}")
+    return list(dict.fromkeys(columns))
+
+
+class _Spool:
+    """Write target collecting what the writer produced since the last drain."""
+    
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.closed = False
+    
+    def write(self, data) -> int:
+        self.parts.append(bytes(data))
+        return len(data)
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+    
+    def drain(self) -> bytes:
+        data, self.parts = b''.join(self.parts), []
+        return data
+
+
+class HistoryExporter:
+    """
+    Streams threat and incident history to Parquet or Arrow IPC files.
+    
+    Sources are read a batch at a time and regrouped into row groups of
+    `export_row_group_size` rows (record batches for Arrow IPC), so memory
+    is bounded by one row group however much history is exported. Both
+    sources take a time range and a column selection. Each source also has
+    a cursor: the threat store's append position, or a table's last id.
+    Incremental exports start from the cursor saved by the previous
+    incremental run, in `export_state_file` when configured, and save the
+    new cursor only once the file is complete.
+    
+    Threat store strings stay dictionary-encoded: the store's dictionaries
+    become Arrow dictionaries, so no per-row string is materialized.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize exporter.
+        
+        Args:
+            config: Configuration dictionary
+        """
+        self.row_group_size = config.get('export_row_group_size', 65536)
+        self.compression = config.get('export_compression', 'zstd')
+        self.state_file = config.get('export_state_file')
+        self.cursors: Dict[str, int] = {}
+        if self.state_file and os.path.exists(self.state_file):
+            with open(self.state_file) as f:
+                self.cursors = json.load(f)
+    
+    def _save_cursor(self, source: str, cursor: int):
+        self.cursors[source] = cursor
+        if self.state_file:
+            temporary = f"{self.state_file}.tmp"
+            with open(temporary, 'w') as f:
+                json.dump(self.cursors, f)
+            os.replace(temporary, self.state_file)
+    
+    def _store_schema(self, store: ThreatStore, names: List[str]) -> Tuple[Any, Dict[str, Any]]:
+        """Schema for the selected store columns and the dictionaries as Arrow arrays."""
+        fields, dictionaries = [], {}
+        for name in names:
+            if name == 'timestamp':
+                fields.append(pa.field(name, _arrow_type('timestamp')))
+            elif name in CATEGORICAL:
+                # Copied after the scan fixed its rows, so it covers every code read
+                dictionaries[name] = pa.array(list(store.dictionaries[name].values), type=pa.string())
+                fields.append(pa.field(name, pa.dictionary(pa.int32(), pa.string())))
+            else:
+                fields.append(pa.field(name, pa.float32()))
+        return pa.schema(fields), dictionaries
+    
+    def _store_batches(self, batches: Iterable[Dict[str, np.ndarray]], schema, dictionaries: Dict[str, Any],
+                       compact: bool) -> Iterator[Any]:
+        """Convert store column arrays to record batches."""
+        for batch in batches:
+            arrays = []
+            for field in schema:
+                values = batch[field.name]
+                if field.name == 'timestamp':
+                    arrays.append(pa.array(np.rint(values * 1e6).astype(np.int64), type=field.type))
+                elif field.name in dictionaries:
+                    dictionary = dictionaries[field.name]
+                    if compact and len(dictionary) > len(values):
+                        # Keep only the values this batch uses, so high-cardinality
+                        # columns don't repeat the whole dictionary in every row group
+                        used, values = np.unique(values, return_inverse=True)
+                        dictionary = dictionary.take(pa.array(used))
+                        values = values.reshape(-1).astype(np.int32)
+                    arrays.append(pa.DictionaryArray.from_arrays(pa.array(values), dictionary, safe=False))
+                else:
+                    arrays.append(pa.array(values, from_pandas=True))
+            yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+    
+    def _row_groups(self, batches: Iterable[Any], schema) -> Iterator[Any]:
+        """Regroup record batches into tables of exactly row_group_size rows (the last may be short)."""
+        pending, rows = [], 0
+        for batch in batches:
+            if not batch.num_rows:
+                continue
+            pending.append(batch)
+            rows += batch.num_rows
+            while rows >= self.row_group_size:
+                table = pa.Table.from_batches(pending, schema)
+                yield table.slice(0, self.row_group_size).combine_chunks()
+                pending = table.slice(self.row_group_size).to_batches()
+                rows -= self.row_group_size
+        if rows:
+            yield pa.Table.from_batches(pending, schema).combine_chunks()
+    
+    def _write(self, groups: Iterable[Any], schema, sink: Any, format: str) -> Iterator[Tuple[int, int]]:
+        """Write row groups to sink, yielding (rows, row groups) after each."""
+        if format == PARQUET:
+            writer = pq.ParquetWriter(sink, schema, compression=self.compression, **_parquet_encodings(schema))
+        else:
+            options = pa.ipc.IpcWriteOptions(compression=self.compression)
+            writer = pa.ipc.new_file(sink, schema, options=options)
+        rows = written = 0
+        try:
+            for group in groups:
+                if format == PARQUET:
+                    writer.write_table(group, row_group_size=group.num_rows)
+                else:
+                    writer.write_table(group)
+                rows += group.num_rows
+                written += 1
+                yield rows, written
+        finally:
+            writer.close()
+    
+    def _export(self, source: str, groups: Iterable[Any], schema, sink: Sink, format: str,
+                since: int, cursor: Callable[[], int], incremental: bool) -> Dict[str, Any]:
+        """Write a whole export to sink; `cursor` is read once all rows are written."""
+        started = time.perf_counter()
+        path = sink if isinstance(sink, str) else None
+        target = f"{path}.tmp" if path else pa.PythonFile(sink, mode='w')
+        rows = written = 0
+        try:
+            for rows, written in self._write(groups, schema, target, format):
+                pass
+        except Exception:
+            if path and os.path.exists(target):
+                os.remove(target)
+            raise
+        if path:
+            os.replace(target, path)
+        cursor = cursor()
+        if incremental:
+            self._save_cursor(source, cursor)
+        elapsed = time.perf_counter() - started
+        logger.info(f"Exported {rows} rows from {source} in {written} row groups ({elapsed:.2f}s)")
+        return {
+            "source": source,
+            "format": format,
+            "rows": rows,
+            "row_groups": written,
+            "bytes": os.path.getsize(path) if path else None,
+            "since": since,
+            "cursor": cursor,
+            "seconds": round(elapsed, 3)
+        }
+    
+    def _store_plan(self, store: ThreatStore, format: str, start: Optional[float], end: Optional[float],
+                    columns: Optional[Sequence[str]], since: Optional[int], incremental: bool):
+        """Fix the rows to read and build the schema and row groups for a store export."""
+        _require_pyarrow()
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format {format!r}; use {' or '.join(FORMATS)}")
+        names = _select(STORE_COLUMNS, columns)
+        if since is None:
+            since = self.cursors.get(STORE_SOURCE, 0) if incremental else 0
+        if since < store.dropped:
+            logger.warning(f"Threat store dropped {store.dropped - since} rows before they were exported")
+        cursor = store.position
+        batches = store.scan(start, end, since, cursor, self.row_group_size)
+        schema, dictionaries = self._store_schema(store, names)
+        # Arrow IPC files cannot replace dictionaries between batches
+        groups = self._row_groups(self._store_batches(batches, schema, dictionaries, format == PARQUET), schema)
+        return groups, schema, since, cursor
+    
+    def export_store(self, store: ThreatStore, sink: Sink, format: str = PARQUET, start: Optional[float] = None,
+                     end: Optional[float] = None, columns: Optional[Sequence[str]] = None,
+                     since: Optional[int] = None, incremental: bool = False) -> Dict[str, Any]:
+        """
+        Export threats held by a ThreatStore.
+        
+        Args:
+            store: Threat store
+            sink: File path (written via a temporary file) or binary file object
+            format: parquet or arrow (Arrow IPC file)
+            start: Only threats at or after this epoch second
+            end: Only threats before this epoch second
+            columns: Columns to export, all by default
+            since: Only rows appended at or after this cursor
+            incremental: Continue from, and then save, the stored cursor
+        
+        Returns:
+            Rows and row groups written, bytes for paths, and the cursor to
+            pass as `since` next time
+        
+        Raises:
+            ValueError: Unknown format or column
+            RuntimeError: pyarrow is not installed
+        """
+        groups, schema, since, cursor = self._store_plan(store, format, start, end, columns, since, incremental)
+        return self._export(STORE_SOURCE, groups, schema, sink, format, since, lambda: cursor, incremental)
+    
+    def stream_store(self, store: ThreatStore, format: str = PARQUET, start: Optional[float] = None,
+                     end: Optional[float] = None, columns: Optional[Sequence[str]] = None,
+                     since: Optional[int] = None) -> Tuple[Iterator[bytes], int]:
+        """
+        Export threats as a byte stream, one chunk per row group.
+        
+        Rows are fixed on the call, so the stream can be consumed from
+        another thread. Arguments are as for export_store().
+        
+        Returns:
+            The byte chunks and the cursor to pass as `since` next time
+        """
+        groups, schema, since, cursor = self._store_plan(store, format, start, end, columns, since, False)
+        
+        def chunks() -> Iterator[bytes]:
+            spool = _Spool()
+            for _ in self._write(groups, schema, pa.PythonFile(spool, mode='w'), format):
+                yield spool.drain()
+            # Footer
+            yield spool.drain()
+        
+        return chunks(), cursor
+    
+    def export_table(self, engine: Any, table: str, sink: Sink, format: str = PARQUET,
+                     start: Optional[float] = None, end: Optional[float] = None,
+                     columns: Optional[Sequence[str]] = None, since: Optional[int] = None,
+                     incremental: bool = False) -> Dict[str, Any]:
+        """
+        Export the threats or incidents table.
+        
+        Rows are read in id order through a server-side cursor, one row
+        group at a time.
+        
+        Args:
+            engine: SQLAlchemy engine for the database created by init_db.py
+            table: threats or incidents
+            sink: File path (written via a temporary file) or binary file object
+            format: parquet or arrow (Arrow IPC file)
+            start: Only rows whose time column is at or after this epoch second
+            end: Only rows whose time column is before this epoch second
+            columns: Columns to export, all by default
+            since: Only rows with a greater id
+            incremental: Continue from, and then save, the stored cursor
+        
+        Returns:
+            Rows and row groups written, bytes for paths, and the last id
+            exported as the cursor
+        
+        Raises:
+            ValueError: Unknown table, format or column
+            RuntimeError: pyarrow or SQLAlchemy is not installed
+        """
+        _require_pyarrow()
+        if sqlalchemy is None:
+            raise RuntimeError("SQLAlchemy is not installed on this server")
+        if table not in TABLES:
+            raise ValueError(f"Unknown table {table!r}; use {' or '.join(TABLES)}")
+        if format not in FORMATS:
+            raise ValueError(f"Unknown format {format!r}; use {' or '.join(FORMATS)}")
+        time_column, spec = TABLES[table]
+        types = dict(spec)
+        names = _select([name for name, _ in spec], columns)
+        if since is None:
+            since = self.cursors.get(table, 0) if incremental else 0
+        
+        sql_types = {'int64': sqlalchemy.BigInteger, 'string': sqlalchemy.String, 'double': sqlalchemy.Float,
+                     'bool': sqlalchemy.Boolean, 'timestamp': sqlalchemy.DateTime}
+        # The id is read even when not exported, to advance the cursor
+        read = list(dict.fromkeys(names + ['id']))
+        id_index = read.index('id')
+        source = sqlalchemy.table(table, *[sqlalchemy.column(name, sql_types[kind]()) for name, kind in spec])
+        query = sqlalchemy.select(*[source.c[name] for name in read]).where(source.c.id > since)
+        if start is not None:
+            query = query.where(source.c[time_column] >= _naive_utc(start))
+        if end is not None:
+            query = query.where(source.c[time_column] < _naive_utc(end))
+        query = query.order_by(source.c.id)
+        
+        schema = pa.schema([pa.field(name, _arrow_type(types[name])) for name in names])
+        last_id = since
+        
+        def groups() -> Iterator[Any]:
+            nonlocal last_id
+            with engine.connect() as connection:
+                result = connection.execution_options(stream_results=True,
+                                                      yield_per=self.row_group_size).execute(query)
+                for rows in result.partitions(self.row_group_size):
+                    last_id = rows[-1][id_index]
+                    values = list(zip(*rows))
+                    yield pa.Table.from_arrays(
+                        [pa.array(values[i], type=field.type) for i, field in enumerate(schema)], schema=schema
+                    )
+        
+        return self._export(table, groups(), schema, sink, format, since, lambda: last_id, incremental)
@@ -0,0 +1,406 @@
+"""
+Bulk File Encryption
+
+Command line:
+    python -m ztso.filecrypt keygen KEYFILE [--algorithm ALGO]
+    python -m ztso.filecrypt encrypt SOURCE TARGET --public-key KEYFILE.pub
+    python -m ztso.filecrypt decrypt SOURCE TARGET --private-key KEYFILE [--offset N --length N]
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, Any, Callable, List, NamedTuple, Optional, Sequence
+
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from .crypto import QuantumSafeCrypto
+from . import streaming
+
+logger = logging.getLogger(__name__)
+
+
+# Container format:
+#   stream header (key_id = algorithm id || wrapped data key, as in encrypt_pqc_stream)
+#   frames: one per chunk, sealed exactly as in the chunked stream format
+#   index: frame offset (u64) per chunk
+#   trailer: index offset | chunk count | plaintext size | magic
+# Regions of the input are encrypted independently and written at offsets
+# known up front, so workers never coordinate. The index and trailer are
+# not encrypted: each frame authenticates its chunk index and final flag,
+# so a forged offset or count only makes the affected chunks fail to open.
+CONTAINER_MAGIC = b'ZTSX'
+INDEX_ENTRY = struct.Struct('>Q')
+TRAILER = struct.Struct('>QQQ4s')
+
+# Plaintext bytes handed to one worker task; also bounds the mapped window
+DEFAULT_REGION_SIZE = 64 * 1024 * 1024
+
+
+class ContainerIndex(NamedTuple):
+    """Parsed container header, index and trailer."""
+    header: streaming.StreamHeader
+    chunks: int
+    size: int
+    offsets: List[int]
+    index_offset: int
+    
+    def frame_end(self, index: int) -> int:
+        """Offset just past a chunk's frame."""
+        return self.offsets[index + 1] if index + 1 < self.chunks else self.index_offset
+    
+    def chunk_length(self, index: int) -> int:
+        """Plaintext length of a chunk."""
+        return min(self.header.chunk_size, self.size - index * self.header.chunk_size)
+
+
+@contextmanager
+def _mapped(fd: int, start: int, stop: int):
+    """Map bytes [start, stop) of a file read-only; yields (view, base offset)."""
+    if stop <= start:
+        yield memoryview(b''), start
+        return
+    base = start - start % mmap.ALLOCATIONGRANULARITY
+    mapping = mmap.mmap(fd, stop - base, access=mmap.ACCESS_READ, offset=base)
+    if hasattr(mapping, 'madvise'):
+        mapping.madvise(mmap.MADV_SEQUENTIAL)
+    view = memoryview(mapping)
+    try:
+        yield view, base
+    finally:
+        view.release()
+        mapping.close()
+
+
+def _run_regions(func: Callable, tasks: Sequence[tuple], workers: int) -> List[Any]:
+    """Run region tasks inline, or across a process pool when there is more than one."""
+    if workers <= 1 or len(tasks) <= 1:
+        return [func(*task) for task in tasks]
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        futures = [pool.submit(func, *task) for task in tasks]
+        return [future.result() for future in futures]
+
+
+def _encrypt_region(source_path: str, target_path: str, header: streaming.StreamHeader,
+                    key: bytes, first: int, end: int, chunks: int, size: int) -> int:
+    """Seal chunks [first, end) of the input into their frames; runs in a worker process."""
+    aead = AESGCM(key)
+    chunk_size = header.chunk_size
+    start = first * chunk_size
+    stop = min(end * chunk_size, size)
+    frame = bytearray(header.frame_size)
+    
+    source = os.open(source_path, os.O_RDONLY)
+    target = os.open(target_path, os.O_WRONLY)
+    try:
+        with _mapped(source, start, stop) as (view, base), memoryview(frame) as frame_view:
+            for index in range(first, end):
+                lo = index * chunk_size - base
+                hi = min(lo + chunk_size, stop - base)
+                with view[lo:hi] as chunk:
+                    length = streaming.seal_chunk_into(aead, header, index, chunk, index == chunks - 1, frame)
+                os.pwrite(target, frame_view[:length], header.frame_offset(index))
+    finally:
+        os.close(source)
+        os.close(target)
+    return stop - start
+
+
+def _decrypt_region(source_path: str, target_path: str, container: ContainerIndex,
+                    key: bytes, first: int, end: int) -> int:
+    """Open chunks [first, end) and write the plaintext in place; runs in a worker process."""
+    aead = AESGCM(key)
+    header = container.header
+    total = 0
+    
+    source = os.open(source_path, os.O_RDONLY)
+    target = os.open(target_path, os.O_WRONLY)
+    try:
+        with _mapped(source, container.offsets[first], container.frame_end(end - 1)) as (view, base):
+            for index in range(first, end):
+                position = container.offsets[index] - base
+                (length,) = streaming.FRAME_LENGTH.unpack_from(view, position)
+                if length != container.chunk_length(index) + streaming.TAG_SIZE:
+                    raise ValueError(f"Invalid frame length for chunk {index}")
+                position += streaming.FRAME_LENGTH.size
+                with view[position:position + length] as sealed:
+                    plaintext = streaming.open_chunk(aead, header, index, sealed, index == container.chunks - 1)
+                os.pwrite(target, plaintext, index * header.chunk_size)
+                total += len(plaintext)
+    finally:
+        os.close(source)
+        os.close(target)
+    return total
+
+
+def read_index(path: str, max_chunk_size: int = streaming.MAX_CHUNK_SIZE) -> ContainerIndex:
+    """
+    Read a container's header, index and trailer.
+    
+    Args:
+        path: Container file
+        max_chunk_size: Largest chunk size to accept from the header
+    
+    Returns:
+        Container index
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        header = streaming.read_header(f, max_chunk_size)
+        if file_size < len(header.raw) + TRAILER.size:
+            raise ValueError("Truncated container")
+        f.seek(file_size - TRAILER.size)
+        index_offset, chunks, size, magic = TRAILER.unpack(f.read(TRAILER.size))
+        if magic != CONTAINER_MAGIC:
+            raise ValueError("Not an encrypted container (missing trailer)")
+        if (chunks < 1 or index_offset + chunks * INDEX_ENTRY.size + TRAILER.size != file_size
+                or not (chunks - 1) * header.chunk_size <= size <= chunks * header.chunk_size):
+            raise ValueError("Corrupt container trailer")
+        f.seek(index_offset)
+        offsets = list(struct.unpack(f'>{chunks}Q', f.read(chunks * INDEX_ENTRY.size)))
+    
+    if offsets[0] != len(header.raw) or any(b <= a for a, b in zip(offsets, offsets[1:])) \
+            or offsets[-1] >= index_offset:
+        raise ValueError("Corrupt container index")
+    return ContainerIndex(header, chunks, size, offsets, index_offset)
+
+
+def encrypt_file(crypto: QuantumSafeCrypto, source_path: str, target_path: str, public_key: bytes,
+                 algorithm: Optional[str] = None, chunk_size: Optional[int] = None,
+                 region_size: int = DEFAULT_REGION_SIZE, workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Encrypt a file into a seekable container.
+    
+    The output is preallocated and the trailer written first; regions of the
+    memory-mapped input are then sealed in parallel and written in place.
+    
+    Args:
+        crypto: Crypto engine that wraps the data key
+        source_path: Plaintext file
+        target_path: Container file to create
+        public_key: Recipient public key
+        algorithm: PQC algorithm to use
+        chunk_size: Plaintext bytes per chunk
+        region_size: Plaintext bytes per worker task
+        workers: Worker processes (default: CPU count)
+    
+    Returns:
+        Container statistics
+    """
+    chunk_size = chunk_size or crypto.stream_chunk_size
+    if not 0 < chunk_size <= crypto.stream_max_chunk_size:
+        raise ValueError(f"chunk_size must be between 1 and {crypto.stream_max_chunk_size}")
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    
+    size = os.path.getsize(source_path)
+    chunks = max(1, -(-size // chunk_size))
+    if chunks >= streaming.MAX_CHUNKS:
+        raise ValueError("Input too large for the chunk size")
+    
+    data_key, key_id = crypto.new_stream_key(public_key, algorithm)
+    header = streaming.build_header(chunk_size, key_id)
+    last_length = size - (chunks - 1) * chunk_size
+    index_offset = header.frame_offset(chunks - 1) + streaming.FRAME_LENGTH.size + last_length + streaming.TAG_SIZE
+    offsets = [header.frame_offset(i) for i in range(chunks)]
+    
+    with open(target_path, 'wb') as f:
+        f.write(header.raw)
+        f.seek(index_offset)
+        f.write(struct.pack(f'>{chunks}Q', *offsets))
+        f.write(TRAILER.pack(index_offset, chunks, size, CONTAINER_MAGIC))
+    
+    per_region = max(1, region_size // chunk_size)
+    tasks = [
+        (source_path, target_path, header, data_key, first, min(first + per_region, chunks), chunks, size)
+        for first in range(0, chunks, per_region)
+    ]
+    try:
+        _run_regions(_encrypt_region, tasks, workers)
+    except BaseException:
+        os.unlink(target_path)
+        raise
+    
+    elapsed = time.perf_counter() - started
+    logger.info(f"Encrypted {size} bytes in {len(tasks)} regions ({elapsed:.2f}s)")
+    return {
+        "chunks": chunks,
+        "regions": len(tasks),
+        "workers": min(workers, len(tasks)),
+        "bytes_in": size,
+        "bytes_out": index_offset + chunks * INDEX_ENTRY.size + TRAILER.size,
+        "seconds": elapsed
+    }
+
+
+def decrypt_file(crypto: QuantumSafeCrypto, source_path: str, target_path: str, private_key: bytes,
+                 region_size: int = DEFAULT_REGION_SIZE, workers: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Decrypt a whole container in parallel.
+    
+    Args:
+        crypto: Crypto engine that unwraps the data key
+        source_path: Container file
+        target_path: Plaintext file to create
+        private_key: Recipient private key
+        region_size: Plaintext bytes per worker task
+        workers: Worker processes (default: CPU count)
+    
+    Returns:
+        Decryption statistics
+    """
+    workers = workers or os.cpu_count() or 1
+    started = time.perf_counter()
+    
+    container = read_index(source_path, crypto.stream_max_chunk_size)
+    data_key = crypto.stream_data_key(container.header, private_key)
+    
+    with open(target_path, 'wb') as f:
+        f.truncate(container.size)
+    
+    per_region = max(1, region_size // container.header.chunk_size)
+    tasks = [
+        (source_path, target_path, container, data_key, first, min(first + per_region, container.chunks))
+        for first in range(0, container.chunks, per_region)
+    ]
+    try:
+        _run_regions(_decrypt_region, tasks, workers)
+    except BaseException:
+        # Never leave partially decrypted (unauthenticated) output behind
+        os.unlink(target_path)
+        raise
+    
+    elapsed = time.perf_counter() - started
+    return {
+        "chunks": container.chunks,
+        "regions": len(tasks),
+        "workers": min(workers, len(tasks)),
+        "bytes_out": container.size,
+        "seconds": elapsed
+    }
+
+
+def read_range(crypto: QuantumSafeCrypto, path: str, private_key: bytes,
+               offset: int, length: int) -> bytes:
+    """
+    Decrypt a byte range without touching the rest of the container.
+    
+    Args:
+        crypto: Crypto engine that unwraps the data key
+        path: Container file
+        private_key: Recipient private key
+        offset: First plaintext byte
+        length: Number of bytes
+    
+    Returns:
+        Plaintext bytes (shorter than length at the end of the file)
+    """
+    container = read_index(path, crypto.stream_max_chunk_size)
+    if offset < 0 or length < 0:
+        raise ValueError("offset and length must not be negative")
+    end = min(offset + length, container.size)
+    if offset >= end:
+        return b''
+    
+    chunk_size = container.header.chunk_size
+    aead = AESGCM(crypto.stream_data_key(container.header, private_key))
+    
+    out = bytearray()
+    with open(path, 'rb') as f:
+        for index in range(offset // chunk_size, (end - 1) // chunk_size + 1):
+            f.seek(container.offsets[index])
+            (frame_length,) = streaming.FRAME_LENGTH.unpack(f.read(streaming.FRAME_LENGTH.size))
+            if frame_length != container.chunk_length(index) + streaming.TAG_SIZE:
+                raise ValueError(f"Invalid frame length for chunk {index}")
+            out += streaming.open_chunk(aead, container.header, index, f.read(frame_length),
+                                        index == container.chunks - 1)
+    
+    skip = offset % chunk_size
+    return bytes(out[skip:skip + end - offset])
+
+
+def _write_key(path: str, key: bytes, private: bool):
+    """Write a key file; private keys are created with mode 0600."""
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600 if private else 0o644)
+    with os.fdopen(fd, 'wb') as f:
+        f.write(key)
+
+
+def _read_key(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    parser = argparse.ArgumentParser(prog="python -m ztso.filecrypt",
+                                     description="Encrypt large files into seekable PQC containers")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    keygen = commands.add_parser("keygen", help="Create a recipient keypair (KEYFILE and KEYFILE.pub)")
+    keygen.add_argument("keyfile")
+    keygen.add_argument("--algorithm", default=None)
+    
+    encrypt = commands.add_parser("encrypt", help="Encrypt a file")
+    encrypt.add_argument("source")
+    encrypt.add_argument("target")
+    encrypt.add_argument("--public-key", required=True)
+    encrypt.add_argument("--algorithm", default=None)
+    encrypt.add_argument("--chunk-size", type=int, default=None)
+    encrypt.add_argument("--region-size", type=int, default=DEFAULT_REGION_SIZE)
+    encrypt.add_argument("--workers", type=int, default=None)
+    
+    decrypt = commands.add_parser("decrypt", help="Decrypt a file or a byte range of it")
+    decrypt.add_argument("source")
+    decrypt.add_argument("target", help="Output file, or - for stdout")
+    decrypt.add_argument("--private-key", required=True)
+    decrypt.add_argument("--offset", type=int, default=None)
+    decrypt.add_argument("--length", type=int, default=None)
+    decrypt.add_argument("--region-size", type=int, default=DEFAULT_REGION_SIZE)
+    decrypt.add_argument("--workers", type=int, default=None)
+    
+    args = parser.parse_args(argv)
+    crypto = QuantumSafeCrypto({'keypair_pool_depth': 0})
+    
+    try:
+        if args.command == "keygen":
+            public_key, private_key = crypto.generate_keypair(args.algorithm)
+            _write_key(args.keyfile, private_key, private=True)
+            _write_key(args.keyfile + ".pub", public_key, private=False)
+            result = {"private_key": args.keyfile, "public_key": args.keyfile + ".pub"}
+        elif args.command == "encrypt":
+            result = encrypt_file(crypto, args.source, args.target, _read_key(args.public_key),
+                                  args.algorithm, args.chunk_size, args.region_size, args.workers)
+        elif args.offset is not None or args.length is not None or args.target == "-":
+            container_size = read_index(args.source).size
+            offset = args.offset or 0
+            length = args.length if args.length is not None else container_size - offset
+            data = read_range(crypto, args.source, _read_key(args.private_key), offset, length)
+            if args.target == "-":
+                sys.stdout.buffer.write(data)
+                return 0
+            with open(args.target, 'wb') as f:
+                f.write(data)
+            result = {"offset": offset, "bytes_out": len(data)}
+        else:
+            result = decrypt_file(crypto, args.source, args.target, _read_key(args.private_key),
+                                  args.region_size, args.workers)
+    except (OSError, ValueError) as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    finally:
+        crypto.close()
+    
+    print(json.dumps(result))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,237 @@
+"""
+Idempotent Response Actions
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Awaitable, Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Delivery metadata that differs between replays of the same event
+VOLATILE_FIELDS = ('timestamp', 'received_at', 'delivery_id', 'attempt')
+# Fields naming what an action acts on, most specific first
+TARGET_FIELDS = ('target', 'host', 'user_id', 'source')
+
+
+class ActionRecord:
+    """Result of one action execution, kept for replays and audits."""
+    
+    __slots__ = ('key', 'fingerprint', 'action', 'target', 'incident_id', 'result',
+                 'started_at', 'completed_at', 'expires', 'hits')
+    
+    def __init__(self, key: str, fingerprint: str, action: str, target: Optional[str], incident_id: Any):
+        self.key = key
+        self.fingerprint = fingerprint
+        self.action = action
+        self.target = target
+        self.incident_id = incident_id
+        self.result = None
+        self.started_at = time.time()
+        self.completed_at = None
+        self.expires = 0.0
+        self.hits = 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "key": self.key,
+            "fingerprint": self.fingerprint,
+            "action": self.action,
+            "target": self.target,
+            "incident_id": self.incident_id,
+            "result": self.result,
+            "started_at": self.started_at,
+            "completed_at": self.completed_at,
+            "replays": self.hits
+        }
+
+
+class ActionLedger:
+    """
+    Runs each response action at most once per intent.
+    
+    An intent is keyed by (incident fingerprint, action, target). The first
+    execution of a key runs the action; concurrent duplicates wait for it,
+    and later duplicates within `ttl` seconds get its result without
+    running anything. Only successes are recorded, so a failed action is
+    retried by the next duplicate. Records are kept in completion order,
+    which is also expiry order, and bounded in number.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize action ledger.
+        
+        Args:
+            config: Configuration dictionary
+        """
+        self.ttl = config.get('idempotency_ttl', 3600.0)
+        self.max_entries = config.get('idempotency_max_entries', 100000)
+        self.ignore_fields = frozenset(config.get('idempotency_ignore_fields', VOLATILE_FIELDS))
+        
+        self._records: OrderedDict = OrderedDict()
+        self._inflight: Dict[str, Tuple[ActionRecord, asyncio.Future]] = {}
+        
+        self.stats = {
+            'executed': 0,
+            'replayed': 0,
+            'joined': 0,
+            'failed': 0,
+            'evicted': 0,
+            'forgotten': 0
+        }
+    
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+    
+    def fingerprint(self, threat_data: Dict[str, Any]) -> str:
+        """
+        Identify an incident independently of how it was delivered.
+        
+        Uses the event's own `fingerprint` if it has one, otherwise a hash of
+        its fields other than delivery metadata.
+        """
+        if threat_data.get('fingerprint'):
+            return str(threat_data['fingerprint'])
+        stable = {name: value for name, value in threat_data.items() if name not in self.ignore_fields}
+        encoded = json.dumps(stable, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(encoded.encode()).hexdigest()[:32]
+    
+    @staticmethod
+    def target(threat_data: Dict[str, Any]) -> Optional[str]:
+        """What the incident's actions act on."""
+        for name in TARGET_FIELDS:
+            if threat_data.get(name):
+                return str(threat_data[name])
+        sources = threat_data.get('sources')
+        return ','.join(sorted(map(str, sources))) if sources else None
+    
+    @staticmethod
+    def key(fingerprint: str, action: str, target: Optional[str]) -> str:
+        """Deterministic idempotency key for an action."""
+        return hashlib.sha256(f"{fingerprint}\x00{action}\x00{target or ''}".encode()).hexdigest()[:32]
+    
+    async def run(self, fingerprint: str, action: str, target: Optional[str], incident_id: Any,
+                  execute: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Run an action unless the same intent already ran.
+        
+        Args:
+            fingerprint: Incident fingerprint
+            action: Action name
+            target: What the action acts on
+            incident_id: Incident running the action, recorded for audits
+            execute: Performs the action
+        
+        Returns:
+            The action's result, and whether it came from an earlier execution
+        """
+        key = self.key(fingerprint, action, target)
+        while True:
+            self._expire(time.monotonic())
+            record = self._records.get(key)
+            if record is not None:
+                record.hits += 1
+                self.stats['replayed'] += 1
+                return record.result, True
+            
+            inflight = self._inflight.get(key)
+            if inflight is None:
+                break
+            inflight[0].hits += 1
+            self.stats['joined'] += 1
+            try:
+                return await asyncio.shield(inflight[1]), True
+            except asyncio.CancelledError:
+                if not inflight[1].cancelled():
+                    raise
+                # The first caller was cancelled; take over the execution
+        
+        record = ActionRecord(key, fingerprint, action, target, incident_id)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = (record, future)
+        try:
+            result = await execute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            self.stats['failed'] += 1
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+        
+        self.stats['executed'] += 1
+        record.result = result
+        record.completed_at = time.time()
+        record.expires = time.monotonic() + self.ttl
+        self._records[key] = record
+        while len(self._records) > self.max_entries:
+            self._records.popitem(last=False)
+            self.stats['evicted'] += 1
+        future.set_result(result)
+        return result, False
+    
+    def forget(self, fingerprint: str, action: str, target: Optional[str]) -> bool:
+        """Drop a recorded result, e.g. once the action has been undone."""
+        removed = self._records.pop(self.key(fingerprint, action, target), None) is not None
+        if removed:
+            self.stats['forgotten'] += 1
+        return removed
+    
+    def _expire(self, now: float):
+        """Drop records past their TTL from the front."""
+        records = self._records
+        while records:
+            key, record = next(iter(records.items()))
+            if record.expires > now:
+                break
+            del records[key]
+    
+    def query(self, fingerprint: Optional[str] = None, action: Optional[str] = None,
+              target: Optional[str] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """
+        Recorded and in-flight executions, most recent first.
+        
+        Args:
+            fingerprint: Only this incident
+            action: Only this action
+            target: Only this target
+            limit: Maximum records returned
+        
+        Returns:
+            Matching records
+        """
+        self._expire(time.monotonic())
+        matches = []
+        records = [record for record, _ in self._inflight.values()] + list(reversed(self._records.values()))
+        for record in records:
+            if ((fingerprint is None or record.fingerprint == fingerprint)
+                    and (action is None or record.action == action)
+                    and (target is None or record.target == target)):
+                matches.append(record.to_dict())
+                if len(matches) >= limit:
+                    break
+        return matches
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get ledger statistics.
+        
+        Returns:
+            Recorded and in-flight counts and replay counters
+        """
+        self._expire(time.monotonic())
+        return {
+            "records": len(self._records),
+            "in_flight": len(self._inflight),
+            **self.stats
+        }
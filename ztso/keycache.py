@@ -0,0 +1,247 @@
+"""
+Tenant Data-Key Cache
+"""
+
+import hashlib
+import logging
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class DataKey:
+    """A data encryption key (DEK) and its usage counters."""
+    
+    __slots__ = ('key', 'wrapped_key', 'aead', 'key_id', 'created_at', 'messages', 'bytes')
+    
+    def __init__(self, key: bytes, wrapped_key: bytes, aead):
+        self.key = key
+        self.wrapped_key = wrapped_key
+        self.aead = aead
+        self.key_id = hashlib.sha256(wrapped_key).hexdigest()[:16]
+        self.created_at = time.monotonic()
+        self.messages = 0
+        self.bytes = 0
+
+
+class DataKeyCache:
+    """
+    Per-(tenant, purpose, recipient key) cache of wrapped data keys.
+    
+    A DEK is wrapped once with the PQC KEM and then reused, so each message
+    costs a single AEAD operation. A DEK is retired after a bounded number
+    of messages, bytes or seconds; a background thread replaces keys that
+    are close to any limit before callers hit it. Unwrapped keys are cached
+    on the decrypt side as well.
+    """
+    
+    def __init__(self, wrap: Callable[[bytes, bytes, str], bytes],
+                 aead_factory: Callable[[bytes], Any], config: Dict[str, Any]):
+        """
+        Initialize data-key cache.
+        
+        Args:
+            wrap: Wraps (data_key, public_key, algorithm) for storage with the ciphertext
+            aead_factory: Builds an AEAD instance for a data key
+            config: Configuration dictionary
+        """
+        self.wrap = wrap
+        self.aead_factory = aead_factory
+        
+        self.max_messages = config.get('dek_max_messages', 1_000_000)
+        self.max_bytes = config.get('dek_max_bytes', 64 * 1024 ** 3)
+        self.max_age = config.get('dek_max_age', 3600)
+        self.max_entries = config.get('dek_cache_size', 4096)
+        # Fraction of any limit at which a replacement is prepared in the background
+        self.rotate_ahead = config.get('dek_rotate_ahead', 0.8)
+        self.rotation_interval = config.get('dek_rotation_interval', 10.0)
+        
+        self._keys: OrderedDict = OrderedDict()
+        self._recipients: Dict[Tuple, Tuple[bytes, str]] = {}
+        self._unwrapped: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._rotating = set()
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'rotations': 0,
+            'expired': 0,
+            'unwrap_hits': 0,
+            'unwrap_misses': 0
+        }
+    
+    def _start(self):
+        """Start the rotation thread on first use."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="ztso-dek-rotation", daemon=True
+                )
+                self._thread.start()
+    
+    def stop(self):
+        """Stop the rotation thread and drop cached keys."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        with self._lock:
+            self._keys.clear()
+            self._recipients.clear()
+            self._unwrapped.clear()
+            self._rotating.clear()
+        self._stopping = False
+    
+    def _new_key(self, public_key: bytes, algorithm: str) -> DataKey:
+        """Generate and wrap a fresh DEK (one PQC key operation)."""
+        key = secrets.token_bytes(32)
+        return DataKey(key, self.wrap(key, public_key, algorithm), self.aead_factory(key))
+    
+    def _usage(self, dek: DataKey, now: float) -> float:
+        """Highest fraction of any limit the DEK has used."""
+        return max(
+            dek.messages / self.max_messages,
+            dek.bytes / self.max_bytes,
+            (now - dek.created_at) / self.max_age
+        )
+    
+    def acquire(self, tenant: str, purpose: str, public_key: bytes, algorithm: str,
+                size: int) -> DataKey:
+        """
+        Reserve a DEK for one message of `size` bytes.
+        
+        Args:
+            tenant: Tenant identifier
+            purpose: Key purpose (e.g. 'records', 'backups')
+            public_key: Tenant's PQC public key the DEK is wrapped to
+            algorithm: PQC algorithm
+            size: Plaintext size in bytes
+        
+        Returns:
+            Data key with the message counted against its limits
+        """
+        if self._thread is None:
+            self._start()
+        
+        slot = (tenant, purpose, hashlib.sha256(public_key).digest())
+        now = time.monotonic()
+        
+        with self._lock:
+            dek = self._keys.get(slot)
+            if dek is not None:
+                if (dek.messages < self.max_messages and dek.bytes + size <= self.max_bytes
+                        and now - dek.created_at < self.max_age):
+                    dek.messages += 1
+                    dek.bytes += size
+                    self._keys.move_to_end(slot)
+                    self.stats['hits'] += 1
+                    if self._usage(dek, now) >= self.rotate_ahead and slot not in self._rotating:
+                        self._rotating.add(slot)
+                        self._wakeup.set()
+                    return dek
+                self.stats['expired'] += 1
+            self.stats['misses'] += 1
+        
+        # Cold or exhausted key: wrap a new one inline
+        dek = self._new_key(public_key, algorithm)
+        dek.messages = 1
+        dek.bytes = size
+        with self._lock:
+            self._install(slot, dek, public_key, algorithm)
+        return dek
+    
+    def _install(self, slot: Tuple, dek: DataKey, public_key: bytes, algorithm: str):
+        """Store a DEK for a slot, evicting the least recently used slot. Caller holds the lock."""
+        replaced = slot in self._keys
+        self._keys[slot] = dek
+        self._keys.move_to_end(slot)
+        self._recipients[slot] = (public_key, algorithm)
+        if replaced:
+            self.stats['rotations'] += 1
+            logger.debug(f"Rotated data key for {slot[0]}/{slot[1]} -> {dek.key_id}")
+        while len(self._keys) > self.max_entries:
+            evicted, _ = self._keys.popitem(last=False)
+            self._recipients.pop(evicted, None)
+    
+    def _run(self):
+        """Replace DEKs that callers flagged as close to a limit; drop expired ones."""
+        while not self._stopping:
+            self._wakeup.wait(timeout=self.rotation_interval)
+            self._wakeup.clear()
+            
+            now = time.monotonic()
+            with self._lock:
+                # Idle slots are not rotated, they simply age out
+                expired = [slot for slot, dek in self._keys.items() if now - dek.created_at >= self.max_age]
+                for slot in expired:
+                    del self._keys[slot]
+                    self._recipients.pop(slot, None)
+                self.stats['expired'] += len(expired)
+                
+                recipients = {slot: self._recipients[slot] for slot in self._rotating if slot in self._recipients}
+                self._rotating.clear()
+            
+            for slot, (public_key, algorithm) in recipients.items():
+                if self._stopping:
+                    return
+                try:
+                    dek = self._new_key(public_key, algorithm)
+                except Exception as e:
+                    logger.error(f"Data key rotation failed for {slot[0]}/{slot[1]}: {e}")
+                    continue
+                with self._lock:
+                    if slot in self._keys:
+                        self._install(slot, dek, public_key, algorithm)
+    
+    def unwrap(self, wrapped_key: bytes, private_key: bytes,
+               unwrap: Callable[[], bytes], aead_cls: Callable[[bytes], Any]) -> Any:
+        """
+        Get the AEAD instance for a wrapped DEK, unwrapping it on first use.
+        
+        Args:
+            wrapped_key: Wrapped DEK from the envelope header
+            private_key: Recipient private key
+            unwrap: Performs the PQC unwrap on a miss
+            aead_cls: AEAD class named in the envelope header
+        
+        Returns:
+            AEAD instance for the data key
+        """
+        slot = (wrapped_key, hashlib.sha256(private_key).digest(), aead_cls)
+        with self._lock:
+            aead = self._unwrapped.get(slot)
+            if aead is not None:
+                self._unwrapped.move_to_end(slot)
+                self.stats['unwrap_hits'] += 1
+                return aead
+            self.stats['unwrap_misses'] += 1
+        
+        aead = aead_cls(unwrap())
+        with self._lock:
+            self._unwrapped[slot] = aead
+            if len(self._unwrapped) > self.max_entries:
+                self._unwrapped.popitem(last=False)
+        return aead
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get cache statistics.
+        
+        Returns:
+            Hit rate, rotations and cached key counts
+        """
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            "keys": len(self._keys),
+            "hit_rate": self.stats['hits'] / lookups if lookups else 0.0,
+            **self.stats
+        }
@@ -0,0 +1,128 @@
+"""
+Pre-generated PQC Keypair Pool
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Dict, Any, Callable, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class KeypairPool:
+    """
+    Per-algorithm pool of pre-generated keypairs.
+    
+    A background thread keeps each pool topped up to its target depth so
+    encryption never waits on key generation under steady load. When a pool
+    runs dry the caller falls back to synchronous key generation (a stall).
+    """
+    
+    def __init__(self, generate: Callable[[str], Tuple[bytes, bytes]], depth: int = 16):
+        """
+        Initialize keypair pool.
+        
+        Args:
+            generate: Keypair generator, called with the algorithm name
+            depth: Target number of ready keypairs per algorithm
+        """
+        self.generate = generate
+        self.depth = depth
+        self.low_watermark = max(1, depth // 2)
+        
+        self._pools: Dict[str, deque] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._wakeup = threading.Event()
+        self._stopping = False
+        self._thread = None
+        self._lock = threading.Lock()
+    
+    def _start(self):
+        """Start the refill thread on first use."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="ztso-keypair-pool", daemon=True
+                )
+                self._thread.start()
+    
+    def stop(self):
+        """Stop the refill thread and drop pooled keys."""
+        self._stopping = True
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+        for pool in self._pools.values():
+            pool.clear()
+        self._stopping = False
+    
+    def acquire(self, algorithm: str) -> Tuple[bytes, bytes]:
+        """
+        Take a keypair from the pool, generating one inline if it is empty.
+        
+        Args:
+            algorithm: PQC algorithm
+        
+        Returns:
+            (public_key, private_key) tuple
+        """
+        pool = self._pools.get(algorithm)
+        if pool is None:
+            self._stats.setdefault(algorithm, {
+                'hits': 0, 'stalls': 0, 'generated': 0, 'refill_rate': 0.0
+            })
+            pool = self._pools.setdefault(algorithm, deque())
+        
+        if self._thread is None:
+            self._start()
+        
+        stats = self._stats[algorithm]
+        
+        try:
+            keypair = pool.popleft()
+            stats['hits'] += 1
+        except IndexError:
+            stats['stalls'] += 1
+            keypair = self.generate(algorithm)
+        
+        if len(pool) < self.low_watermark:
+            self._wakeup.set()
+        
+        return keypair
+    
+    def _run(self):
+        """Refill pools to their target depth whenever they run low."""
+        while not self._stopping:
+            self._wakeup.clear()
+            for algorithm, pool in list(self._pools.items()):
+                missing = self.depth - len(pool)
+                if missing <= 0:
+                    continue
+                
+                started = time.perf_counter()
+                for _ in range(missing):
+                    if self._stopping:
+                        return
+                    pool.append(self.generate(algorithm))
+                elapsed = time.perf_counter() - started
+                
+                stats = self._stats[algorithm]
+                stats['generated'] += missing
+                stats['refill_rate'] = missing / elapsed if elapsed > 0 else 0.0
+            
+            self._wakeup.wait(timeout=1.0)
+    
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Get pool statistics per algorithm.
+        
+        Returns:
+            Depth, hits, stalls, keys generated and last refill rate (keys/s)
+        """
+        return {
+            algorithm: {"depth": len(self._pools[algorithm]), **stats}
+            for algorithm, stats in self._stats.items()
+        }
@@ -0,0 +1,316 @@
+"""
+Streaming Latency Quantiles
+"""
+
+import logging
+import math
+import time
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+# Series key component matching every threat type or severity
+ALL = '*'
+
+
+class DDSketch:
+    """
+    Quantile sketch with relative-error guarantees (DDSketch).
+    
+    Values are counted in logarithmic bins of ratio gamma, so any quantile
+    is returned within `relative_accuracy` of the true value. Sketches with
+    the same accuracy merge exactly by adding bin counts, which lets
+    per-worker or per-interval sketches be combined. Bin count is capped at
+    `max_bins` by folding the lowest bins together, keeping the upper
+    quantiles that latency reporting cares about accurate.
+    """
+    
+    __slots__ = ('relative_accuracy', 'gamma', '_log_gamma', 'max_bins', 'bins', 'zero_count',
+                 'count', 'sum', 'min', 'max')
+    
+    # Values at or below this are counted as zero
+    MIN_VALUE = 1e-9
+    
+    def __init__(self, relative_accuracy: float = 0.01, max_bins: int = 2048):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.max_bins = max_bins
+        self.bins: Dict[int, int] = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+    
+    def add(self, value: float, weight: int = 1):
+        """Add a non-negative value."""
+        if value <= self.MIN_VALUE:
+            self.zero_count += weight
+        else:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            bins = self.bins
+            if key in bins:
+                bins[key] += weight
+            else:
+                bins[key] = weight
+                if len(bins) > self.max_bins:
+                    self._collapse()
+        self.count += weight
+        self.sum += value * weight
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+    
+    def _collapse(self):
+        """Fold the lowest bins into one so at most max_bins remain."""
+        keys = sorted(self.bins)
+        excess = len(keys) - self.max_bins
+        target = keys[excess]
+        for key in keys[:excess]:
+            self.bins[target] += self.bins.pop(key)
+    
+    def merge(self, other: 'DDSketch'):
+        """Add another sketch's values into this one."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        bins = self.bins
+        for key, count in other.bins.items():
+            bins[key] = bins.get(key, 0) + count
+        if len(bins) > self.max_bins:
+            self._collapse()
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+    
+    def quantile(self, q: float) -> float:
+        """Value at quantile q (0-1), or 0.0 if empty."""
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if seen > rank:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if seen > rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+        return self.max
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable form, for shipping to another process."""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "bins": {str(key): count for key, count in self.bins.items()},
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else None,
+            "max": self.max if self.count else None
+        }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], max_bins: int = 2048) -> 'DDSketch':
+        sketch = cls(data['relative_accuracy'], max_bins)
+        sketch.bins = {int(key): count for key, count in data['bins'].items()}
+        sketch.zero_count = data['zero_count']
+        sketch.count = data['count']
+        sketch.sum = data['sum']
+        if sketch.count:
+            sketch.min, sketch.max = data['min'], data['max']
+        return sketch
+
+
+class SlidingSketch:
+    """
+    Sketches for consecutive time slices in a fixed ring.
+    
+    A window query merges the slices it covers, so old values age out one
+    slice at a time and memory is bounded by `slices` sketches.
+    """
+    
+    __slots__ = ('slice_seconds', 'slices', 'relative_accuracy', 'max_bins', '_ring')
+    
+    def __init__(self, slice_seconds: float, slices: int, relative_accuracy: float, max_bins: int):
+        self.slice_seconds = slice_seconds
+        self.slices = slices
+        self.relative_accuracy = relative_accuracy
+        self.max_bins = max_bins
+        self._ring: List[Optional[Tuple[int, DDSketch]]] = [None] * slices
+    
+    def _slice(self, number: int) -> Optional[DDSketch]:
+        """Sketch for slice `number`, creating or recycling its slot."""
+        slot = self._ring[number % self.slices]
+        if slot is not None and slot[0] == number:
+            return slot[1]
+        if slot is not None and slot[0] > number:
+            # Older than the ring covers
+            return None
+        sketch = DDSketch(self.relative_accuracy, self.max_bins)
+        self._ring[number % self.slices] = (number, sketch)
+        return sketch
+    
+    def add(self, value: float, now: float):
+        sketch = self._slice(int(now // self.slice_seconds))
+        if sketch is not None:
+            sketch.add(value)
+    
+    def window(self, seconds: float, now: float) -> DDSketch:
+        """Merged sketch of the slices overlapping the last `seconds`."""
+        newest = int(now // self.slice_seconds)
+        oldest = newest - min(self.slices, max(1, math.ceil(seconds / self.slice_seconds))) + 1
+        merged = DDSketch(self.relative_accuracy, self.max_bins)
+        for slot in self._ring:
+            if slot is not None and oldest <= slot[0] <= newest:
+                merged.merge(slot[1])
+        return merged
+    
+    def to_list(self) -> List[Tuple[int, Dict[str, Any]]]:
+        return [(slot[0], slot[1].to_dict()) for slot in self._ring if slot is not None]
+    
+    def load(self, slices: List[Tuple[int, Dict[str, Any]]]):
+        """Merge slices produced by to_list()."""
+        for number, data in slices:
+            sketch = self._slice(number)
+            if sketch is not None:
+                sketch.merge(DDSketch.from_dict(data, self.max_bins))
+    
+    def merge(self, other: 'SlidingSketch'):
+        """Merge another ring with the same slicing, slice by slice."""
+        for slot in other._ring:
+            if slot is not None:
+                sketch = self._slice(slot[0])
+                if sketch is not None:
+                    sketch.merge(slot[1])
+
+
+class LatencyTracker:
+    """
+    Sliding-window latency quantiles per metric, threat type and severity.
+    
+    Each observation updates the series for its type and severity and the
+    roll-ups across all types and/or severities. A series keeps a ring of
+    5-minute sketches for the last hour and of hourly sketches for the last
+    day, so its memory is fixed however many observations it takes.
+    Trackers from several workers merge series by series.
+    """
+    
+    WINDOWS = {'1h': 3600, '24h': 86400}
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize latency tracker.
+        
+        Args:
+            config: Configuration dictionary
+        """
+        self.relative_accuracy = config.get('latency_relative_accuracy', 0.01)
+        self.max_bins = config.get('latency_max_bins', 2048)
+        self.max_series = config.get('latency_max_series', 1000)
+        self.series: Dict[Tuple[str, str, str], Tuple[SlidingSketch, SlidingSketch]] = {}
+        self.dropped = 0
+    
+    def _series(self, key: Tuple[str, str, str]) -> Optional[Tuple[SlidingSketch, SlidingSketch]]:
+        series = self.series.get(key)
+        if series is None:
+            if key[1] != ALL and len(self.series) >= self.max_series:
+                # Past the limit new threat types still land in the roll-ups
+                self.dropped += 1
+                return None
+            series = self.series[key] = (
+                SlidingSketch(300, 12, self.relative_accuracy, self.max_bins),
+                SlidingSketch(3600, 24, self.relative_accuracy, self.max_bins)
+            )
+        return series
+    
+    def record(self, metric: str, seconds: float, threat_type: str, severity: str, now: Optional[float] = None):
+        """
+        Record one latency observation.
+        
+        Args:
+            metric: Latency name, e.g. time_to_detect
+            seconds: Observed latency
+            threat_type: Threat type
+            severity: Threat severity level
+            now: Epoch seconds, defaults to now
+        """
+        now = time.time() if now is None else now
+        value = max(seconds, 0.0)
+        for key in ((metric, ALL, ALL), (metric, threat_type, ALL), (metric, ALL, severity),
+                    (metric, threat_type, severity)):
+            series = self._series(key)
+            if series is not None:
+                series[0].add(value, now)
+                series[1].add(value, now)
+    
+    def sketch(self, metric: str, window: str = '1h', threat_type: str = ALL, severity: str = ALL,
+               now: Optional[float] = None) -> DDSketch:
+        """Merged sketch for a series over '1h' or '24h'."""
+        seconds = self.WINDOWS[window]
+        series = self.series.get((metric, threat_type, severity))
+        if series is None:
+            return DDSketch(self.relative_accuracy, self.max_bins)
+        ring = series[0] if seconds <= 3600 else series[1]
+        return ring.window(seconds, time.time() if now is None else now)
+    
+    def summary(self, metric: str, window: str = '1h', threat_type: str = ALL, severity: str = ALL,
+                quantiles: Sequence[float] = (0.5, 0.95, 0.99), now: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Count, mean and quantiles in milliseconds for a series.
+        
+        Returns:
+            Dictionary with count, mean_ms and p50_ms-style keys
+        """
+        sketch = self.sketch(metric, window, threat_type, severity, now)
+        summary = {
+            "count": sketch.count,
+            "mean_ms": round(sketch.sum / sketch.count * 1000, 3) if sketch.count else 0.0
+        }
+        for q in quantiles:
+            summary[f"p{round(q * 100):d}_ms"] = round(sketch.quantile(q) * 1000, 3)
+        return summary
+    
+    def breakdown(self, metric: str, window: str = '1h', now: Optional[float] = None) -> Dict[str, Any]:
+        """Summaries per threat type and per severity for a metric."""
+        by_type, by_severity = {}, {}
+        for name, threat_type, severity in list(self.series):
+            if name != metric:
+                continue
+            if severity == ALL and threat_type != ALL:
+                by_type[threat_type] = self.summary(metric, window, threat_type, ALL, now=now)
+            elif threat_type == ALL and severity != ALL:
+                by_severity[severity] = self.summary(metric, window, ALL, severity, now=now)
+        return {"by_type": by_type, "by_severity": by_severity}
+    
+    def merge(self, other: 'LatencyTracker'):
+        """Merge another worker's series into this tracker."""
+        for key, (hour, day) in other.series.items():
+            series = self._series(key)
+            if series is not None:
+                series[0].merge(hour)
+                series[1].merge(day)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Serializable form of every series, for merging in another process."""
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "series": [
+                {"key": list(key), "hour": hour.to_list(), "day": day.to_list()}
+                for key, (hour, day) in self.series.items()
+            ]
+        }
+    
+    def load(self, data: Dict[str, Any]):
+        """Merge series exported by another worker's to_dict()."""
+        if data['relative_accuracy'] != self.relative_accuracy:
+            raise ValueError("Cannot merge latency trackers with different relative accuracy")
+        for entry in data['series']:
+            series = self._series(tuple(entry['key']))
+            if series is not None:
+                series[0].load(entry['hour'])
+                series[1].load(entry['day'])
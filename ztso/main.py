@@ -2,16 +2,22 @@
 Main FastAPI Application
 """
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-from typing import Dict, Any, Optional
+from pydantic import BaseModel, ValidationError
+from typing import Dict, Any, AsyncIterator, List, Optional
+import json
 import logging
 import os
 
+from .detection import DETECTION_STAGE
+from .materialized import MaterializedView
 from .orchestrator import SecurityOrchestrator
+from .telemetry import PROMETHEUS_MEDIA_TYPES
+from . import wire
 
 # Configure logging
 logging.basicConfig(
@@ -51,9 +57,32 @@ class IdentityVerificationRequest(BaseModel):
     context: Dict[str, Any]
 
 
+class PolicyReloadRequest(BaseModel):
+    policies: Optional[Dict[str, bool]] = None
+    thresholds: Optional[Dict[str, float]] = None
+    weights: Optional[Dict[str, float]] = None
+
+
+class PolicyRollbackRequest(BaseModel):
+    version: Optional[int] = None
+
+
 class EncryptionRequest(BaseModel):
     data: str
     algorithm: Optional[str] = None
+    public_key: Optional[str] = None
+
+
+class BatchEncryptionRequest(BaseModel):
+    items: List[str]
+    algorithm: Optional[str] = None
+    public_key: Optional[str] = None
+
+
+class BinaryBatchEncryptionRequest(BaseModel):
+    items: List[bytes]
+    algorithm: Optional[str] = None
+    public_key: Optional[bytes] = None
 
 
 @app.on_event("startup")
@@ -105,23 +134,35 @@ async def health_check():
     }
 
 
+def _view_response(request: Request, view: MaterializedView) -> Response:
+    """Serve a materialized view, or 304 if the client's ETag is current."""
+    snapshot, not_modified = view.revalidate(request.headers.get('if-none-match'))
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if not_modified:
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type=wire.JSON, headers=headers)
+
+
 @app.get("/dashboard")
-async def get_dashboard():
-    """Get security dashboard."""
-    return orchestrator.get_dashboard()
+async def get_dashboard(request: Request):
+    """Get security dashboard; supports If-None-Match revalidation."""
+    return _view_response(request, orchestrator.dashboard)
 
 
 @app.get("/security-posture")
-async def get_security_posture():
-    """Get security posture assessment."""
-    return orchestrator.get_security_posture()
+async def get_security_posture(request: Request):
+    """Get security posture assessment; supports If-None-Match revalidation."""
+    return _view_response(request, orchestrator.analytics.posture)
 
 
 @app.post("/threat/analyze")
 async def analyze_threat(request: ThreatAnalysisRequest):
     """Analyze potential threat."""
-    result = await orchestrator.threat_detector.analyze_network_traffic(request.data)
-    return result
+    started = DETECTION_STAGE.start()
+    try:
+        return await orchestrator.threat_detector.analyze_network_traffic(request.data)
+    finally:
+        DETECTION_STAGE.stop(started)
 
 
 @app.post("/zerotrust/verify")
@@ -131,18 +172,155 @@ async def verify_identity(request: IdentityVerificationRequest):
         request.user_id,
         request.context
     )
+    orchestrator.audit_trail.record(
+        request.user_id,
+        "zerotrust.verify",
+        request.context.get('resource', ''),
+        result['verified'],
+        {"trust_score": result['trust_score']}
+    )
     return result
 
 
-@app.post("/crypto/encrypt")
-async def encrypt_data(request: EncryptionRequest):
-    """Encrypt data with quantum-safe crypto."""
-    data_bytes = request.data.encode('utf-8')
-    result = orchestrator.crypto_engine.encrypt_pqc(
-        data_bytes,
-        request.algorithm
+@app.get("/zerotrust/policies")
+async def get_policies():
+    """Get the active policy snapshot and reload statistics."""
+    snapshot = orchestrator.policy_engine.snapshot
+    return {
+        "version": snapshot.version,
+        "policies": dict(snapshot.policies),
+        "thresholds": dict(snapshot.thresholds),
+        "reload_stats": orchestrator.policy_engine.get_reload_stats()
+    }
+
+
+@app.post("/zerotrust/policies/reload")
+async def reload_policies(request: PolicyReloadRequest):
+    """Hot-reload zero-trust policies."""
+    try:
+        result = await orchestrator.policy_engine.reload_policies(
+            request.policies,
+            request.thresholds,
+            request.weights
+        )
+    except ValueError as e:
+        orchestrator.audit_trail.record("api", "policy.reload", "policies", False, {"error": str(e)})
+        raise HTTPException(status_code=400, detail=str(e))
+    orchestrator.audit_trail.record("api", "policy.reload", "policies", True,
+                                    {"version": orchestrator.policy_engine.snapshot.version})
+    return result
+
+
+@app.post("/zerotrust/policies/rollback")
+async def rollback_policies(request: PolicyRollbackRequest):
+    """Roll back to a previous policy snapshot."""
+    try:
+        result = await orchestrator.policy_engine.rollback_policies(request.version)
+    except ValueError as e:
+        orchestrator.audit_trail.record("api", "policy.rollback", "policies", False, {"error": str(e)})
+        raise HTTPException(status_code=409, detail=str(e))
+    orchestrator.audit_trail.record("api", "policy.rollback", "policies", True,
+                                    {"version": orchestrator.policy_engine.snapshot.version})
+    return result
+
+
+def _hex_fields(value):
+    """Hex-encode bytes in an audit proof or checkpoint for JSON."""
+    if isinstance(value, bytes):
+        return value.hex()
+    if isinstance(value, dict):
+        return {key: _hex_fields(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_hex_fields(item) for item in value]
+    return value
+
+
+@app.get("/response/actions")
+async def get_response_actions(fingerprint: Optional[str] = None, action: Optional[str] = None,
+                               target: Optional[str] = None, limit: int = 100):
+    """Audit recorded response action executions, most recent first."""
+    return {
+        "actions": orchestrator.response_engine.ledger.query(fingerprint, action, target, limit)
+    }
+
+
+@app.get("/analytics/threats")
+async def query_threats(group_by: str = "", metrics: str = "count", start: Optional[float] = None,
+                        end: Optional[float] = None, threat_type: Optional[str] = Query(None, alias="type"),
+                        severity: Optional[str] = None, source: Optional[str] = None, status: Optional[str] = None):
+    """
+    Break recorded threats down by type, severity, source, status or time.
+    
+    group_by and metrics are comma-separated, e.g.
+    ?group_by=type,hour&metrics=count,p95:response_ms&severity=high,critical
+    """
+    filters = {"type": threat_type, "severity": severity, "source": source, "status": status}
+    where = {name: value.split(',') for name, value in filters.items() if value}
+    try:
+        return orchestrator.analytics.query_threats(
+            start, end, where,
+            [name for name in group_by.split(',') if name],
+            [metric for metric in metrics.split(',') if metric]
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/analytics/threats/export")
+async def export_threats(format: str = "parquet", start: Optional[float] = None, end: Optional[float] = None,
+                         columns: str = "", since: Optional[int] = None):
+    """
+    Download recorded threats as a Parquet or Arrow IPC (format=arrow) file.
+    
+    The file is streamed one row group at a time. X-ZTSO-Export-Cursor
+    carries the value to pass as ?since= to get only newer threats next time.
+    """
+    try:
+        chunks, cursor = orchestrator.analytics.export_threats(
+            format, start, end, [name for name in columns.split(',') if name] or None, since
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except RuntimeError as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return StreamingResponse(
+        chunks,
+        media_type=wire.ARROW_FILE if format == 'arrow' else wire.PARQUET,
+        headers={
+            "Content-Disposition": f'attachment; filename="threats.{format}"',
+            "X-ZTSO-Export-Cursor": str(cursor)
+        }
     )
+
+
+# Signing and database reads block, so these are sync and run in the threadpool
+@app.get("/audit/checkpoint")
+def get_audit_checkpoint():
+    """Sign and return a checkpoint covering all audit entries."""
+    return _hex_fields(orchestrator.audit_trail.checkpoint())
+
+
+@app.get("/audit/entries/{index}")
+def get_audit_entry(index: int):
+    """
+    Get an audit entry with its inclusion proof against the latest checkpoint.
     
+    Entries older than the in-memory tail are read from the audit database
+    and returned without a proof.
+    """
+    try:
+        entry = orchestrator.audit_trail.entry(index)
+    except IndexError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    try:
+        proof = orchestrator.audit_trail.prove(index)
+    except IndexError:
+        proof = None
+    return _hex_fields({"entry": entry, "proof": proof})
+
+
+def _encryption_response(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Convert an encryption result to a JSON-serializable response."""
     # Convert bytes to hex for JSON serialization
     return {
         "encrypted_data": result["encrypted_data"].hex(),
@@ -152,14 +330,202 @@ async def encrypt_data(request: EncryptionRequest):
     }
 
 
+class EncryptedStreamResponse(StreamingResponse):
+    """
+    Stream frames produced from the request body back to the client.
+    
+    StreamingResponse listens for disconnects on the same receive channel the
+    request body arrives on, so it would swallow body messages. This response
+    sends frames itself and leaves `receive` to the body reader alone.
+    """
+    
+    def __init__(self, frames: AsyncIterator[bytes], headers: Dict[str, str]):
+        super().__init__(frames, headers=headers, media_type=wire.OCTET_STREAM)
+    
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        async for frame in self.body_iterator:
+            await send({"type": "http.response.body", "body": bytes(frame), "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _public_key(value: Optional[str]) -> Optional[bytes]:
+    """Decode a hex-encoded recipient public key."""
+    if not value:
+        return None
+    try:
+        return bytes.fromhex(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="public_key must be hex-encoded")
+
+
+async def _read_body(request: Request, max_bytes: int) -> bytes:
+    """Read a request body, answering 413 as soon as it exceeds max_bytes."""
+    length = request.headers.get('content-length')
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Request body exceeds {max_bytes} bytes")
+    
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Request body exceeds {max_bytes} bytes")
+    return bytes(body)
+
+
+async def _parse_body(request: Request, model, content_type: str, max_bytes: Optional[int] = None):
+    """Decode and validate a JSON, msgpack or CBOR request body."""
+    try:
+        body = await _read_body(request, max_bytes) if max_bytes else await request.body()
+        if content_type == wire.JSON:
+            payload = json.loads(body)
+        else:
+            decode, _ = wire.structured_codec(content_type)
+            payload = decode(body)
+    except wire.UnsupportedMediaType as e:
+        raise HTTPException(status_code=415, detail=str(e))
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Malformed {content_type} body")
+    
+    try:
+        return model.model_validate(payload)
+    except ValidationError as e:
+        raise RequestValidationError(e.errors())
+
+
+@app.post("/crypto/encrypt")
+async def encrypt_data(request: Request, algorithm: Optional[str] = None):
+    """
+    Encrypt data with quantum-safe crypto.
+    
+    A JSON body ({"data": "..."}) gets a JSON response with hex ciphertext,
+    or the raw envelope when the client sends Accept: application/octet-stream.
+    A raw application/octet-stream body is encrypted as it arrives to the
+    hex public key in X-ZTSO-Public-Key and streamed back in the chunked
+    stream format; metadata goes in X-ZTSO-* headers and the algorithm in the
+    query string. JSON bodies may name a recipient in public_key (hex).
+    """
+    content_type = wire.media_type(request.headers.get('content-type'))
+    
+    if content_type == wire.OCTET_STREAM:
+        # Without a caller key the data key would be wrapped to a pooled
+        # keypair whose private half is never returned
+        public_key = _public_key(request.headers.get(wire.PUBLIC_KEY_HEADER))
+        if public_key is None:
+            raise HTTPException(
+                status_code=400, detail=f"Streamed encryption requires the {wire.PUBLIC_KEY_HEADER} header"
+            )
+        try:
+            metadata, stream = orchestrator.crypto_engine.encrypt_pqc_stream(
+                request.stream(), algorithm, public_key
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return EncryptedStreamResponse(stream, headers=wire.metadata_headers(metadata))
+    
+    if content_type != wire.JSON:
+        raise HTTPException(status_code=415, detail=f"Unsupported media type: {content_type}")
+    
+    body = await _parse_body(request, EncryptionRequest, content_type)
+    try:
+        result = await orchestrator.crypto_engine.encrypt_async(
+            body.data.encode('utf-8'),
+            body.algorithm or algorithm,
+            _public_key(body.public_key)
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if wire.accepts(request.headers.get('accept'), wire.OCTET_STREAM):
+        return Response(
+            content=bytes(result["encrypted_data"]),
+            media_type=wire.OCTET_STREAM,
+            headers=wire.metadata_headers({
+                "algorithm": result["algorithm"],
+                "hybrid_mode": result["hybrid_mode"],
+                "format": "envelope",
+                "key_size": result["metadata"]["key_size"]
+            })
+        )
+    
+    return _encryption_response(result)
+
+
+@app.post("/crypto/encrypt/batch")
+async def encrypt_batch(request: Request):
+    """
+    Encrypt many payloads concurrently with quantum-safe crypto.
+    
+    JSON batches carry UTF-8 strings and return hex ciphertext. msgpack
+    (application/msgpack) and CBOR (application/cbor) batches carry raw bytes
+    both ways and are answered in the same encoding. Batches over
+    crypto_batch_max_items items or crypto_batch_max_bytes bytes get 413.
+    """
+    engine = orchestrator.crypto_engine
+    content_type = wire.media_type(request.headers.get('content-type'))
+    model = BatchEncryptionRequest if content_type == wire.JSON else BinaryBatchEncryptionRequest
+    body = await _parse_body(request, model, content_type, engine.batch_max_bytes)
+    
+    if model is BinaryBatchEncryptionRequest:
+        items, public_key = body.items, body.public_key
+    else:
+        items, public_key = [item.encode('utf-8') for item in body.items], _public_key(body.public_key)
+    if len(items) > engine.batch_max_items:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {engine.batch_max_items} items")
+    if sum(len(item) for item in items) > engine.batch_max_bytes:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {engine.batch_max_bytes} bytes")
+    
+    try:
+        results = await engine.encrypt_many(items, body.algorithm, public_key)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    if content_type == wire.JSON:
+        return {"results": [_encryption_response(result) for result in results]}
+    
+    _, encode = wire.structured_codec(content_type)
+    return Response(
+        content=encode({"results": [
+            {
+                "encrypted_data": bytes(result["encrypted_data"]),
+                "algorithm": result["algorithm"],
+                "hybrid_mode": result["hybrid_mode"],
+                "metadata": result["metadata"]
+            }
+            for result in results
+        ]}),
+        media_type=content_type
+    )
+
+
 @app.get("/metrics")
-async def get_metrics():
-    """Get security metrics."""
+async def get_metrics(request: Request):
+    """
+    Get security metrics.
+    
+    Scrapers asking for text/plain or OpenMetrics without JSON get the
+    Prometheus text format, including per-stage latency histograms.
+    """
+    accept = request.headers.get('accept')
+    if (any(wire.accepts(accept, candidate) for candidate in PROMETHEUS_MEDIA_TYPES)
+            and not wire.accepts(accept, wire.JSON)):
+        body, content_type = orchestrator.telemetry.render()
+        return Response(content=body, media_type=content_type)
     return {
         "threats_detected": orchestrator.threat_detector.get_threat_count(),
         "policies_enforced": orchestrator.policy_engine.get_policy_count(),
         "incidents_responded": orchestrator.response_engine.get_incident_count(),
-        "security_score": orchestrator.analytics.calculate_security_score()
+        "security_score": orchestrator.analytics.calculate_security_score(),
+        "keypair_pool": orchestrator.crypto_engine.get_keypair_pool_stats(),
+        "data_keys": orchestrator.crypto_engine.get_data_key_stats(),
+        "audit": orchestrator.audit_trail.get_stats(),
+        "response_scheduler": orchestrator.scheduler.get_stats(),
+        "enforcement": orchestrator.enforcer.get_stats(),
+        "latency": orchestrator.analytics.get_latency_stats(),
+        "views": {
+            "dashboard": orchestrator.dashboard.get_stats(),
+            "posture": orchestrator.analytics.posture.get_stats()
+        }
     }
 
 
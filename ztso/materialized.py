@@ -0,0 +1,143 @@
+"""
+Materialized Views
+"""
+
+import json
+import logging
+import time
+from typing import Dict, Any, Callable, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class ViewSnapshot:
+    """One built version of a view: the document, its JSON encoding and ETag."""
+    
+    __slots__ = ('document', 'body', 'etag', 'version', 'key', 'built_at')
+    
+    def __init__(self, document: Dict[str, Any], body: bytes, etag: str, version: int, key: Hashable):
+        self.document = document
+        self.body = body
+        self.etag = etag
+        self.version = version
+        # Fingerprint of the inputs the document was last built or confirmed from
+        self.key = key
+        self.built_at = time.monotonic()
+
+
+def _opaque_tag(etag: str) -> str:
+    return etag.strip().removeprefix('W/')
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches an ETag (weak comparison)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return _opaque_tag(etag) in {_opaque_tag(tag) for tag in if_none_match.split(',')}
+
+
+class MaterializedView:
+    """
+    A document rebuilt only when its inputs change, kept ready to serve.
+    
+    `key` returns a cheap fingerprint of the inputs, such as change counters
+    and the current minute for time-windowed figures. Every read compares it
+    to the key of the stored snapshot and rebuilds on a mismatch, at most
+    once per `refresh_interval` seconds however many readers poll; otherwise
+    it returns the stored document and its pre-encoded JSON. The version,
+    and the ETag with it, only moves when a rebuild produces a different
+    document. A snapshot whose key no longer matches may still be served
+    until the next rebuild is allowed, but is never confirmed with 304.
+    """
+    
+    def __init__(self, name: str, build: Callable[[], Dict[str, Any]], key: Callable[[], Hashable],
+                 refresh_interval: float = 1.0):
+        """
+        Initialize view.
+        
+        Args:
+            name: View name, used in the ETag
+            build: Produces the document from current state
+            key: Fingerprint of the state the document depends on
+            refresh_interval: Minimum seconds between rebuilds
+        """
+        self.name = name
+        self.build = build
+        self.key = key
+        self.refresh_interval = refresh_interval
+        
+        self._snapshot: Optional[ViewSnapshot] = None
+        # Keeps ETags from before a restart from matching new versions
+        self._epoch = f"{time.time_ns() // 1000:x}"
+        
+        self.stats = {
+            'reads': 0,
+            'builds': 0,
+            'versions': 0,
+            'stale': 0,
+            'not_modified': 0
+        }
+    
+    def _refresh(self) -> Tuple[ViewSnapshot, bool]:
+        """Current snapshot, rebuilt first if its inputs changed, and whether it is up to date."""
+        self.stats['reads'] += 1
+        snapshot = self._snapshot
+        key = self.key()
+        if snapshot is not None and key == snapshot.key:
+            return snapshot, True
+        if snapshot is not None and time.monotonic() - snapshot.built_at < self.refresh_interval:
+            self.stats['stale'] += 1
+            return snapshot, False
+        
+        document = self.build()
+        self.stats['builds'] += 1
+        if snapshot is not None and document == snapshot.document:
+            snapshot.key = key
+            snapshot.built_at = time.monotonic()
+            return snapshot, True
+        version = snapshot.version + 1 if snapshot is not None else 1
+        body = json.dumps(document, separators=(',', ':'), default=str).encode()
+        self._snapshot = ViewSnapshot(document, body, f'W/"{self.name}-{self._epoch}-{version}"', version, key)
+        self.stats['versions'] += 1
+        return self._snapshot, True
+    
+    def snapshot(self) -> ViewSnapshot:
+        """Current snapshot, rebuilt first if its inputs changed."""
+        return self._refresh()[0]
+    
+    def get(self) -> Dict[str, Any]:
+        """Current document; shared between readers, so treat it as read-only."""
+        return self.snapshot().document
+    
+    def revalidate(self, if_none_match: Optional[str]) -> Tuple[ViewSnapshot, bool]:
+        """
+        Current snapshot and whether the client's copy is still current.
+        
+        A snapshot built from older inputs than the current ones never
+        matches, even while the refresh interval holds back its rebuild.
+        
+        Args:
+            if_none_match: The request's If-None-Match header
+        
+        Returns:
+            The snapshot, and True if the client should get 304 Not Modified
+        """
+        snapshot, current = self._refresh()
+        not_modified = current and etag_matches(if_none_match, snapshot.etag)
+        if not_modified:
+            self.stats['not_modified'] += 1
+        return snapshot, not_modified
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get view statistics.
+        
+        Returns:
+            Current version, read, build and 304 counts
+        """
+        return {
+            "version": self._snapshot.version if self._snapshot else 0,
+            **self.stats
+        }
@@ -4,6 +4,7 @@ Security Orchestrator - Main coordination engine
 
 import asyncio
 import logging
+import time
 from typing import Dict, Any, Optional
 from datetime import datetime
 
@@ -12,6 +13,11 @@ from .zerotrust import PolicyEngine
 from .crypto import QuantumSafeCrypto
 from .response import AutomatedResponse
 from .analytics import SecurityAnalytics
+from .audit import AuditTrail
+from .scheduler import ResponseScheduler
+from .enforcement import Enforcer
+from .materialized import MaterializedView
+from .telemetry import Telemetry
 
 logger = logging.getLogger(__name__)
 
@@ -33,13 +39,86 @@ class SecurityOrchestrator:
         self.policy_engine = PolicyEngine(self.config)
         self.crypto_engine = QuantumSafeCrypto(self.config)
         self.response_engine = AutomatedResponse(self.config)
+        self.enforcer = Enforcer(self.config)
+        for name, action in self.enforcer.actions().items():
+            self.response_engine.register_action(name, action)
         self.analytics = SecurityAnalytics(self.config)
+        self.audit_trail = AuditTrail(self.config, self.crypto_engine)
+        # Coalesced first, so only new incidents are queued for a worker
+        self.scheduler = ResponseScheduler(self.response_engine.run_incident, self.config)
+        self.response_engine.set_dispatcher(self.scheduler.submit)
         
         self.is_running = False
         self.start_time = None
         
+        # Rebuilt when a counter it shows changes or the score's window moves
+        self.dashboard = MaterializedView(
+            'dashboard',
+            self._build_dashboard,
+            lambda: (self.is_running, self.analytics.version, self.threat_detector.get_threat_count(),
+                     self.policy_engine.get_policy_count(), self.response_engine.get_incident_count(),
+                     int(time.time() // 60)),
+            self.config.get('posture_refresh_interval', 1.0)
+        )
+        
+        self.telemetry = Telemetry(self.config)
+        self._register_metrics()
+        
         logger.info("Security Orchestrator initialized")
     
+    def _register_metrics(self):
+        """Export component counters, queue depths and cache hit ratios to Prometheus."""
+        telemetry = self.telemetry
+        telemetry.counter('ztso_threats_detected', 'Threats detected', self.threat_detector.get_threat_count)
+        telemetry.counter('ztso_incidents', 'Incidents responded to', self.response_engine.get_incident_count)
+        telemetry.counter('ztso_threats_recorded', 'Threats recorded by analytics', lambda: self.analytics.version)
+        telemetry.counter(
+            'ztso_scheduled_responses', 'Responses by scheduler outcome',
+            lambda: {(severity, outcome): count
+                     for severity, counters in self.scheduler.counters.items()
+                     for outcome, count in counters.items()},
+            ['severity', 'outcome']
+        )
+        telemetry.counter(
+            'ztso_cache_lookups', 'Cache lookups by result',
+            lambda: {(cache, result): count for cache, (hits, misses) in self._cache_lookups().items()
+                     for result, count in (('hit', hits), ('miss', misses))},
+            ['cache', 'result']
+        )
+        telemetry.gauge(
+            'ztso_cache_hit_ratio', 'Hits over lookups since start',
+            lambda: {cache: hits / (hits + misses) if hits + misses else 0.0
+                     for cache, (hits, misses) in self._cache_lookups().items()},
+            ['cache'], multiprocess_mode='liveall'
+        )
+        telemetry.gauge('ztso_queue_depth', 'Items waiting in internal queues', self._queue_depths, ['queue'])
+    
+    def _cache_lookups(self) -> Dict[str, Any]:
+        """(hits, misses) for each cache."""
+        data_keys = self.crypto_engine.data_keys.stats
+        pools = self.crypto_engine.get_keypair_pool_stats().values()
+        signatures = self.crypto_engine.signatures.stats
+        ledger = self.response_engine.ledger.stats
+        lookups = {
+            "data_key": (data_keys['hits'], data_keys['misses']),
+            "data_key_unwrap": (data_keys['unwrap_hits'], data_keys['unwrap_misses']),
+            "keypair_pool": (sum(pool['hits'] for pool in pools), sum(pool['stalls'] for pool in pools)),
+            "signature_verify": (signatures['cache_hits'], signatures['verified']),
+            "response_action": (ledger['replayed'] + ledger['joined'], ledger['executed'] + ledger['failed'])
+        }
+        for view in (self.dashboard, self.analytics.posture):
+            lookups[f"{view.name}_view"] = (view.stats['reads'] - view.stats['builds'], view.stats['builds'])
+        return lookups
+    
+    def _queue_depths(self) -> Dict[str, int]:
+        """Items waiting in each internal queue."""
+        severities = self.scheduler.get_stats()['severities']
+        depths = {f"response_{severity}": stats['queued'] for severity, stats in severities.items()}
+        depths["enforcement"] = self.enforcer.get_stats()['pending_requests']
+        depths["audit_unsigned"] = self.audit_trail.pending
+        depths["open_incidents"] = self.response_engine.coalescer.get_stats()['open_groups']
+        return depths
+    
     async def start(self):
         """Start all security components."""
         logger.info("Starting Security Orchestrator...")
@@ -52,8 +131,11 @@ class SecurityOrchestrator:
             self.threat_detector.start(),
             self.policy_engine.start(),
             self.response_engine.start(),
-            self.analytics.start()
+            self.analytics.start(),
+            self.audit_trail.start()
         )
+        await self.scheduler.start()
+        await self.telemetry.start()
         
         logger.info("Security Orchestrator started successfully")
     
@@ -63,12 +145,19 @@ class SecurityOrchestrator:
         
         self.is_running = False
         
+        # Stop taking new responses before the engines go away
+        await self.scheduler.stop()
         await asyncio.gather(
             self.threat_detector.stop(),
             self.policy_engine.stop(),
             self.response_engine.stop(),
-            self.analytics.stop()
+            self.analytics.stop(),
+            self.audit_trail.stop()
         )
+        await self.enforcer.stop()
+        await self.telemetry.stop()
+        
+        self.crypto_engine.close()
         
         logger.info("Security Orchestrator stopped")
     
@@ -86,12 +175,18 @@ class SecurityOrchestrator:
         """
         Get current security dashboard data.
         
+        Served from the materialized view; see `dashboard` for its ETag.
+        
         Returns:
             Dashboard data dictionary
         """
+        return self.dashboard.get()
+    
+    def _build_dashboard(self) -> Dict[str, Any]:
+        """Collect dashboard figures from the components."""
         return {
             "status": "running" if self.is_running else "stopped",
-            "uptime": (datetime.utcnow() - self.start_time).total_seconds() if self.start_time else 0,
+            "started_at": self.start_time.isoformat() if self.start_time else None,
             "threats_detected": self.threat_detector.get_threat_count(),
             "policies_enforced": self.policy_engine.get_policy_count(),
             "incidents_responded": self.response_engine.get_incident_count(),
@@ -106,16 +201,22 @@ class SecurityOrchestrator:
         Args:
             threat_data: Threat information
         """
+        detected_at = time.time()
         logger.warning(f"Threat detected: {threat_data.get('type')}")
         
         # Analyze threat severity
         severity = self.analytics.assess_threat_severity(threat_data)
         
-        # Execute automated response
-        response = await self.response_engine.respond(threat_data, severity)
-        
-        # Update analytics
-        self.analytics.record_threat(threat_data, response)
+        # Execute automated response, most severe threats first
+        response = None
+        try:
+            response = await self.response_engine.respond(threat_data, severity)
+        finally:
+            # Update analytics, also for threats the scheduler refused or shed
+            if response is None:
+                self.analytics.record_threat(threat_data, {"severity": severity, "status": "not_run"}, detected_at)
+            else:
+                self.analytics.record_threat(threat_data, response, detected_at, time.time())
         
         return response
     
@@ -0,0 +1,331 @@
+"""
+Response Playbooks as Action Graphs
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Awaitable, Callable, Iterable, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+# An action receives the incident context and returns a description of what it did
+Action = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+TIMED_OUT = 'timed_out'
+SKIPPED = 'skipped'
+CANCELLED = 'cancelled'
+COMPENSATED = 'compensated'
+
+
+class Step:
+    """One action in a playbook and how to run it."""
+    
+    __slots__ = ('name', 'action', 'depends_on', 'timeout', 'retries', 'backoff', 'compensate', 'critical')
+    
+    def __init__(self, name: str, action: Action, depends_on: Sequence[str] = (),
+                 timeout: float = 5.0, retries: int = 0, backoff: float = 0.05,
+                 compensate: Optional[Action] = None, critical: bool = True):
+        """
+        Define a playbook step.
+        
+        Args:
+            name: Step name, unique within the playbook
+            action: Async callable run with the incident context
+            depends_on: Steps that must succeed first
+            timeout: Seconds allowed per attempt
+            retries: Extra attempts after a failure or timeout
+            backoff: Delay before the first retry, doubled for each further one
+            compensate: Undoes the action if containment fails later
+            critical: Containment step; respond() waits for these only
+        """
+        self.name = name
+        self.action = action
+        self.depends_on = tuple(depends_on)
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.compensate = compensate
+        self.critical = critical
+
+
+class Playbook:
+    """
+    A validated graph of steps.
+    
+    Dependencies are checked and ordered once, when the playbook is built.
+    """
+    
+    def __init__(self, name: str, steps: Iterable[Step]):
+        """
+        Build a playbook.
+        
+        Args:
+            name: Playbook name
+            steps: Steps in any order
+        """
+        self.name = name
+        self.steps: Dict[str, Step] = {}
+        for step in steps:
+            if step.name in self.steps:
+                raise ValueError(f"Playbook {name}: duplicate step {step.name}")
+            self.steps[step.name] = step
+        
+        self.dependents: Dict[str, List[str]] = {step: [] for step in self.steps}
+        for step in self.steps.values():
+            for dependency in step.depends_on:
+                if dependency not in self.steps:
+                    raise ValueError(f"Playbook {name}: {step.name} depends on unknown step {dependency}")
+                if step.critical and not self.steps[dependency].critical:
+                    # Containment must never wait on background work
+                    raise ValueError(f"Playbook {name}: critical step {step.name} depends on "
+                                     f"non-critical step {dependency}")
+                self.dependents[dependency].append(step.name)
+        
+        self.order = self._topological_order()
+        self.roots = [step for step in self.order if not self.steps[step].depends_on]
+    
+    def _topological_order(self) -> List[str]:
+        """Order steps so each follows its dependencies, otherwise as declared; rejects cycles."""
+        remaining = {name: len(step.depends_on) for name, step in self.steps.items()}
+        ready = deque(name for name, count in remaining.items() if count == 0)
+        order = []
+        while ready:
+            name = ready.popleft()
+            order.append(name)
+            for dependent in self.dependents[name]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    ready.append(dependent)
+        if len(order) != len(self.steps):
+            cyclic = sorted(set(self.steps) - set(order))
+            raise ValueError(f"Playbook {self.name}: dependency cycle among {', '.join(cyclic)}")
+        return order
+
+
+class PlaybookRun:
+    """
+    One execution of a playbook for an incident.
+    
+    Steps start as soon as their dependencies succeed, so independent steps
+    run concurrently. When a critical step fails after its retries, the
+    other critical steps are cancelled or skipped and completed ones are
+    compensated in reverse order. `contained` is set once every critical
+    step has settled; non-critical steps may still be running.
+    """
+    
+    def __init__(self, playbook: Playbook, context: Dict[str, Any], ledger=None):
+        """
+        Prepare a run.
+        
+        Args:
+            playbook: Playbook to execute
+            context: Incident context passed to every action
+            ledger: ActionLedger that skips actions already run for the same
+                intent; needs `fingerprint` and `target` in the context
+        """
+        self.playbook = playbook
+        self.context = context
+        self.ledger = ledger
+        self.contained = asyncio.Event()
+        self.containment_failed = False
+        self.outcomes: Dict[str, Dict[str, Any]] = {}
+        self.critical_path: List[str] = []
+        self.containment_ms = 0.0
+        self.total_ms = 0.0
+        
+        self._started = 0.0
+        self._finished_at: Dict[str, float] = {}
+        self._completed: List[str] = []
+        self._critical_left = sum(1 for step in playbook.steps.values() if step.critical)
+        self.task: Optional[asyncio.Task] = None
+    
+    def start(self) -> asyncio.Task:
+        """Start executing in the background."""
+        self.task = asyncio.create_task(self._execute())
+        return self.task
+    
+    def _elapsed_ms(self) -> float:
+        return (time.perf_counter() - self._started) * 1000
+    
+    async def _execute(self):
+        """Schedule steps as their dependencies complete."""
+        playbook = self.playbook
+        self._started = time.perf_counter()
+        waiting = {name: len(step.depends_on) for name, step in playbook.steps.items()}
+        running: Dict[asyncio.Task, str] = {}
+        
+        def launch(name: str):
+            running[asyncio.create_task(self._run_step(playbook.steps[name]))] = name
+        
+        for name in playbook.roots:
+            launch(name)
+        if not self._critical_left:
+            self._settle_containment()
+        
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    name = running.pop(task)
+                    step = playbook.steps[name]
+                    self._finished_at[name] = self._elapsed_ms()
+                    
+                    if self.outcomes[name]['status'] == SUCCEEDED:
+                        self._completed.append(name)
+                        if step.critical and self.containment_failed:
+                            # Finished alongside the failure that aborted containment
+                            await self._compensate(name)
+                        for dependent in playbook.dependents[name]:
+                            waiting[dependent] -= 1
+                            if waiting[dependent] == 0 and dependent not in self.outcomes:
+                                launch(dependent)
+                    else:
+                        self._skip_dependents(name)
+                        if step.critical and not self.containment_failed:
+                            self.containment_failed = True
+                            await self._abort_containment(running)
+                    
+                    if step.critical:
+                        self._critical_left -= 1
+                        if self._critical_left == 0:
+                            self._settle_containment()
+        except asyncio.CancelledError:
+            for task in running:
+                task.cancel()
+            raise
+        finally:
+            self.total_ms = self._elapsed_ms()
+            if not self.contained.is_set():
+                self._settle_containment()
+    
+    async def _run_step(self, step: Step):
+        """Run one step with its timeout and retries; records the outcome."""
+        outcome = self.outcomes[step.name] = {
+            "status": FAILED,
+            "critical": step.critical,
+            "attempts": 0,
+            "started_ms": self._elapsed_ms()
+        }
+        delay = step.backoff
+        
+        for attempt in range(step.retries + 1):
+            outcome['attempts'] = attempt + 1
+            try:
+                if self.ledger is None:
+                    outcome['result'] = await asyncio.wait_for(step.action(self.context), step.timeout)
+                else:
+                    outcome['result'], outcome['replayed'] = await self.ledger.run(
+                        self.context['fingerprint'], step.name, self.context['target'],
+                        self.context.get('incident_id'),
+                        lambda: asyncio.wait_for(step.action(self.context), step.timeout)
+                    )
+                outcome['status'] = SUCCEEDED
+                outcome.pop('error', None)
+                break
+            except asyncio.TimeoutError:
+                outcome['status'] = TIMED_OUT
+                outcome['error'] = f"timed out after {step.timeout}s"
+            except asyncio.CancelledError:
+                outcome['status'] = CANCELLED
+                raise
+            except Exception as e:
+                outcome['status'] = FAILED
+                outcome['error'] = str(e)
+            
+            if attempt < step.retries:
+                await asyncio.sleep(delay)
+                delay *= 2
+        
+        outcome['duration_ms'] = self._elapsed_ms() - outcome['started_ms']
+        if outcome['status'] != SUCCEEDED:
+            logger.warning(f"Playbook {self.playbook.name}: step {step.name} {outcome['status']} "
+                           f"after {outcome['attempts']} attempt(s): {outcome.get('error')}")
+    
+    def _skip_dependents(self, name: str):
+        """Mark every step downstream of a failed one as skipped."""
+        pending = list(self.playbook.dependents[name])
+        while pending:
+            dependent = pending.pop()
+            if dependent in self.outcomes:
+                continue
+            self.outcomes[dependent] = {"status": SKIPPED, "critical": self.playbook.steps[dependent].critical,
+                                        "attempts": 0}
+            if self.playbook.steps[dependent].critical:
+                self._critical_left -= 1
+            pending.extend(self.playbook.dependents[dependent])
+    
+    async def _abort_containment(self, running: Dict[asyncio.Task, str]):
+        """Stop the remaining critical steps and undo the completed ones."""
+        steps = self.playbook.steps
+        
+        # Tasks that already finished are settled by the caller
+        cancelled = [task for task, name in running.items() if steps[name].critical and not task.done()]
+        for task in cancelled:
+            task.cancel()
+        if cancelled:
+            await asyncio.gather(*cancelled, return_exceptions=True)
+        for task in cancelled:
+            name = running.pop(task)
+            # A task cancelled before it first ran has no outcome yet
+            outcome = self.outcomes.setdefault(name, {"critical": True, "attempts": 0})
+            outcome['status'] = CANCELLED
+            self._finished_at[name] = self._elapsed_ms()
+            self._critical_left -= 1
+        
+        for name in steps:
+            if steps[name].critical and name not in self.outcomes:
+                self.outcomes[name] = {"status": SKIPPED, "critical": True, "attempts": 0}
+                self._critical_left -= 1
+        
+        for name in reversed(self._completed):
+            if steps[name].critical:
+                await self._compensate(name)
+    
+    async def _compensate(self, name: str):
+        """Undo a completed step, if it defines how."""
+        step = self.playbook.steps[name]
+        if step.compensate is None:
+            return
+        try:
+            await asyncio.wait_for(step.compensate(self.context), step.timeout)
+            self.outcomes[name]['status'] = COMPENSATED
+            if self.ledger is not None:
+                # Undone, so a replay of the incident must run it again
+                self.ledger.forget(self.context['fingerprint'], name, self.context['target'])
+        except Exception as e:
+            self.outcomes[name]['compensation_error'] = str(e) or type(e).__name__
+            logger.error(f"Playbook {self.playbook.name}: compensating {name} failed: {e}")
+    
+    def _settle_containment(self):
+        """Record time-to-contain and the critical path, then release waiters."""
+        self.containment_ms = self._elapsed_ms()
+        self.critical_path = self._trace_critical_path()
+        self.contained.set()
+    
+    def _trace_critical_path(self) -> List[str]:
+        """Walk back from the last critical step through the dependency that gated each start."""
+        steps = self.playbook.steps
+        finished = {name: at for name, at in self._finished_at.items() if steps[name].critical}
+        if not finished:
+            return []
+        name = max(finished, key=finished.get)
+        path = [name]
+        while steps[name].depends_on:
+            name = max(steps[name].depends_on, key=lambda d: finished.get(d, 0.0))
+            path.append(name)
+        return path[::-1]
+    
+    def summary(self) -> Dict[str, Any]:
+        """Outcome of the run so far."""
+        return {
+            "playbook": self.playbook.name,
+            "contained": not self.containment_failed,
+            "containment_ms": round(self.containment_ms, 3),
+            "critical_path": self.critical_path,
+            "steps": {name: dict(outcome) for name, outcome in self.outcomes.items()}
+        }
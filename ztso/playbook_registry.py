@@ -0,0 +1,302 @@
+"""
+Declarative Playbook Registry
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import yaml
+
+from .analytics import SEVERITY_LEVELS
+from .playbook import Action, Playbook, Step
+
+logger = logging.getLogger(__name__)
+
+try:
+    YAML_LOADER = yaml.CSafeLoader
+except AttributeError:
+    YAML_LOADER = yaml.SafeLoader
+
+
+DEFAULT_PLAYBOOK_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                    'config', 'playbooks')
+PLAYBOOK_FIELDS = {'name', 'threat_types', 'severities', 'steps'}
+STEP_FIELDS = {'action', 'name', 'depends_on', 'timeout', 'retries', 'backoff', 'compensate', 'critical'}
+# Threat type whose playbooks handle anything without a playbook of its own
+FALLBACK = 'default'
+
+
+class PlaybookFile:
+    """Playbooks compiled from one YAML file, and the file state they came from."""
+    
+    __slots__ = ('stamp', 'playbooks')
+    
+    def __init__(self, stamp: Tuple[int, int], playbooks: List[Tuple[Playbook, List[str], Optional[List[str]]]]):
+        self.stamp = stamp
+        self.playbooks = playbooks
+
+
+class PlaybookRegistry:
+    """
+    Playbooks loaded from YAML files in a watched directory.
+    
+    Each file holds one or more YAML documents, each defining a playbook:
+        
+        name: block_scanner
+        threat_types: [network_anomaly]
+        severities: [high, critical]   # optional, all severities if omitted
+        steps:
+          - action: block_traffic
+            compensate: unblock_traffic
+          - action: log_incident
+            critical: false
+    
+    Files are parsed, validated and compiled into Playbook objects once,
+    and again only when their modification time or size changes. The
+    compiled playbooks are indexed by (threat type, severity) and the index
+    is replaced as a whole on reload, so selection is a dictionary lookup
+    and runs already in flight keep the playbook they started with. A file
+    that fails to load keeps its previous playbooks until it is fixed.
+    """
+    
+    def __init__(self, actions: Dict[str, Action], config: Dict[str, Any]):
+        """
+        Initialize registry.
+        
+        Args:
+            actions: Action implementations referenced by name from playbooks
+            config: Configuration dictionary
+        """
+        self.actions = actions
+        self.directory = config.get('playbook_dir', DEFAULT_PLAYBOOK_DIR)
+        self.reload_interval = config.get('playbook_reload_interval', 2.0)
+        self.step_timeout = config.get('response_step_timeout', 5.0)
+        self.step_retries = config.get('response_step_retries', 1)
+        
+        self.index: Dict[Tuple[str, str], Playbook] = {}
+        self.playbooks: Dict[str, Playbook] = {}
+        self.errors: Dict[str, str] = {}
+        
+        self._files: Dict[str, PlaybookFile] = {}
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        
+        self.stats = {
+            'reloads': 0,
+            'files_compiled': 0,
+            'failed_reloads': 0,
+            'last_reload_ms': 0.0
+        }
+    
+    @property
+    def loaded(self) -> bool:
+        return bool(self.index)
+    
+    async def start(self):
+        """Start watching the playbook directory."""
+        if self.reload_interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._watch())
+    
+    async def stop(self):
+        """Stop watching."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+    
+    async def _watch(self):
+        """Poll file modification times and reload on change."""
+        while True:
+            await asyncio.sleep(self.reload_interval)
+            try:
+                await asyncio.to_thread(self.reload)
+            except Exception as e:
+                logger.error(f"Playbook reload failed, keeping current playbooks: {e}")
+    
+    def select(self, threat_type: str, severity: str) -> Playbook:
+        """
+        Playbook for a threat.
+        
+        Args:
+            threat_type: Threat type
+            severity: Threat severity level
+        
+        Returns:
+            The playbook for the type and severity, else the fallback playbook
+        """
+        index = self.index
+        return index.get((threat_type, severity)) or index[(FALLBACK, severity)]
+    
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """Modification time and size of every playbook file."""
+        stamps = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if entry.name.endswith(('.yaml', '.yml')) and entry.is_file():
+                    stat = entry.stat()
+                    stamps[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+    
+    def reload(self, force: bool = False) -> bool:
+        """
+        Recompile changed files and rebuild the index.
+        
+        Args:
+            force: Recompile every file, e.g. after actions were registered
+        
+        Returns:
+            Whether the index changed
+        
+        Raises:
+            ValueError: The resulting playbook set is inconsistent; the
+                current index is kept
+        """
+        with self._lock:
+            started = time.perf_counter()
+            stamps = self._scan()
+            files = {} if force else dict(self._files)
+            if force:
+                self.errors.clear()
+            changed = set(files) - set(stamps)
+            for path in changed:
+                del files[path]
+                self.errors.pop(path, None)
+            
+            for path, stamp in stamps.items():
+                current = files.get(path)
+                if current is not None and current.stamp == stamp:
+                    continue
+                changed.add(path)
+                try:
+                    files[path] = PlaybookFile(stamp, self._compile_file(path))
+                    self.errors.pop(path, None)
+                    self.stats['files_compiled'] += 1
+                except (OSError, yaml.YAMLError, ValueError, TypeError) as e:
+                    # Keep what the file defined before it broke
+                    self.errors[path] = str(e)
+                    logger.error(f"Playbook file {path} not loaded: {e}")
+                    if current is not None:
+                        files[path] = PlaybookFile(stamp, current.playbooks)
+            
+            if not changed and self.index:
+                return False
+            
+            try:
+                index, playbooks = self._build_index(files)
+            except ValueError:
+                self.stats['failed_reloads'] += 1
+                raise
+            self._files = files
+            self.index, self.playbooks = index, playbooks
+            self.stats['reloads'] += 1
+            self.stats['last_reload_ms'] = round((time.perf_counter() - started) * 1000, 3)
+            logger.info(f"Loaded {len(playbooks)} playbooks from {len(files)} files "
+                        f"in {self.stats['last_reload_ms']} ms")
+            return True
+    
+    def _compile_file(self, path: str) -> List[Tuple[Playbook, List[str], Optional[List[str]]]]:
+        """Parse and compile every playbook in a file."""
+        with open(path, 'rb') as f:
+            documents = [document for document in yaml.load_all(f, Loader=YAML_LOADER) if document is not None]
+        return [self._compile(document, path) for document in documents]
+    
+    def _compile(self, spec: Any, path: str) -> Tuple[Playbook, List[str], Optional[List[str]]]:
+        """Validate one playbook definition and build its steps."""
+        if not isinstance(spec, dict):
+            raise ValueError(f"{path}: playbook must be a mapping")
+        unknown = set(spec) - PLAYBOOK_FIELDS
+        if unknown:
+            raise ValueError(f"{path}: unknown playbook fields {sorted(unknown)}")
+        name = spec.get('name')
+        threat_types = spec.get('threat_types')
+        if not isinstance(name, str) or not name:
+            raise ValueError(f"{path}: playbook needs a name")
+        if not isinstance(threat_types, list) or not threat_types:
+            raise ValueError(f"{path}: playbook {name} needs a list of threat_types")
+        severities = spec.get('severities')
+        if severities is not None and (not isinstance(severities, list)
+                                       or not set(severities) <= set(SEVERITY_LEVELS)):
+            raise ValueError(f"{path}: playbook {name} severities must be a list of {', '.join(SEVERITY_LEVELS)}")
+        if not isinstance(spec.get('steps'), list) or not spec['steps']:
+            raise ValueError(f"{path}: playbook {name} needs steps")
+        
+        steps = []
+        for entry in spec['steps']:
+            if not isinstance(entry, dict) or 'action' not in entry:
+                raise ValueError(f"{path}: playbook {name} steps need an action")
+            unknown = set(entry) - STEP_FIELDS
+            if unknown:
+                raise ValueError(f"{path}: playbook {name} step {entry['action']} has unknown fields {sorted(unknown)}")
+            for field in ('action', 'compensate'):
+                if entry.get(field) is not None and entry[field] not in self.actions:
+                    raise ValueError(f"{path}: playbook {name} references unknown action {entry[field]}")
+            compensate = entry.get('compensate')
+            steps.append(Step(
+                entry.get('name', entry['action']),
+                self.actions[entry['action']],
+                depends_on=entry.get('depends_on', ()),
+                timeout=entry.get('timeout', self.step_timeout),
+                retries=entry.get('retries', self.step_retries),
+                backoff=entry.get('backoff', 0.05),
+                compensate=self.actions[compensate] if compensate else None,
+                critical=entry.get('critical', True)
+            ))
+        try:
+            playbook = Playbook(name, steps)
+        except ValueError as e:
+            raise ValueError(f"{path}: {e}")
+        return playbook, threat_types, severities
+    
+    def _build_index(self, files: Dict[str, PlaybookFile]) -> Tuple[Dict[Tuple[str, str], Playbook],
+                                                                    Dict[str, Playbook]]:
+        """
+        Map (threat type, severity) to playbooks.
+        
+        Playbooks that list severities take precedence over ones that do
+        not; two playbooks claiming the same slot at the same precedence
+        are an error.
+        """
+        general: Dict[Tuple[str, str], Playbook] = {}
+        specific: Dict[Tuple[str, str], Playbook] = {}
+        playbooks: Dict[str, Playbook] = {}
+        for path in sorted(files):
+            for playbook, threat_types, severities in files[path].playbooks:
+                if playbook.name in playbooks:
+                    raise ValueError(f"Duplicate playbook name {playbook.name} in {path}")
+                playbooks[playbook.name] = playbook
+                slots = general if severities is None else specific
+                for threat_type in threat_types:
+                    for severity in severities or SEVERITY_LEVELS:
+                        other = slots.get((threat_type, severity))
+                        if other is not None:
+                            raise ValueError(f"Playbooks {other.name} and {playbook.name} both handle "
+                                             f"{threat_type} at {severity}")
+                        slots[(threat_type, severity)] = playbook
+        
+        index = {**general, **specific}
+        missing = [severity for severity in SEVERITY_LEVELS if (FALLBACK, severity) not in index]
+        if missing:
+            raise ValueError(f"No {FALLBACK} playbook for severities {', '.join(missing)}")
+        return index, playbooks
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get registry statistics.
+        
+        Returns:
+            Playbook and file counts, reload counters and files failing to load
+        """
+        return {
+            "directory": self.directory,
+            "playbooks": len(self.playbooks),
+            "files": len(self._files),
+            "errors": dict(self.errors),
+            **self.stats
+        }
@@ -3,13 +3,60 @@ Automated Incident Response Engine
 """
 
 import logging
-from typing import Dict, Any, List
+from collections import deque
+from typing import Dict, Any, Awaitable, Callable
 from datetime import datetime
 import asyncio
 
+from .coalesce import IncidentCoalescer
+from .idempotency import ActionLedger
+from .playbook import Action, PlaybookRun, SKIPPED, SUCCEEDED
+from .playbook_registry import PlaybookRegistry
+from .telemetry import stage
+
 logger = logging.getLogger(__name__)
 
 
+RESPONSE_STAGE = stage('response')
+
+
+# Built-in actions and what they report when done
+ACTION_DESCRIPTIONS = {
+    'isolate_host': "Isolated affected system",
+    'release_host': "Released host isolation",
+    'terminate_process': "Terminated malicious process",
+    'quarantine_sample': "Quarantined malware sample",
+    'full_scan': "Initiated full system scan",
+    'block_traffic': "Blocked suspicious traffic",
+    'unblock_traffic': "Removed traffic block",
+    'apply_firewall_rules': "Applied firewall rules",
+    'increase_monitoring': "Increased monitoring",
+    'log_incident': "Logged incident details",
+    'revoke_credentials': "Revoked access credentials",
+    'lock_account': "Locked user account",
+    'unlock_account': "Unlocked user account",
+    'force_password_reset': "Forced password reset",
+    'require_mfa': "Enabled MFA requirement",
+    'block_outbound': "Blocked outbound connection",
+    'preserve_evidence': "Preserved forensic evidence",
+    'open_investigation': "Initiated incident investigation",
+    'activate_ddos_mitigation': "Activated DDoS mitigation",
+    'rate_limit': "Rate limited traffic",
+    'block_sources': "Blocked attack sources",
+    'scale_infrastructure': "Scaled infrastructure",
+    'enable_cdn_protection': "Engaged CDN protection",
+    'notify_security_team': "Notified security team",
+    'notify_compliance_team': "Notified compliance team",
+}
+
+def _simulated_action(description: str) -> Action:
+    """Stand-in for an integration that has not been wired up yet."""
+    async def action(context: Dict[str, Any]) -> str:
+        await asyncio.sleep(0)
+        return description
+    return action
+
+
 class AutomatedResponse:
     """
     Automated incident response and remediation engine.
@@ -19,7 +66,24 @@ class AutomatedResponse:
         """Initialize automated response engine."""
         self.config = config
         self.incident_count = 0
-        self.playbooks = {}
+        self.actions: Dict[str, Action] = {
+            name: _simulated_action(description) for name, description in ACTION_DESCRIPTIONS.items()
+        }
+        # Playbooks are defined in YAML (config/playbooks) and compiled against self.actions
+        self.registry = PlaybookRegistry(self.actions, config)
+        
+        self.drain_timeout = config.get('response_drain_timeout', 5.0)
+        
+        # Playbook runs still finishing non-critical steps
+        self._background = set()
+        self.containment_times = deque(maxlen=config.get('response_stats_window', 1000))
+        
+        # Repeats of an open incident share its response instead of re-running the playbook
+        self.coalescer = IncidentCoalescer(self._dispatch_incident, config)
+        self._dispatch = self._respond_once
+        self.coalescing = config.get('coalesce_window', 60.0) > 0
+        # Replayed incidents reuse earlier action results instead of acting twice
+        self.ledger = ActionLedger(config)
         
         logger.info("Automated Response Engine initialized")
     
@@ -27,115 +91,175 @@ class AutomatedResponse:
         """Start response engine."""
         logger.info("Starting Automated Response Engine...")
         await self._load_playbooks()
+        await self.registry.start()
     
     async def stop(self):
         """Stop response engine."""
         logger.info("Stopping Automated Response Engine...")
+        await self.registry.stop()
+        if self._background:
+            # Let notifications and scans finish, within limits
+            _, unfinished = await asyncio.wait(self._background, timeout=self.drain_timeout)
+            for task in unfinished:
+                task.cancel()
+            if unfinished:
+                logger.warning(f"Cancelled {len(unfinished)} unfinished playbook runs")
+    
+    def register_action(self, name: str, action: Action):
+        """
+        Register or replace an action implementation.
+        
+        Playbooks are recompiled on the next load; call before start().
+        
+        Args:
+            name: Action name referenced by playbooks
+            action: Async callable taking the incident context
+        """
+        self.actions[name] = action
     
     async def _load_playbooks(self):
-        """Load incident response playbooks."""
-        self.playbooks = {
-            'malware_detected': self._respond_to_malware,
-            'network_anomaly': self._respond_to_network_anomaly,
-            'unauthorized_access': self._respond_to_unauthorized_access,
-            'data_exfiltration': self._respond_to_data_exfiltration,
-            'ddos_attack': self._respond_to_ddos
-        }
+        """Compile incident response playbooks against the registered actions."""
+        await asyncio.to_thread(self.registry.reload, True)
+    
+    def set_dispatcher(self, dispatch: Callable[[Dict[str, Any], str], Awaitable[Dict[str, Any]]]):
+        """
+        Run new incidents through `dispatch`, e.g. a ResponseScheduler's submit.
+        
+        Coalescing happens before dispatch, so repeats of an open incident
+        wait for its result without taking a queue slot or a worker. The
+        dispatcher should end up calling run_incident().
+        
+        Args:
+            dispatch: Async callable taking the threat and severity
+        """
+        self._dispatch = dispatch
+    
+    async def _dispatch_incident(self, threat_data: Dict[str, Any], severity: str) -> Dict[str, Any]:
+        """Hand the first threat of a coalesced group to the current dispatcher."""
+        return await self._dispatch(threat_data, severity)
+    
+    async def run_incident(self, threat_data: Dict[str, Any], severity: str) -> Dict[str, Any]:
+        """Run the playbook for a new incident, bypassing coalescing and the dispatcher."""
+        return await self._respond_once(threat_data, severity)
     
     async def respond(self, threat_data: Dict[str, Any], severity: str) -> Dict[str, Any]:
         """
         Execute automated response to threat.
         
+        Threats matching an open incident (same type, source and target by
+        default) are coalesced into it and get its response back, with the
+        incident's occurrence count and time span.
+        
+        Args:
+            threat_data: Threat information
+            severity: Threat severity level
+        
+        Returns:
+            Response actions taken
+        """
+        started = RESPONSE_STAGE.start()
+        try:
+            if self.coalescing:
+                return await self.coalescer.submit(threat_data, severity)
+            return await self._dispatch(threat_data, severity)
+        finally:
+            RESPONSE_STAGE.stop(started)
+    
+    async def _respond_once(self, threat_data: Dict[str, Any], severity: str) -> Dict[str, Any]:
+        """
+        Run the playbook for a new incident.
+        
+        Returns once the playbook's containment steps have settled;
+        non-critical steps keep running in the background.
+        
         Args:
             threat_data: Threat information
             severity: Threat severity level
-            
+        
         Returns:
             Response actions taken
         """
+        if not self.registry.loaded:
+            await self._load_playbooks()
+        
         self.incident_count += 1
+        incident_id = self.incident_count
         threat_type = threat_data.get('type', 'unknown')
         
         logger.warning(f"Responding to {threat_type} (severity: {severity})")
         
         # Select appropriate playbook
-        playbook = self.playbooks.get(threat_type, self._default_response)
+        playbook = self.registry.select(threat_type, severity)
         
         # Execute response
-        actions = await playbook(threat_data, severity)
+        context = {
+            "incident_id": incident_id,
+            "threat": threat_data,
+            "severity": severity
+        }
+        if self.ledger.enabled:
+            context["fingerprint"] = self.ledger.fingerprint(threat_data)
+            context["target"] = self.ledger.target(threat_data)
+        run = PlaybookRun(playbook, context, self.ledger if self.ledger.enabled else None)
+        task = run.start()
+        self._background.add(task)
+        task.add_done_callback(self._run_finished)
+        await run.contained.wait()
+        
+        self.containment_times.append(run.containment_ms)
+        summary = run.summary()
+        
+        actions_taken = []
+        background_steps = []
+        replayed_steps = []
+        for name in playbook.order:
+            outcome = summary['steps'].get(name)
+            if outcome is None or (outcome['status'] != SKIPPED and 'duration_ms' not in outcome):
+                background_steps.append(name)
+            elif outcome['status'] == SUCCEEDED:
+                actions_taken.append(outcome['result'])
+                if outcome.get('replayed'):
+                    replayed_steps.append(name)
         
         return {
-            "incident_id": self.incident_count,
+            "incident_id": incident_id,
             "threat_type": threat_type,
             "severity": severity,
-            "actions_taken": actions,
+            "actions_taken": actions_taken,
+            "background_steps": background_steps,
+            "replayed_steps": replayed_steps,
+            "containment_ms": summary['containment_ms'],
+            "critical_path": summary['critical_path'],
+            "steps": summary['steps'],
             "timestamp": datetime.utcnow().isoformat(),
-            "status": "resolved"
+            "status": "resolved" if summary['contained'] else "containment_failed"
         }
     
-    async def _respond_to_malware(self, threat_data: Dict, severity: str) -> List[str]:
-        """Respond to malware detection."""
-        actions = [
-            "Isolated affected system",
-            "Terminated malicious process",
-            "Quarantined malware sample",
-            "Initiated full system scan",
-            "Notified security team"
-        ]
-        return actions
-    
-    async def _respond_to_network_anomaly(self, threat_data: Dict, severity: str) -> List[str]:
-        """Respond to network anomaly."""
-        actions = [
-            "Blocked suspicious traffic",
-            "Applied firewall rules",
-            "Increased monitoring",
-            "Logged incident details"
-        ]
-        return actions
-    
-    async def _respond_to_unauthorized_access(self, threat_data: Dict, severity: str) -> List[str]:
-        """Respond to unauthorized access attempt."""
-        actions = [
-            "Revoked access credentials",
-            "Locked user account",
-            "Forced password reset",
-            "Enabled MFA requirement",
-            "Alerted security team"
-        ]
-        return actions
-    
-    async def _respond_to_data_exfiltration(self, threat_data: Dict, severity: str) -> List[str]:
-        """Respond to data exfiltration attempt."""
-        actions = [
-            "Blocked outbound connection",
-            "Isolated affected systems",
-            "Preserved forensic evidence",
-            "Initiated incident investigation",
-            "Notified compliance team"
-        ]
-        return actions
-    
-    async def _respond_to_ddos(self, threat_data: Dict, severity: str) -> List[str]:
-        """Respond to DDoS attack."""
-        actions = [
-            "Activated DDoS mitigation",
-            "Rate limited traffic",
-            "Blocked attack sources",
-            "Scaled infrastructure",
-            "Engaged CDN protection"
-        ]
-        return actions
-    
-    async def _default_response(self, threat_data: Dict, severity: str) -> List[str]:
-        """Default response for unknown threats."""
-        actions = [
-            "Logged threat details",
-            "Increased monitoring",
-            "Alerted security team"
-        ]
-        return actions
+    def _run_finished(self, task: asyncio.Task):
+        """Forget a finished run and surface unexpected errors."""
+        self._background.discard(task)
+        if not task.cancelled() and task.exception():
+            logger.error(f"Playbook run failed: {task.exception()}")
     
     def get_incident_count(self) -> int:
         """Get total incident count."""
         return self.incident_count
+    
+    def get_response_stats(self) -> Dict[str, Any]:
+        """
+        Get time-to-contain statistics over recent incidents.
+        
+        Returns:
+            Mean and max containment time, runs still in the background,
+            coalescing and replay counters and playbook registry state
+        """
+        times = self.containment_times
+        return {
+            "incidents": self.incident_count,
+            "mean_containment_ms": round(sum(times) / len(times), 3) if times else 0.0,
+            "max_containment_ms": round(max(times), 3) if times else 0.0,
+            "background_runs": len(self._background),
+            "coalescing": self.coalescer.get_stats(),
+            "idempotency": self.ledger.get_stats(),
+            "playbooks": self.registry.get_stats()
+        }
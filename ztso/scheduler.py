@@ -0,0 +1,247 @@
+"""
+Severity-Prioritized Response Scheduler
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Dict, Any, Awaitable, Callable, List, Optional
+
+from .analytics import SEVERITY_LEVELS, SEVERITY_RANK
+
+logger = logging.getLogger(__name__)
+
+
+# What to do with a submission when the queue is full
+REJECT = 'reject'
+DROP_LOWEST = 'drop_lowest'
+BLOCK = 'block'
+OVERFLOW_POLICIES = (REJECT, DROP_LOWEST, BLOCK)
+
+
+class SchedulerFull(RuntimeError):
+    """Raised for work refused or shed because the queue is full."""
+
+
+class Job:
+    """One queued response."""
+    
+    __slots__ = ('severity', 'priority', 'enqueued', 'threat_data', 'future')
+    
+    def __init__(self, severity: str, priority: float, threat_data: Dict[str, Any]):
+        self.severity = severity
+        self.priority = priority
+        self.enqueued = time.monotonic()
+        self.threat_data = threat_data
+        self.future = asyncio.get_running_loop().create_future()
+
+
+class ResponseScheduler:
+    """
+    Runs responses on a bounded worker pool, most severe first.
+    
+    Each job's priority is its arrival time less `aging` seconds per
+    severity level, and the lowest value runs first. A critical threat
+    therefore overtakes low-severity work that has waited less than
+    3 * `aging` seconds, while older low-severity work is still served
+    ahead of it, so nothing starves. Priorities never change after
+    arrival and grow with arrival time within a severity, so each
+    severity is a FIFO and the next job is the best of four queue heads.
+    
+    Per-severity caps limit how many workers one severity may occupy, and
+    `critical_reserve` workers are kept free of anything but critical
+    work, so a critical response starts as soon as it is queued even when
+    a flood of lower-severity work has filled the queue.
+    """
+    
+    def __init__(self, handler: Callable[[Dict[str, Any], str], Awaitable[Any]], config: Dict[str, Any]):
+        """
+        Initialize scheduler.
+        
+        Args:
+            handler: Runs the response for a threat and severity
+            config: Configuration dictionary
+        """
+        self.handler = handler
+        self.workers = config.get('scheduler_workers', 8)
+        self.max_queue = config.get('scheduler_max_queue', 10000)
+        self.aging = config.get('scheduler_aging_seconds', 5.0)
+        self.critical_reserve = min(config.get('scheduler_critical_reserve', 1), self.workers - 1)
+        self.overflow = config.get('scheduler_overflow', DROP_LOWEST)
+        if self.overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown scheduler overflow policy: {self.overflow}")
+        
+        caps = {
+            'low': max(1, self.workers // 4),
+            'medium': max(1, self.workers // 2),
+            'high': self.workers,
+            'critical': self.workers
+        }
+        caps.update(config.get('scheduler_caps', {}))
+        self.caps = caps
+        
+        self._queues: Dict[str, deque] = {severity: deque() for severity in SEVERITY_LEVELS}
+        self._running: Dict[str, int] = {severity: 0 for severity in SEVERITY_LEVELS}
+        self._queued = 0
+        self._changed: Optional[asyncio.Condition] = None
+        self._tasks: List[asyncio.Task] = []
+        
+        self.wait_times: Dict[str, deque] = {
+            severity: deque(maxlen=config.get('scheduler_stats_window', 1000)) for severity in SEVERITY_LEVELS
+        }
+        self.counters: Dict[str, Dict[str, int]] = {
+            severity: {'submitted': 0, 'completed': 0, 'failed': 0, 'rejected': 0, 'shed': 0}
+            for severity in SEVERITY_LEVELS
+        }
+        
+        logger.info(f"Response scheduler initialized with {self.workers} workers")
+    
+    async def start(self):
+        """Start the worker pool."""
+        if self._tasks:
+            return
+        self._changed = asyncio.Condition()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+    
+    async def stop(self):
+        """Stop the workers, failing anything still queued."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        for queue in self._queues.values():
+            while queue:
+                job = queue.popleft()
+                if not job.future.done():
+                    job.future.set_exception(SchedulerFull("Scheduler stopped"))
+                    job.future.exception()
+        self._queued = 0
+    
+    async def submit(self, threat_data: Dict[str, Any], severity: str) -> Any:
+        """
+        Queue a response and wait for its result.
+        
+        Args:
+            threat_data: Threat information
+            severity: Threat severity level
+        
+        Returns:
+            The handler's result
+        
+        Raises:
+            SchedulerFull: The queue was full and this job was refused or shed
+        """
+        if severity not in SEVERITY_RANK:
+            severity = 'medium'
+        if not self._tasks:
+            await self.start()
+        counters = self.counters[severity]
+        counters['submitted'] += 1
+        
+        job = Job(severity, time.monotonic() - SEVERITY_RANK[severity] * self.aging, threat_data)
+        async with self._changed:
+            if self._queued >= self.max_queue:
+                if self.overflow == BLOCK:
+                    await self._changed.wait_for(lambda: self._queued < self.max_queue)
+                elif self.overflow == DROP_LOWEST and self._shed_below(job):
+                    pass
+                else:
+                    counters['rejected'] += 1
+                    raise SchedulerFull(f"Response queue full ({self.max_queue}), "
+                                        f"refused {severity} {threat_data.get('type')}")
+            self._queues[severity].append(job)
+            self._queued += 1
+            self._changed.notify_all()
+        
+        return await job.future
+    
+    def _shed_below(self, job: Job) -> bool:
+        """Drop the lowest-priority queued job if it ranks below `job`."""
+        tails = [queue for queue in self._queues.values() if queue]
+        lowest = max(tails, key=lambda queue: queue[-1].priority)
+        if lowest[-1].priority <= job.priority:
+            return False
+        victim = lowest.pop()
+        self._queued -= 1
+        self.counters[victim.severity]['shed'] += 1
+        victim.future.set_exception(SchedulerFull(
+            f"Shed {victim.severity} {victim.threat_data.get('type')} for {job.severity} work"))
+        victim.future.exception()
+        return True
+    
+    def _next_job(self) -> Optional[Job]:
+        """Highest-priority job a worker may start now, if any."""
+        busy = sum(self._running.values())
+        best = None
+        for severity, queue in self._queues.items():
+            if not queue or self._running[severity] >= self.caps[severity]:
+                continue
+            if severity != 'critical' and busy >= self.workers - self.critical_reserve:
+                continue
+            if best is None or queue[0].priority < best[0].priority:
+                best = queue
+        if best is None:
+            return None
+        self._queued -= 1
+        return best.popleft()
+    
+    async def _worker(self):
+        """Take the next eligible job, run it, repeat."""
+        changed = self._changed
+        while True:
+            async with changed:
+                job = self._next_job()
+                while job is None:
+                    await changed.wait()
+                    job = self._next_job()
+                self._running[job.severity] += 1
+                # Frees queue space for blocked submitters
+                changed.notify_all()
+            
+            try:
+                # Skip jobs whose submitter gave up while they were queued
+                if not job.future.done():
+                    self.wait_times[job.severity].append((time.monotonic() - job.enqueued) * 1000)
+                    result = await self.handler(job.threat_data, job.severity)
+                    self.counters[job.severity]['completed'] += 1
+                    if not job.future.done():
+                        job.future.set_result(result)
+            except asyncio.CancelledError:
+                job.future.cancel()
+                raise
+            except Exception as e:
+                self.counters[job.severity]['failed'] += 1
+                if not job.future.done():
+                    job.future.set_exception(e)
+            finally:
+                async with changed:
+                    self._running[job.severity] -= 1
+                    changed.notify_all()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get queue statistics per severity.
+        
+        Returns:
+            Queue depth, running jobs, wait times in ms and outcome counters
+        """
+        stats = {}
+        for severity in SEVERITY_LEVELS:
+            waits = sorted(self.wait_times[severity])
+            stats[severity] = {
+                "queued": len(self._queues[severity]),
+                "running": self._running[severity],
+                "cap": self.caps[severity],
+                "mean_wait_ms": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "p99_wait_ms": round(waits[min(len(waits) - 1, int(len(waits) * 0.99))], 3) if waits else 0.0,
+                "max_wait_ms": round(waits[-1], 3) if waits else 0.0,
+                **self.counters[severity]
+            }
+        return {
+            "workers": self.workers,
+            "queued": self._queued,
+            "max_queue": self.max_queue,
+            "overflow": self.overflow,
+            "severities": stats
+        }
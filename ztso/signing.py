@@ -0,0 +1,332 @@
+"""
+Long-Lived Signing Keys and Batched Signature Verification
+"""
+
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Executor
+from typing import Dict, Any, Iterable, List, Optional, Sequence, Tuple
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+from cryptography.hazmat.primitives import serialization
+
+try:
+    import oqs
+except ImportError:  # liboqs-python is optional at runtime
+    oqs = None
+
+logger = logging.getLogger(__name__)
+
+
+# liboqs mechanism names for the PQC signature algorithms we advertise
+OQS_MECHANISMS = {
+    'CRYSTALS-Dilithium': 'Dilithium3',
+    'FALCON': 'Falcon-512',
+    'SPHINCS+': 'SPHINCS+-SHA2-128f-simple',
+}
+
+
+def message_digest(data) -> bytes:
+    """SHA-256 digest that signatures are computed over."""
+    return hashlib.sha256(data).digest()
+
+
+def key_fingerprint(public_key: bytes) -> str:
+    """Short, stable identifier for a public key, for display only."""
+    return hashlib.sha256(public_key).hexdigest()[:16]
+
+
+def key_digest(public_key: bytes) -> bytes:
+    """Full SHA-256 of a public key; identifies the key in the verification cache."""
+    return hashlib.sha256(public_key).digest()
+
+
+class _OQSBackend:
+    """PQC signatures through liboqs; one native context per thread."""
+    
+    def __init__(self, algorithm: str):
+        self.algorithm = algorithm
+        self.mechanism = OQS_MECHANISMS[algorithm]
+        self._local = threading.local()
+    
+    def generate(self) -> Tuple[bytes, bytes]:
+        with oqs.Signature(self.mechanism) as signer:
+            public_key = signer.generate_keypair()
+            return public_key, signer.export_secret_key()
+    
+    def _verifier(self):
+        verifier = getattr(self._local, 'verifier', None)
+        if verifier is None:
+            verifier = self._local.verifier = oqs.Signature(self.mechanism)
+        return verifier
+    
+    def signer(self, private_key: bytes):
+        return oqs.Signature(self.mechanism, private_key)
+    
+    def sign(self, signer, digest: bytes) -> bytes:
+        return signer.sign(digest)
+    
+    def verify(self, digest: bytes, signature: bytes, public_key: bytes) -> bool:
+        return self._verifier().verify(digest, signature, public_key)
+
+
+class _Ed25519Backend:
+    """Ed25519 signatures, used when liboqs is not installed."""
+    
+    algorithm = 'Ed25519'
+    max_parsed_keys = 1024
+    
+    def __init__(self):
+        self._public_keys: Dict[bytes, Ed25519PublicKey] = {}
+    
+    def generate(self) -> Tuple[bytes, bytes]:
+        private_key = Ed25519PrivateKey.generate()
+        return self._public_bytes(private_key), private_key.private_bytes(
+            serialization.Encoding.Raw, serialization.PrivateFormat.Raw, serialization.NoEncryption()
+        )
+    
+    @staticmethod
+    def _public_bytes(private_key: Ed25519PrivateKey) -> bytes:
+        return private_key.public_key().public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw
+        )
+    
+    def signer(self, private_key: bytes):
+        return Ed25519PrivateKey.from_private_bytes(private_key)
+    
+    def sign(self, signer, digest: bytes) -> bytes:
+        return signer.sign(digest)
+    
+    def verify(self, digest: bytes, signature: bytes, public_key: bytes) -> bool:
+        # Parsed keys are reused; the set of signers we verify is small
+        key = self._public_keys.get(public_key)
+        if key is None:
+            try:
+                key = Ed25519PublicKey.from_public_bytes(public_key)
+            except ValueError:
+                return False
+            if len(self._public_keys) < self.max_parsed_keys:
+                self._public_keys[public_key] = key
+        try:
+            key.verify(signature, digest)
+            return True
+        except InvalidSignature:
+            return False
+
+
+class SignatureEngine:
+    """
+    Signs and verifies artifacts with a long-lived key.
+    
+    The signing key is loaded (or created) once. Signatures cover the SHA-256
+    digest of the message, so a digest computed once serves both as the
+    signed value and as the verification cache key. Successful verifications
+    are remembered in a bounded LRU keyed by (digest, signature, key digest);
+    failures are never cached.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize signature engine.
+        
+        Args:
+            config: Configuration dictionary
+        """
+        self.config = config
+        algorithm = config.get('signature_algorithm', 'CRYSTALS-Dilithium')
+        if oqs is not None and algorithm in OQS_MECHANISMS:
+            self.backend = _OQSBackend(algorithm)
+        else:
+            if algorithm != 'Ed25519':
+                logger.warning(f"liboqs not available for {algorithm}; signing with Ed25519")
+            self.backend = _Ed25519Backend()
+        self.algorithm = self.backend.algorithm
+        
+        self.key_path = config.get('signing_key_path')
+        self.cache_size = config.get('signature_cache_size', 65536)
+        self.parallel_threshold = config.get('signature_parallel_threshold', 32)
+        # Chunks per parallel batch; matches the crypto pool verification runs on
+        self.verify_workers = (
+            config.get('signature_workers') or config.get('crypto_workers') or os.cpu_count() or 1
+        )
+        
+        self.public_key, private_key = self._load_key()
+        self.key_id = key_fingerprint(self.public_key)
+        self._key_digest = key_digest(self.public_key)
+        self._signer = self.backend.signer(private_key)
+        self._sign_lock = threading.Lock()
+        
+        self._cache: OrderedDict = OrderedDict()
+        self._cache_lock = threading.Lock()
+        
+        self.stats = {
+            'signed': 0,
+            'verified': 0,
+            'cache_hits': 0,
+            'failures': 0
+        }
+        
+        logger.info(f"Signature engine ready ({self.algorithm}, key {self.key_id})")
+    
+    def _load_key(self) -> Tuple[bytes, bytes]:
+        """Load the signing keypair from disk, creating it on first use."""
+        if not self.key_path:
+            return self.backend.generate()
+        
+        public_path = self.key_path + '.pub'
+        if os.path.exists(self.key_path) and os.path.exists(public_path):
+            with open(self.key_path, 'rb') as f:
+                private_key = f.read()
+            with open(public_path, 'rb') as f:
+                public_key = f.read()
+            return public_key, private_key
+        
+        public_key, private_key = self.backend.generate()
+        os.makedirs(os.path.dirname(self.key_path) or '.', exist_ok=True)
+        fd = os.open(self.key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(private_key)
+        with open(public_path, 'wb') as f:
+            f.write(public_key)
+        logger.info(f"Created signing key at {self.key_path}")
+        return public_key, private_key
+    
+    # Signing
+    
+    def sign(self, data) -> bytes:
+        """
+        Sign a message with the long-lived key.
+        
+        Args:
+            data: Message to sign
+        
+        Returns:
+            Signature bytes
+        """
+        return self.sign_many([data])[0]
+    
+    def sign_many(self, payloads: Iterable) -> List[bytes]:
+        """
+        Sign a batch of messages, holding the signer once for the batch.
+        
+        Our own signatures are added to the verification cache.
+        
+        Args:
+            payloads: Messages to sign
+        
+        Returns:
+            Signatures in input order
+        """
+        digests = [message_digest(data) for data in payloads]
+        with self._sign_lock:
+            signatures = [self.backend.sign(self._signer, digest) for digest in digests]
+        
+        with self._cache_lock:
+            for digest, signature in zip(digests, signatures):
+                self._remember((digest, signature, self._key_digest))
+        self.stats['signed'] += len(signatures)
+        return signatures
+    
+    # Verification
+    
+    def verify(self, data, signature: bytes, public_key: Optional[bytes] = None) -> bool:
+        """
+        Verify one signature.
+        
+        Args:
+            data: Signed message
+            signature: Signature to check
+            public_key: Signer's public key (default: our own)
+        
+        Returns:
+            True if the signature is valid
+        """
+        return self.verify_many([(data, signature, public_key)])[0]
+    
+    def verify_many(self, items: Sequence[Tuple[Any, bytes, Optional[bytes]]],
+                    executor: Optional[Executor] = None) -> List[bool]:
+        """
+        Verify a batch of signatures.
+        
+        Cached results are answered immediately; the rest are split into one
+        chunk per worker and verified in parallel when an executor is given
+        and the batch is large enough to pay for the hand-off.
+        
+        Args:
+            items: (message, signature, public key or None) tuples
+            executor: Pool to spread verification across
+        
+        Returns:
+            Validity per item, in input order
+        """
+        results = [False] * len(items)
+        pending = []
+        
+        with self._cache_lock:
+            for i, (data, signature, public_key) in enumerate(items):
+                if public_key:
+                    signer = key_digest(public_key)
+                else:
+                    public_key, signer = self.public_key, self._key_digest
+                entry = (message_digest(data), bytes(signature), signer)
+                if entry in self._cache:
+                    self._cache.move_to_end(entry)
+                    results[i] = True
+                else:
+                    pending.append((i, entry, public_key))
+        self.stats['cache_hits'] += len(items) - len(pending)
+        
+        if not pending:
+            return results
+        
+        workers = self.verify_workers if executor else 1
+        if workers > 1 and len(pending) >= self.parallel_threshold:
+            size = -(-len(pending) // workers)
+            chunks = [pending[i:i + size] for i in range(0, len(pending), size)]
+            outcomes = [ok for chunk in executor.map(self._verify_chunk, chunks) for ok in chunk]
+        else:
+            outcomes = self._verify_chunk(pending)
+        
+        with self._cache_lock:
+            for (i, entry, _), ok in zip(pending, outcomes):
+                results[i] = ok
+                if ok:
+                    self._remember(entry)
+        
+        failures = outcomes.count(False)
+        self.stats['verified'] += len(pending)
+        self.stats['failures'] += failures
+        if failures:
+            logger.warning(f"{failures} of {len(items)} signatures failed verification")
+        
+        return results
+    
+    def _verify_chunk(self, chunk: List[Tuple[int, Tuple[bytes, bytes, bytes], bytes]]) -> List[bool]:
+        """Verify uncached signatures; runs on a worker thread for large batches."""
+        return [self.backend.verify(digest, signature, public_key)
+                for _, (digest, signature, _), public_key in chunk]
+    
+    def _remember(self, entry: Tuple[bytes, bytes, bytes]):
+        """Record a verified signature, evicting the least recently used. Caller holds the lock."""
+        self._cache[entry] = True
+        self._cache.move_to_end(entry)
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    def clear_cache(self):
+        """Forget all cached verifications (e.g. after revoking a key)."""
+        with self._cache_lock:
+            self._cache.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get signing and verification statistics."""
+        return {
+            "algorithm": self.algorithm,
+            "key_id": self.key_id,
+            "cache_entries": len(self._cache),
+            **self.stats
+        }
@@ -0,0 +1,462 @@
+"""
+Chunked Streaming Encryption
+"""
+
+import asyncio
+import logging
+import secrets
+import struct
+from concurrent.futures import Executor
+from typing import Dict, Any, AsyncIterable, AsyncIterator, BinaryIO, Callable, NamedTuple, Optional, Union
+
+from cryptography.exceptions import InvalidTag
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+logger = logging.getLogger(__name__)
+
+
+# Stream format:
+#   header: magic | version | aead | chunk_size | nonce_prefix | key_id_len | key_id
+#   frames: length (u32) | ciphertext + tag, one per chunk
+# Every chunk is sealed with AES-256-GCM under nonce_prefix || chunk index and
+# authenticates the header, its index and a final-chunk flag, so chunks cannot
+# be reordered, spliced between streams or truncated undetected. All frames
+# except the last have the same size, which makes any chunk addressable.
+STREAM_MAGIC = b'ZTSF'
+STREAM_VERSION = 1
+AEAD_AES_256_GCM = 1
+
+HEADER = struct.Struct('>4sBBI8sH')
+FRAME_LENGTH = struct.Struct('>I')
+CHUNK_AAD = struct.Struct('>IB')
+TAG_SIZE = 16
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+MAX_CHUNKS = 2 ** 32
+# Largest chunk a reader accepts; the header is untrusted, and decryption
+# buffers one full frame
+MAX_CHUNK_SIZE = 16 * DEFAULT_CHUNK_SIZE
+
+_copy_fallback_warned = False
+
+
+class StreamHeader(NamedTuple):
+    """Parsed stream header."""
+    chunk_size: int
+    nonce_prefix: bytes
+    key_id: bytes
+    raw: bytes
+    
+    @property
+    def frame_size(self) -> int:
+        """Size of every non-final frame."""
+        return FRAME_LENGTH.size + self.chunk_size + TAG_SIZE
+    
+    def frame_offset(self, index: int) -> int:
+        """Byte offset of a chunk's frame from the start of the stream."""
+        return len(self.raw) + index * self.frame_size
+
+
+def build_header(chunk_size: int, key_id: bytes = b'') -> StreamHeader:
+    """
+    Create a header for a new stream.
+    
+    Args:
+        chunk_size: Plaintext bytes per chunk
+        key_id: Opaque key identifier or wrapped key stored with the stream
+    
+    Returns:
+        Stream header
+    """
+    nonce_prefix = secrets.token_bytes(8)
+    raw = HEADER.pack(
+        STREAM_MAGIC, STREAM_VERSION, AEAD_AES_256_GCM, chunk_size, nonce_prefix, len(key_id)
+    ) + key_id
+    return StreamHeader(chunk_size, nonce_prefix, key_id, raw)
+
+
+def parse_header(data: bytes, max_chunk_size: int = MAX_CHUNK_SIZE) -> StreamHeader:
+    """
+    Parse a stream header.
+    
+    Args:
+        data: Bytes starting at the beginning of the stream
+        max_chunk_size: Largest chunk size to accept
+    
+    Returns:
+        Stream header
+    """
+    if len(data) < HEADER.size:
+        raise ValueError("Truncated stream header")
+    
+    magic, version, aead, chunk_size, nonce_prefix, key_id_len = HEADER.unpack_from(data)
+    if magic != STREAM_MAGIC or version != STREAM_VERSION or aead != AEAD_AES_256_GCM:
+        raise ValueError("Unrecognized stream format")
+    if not 0 < chunk_size <= max_chunk_size:
+        raise ValueError(f"Stream chunk size {chunk_size} outside 1..{max_chunk_size}")
+    
+    end = HEADER.size + key_id_len
+    if len(data) < end:
+        raise ValueError("Truncated stream header")
+    
+    return StreamHeader(chunk_size, nonce_prefix, bytes(data[HEADER.size:end]), bytes(data[:end]))
+
+
+def read_header(source: BinaryIO, max_chunk_size: int = MAX_CHUNK_SIZE) -> StreamHeader:
+    """Read and parse the header from the start of a file-like object."""
+    fixed = source.read(HEADER.size)
+    key_id_len = HEADER.unpack(fixed)[-1] if len(fixed) == HEADER.size else 0
+    return parse_header(fixed + source.read(key_id_len), max_chunk_size)
+
+
+def _warn_copy_fallback():
+    """Log once that the installed cryptography lacks the in-place AEAD API."""
+    global _copy_fallback_warned
+    if not _copy_fallback_warned:
+        _copy_fallback_warned = True
+        logger.warning("cryptography < 47 has no encrypt_into/decrypt_into; "
+                       "AEAD output is copied (upgrade to avoid the extra allocation)")
+
+
+def aead_encrypt_into(aead, nonce: bytes, data, associated_data, out) -> int:
+    """
+    Encrypt into a caller-provided buffer of len(data) + TAG_SIZE bytes.
+    
+    Uses the in-place AEAD API when the installed cryptography provides it,
+    otherwise falls back to encrypting into a new object and copying.
+    
+    Returns:
+        Number of bytes written
+    """
+    if hasattr(aead, 'encrypt_into'):
+        return aead.encrypt_into(nonce, data, associated_data, out)
+    _warn_copy_fallback()
+    sealed = aead.encrypt(nonce, bytes(data), bytes(associated_data))
+    out[:len(sealed)] = sealed
+    return len(sealed)
+
+
+def aead_decrypt_into(aead, nonce: bytes, sealed, associated_data, out) -> int:
+    """
+    Decrypt into a caller-provided buffer of len(sealed) - TAG_SIZE bytes.
+    
+    Returns:
+        Number of bytes written
+    """
+    if hasattr(aead, 'decrypt_into'):
+        return aead.decrypt_into(nonce, sealed, associated_data, out)
+    _warn_copy_fallback()
+    data = aead.decrypt(nonce, bytes(sealed), bytes(associated_data))
+    out[:len(data)] = data
+    return len(data)
+
+
+def _nonce(header: StreamHeader, index: int) -> bytes:
+    if index >= MAX_CHUNKS:
+        raise ValueError("Stream exceeds maximum chunk count")
+    return header.nonce_prefix + index.to_bytes(4, 'big')
+
+
+def seal_chunk(aead: AESGCM, header: StreamHeader, index: int, data, final: bool) -> bytes:
+    """
+    Encrypt one chunk into a frame.
+    
+    Args:
+        aead: AEAD instance for the stream key
+        header: Stream header
+        index: Chunk index
+        data: Plaintext chunk (any bytes-like object)
+        final: Whether this is the last chunk of the stream
+    
+    Returns:
+        Frame bytes
+    """
+    frame = bytearray(FRAME_LENGTH.size + len(data) + TAG_SIZE)
+    return bytes(frame[:seal_chunk_into(aead, header, index, data, final, frame)])
+
+
+def seal_chunk_into(aead: AESGCM, header: StreamHeader, index: int, data, final: bool,
+                    frame: bytearray) -> int:
+    """
+    Encrypt one chunk into a preallocated frame buffer.
+    
+    Args:
+        aead: AEAD instance for the stream key
+        header: Stream header
+        index: Chunk index
+        data: Plaintext chunk (any bytes-like object)
+        final: Whether this is the last chunk of the stream
+        frame: Buffer of at least FRAME_LENGTH.size + len(data) + TAG_SIZE bytes
+    
+    Returns:
+        Frame length in bytes
+    """
+    length = len(data) + TAG_SIZE
+    FRAME_LENGTH.pack_into(frame, 0, length)
+    with memoryview(frame) as view:
+        aead_encrypt_into(
+            aead, _nonce(header, index), data, header.raw + CHUNK_AAD.pack(index, final),
+            view[FRAME_LENGTH.size:FRAME_LENGTH.size + length]
+        )
+    return FRAME_LENGTH.size + length
+
+
+def open_chunk(aead: AESGCM, header: StreamHeader, index: int, sealed, final: bool) -> bytes:
+    """
+    Decrypt one chunk.
+    
+    Args:
+        aead: AEAD instance for the stream key
+        header: Stream header
+        index: Chunk index
+        sealed: Ciphertext and tag (frame without its length prefix)
+        final: Whether this frame is the last one in the stream
+    
+    Returns:
+        Plaintext chunk
+    """
+    try:
+        return aead.decrypt(_nonce(header, index), sealed, header.raw + CHUNK_AAD.pack(index, final))
+    except InvalidTag:
+        raise ValueError(f"Authentication failed for chunk {index}")
+
+
+def encrypt_stream(source: BinaryIO, sink: BinaryIO, key: bytes,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE, key_id: bytes = b'') -> Dict[str, Any]:
+    """
+    Encrypt a file-like object chunk by chunk.
+    
+    Memory use is bounded by two chunk buffers and one frame buffer,
+    all allocated once, regardless of input size.
+    
+    Args:
+        source: Readable binary file
+        sink: Writable binary file
+        key: 256-bit data key
+        chunk_size: Plaintext bytes per chunk
+        key_id: Opaque key identifier or wrapped key stored in the header
+    
+    Returns:
+        Stream statistics
+    """
+    aead = AESGCM(key)
+    header = build_header(chunk_size, key_id)
+    sink.write(header.raw)
+    written = len(header.raw)
+    
+    # Read one chunk ahead so the last chunk can be flagged as final
+    current = bytearray(chunk_size)
+    ahead = bytearray(chunk_size)
+    current_len = _read_full(source, current)
+    frame = bytearray(FRAME_LENGTH.size + chunk_size + TAG_SIZE)
+    frame_view = memoryview(frame)
+    
+    index = 0
+    total = 0
+    while True:
+        ahead_len = _read_full(source, ahead) if current_len == chunk_size else 0
+        final = ahead_len == 0
+        
+        with memoryview(current) as chunk:
+            frame_len = seal_chunk_into(aead, header, index, chunk[:current_len], final, frame)
+        sink.write(frame_view[:frame_len])
+        written += frame_len
+        total += current_len
+        index += 1
+        
+        if final:
+            break
+        current, ahead = ahead, current
+        current_len = ahead_len
+    
+    return {
+        "chunks": index,
+        "bytes_in": total,
+        "bytes_out": written,
+        "chunk_size": chunk_size
+    }
+
+
+def decrypt_stream(source: BinaryIO, sink: BinaryIO, key: bytes,
+                   start_chunk: int = 0, end_chunk: Optional[int] = None,
+                   max_chunk_size: int = MAX_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Decrypt a stream, optionally starting at an arbitrary chunk.
+    
+    Args:
+        source: Readable binary file (must be seekable when start_chunk > 0)
+        sink: Writable binary file
+        key: 256-bit data key
+        start_chunk: First chunk to decrypt
+        end_chunk: Chunk index to stop before (default: end of stream)
+        max_chunk_size: Largest chunk size to accept from the header
+    
+    Returns:
+        Stream statistics
+    """
+    aead = AESGCM(key)
+    header = read_header(source, max_chunk_size)
+    if start_chunk:
+        source.seek(header.frame_offset(start_chunk))
+    
+    index = start_chunk
+    total = 0
+    while end_chunk is None or index < end_chunk:
+        prefix = source.read(FRAME_LENGTH.size)
+        if not prefix:
+            if end_chunk is not None:
+                raise ValueError("Stream ended before requested chunk")
+            raise ValueError("Stream truncated: final chunk missing")
+        
+        (length,) = FRAME_LENGTH.unpack(prefix)
+        if length > header.chunk_size + TAG_SIZE:
+            raise ValueError(f"Invalid frame length for chunk {index}")
+        sealed = source.read(length)
+        final = length < header.chunk_size + TAG_SIZE or _at_eof(source)
+        
+        sink.write(open_chunk(aead, header, index, sealed, final))
+        total += length - TAG_SIZE
+        index += 1
+        
+        if final:
+            break
+    
+    return {"chunks": index - start_chunk, "bytes_out": total}
+
+
+async def aencrypt_stream(chunks: AsyncIterable[bytes], key: bytes,
+                          chunk_size: int = DEFAULT_CHUNK_SIZE, key_id: bytes = b'',
+                          executor: Optional[Executor] = None) -> AsyncIterator[bytes]:
+    """
+    Encrypt an async byte stream, yielding the header and then one frame per chunk.
+    
+    Incoming pieces of any size are copied into one reusable chunk buffer;
+    nothing else is buffered.
+    
+    Args:
+        chunks: Async iterable of plaintext pieces
+        key: 256-bit data key
+        chunk_size: Plaintext bytes per chunk
+        key_id: Opaque key identifier or wrapped key stored in the header
+        executor: Pool to seal chunks on, keeping the event loop free
+    """
+    aead = AESGCM(key)
+    header = build_header(chunk_size, key_id)
+    yield header.raw
+    
+    chunk = bytearray(chunk_size)
+    chunk_view = memoryview(chunk)
+    filled = 0
+    index = 0
+    async for piece in chunks:
+        view = memoryview(piece).cast('B')
+        while len(view):
+            # A full chunk is only sealed once more data arrives, so the final one is known
+            if filled == chunk_size:
+                yield await _run(executor, seal_chunk, aead, header, index, chunk_view, False)
+                filled = 0
+                index += 1
+            n = min(chunk_size - filled, len(view))
+            chunk_view[filled:filled + n] = view[:n]
+            filled += n
+            view = view[n:]
+    
+    yield await _run(executor, seal_chunk, aead, header, index, chunk_view[:filled], True)
+
+
+async def adecrypt_stream(data: AsyncIterable[bytes],
+                          key: Union[bytes, Callable[[StreamHeader], bytes]],
+                          executor: Optional[Executor] = None,
+                          max_chunk_size: int = MAX_CHUNK_SIZE) -> AsyncIterator[bytes]:
+    """
+    Decrypt an async byte stream, yielding plaintext chunks as frames complete.
+    
+    At most one frame plus one incoming piece is buffered.
+    
+    Args:
+        data: Async iterable of stream bytes
+        key: 256-bit data key, or a function resolving it from the stream header
+        executor: Pool to open chunks on, keeping the event loop free
+        max_chunk_size: Largest chunk size to accept from the header
+    """
+    aead = None
+    header = None
+    buffer = bytearray()
+    index = 0
+    finished = False
+    
+    async for piece in data:
+        if finished:
+            if piece:
+                raise ValueError("Trailing data after final chunk")
+            continue
+        buffer += piece
+        
+        if header is None:
+            if len(buffer) < HEADER.size or len(buffer) < HEADER.size + HEADER.unpack_from(buffer)[-1]:
+                continue
+            header = parse_header(buffer, max_chunk_size)
+            del buffer[:len(header.raw)]
+            aead = AESGCM(key(header) if callable(key) else key)
+        
+        # A full-size frame is final only if nothing follows it, so hold it
+        # back until more bytes arrive
+        while len(buffer) > header.frame_size or _short_frame_ready(buffer, header):
+            (length,) = FRAME_LENGTH.unpack_from(buffer)
+            end = FRAME_LENGTH.size + length
+            final = length < header.chunk_size + TAG_SIZE
+            # Copy the frame out: a view handed to a worker thread could still
+            # pin the buffer when it is trimmed below
+            yield await _run(executor, open_chunk, aead, header, index,
+                             bytes(memoryview(buffer)[FRAME_LENGTH.size:end]), final)
+            del buffer[:end]
+            index += 1
+            if final:
+                finished = True
+                break
+    
+    if finished:
+        if buffer:
+            raise ValueError("Trailing data after final chunk")
+    else:
+        if header is None or len(buffer) != header.frame_size:
+            raise ValueError("Stream truncated: final chunk missing")
+        yield await _run(executor, open_chunk, aead, header, index,
+                         bytes(memoryview(buffer)[FRAME_LENGTH.size:]), True)
+
+
+async def _run(executor: Optional[Executor], func, *args):
+    """Call func on the executor if one is given, otherwise inline."""
+    if executor is None:
+        return func(*args)
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+
+def _short_frame_ready(buffer: bytearray, header: StreamHeader) -> bool:
+    """Whether the buffer starts with a complete final (short) frame."""
+    if len(buffer) < FRAME_LENGTH.size:
+        return False
+    (length,) = FRAME_LENGTH.unpack_from(buffer)
+    return length < header.chunk_size + TAG_SIZE and len(buffer) >= FRAME_LENGTH.size + length
+
+
+def _read_full(source: BinaryIO, buffer: bytearray) -> int:
+    """Fill a buffer from a file, returning the number of bytes read."""
+    view = memoryview(buffer)
+    filled = 0
+    while filled < len(buffer):
+        n = source.readinto(view[filled:])
+        if not n:
+            break
+        filled += n
+    return filled
+
+
+def _at_eof(source: BinaryIO) -> bool:
+    """Check whether a file has no more data without consuming it."""
+    if hasattr(source, 'peek'):
+        return not source.peek(1)
+    position = source.tell()
+    at_end = not source.read(1)
+    source.seek(position)
+    return at_end
@@ -0,0 +1,153 @@
+"""
+Bounded Threat History
+"""
+
+import logging
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, Any, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+MINUTE = 60
+HOUR = 3600
+DAY = 24 * HOUR
+WEEK = 7 * DAY
+
+
+class Bucket:
+    """Aggregate counts for one minute or hour."""
+    
+    __slots__ = ('start', 'total', 'resolved', 'by_severity')
+    
+    def __init__(self):
+        self.start = -1
+        self.total = 0
+        self.resolved = 0
+        self.by_severity: Dict[str, int] = {}
+    
+    def reset(self, start: int):
+        self.start = start
+        self.total = 0
+        self.resolved = 0
+        self.by_severity = {}
+
+
+class BucketRing:
+    """
+    Fixed ring of equal-width time buckets.
+    
+    Bucket `n` (time // width) lives in slot n % size and is reset when a
+    later bucket reuses the slot, so memory is constant however many events
+    arrive and buckets older than size * width simply disappear.
+    """
+    
+    def __init__(self, width: int, size: int):
+        self.width = width
+        self.size = size
+        self.buckets = [Bucket() for _ in range(size)]
+    
+    def add(self, timestamp: float, severity: str, resolved: bool):
+        start = int(timestamp // self.width)
+        bucket = self.buckets[start % self.size]
+        if bucket.start != start:
+            if bucket.start > start:
+                # Older than the ring covers
+                return
+            bucket.reset(start)
+        bucket.total += 1
+        bucket.resolved += resolved
+        bucket.by_severity[severity] = bucket.by_severity.get(severity, 0) + 1
+    
+    def window(self, seconds: float, now: float) -> Iterable[Bucket]:
+        """Buckets overlapping the last `seconds`, including the current one."""
+        newest = int(now // self.width)
+        oldest = max(newest - int(seconds // self.width) + 1, newest - self.size + 1)
+        for start in range(oldest, newest + 1):
+            bucket = self.buckets[start % self.size]
+            if bucket.start == start:
+                yield bucket
+
+
+class ThreatHistory:
+    """
+    Recent threat events plus minute and hour aggregates.
+    
+    Raw events go to a fixed-capacity ring buffer for drill-down. Counts
+    go to a ring of per-minute buckets (last two hours) and a ring of
+    per-hour buckets (last week), so a 1h, 24h or 7d count sums at most
+    60, 24 or 168 buckets no matter how many threats were seen. Windows
+    are aligned to bucket boundaries: the 1h count is exact to the minute
+    and longer windows to the hour.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize threat history.
+        
+        Args:
+            config: Configuration dictionary
+        """
+        self.recent = deque(maxlen=config.get('threat_history_capacity', 10000))
+        self.minutes = BucketRing(MINUTE, 2 * HOUR // MINUTE)
+        self.hours = BucketRing(HOUR, WEEK // HOUR + 1)
+        self.total = 0
+    
+    def record(self, threat_data: Dict[str, Any], response: Dict[str, Any], severity: str,
+               timestamp: Optional[float] = None):
+        """
+        Record a threat and its response.
+        
+        Args:
+            threat_data: Threat information
+            response: Response summary
+            severity: Threat severity level
+            timestamp: Epoch seconds, defaults to now
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        resolved = response.get('status') == 'resolved'
+        self.recent.append({
+            "threat": threat_data,
+            "response": response,
+            "severity": severity,
+            "timestamp": datetime.utcfromtimestamp(timestamp)
+        })
+        self.minutes.add(timestamp, severity, resolved)
+        self.hours.add(timestamp, severity, resolved)
+        self.total += 1
+    
+    def _ring(self, seconds: float) -> BucketRing:
+        return self.minutes if seconds <= HOUR else self.hours
+    
+    def count(self, seconds: float, severity: Optional[str] = None, now: Optional[float] = None) -> int:
+        """
+        Threats seen in the last `seconds`.
+        
+        Args:
+            seconds: Window length, up to a week
+            severity: Only count this severity
+            now: Epoch seconds, defaults to now
+        
+        Returns:
+            Threat count
+        """
+        buckets = self._ring(seconds).window(seconds, time.time() if now is None else now)
+        if severity is None:
+            return sum(bucket.total for bucket in buckets)
+        return sum(bucket.by_severity.get(severity, 0) for bucket in buckets)
+    
+    def resolved(self, seconds: float, now: Optional[float] = None) -> int:
+        """Threats in the last `seconds` whose response resolved them."""
+        buckets = self._ring(seconds).window(seconds, time.time() if now is None else now)
+        return sum(bucket.resolved for bucket in buckets)
+    
+    def by_severity(self, seconds: float, now: Optional[float] = None) -> Dict[str, int]:
+        """Threat counts per severity over the last `seconds`."""
+        counts: Dict[str, int] = {}
+        for bucket in self._ring(seconds).window(seconds, time.time() if now is None else now):
+            for severity, count in bucket.by_severity.items():
+                counts[severity] = counts.get(severity, 0) + count
+        return counts
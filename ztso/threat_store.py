@@ -0,0 +1,503 @@
+"""
+Columnar Threat Store
+"""
+
+import logging
+import math
+import re
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Dictionary-encoded string columns
+CATEGORICAL = ('type', 'severity', 'source', 'status')
+# Numeric columns aggregates can be computed over; NaN when unknown
+NUMERIC = ('score', 'response_ms')
+# Derived grouping keys: timestamp truncated to this many seconds
+TIME_BUCKETS = {'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Above this many possible groups, group keys are compacted by sorting
+# rather than counted into a dense array
+DENSE_GROUPS = 1 << 22
+
+METRIC_PATTERN = re.compile(r'^(count|sum|mean|min|max|p\d{1,2}(?:\.\d+)?):?(\w+)?$')
+
+
+class Dictionary:
+    """Maps the distinct values of a column to dense integer codes."""
+    
+    __slots__ = ('values', 'codes')
+    
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+    
+    def encode(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+    
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class Chunk:
+    """Fixed-capacity column arrays for consecutive rows."""
+    
+    __slots__ = ('timestamp', 'codes', 'values', 'missing', 'length', 'min_ts', 'max_ts')
+    
+    def __init__(self, capacity: int):
+        self.timestamp = np.empty(capacity, dtype=np.float64)
+        self.codes = {name: np.empty(capacity, dtype=np.int32) for name in CATEGORICAL}
+        self.values = {name: np.empty(capacity, dtype=np.float32) for name in NUMERIC}
+        # NaN (unknown) values per numeric column
+        self.missing = {name: 0 for name in NUMERIC}
+        self.length = 0
+        self.min_ts = math.inf
+        self.max_ts = -math.inf
+    
+    def column(self, name: str) -> np.ndarray:
+        if name == 'timestamp':
+            array = self.timestamp
+        elif name in self.codes:
+            array = self.codes[name]
+        else:
+            array = self.values[name]
+        return array[:self.length]
+
+
+class ThreatStore:
+    """
+    Threats held column by column for analytical queries.
+    
+    String fields (type, severity, source, status) are dictionary-encoded
+    to int32 codes; timestamps, detection scores and response times are
+    NumPy arrays. Rows are appended into fixed-size chunks, so growth never
+    copies existing data, and whole chunks are dropped from the front once
+    `threat_store_max_rows` is exceeded. Each chunk keeps its time range,
+    letting range filters skip or take chunks without looking at rows.
+    
+    Queries filter, group and aggregate with array operations: groups are
+    combined into a single integer key per row, counted and summed with
+    bincount, and quantiles read from one sort of the matching rows.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize threat store.
+        
+        Args:
+            config: Configuration dictionary
+        """
+        self.chunk_size = config.get('threat_store_chunk_size', 65536)
+        self.max_rows = config.get('threat_store_max_rows', 1_000_000)
+        self.dictionaries = {name: Dictionary() for name in CATEGORICAL}
+        self.chunks: List[Chunk] = []
+        self.rows = 0
+        self.dropped = 0
+    
+    def __len__(self) -> int:
+        return self.rows
+    
+    @property
+    def position(self) -> int:
+        """Rows appended so far, including those since dropped."""
+        return self.dropped + self.rows
+    
+    def append(self, timestamp: float, threat_type: str, severity: str, source: Optional[str] = None,
+               status: Optional[str] = None, score: Optional[float] = None, response_ms: Optional[float] = None):
+        """
+        Append one threat.
+        
+        Args:
+            timestamp: Epoch seconds
+            threat_type: Threat type
+            severity: Threat severity level
+            source: Source address or identity
+            status: Response status
+            score: Detection score
+            response_ms: Time to respond in milliseconds
+        """
+        chunk = self.chunks[-1] if self.chunks else None
+        if chunk is None or chunk.length == self.chunk_size:
+            chunk = Chunk(self.chunk_size)
+            self.chunks.append(chunk)
+        
+        i = chunk.length
+        chunk.timestamp[i] = timestamp
+        codes, dictionaries = chunk.codes, self.dictionaries
+        codes['type'][i] = dictionaries['type'].encode(threat_type)
+        codes['severity'][i] = dictionaries['severity'].encode(severity)
+        codes['source'][i] = dictionaries['source'].encode(source or 'unknown')
+        codes['status'][i] = dictionaries['status'].encode(status or 'unknown')
+        for name, value in (('score', score), ('response_ms', response_ms)):
+            if value is None or value != value:
+                chunk.values[name][i] = math.nan
+                chunk.missing[name] += 1
+            else:
+                chunk.values[name][i] = value
+        chunk.length = i + 1
+        if timestamp < chunk.min_ts:
+            chunk.min_ts = timestamp
+        if timestamp > chunk.max_ts:
+            chunk.max_ts = timestamp
+        self.rows += 1
+        self._trim()
+    
+    def extend(self, columns: Dict[str, Any]):
+        """
+        Append many threats at once.
+        
+        Args:
+            columns: Equal-length sequences keyed by column name; `timestamp`,
+                `type` and `severity` are required
+        """
+        timestamps = np.asarray(columns['timestamp'], dtype=np.float64)
+        count = len(timestamps)
+        encoded = {}
+        for name in CATEGORICAL:
+            values = columns.get(name)
+            if values is None:
+                encoded[name] = np.full(count, self.dictionaries[name].encode('unknown'), dtype=np.int32)
+            else:
+                encode = self.dictionaries[name].encode
+                values = values.tolist() if isinstance(values, np.ndarray) else values
+                encoded[name] = np.fromiter((encode(value) for value in values), dtype=np.int32, count=count)
+        numeric = {name: (np.asarray(columns[name], dtype=np.float32) if name in columns
+                          else np.full(count, np.nan, dtype=np.float32)) for name in NUMERIC}
+        
+        done = 0
+        while done < count:
+            chunk = self.chunks[-1] if self.chunks else None
+            if chunk is None or chunk.length == self.chunk_size:
+                chunk = Chunk(self.chunk_size)
+                self.chunks.append(chunk)
+            take = min(self.chunk_size - chunk.length, count - done)
+            rows = slice(chunk.length, chunk.length + take)
+            part = slice(done, done + take)
+            chunk.timestamp[rows] = timestamps[part]
+            for name in CATEGORICAL:
+                chunk.codes[name][rows] = encoded[name][part]
+            for name in NUMERIC:
+                chunk.values[name][rows] = numeric[name][part]
+                chunk.missing[name] += int(np.count_nonzero(np.isnan(numeric[name][part])))
+            chunk.min_ts = min(chunk.min_ts, float(timestamps[part].min()))
+            chunk.max_ts = max(chunk.max_ts, float(timestamps[part].max()))
+            chunk.length += take
+            self.rows += take
+            done += take
+            self._trim()
+    
+    def _trim(self):
+        """Drop the oldest chunks while the others still hold max_rows."""
+        while self.max_rows and len(self.chunks) > 1 and self.rows - self.chunks[0].length >= self.max_rows:
+            dropped = self.chunks.pop(0)
+            self.rows -= dropped.length
+            self.dropped += dropped.length
+    
+    def _masks(self, start: Optional[float], end: Optional[float],
+               where: Dict[str, np.ndarray]) -> Iterable[Tuple[Chunk, Union[slice, np.ndarray]]]:
+        """Chunks with rows matching the filters, and which rows."""
+        for chunk in self.chunks:
+            if not chunk.length:
+                continue
+            if (start is not None and chunk.max_ts < start) or (end is not None and chunk.min_ts >= end):
+                continue
+            mask = None
+            if start is not None and chunk.min_ts < start:
+                mask = chunk.column('timestamp') >= start
+            if end is not None and chunk.max_ts >= end:
+                before = chunk.column('timestamp') < end
+                mask = before if mask is None else mask & before
+            for name, allowed in where.items():
+                matches = allowed[chunk.column(name)]
+                mask = matches if mask is None else mask & matches
+            if mask is None:
+                yield chunk, slice(None)
+            elif mask.any():
+                yield chunk, mask
+    
+    def _where(self, where: Optional[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+        """Lookup tables, indexed by code, of the categorical values each filter allows."""
+        tables = {}
+        for name, wanted in (where or {}).items():
+            if name not in CATEGORICAL:
+                raise ValueError(f"Cannot filter on {name}; filterable columns are {', '.join(CATEGORICAL)}")
+            dictionary = self.dictionaries[name]
+            table = np.zeros(len(dictionary), dtype=bool)
+            for value in ([wanted] if isinstance(wanted, str) else wanted):
+                code = dictionary.codes.get(value)
+                if code is not None:
+                    table[code] = True
+            tables[name] = table
+        return tables
+    
+    @staticmethod
+    def _parse_metric(spec: str) -> Tuple[str, str, Optional[str], Optional[float]]:
+        """Split 'count', 'mean:score' or 'p95:response_ms' into (name, function, column, quantile)."""
+        match = METRIC_PATTERN.match(spec)
+        if not match or (match.group(1) == 'count') != (match.group(2) is None):
+            raise ValueError(f"Invalid metric {spec!r}; use count, sum|mean|min|max|pNN:column")
+        function, column = match.groups()
+        if column is not None and column not in NUMERIC:
+            raise ValueError(f"Cannot aggregate {column}; numeric columns are {', '.join(NUMERIC)}")
+        name = function if column is None else f"{function}_{column}"
+        if function == 'min':
+            return name, 'quantile', column, 0.0
+        if function == 'max':
+            return name, 'quantile', column, 1.0
+        if function.startswith('p'):
+            q = float(function[1:]) / 100
+            return name, 'quantile', column, q
+        return name, function, column, None
+    
+    def _radix(self, group_by: Sequence[str], selected: List[Tuple[Chunk, Any]], start: Optional[float],
+               end: Optional[float]) -> List[Tuple[str, int, int]]:
+        """(column, offset, size) for each grouping column of the combined group key."""
+        if selected:
+            first = min(chunk.min_ts for chunk, _ in selected)
+            last = max(chunk.max_ts for chunk, _ in selected)
+            first = first if start is None else max(first, start)
+            last = last if end is None else min(last, end)
+        radix = []
+        for name in group_by:
+            if name in CATEGORICAL:
+                radix.append((name, 0, max(len(self.dictionaries[name]), 1)))
+            elif not selected:
+                radix.append((name, 0, 1))
+            else:
+                # Time buckets are numbered from the earliest one selected
+                width = TIME_BUCKETS[name]
+                offset = math.floor(first / width)
+                radix.append((name, offset, math.floor(last / width) - offset + 1))
+        return radix
+    
+    @staticmethod
+    def _group_key(chunk: Chunk, rows: Any, radix: List[Tuple[str, int, int]], slots: int) -> np.ndarray:
+        """Combined mixed-radix group key of the selected rows."""
+        dtype = np.int32 if slots < 1 << 31 else np.int64
+        key = None
+        for name, offset, size in radix:
+            if name in CATEGORICAL:
+                part = chunk.column(name)[rows]
+            else:
+                # Rows are no earlier than the first bucket, so truncation floors
+                width = TIME_BUCKETS[name]
+                part = (chunk.column('timestamp')[rows] - offset * width) / width
+            part = part.astype(dtype, copy=False)
+            key = part if key is None else key * size + part
+        if key is None:
+            return np.zeros(chunk.length if isinstance(rows, slice) else np.count_nonzero(rows), dtype=dtype)
+        return key
+    
+    @staticmethod
+    def _quantiles(keys: np.ndarray, data: np.ndarray, slots: int, qs: List[float]) -> np.ndarray:
+        """Quantiles qs of data per group slot, NaN where a group has no values."""
+        valid = ~np.isnan(data)
+        if not valid.all():
+            keys, data = keys[valid], data[valid]
+        out = np.full((slots, len(qs)), np.nan)
+        counts = np.bincount(keys, minlength=slots)
+        if slots > 1:
+            # Stable sort of small integer keys is a linear-time radix sort
+            order = np.argsort(keys.astype(np.uint16) if slots <= 1 << 16 else keys, kind='stable')
+            data = data[order]
+        bounds = np.concatenate(([0], np.cumsum(counts)))
+        qs = np.asarray(qs)
+        for slot in np.flatnonzero(counts).tolist():
+            # A full sort beats partitioning around several ranks
+            values = np.sort(data[bounds[slot]:bounds[slot + 1]])
+            # Linear interpolation between closest ranks, as numpy.quantile
+            position = qs * (len(values) - 1)
+            lower = np.floor(position).astype(np.intp)
+            upper = np.minimum(lower + 1, len(values) - 1)
+            low, high = values[lower].astype(np.float64), values[upper].astype(np.float64)
+            out[slot] = low + (high - low) * (position - lower)
+        return out
+    
+    def query(self, start: Optional[float] = None, end: Optional[float] = None,
+              where: Optional[Dict[str, Any]] = None, group_by: Sequence[str] = (),
+              metrics: Sequence[str] = ('count',)) -> List[Dict[str, Any]]:
+        """
+        Filter, group and aggregate stored threats.
+        
+        Args:
+            start: Only threats at or after this epoch second
+            end: Only threats before this epoch second
+            where: Categorical filters, column -> value or list of values
+            group_by: Categorical columns and/or minute, hour, day
+            metrics: 'count' and aggregates such as 'mean:score',
+                'p95:response_ms' or 'max:score'; NaN values are ignored
+        
+        Returns:
+            One row per non-empty group with the group values and metrics,
+            ordered by group
+        
+        Raises:
+            ValueError: Unknown column or metric
+        """
+        for name in group_by:
+            if name not in CATEGORICAL and name not in TIME_BUCKETS:
+                raise ValueError(f"Cannot group by {name}; use {', '.join(CATEGORICAL + tuple(TIME_BUCKETS))}")
+        parsed = [self._parse_metric(spec) for spec in metrics]
+        selected = list(self._masks(start, end, self._where(where)))
+        if not selected:
+            return []
+        
+        radix = self._radix(group_by, selected, start, end)
+        slots = 1
+        for _, _, size in radix:
+            slots *= size
+        sums = [(name, function, column) for name, function, column, _ in parsed if function in ('sum', 'mean')]
+        quantiles: Dict[str, List[Tuple[str, float]]] = {}
+        for name, function, column, q in parsed:
+            if function == 'quantile':
+                quantiles.setdefault(column, []).append((name, q))
+        
+        if slots <= DENSE_GROUPS:
+            # Count and sum chunk by chunk into dense per-group arrays
+            counts = np.zeros(slots, dtype=np.int64)
+            totals = {column: (np.zeros(slots), np.zeros(slots)) for _, _, column in sums}
+            keys, data = [], {column: [] for column in quantiles}
+            for chunk, rows in selected:
+                key = self._group_key(chunk, rows, radix, slots)
+                counts_chunk = np.bincount(key, minlength=slots)
+                counts += counts_chunk
+                for column, (total, valid_count) in totals.items():
+                    values = chunk.column(column)[rows]
+                    if chunk.missing[column]:
+                        valid = ~np.isnan(values)
+                        total += np.bincount(key, weights=np.where(valid, values, 0), minlength=slots)
+                        valid_count += np.bincount(key, weights=valid, minlength=slots)
+                    else:
+                        total += np.bincount(key, weights=values, minlength=slots)
+                        valid_count += counts_chunk
+                if quantiles:
+                    keys.append(key)
+                    for column in quantiles:
+                        data[column].append(chunk.column(column)[rows])
+            present = groups = np.flatnonzero(counts)
+            key = np.concatenate(keys) if quantiles else None
+            data = {column: np.concatenate(parts) for column, parts in data.items()}
+        else:
+            # Too many possible groups to count densely: renumber the ones present
+            key = np.concatenate([self._group_key(chunk, rows, radix, slots) for chunk, rows in selected])
+            present, key = np.unique(key, return_inverse=True)
+            key = key.reshape(-1)
+            slots = len(present)
+            groups = slice(None)
+            counts = np.bincount(key, minlength=slots)
+            data = {column: np.concatenate([chunk.column(column)[rows] for chunk, rows in selected])
+                    for column in set(quantiles) | {column for _, _, column in sums}}
+            totals = {}
+            for _, _, column in sums:
+                valid = ~np.isnan(data[column])
+                totals[column] = (np.bincount(key, weights=np.where(valid, data[column], 0), minlength=slots),
+                                  np.bincount(key, weights=valid, minlength=slots))
+        
+        results: Dict[str, np.ndarray] = {}
+        for name, function, column, _ in parsed:
+            if function == 'count':
+                results[name] = counts[groups]
+            elif function == 'sum':
+                results[name] = totals[column][0][groups]
+            elif function == 'mean':
+                with np.errstate(invalid='ignore'):
+                    results[name] = totals[column][0][groups] / totals[column][1][groups]
+        for column, wanted in quantiles.items():
+            values = self._quantiles(key, data[column], slots, [q for _, q in wanted])[groups]
+            for i, (name, _) in enumerate(wanted):
+                results[name] = values[:, i]
+        
+        decoded = []
+        remaining = present.astype(np.int64)
+        for name, offset, size in reversed(radix):
+            part = remaining % size
+            remaining = remaining // size
+            if name in CATEGORICAL:
+                dictionary = self.dictionaries[name].values
+                decoded.append((name, [dictionary[code] for code in part.tolist()]))
+            else:
+                decoded.append((name, ((part + offset) * TIME_BUCKETS[name]).tolist()))
+        decoded.reverse()
+        
+        metric_values = [(name, results[name].tolist()) for name, _, _, _ in parsed]
+        rows = []
+        for i in range(len(present)):
+            row = {name: values[i] for name, values in decoded}
+            for name, values in metric_values:
+                value = values[i]
+                row[name] = None if value != value else value
+            rows.append(row)
+        return rows
+    
+    def scan(self, start: Optional[float] = None, end: Optional[float] = None, since: int = 0,
+             until: Optional[int] = None, batch_rows: int = 65536) -> Iterator[Dict[str, np.ndarray]]:
+        """
+        Stored rows in append order, as batches of column arrays.
+        
+        The rows to read are fixed when scan() is called, so the batches can
+        be consumed from another thread while appends continue. Categorical
+        columns are codes into `dictionaries`, which only ever grow.
+        
+        Args:
+            start: Only threats at or after this epoch second
+            end: Only threats before this epoch second
+            since: Only rows at or after this position
+            until: Only rows before this position, defaults to `position`
+            batch_rows: Most rows per batch
+        
+        Returns:
+            Iterator of {column: array} batches
+        """
+        until = self.position if until is None else until
+        chunks = [(chunk, chunk.length) for chunk in self.chunks]
+        return self._scan(chunks, self.dropped, start, end, since, until, batch_rows)
+    
+    @staticmethod
+    def _scan(chunks: List[Tuple[Chunk, int]], base: int, start: Optional[float], end: Optional[float],
+              since: int, until: int, batch_rows: int) -> Iterator[Dict[str, np.ndarray]]:
+        names = ('timestamp',) + CATEGORICAL + NUMERIC
+        for chunk, length in chunks:
+            first, last = max(since - base, 0), min(until - base, length)
+            base += length
+            if first >= last:
+                continue
+            if (start is not None and chunk.max_ts < start) or (end is not None and chunk.min_ts >= end):
+                continue
+            filtered = (start is not None and chunk.min_ts < start) or (end is not None and chunk.max_ts >= end)
+            for offset in range(first, last, batch_rows):
+                rows = slice(offset, min(offset + batch_rows, last))
+                batch = {name: chunk.column(name)[rows] for name in names}
+                if filtered:
+                    timestamps = batch['timestamp']
+                    mask = np.ones(len(timestamps), dtype=bool)
+                    if start is not None:
+                        mask &= timestamps >= start
+                    if end is not None:
+                        mask &= timestamps < end
+                    if not mask.any():
+                        continue
+                    batch = {name: array[mask] for name, array in batch.items()}
+                yield batch
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Get store statistics.
+        
+        Returns:
+            Row, chunk and dictionary sizes and memory held by the columns
+        """
+        return {
+            "rows": self.rows,
+            "chunks": len(self.chunks),
+            "dropped_rows": self.dropped,
+            "distinct": {name: len(dictionary) for name, dictionary in self.dictionaries.items()},
+            "column_bytes": sum(chunk.timestamp.nbytes + sum(array.nbytes for array in chunk.codes.values())
+                                + sum(array.nbytes for array in chunk.values.values()) for chunk in self.chunks)
+        }
@@ -0,0 +1,488 @@
+"""
+Columnar Trust Score Table
+"""
+
+import hashlib
+import logging
+import time
+from collections.abc import Mapping
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Iterator, Sequence
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+# Verification factors in column order
+TRUST_FACTORS = ('credentials', 'device', 'location', 'behavior')
+
+# Documented trust formula weights
+DEFAULT_TRUST_WEIGHTS = {
+    'credentials': 0.30,
+    'device': 0.25,
+    'location': 0.20,
+    'behavior': 0.25
+}
+
+_DEVICE_COLUMN = TRUST_FACTORS.index('device')
+
+
+def session_key(user_id: str) -> int:
+    """Stable 64-bit key for a user ID, used by the restored-session index."""
+    return int.from_bytes(hashlib.blake2b(user_id.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def weighted_trust_score(factors: Dict[str, float], weights: Dict[str, float]) -> float:
+    """
+    Calculate the weighted trust score for a single session.
+    
+    Args:
+        factors: Factor name -> score
+        weights: Factor name -> weight
+    
+    Returns:
+        Trust score
+    """
+    return sum(factors[name] * weights[name] for name in TRUST_FACTORS)
+
+
+class TrustScoreTable(Mapping):
+    """
+    Trust state for active sessions held as NumPy columns.
+    
+    Each verification factor, the score, the verification timestamp and the
+    device class are stored in their own contiguous array, so re-scoring the
+    whole population after a weight, threshold or device-class change is a
+    single vectorized pass. The table also behaves as a read-only mapping of
+    user_id -> trust record for per-user lookups.
+    """
+    
+    def __init__(self, capacity: int = 1024):
+        """
+        Initialize trust score table.
+        
+        Args:
+            capacity: Initial number of session rows to allocate
+        """
+        self._capacity = max(1, capacity)
+        self._size = 0
+        self._factors = np.zeros((len(TRUST_FACTORS), self._capacity), dtype=np.float32)
+        self._scores = np.zeros(self._capacity, dtype=np.float32)
+        self._timestamps = np.zeros(self._capacity, dtype=np.float64)
+        self._device_class = np.zeros(self._capacity, dtype=np.int32)
+        self._verified = np.zeros(self._capacity, dtype=bool)
+        self._requires_mfa = np.zeros(self._capacity, dtype=bool)
+        
+        self._user_ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        
+        # Sessions restored in bulk are indexed by a sorted array of session
+        # keys instead of the dict, so restoring millions of rows does not pay
+        # for millions of dict inserts.
+        self._restored_keys = np.empty(0, dtype=np.uint64)
+        self._restored_rows = np.empty(0, dtype=np.int64)
+        
+        # Bumped whenever rows move, so a recompute computed off-thread can
+        # tell whether its row numbers are still valid
+        self._layout = 0
+        
+        # Dictionary-encoded device classes; code 0 is "unknown"
+        self._device_classes: Dict[str, int] = {'': 0}
+        self._device_flags = np.full(1, np.nan, dtype=np.float32)
+    
+    # Mapping interface
+    
+    def __getitem__(self, user_id: str) -> Dict[str, Any]:
+        row = self._row(user_id)
+        if row is None:
+            raise KeyError(user_id)
+        return {
+            'score': float(self._scores[row]),
+            'timestamp': datetime.utcfromtimestamp(self._timestamps[row]),
+            'verified': bool(self._verified[row]),
+            'requires_mfa': bool(self._requires_mfa[row]),
+            'factors': {
+                name: float(self._factors[i, row]) for i, name in enumerate(TRUST_FACTORS)
+            }
+        }
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._user_ids)
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def __contains__(self, user_id: object) -> bool:
+        return isinstance(user_id, str) and self._row(user_id) is not None
+    
+    # Storage
+    
+    def _restored_position(self, user_id: str) -> Optional[int]:
+        """Position of a user ID in the restored-session index."""
+        keys = self._restored_keys
+        if not len(keys):
+            return None
+        
+        key = np.uint64(session_key(user_id))
+        pos = int(np.searchsorted(keys, key))
+        while pos < len(keys) and keys[pos] == key:
+            row = self._restored_rows[pos]
+            if row >= 0 and self._user_ids[row] == user_id:
+                return pos
+            pos += 1
+        return None
+    
+    def _row(self, user_id: str) -> Optional[int]:
+        """Row holding a user's session, if any."""
+        row = self._index.get(user_id)
+        if row is not None:
+            return row
+        
+        pos = self._restored_position(user_id)
+        return None if pos is None else int(self._restored_rows[pos])
+    
+    def _set_row(self, user_id: str, row: int):
+        """Point an existing session's index entry at a new row."""
+        if user_id in self._index:
+            self._index[user_id] = row
+        else:
+            self._restored_rows[self._restored_position(user_id)] = row
+    
+    def _grow(self, minimum: int):
+        """Grow column arrays to hold at least `minimum` rows."""
+        capacity = self._capacity
+        while capacity < minimum:
+            capacity *= 2
+        if capacity == self._capacity:
+            return
+        
+        factors = np.zeros((len(TRUST_FACTORS), capacity), dtype=np.float32)
+        factors[:, :self._size] = self._factors[:, :self._size]
+        self._factors = factors
+        
+        for name in ('_scores', '_timestamps', '_device_class', '_verified', '_requires_mfa'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+        
+        self._capacity = capacity
+    
+    def _device_code(self, device_class: Optional[str]) -> int:
+        """Dictionary-encode a device class."""
+        key = device_class or ''
+        code = self._device_classes.get(key)
+        if code is None:
+            code = len(self._device_classes)
+            self._device_classes[key] = code
+            self._device_flags = np.append(self._device_flags, np.float32(np.nan))
+        return code
+    
+    def upsert(self, user_id: str, factors: Dict[str, float], score: float,
+               verified: bool, requires_mfa: bool, timestamp: Optional[float] = None,
+               device_class: Optional[str] = None):
+        """
+        Insert or update a session's trust state.
+        
+        Args:
+            user_id: User identifier
+            factors: Factor name -> score
+            score: Trust score
+            verified: Whether the session passed verification
+            requires_mfa: Whether the session requires MFA
+            timestamp: Verification time (epoch seconds, default: now)
+            device_class: Device class used for device-wide flags
+        """
+        row = self._row(user_id)
+        if row is None:
+            row = self._size
+            if row >= self._capacity:
+                self._grow(row + 1)
+            self._index[user_id] = row
+            self._user_ids.append(user_id)
+            self._size += 1
+        
+        for i, name in enumerate(TRUST_FACTORS):
+            self._factors[i, row] = factors[name]
+        self._scores[row] = score
+        self._timestamps[row] = time.time() if timestamp is None else timestamp
+        self._device_class[row] = self._device_code(device_class)
+        self._verified[row] = verified
+        self._requires_mfa[row] = requires_mfa
+    
+    def bulk_load(self, user_ids: Sequence[str], factors: np.ndarray, scores: np.ndarray,
+                  timestamps: np.ndarray, thresholds: Dict[str, float],
+                  device_classes: Optional[Sequence[Optional[str]]] = None,
+                  keys: Optional[np.ndarray] = None):
+        """
+        Load many sessions at once (e.g. on restore).
+        
+        Args:
+            user_ids: User identifiers
+            factors: Array of shape (len(TRUST_FACTORS), n)
+            scores: Trust scores
+            timestamps: Verification times (epoch seconds)
+            thresholds: Trust decision thresholds
+            device_classes: Device class per session (default: existing
+                sessions keep theirs, new ones are "unknown")
+            keys: Sorted session_key() values for user_ids; when given, rows
+                are indexed by key instead of through the dict
+        """
+        n = len(user_ids)
+        if self._size:
+            for j, user_id in enumerate(user_ids):
+                row = self._row(user_id)
+                code = self._device_class[row] if row is not None else 0
+                score = float(scores[j])
+                self.upsert(
+                    user_id,
+                    {name: float(factors[i, j]) for i, name in enumerate(TRUST_FACTORS)},
+                    score,
+                    score >= thresholds['verified'],
+                    score < thresholds['requires_mfa'],
+                    float(timestamps[j]),
+                    device_classes[j] if device_classes is not None else None
+                )
+                if device_classes is None:
+                    self._device_class[self._row(user_id)] = code
+            return
+        
+        self._grow(n)
+        self._factors[:, :n] = factors
+        self._scores[:n] = scores
+        self._timestamps[:n] = timestamps
+        if device_classes is not None:
+            self._device_class[:n] = [self._device_code(c) for c in device_classes]
+        else:
+            self._device_class[:n] = 0
+        self._verified[:n] = self._scores[:n] >= thresholds['verified']
+        self._requires_mfa[:n] = self._scores[:n] < thresholds['requires_mfa']
+        self._user_ids = list(user_ids)
+        if keys is not None:
+            self._restored_keys = np.asarray(keys, dtype=np.uint64)
+            self._restored_rows = np.arange(n, dtype=np.int64)
+        else:
+            self._index = dict(zip(self._user_ids, range(n)))
+        self._size = n
+        self._layout += 1
+    
+    def remove(self, user_id: str) -> bool:
+        """Remove a session by moving the last row into its slot."""
+        row = self._index.pop(user_id, None)
+        if row is None:
+            pos = self._restored_position(user_id)
+            if pos is None:
+                return False
+            row = int(self._restored_rows[pos])
+            self._restored_rows[pos] = -1
+        
+        last = self._size - 1
+        if row != last:
+            moved = self._user_ids[last]
+            self._factors[:, row] = self._factors[:, last]
+            for name in ('_scores', '_timestamps', '_device_class', '_verified', '_requires_mfa'):
+                column = getattr(self, name)
+                column[row] = column[last]
+            self._user_ids[row] = moved
+            self._set_row(moved, row)
+        
+        self._user_ids.pop()
+        self._size = last
+        self._layout += 1
+        return True
+    
+    def verified_before(self, cutoff: float) -> Dict[str, float]:
+        """Map user_id -> verification time for sessions last verified before `cutoff`."""
+        rows = np.flatnonzero(self._timestamps[:self._size] < cutoff)
+        return {self._user_ids[row]: float(self._timestamps[row]) for row in rows}
+    
+    def evict_before(self, cutoff: float) -> int:
+        """
+        Drop sessions last verified before `cutoff`.
+        
+        Args:
+            cutoff: Epoch seconds
+        
+        Returns:
+            Number of sessions evicted
+        """
+        n = self._size
+        keep = self._timestamps[:n] >= cutoff
+        evicted = n - int(np.count_nonzero(keep))
+        if not evicted:
+            return 0
+        
+        kept = np.flatnonzero(keep)
+        m = len(kept)
+        self._factors[:, :m] = self._factors[:, kept]
+        for name in ('_scores', '_timestamps', '_device_class', '_verified', '_requires_mfa'):
+            column = getattr(self, name)
+            column[:m] = column[kept]
+        self._user_ids = [self._user_ids[i] for i in kept]
+        
+        remap = np.full(n, -1, dtype=np.int64)
+        remap[kept] = np.arange(m)
+        if len(self._restored_rows):
+            live = self._restored_rows >= 0
+            self._restored_rows[live] = remap[self._restored_rows[live]]
+        self._index = {
+            uid: int(remap[row]) for uid, row in self._index.items() if remap[row] >= 0
+        }
+        self._size = m
+        self._layout += 1
+        return evicted
+    
+    def columns(self) -> Dict[str, np.ndarray]:
+        """Get views of the live column data."""
+        n = self._size
+        return {
+            'factors': self._factors[:, :n],
+            'scores': self._scores[:n],
+            'timestamps': self._timestamps[:n]
+        }
+    
+    @property
+    def user_ids(self) -> List[str]:
+        """User identifiers in row order."""
+        return self._user_ids
+    
+    # Device-class flags
+    
+    def flag_device_class(self, device_class: str, device_score: float):
+        """Override the device factor for every session of a device class."""
+        self._device_flags[self._device_code(device_class)] = device_score
+    
+    def device_flag(self, device_class: Optional[str]) -> Optional[float]:
+        """Device factor override for a device class, if it is flagged."""
+        code = self._device_classes.get(device_class or '')
+        if code is None or np.isnan(self._device_flags[code]):
+            return None
+        return float(self._device_flags[code])
+    
+    def clear_device_flag(self, device_class: str):
+        """Remove a device-class override."""
+        code = self._device_classes.get(device_class)
+        if code is not None:
+            self._device_flags[code] = np.nan
+    
+    # Recomputation
+    
+    def recompute(self, weights: Dict[str, float], thresholds: Dict[str, float]) -> Dict[str, Any]:
+        """
+        Re-score every session in one vectorized pass.
+        
+        Args:
+            weights: Factor name -> weight
+            thresholds: Trust decision thresholds ('verified', 'requires_mfa')
+        
+        Returns:
+            Sessions whose verified or requires_mfa state changed
+        """
+        state = self.begin_recompute()
+        return self.apply_scores(state, self.score_rows(state, weights), thresholds)
+    
+    def begin_recompute(self) -> Dict[str, Any]:
+        """
+        Capture what an off-thread re-score needs.
+        
+        Must run on the thread that writes the table. Factor columns are
+        referenced, not copied; rows written while scoring runs are detected
+        through their timestamps and skipped by apply_scores.
+        """
+        n = self._size
+        return {
+            'size': n,
+            'layout': self._layout,
+            'factors': self._factors[:, :n],
+            'device_class': self._device_class[:n],
+            'device_flags': self._device_flags.copy(),
+            'timestamps': self._timestamps[:n].copy()
+        }
+    
+    @staticmethod
+    def score_rows(state: Dict[str, Any], weights: Dict[str, float]) -> np.ndarray:
+        """
+        Compute scores for captured rows. Safe to run on a worker thread.
+        
+        Args:
+            state: Result of begin_recompute()
+            weights: Factor name -> weight
+        
+        Returns:
+            Scores in row order
+        """
+        factors = state['factors']
+        w = np.array([weights[name] for name in TRUST_FACTORS], dtype=np.float32)
+        
+        scores = w @ factors
+        
+        flags = state['device_flags']
+        if not np.isnan(flags).all():
+            override = flags[state['device_class']]
+            flagged = ~np.isnan(override)
+            if flagged.any():
+                scores[flagged] += w[_DEVICE_COLUMN] * (
+                    override[flagged] - factors[_DEVICE_COLUMN, flagged]
+                )
+        
+        return scores
+    
+    def apply_scores(self, state: Dict[str, Any], scores: np.ndarray,
+                     thresholds: Dict[str, float]) -> Optional[Dict[str, Any]]:
+        """
+        Write re-scored rows back and report threshold crossings.
+        
+        Must run on the thread that writes the table. Rows re-verified since
+        begin_recompute() already carry a fresh score and are left alone.
+        
+        Args:
+            state: Result of begin_recompute()
+            scores: Result of score_rows()
+            thresholds: Trust decision thresholds ('verified', 'requires_mfa')
+        
+        Returns:
+            Sessions whose verified or requires_mfa state changed, or None if
+            rows were removed or moved meanwhile and the re-score must be redone
+        """
+        if state['layout'] != self._layout:
+            return None
+        
+        n = state['size']
+        unchanged = self._timestamps[:n] == state['timestamps']
+        
+        verified = scores >= thresholds['verified']
+        requires_mfa = scores < thresholds['requires_mfa']
+        
+        old_verified = self._verified[:n]
+        old_mfa = self._requires_mfa[:n]
+        
+        crossings = {
+            'verified_lost': np.flatnonzero(unchanged & old_verified & ~verified),
+            'verified_gained': np.flatnonzero(unchanged & ~old_verified & verified),
+            'mfa_required': np.flatnonzero(unchanged & ~old_mfa & requires_mfa),
+            'mfa_cleared': np.flatnonzero(unchanged & old_mfa & ~requires_mfa)
+        }
+        
+        if unchanged.all():
+            self._scores[:n] = scores
+            self._verified[:n] = verified
+            self._requires_mfa[:n] = requires_mfa
+        else:
+            rows = np.flatnonzero(unchanged)
+            self._scores[rows] = scores[rows]
+            self._verified[rows] = verified[rows]
+            self._requires_mfa[rows] = requires_mfa[rows]
+        
+        user_ids = self._user_ids
+        result = {
+            name: [user_ids[i] for i in rows] for name, rows in crossings.items()
+        }
+        result['sessions'] = n
+        
+        logger.debug(
+            f"Re-scored {n} sessions: "
+            + ", ".join(f"{name}={len(rows)}" for name, rows in crossings.items())
+        )
+        
+        return result
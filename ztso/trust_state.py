@@ -0,0 +1,340 @@
+"""
+Persistent Trust-State Snapshots
+"""
+
+import logging
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+import numpy as np
+
+from .trust import TrustScoreTable, TRUST_FACTORS, session_key
+
+logger = logging.getLogger(__name__)
+
+
+# Compacted snapshot: header, fixed-size records sorted by session key, then
+# NUL-joined user IDs in the same order
+SNAPSHOT_MAGIC = b'ZTTS'
+SNAPSHOT_HEADER = struct.Struct('<4sBQQ')  # magic, version, count, uid blob length
+SNAPSHOT_RECORD = np.dtype([
+    ('key', '<u8'),
+    ('timestamp', '<f8'),
+    ('score', '<f4'),
+    ('factors', '<f4', (len(TRUST_FACTORS),))
+])
+
+# Append-only log: header, then variable-size records
+LOG_MAGIC = b'ZTTL\x01'
+LOG_RECORD = struct.Struct('<d' + 'f' * (1 + len(TRUST_FACTORS)) + 'H')
+
+# User IDs must fit the log's length field and must not contain the
+# snapshot's NUL separator
+MAX_USER_ID_BYTES = 0xFFFF
+
+FORMAT_VERSION = 1
+
+
+class TrustStateStore:
+    """
+    Durable trust state for fast restarts.
+    
+    Every verification is appended to a log by a background writer thread;
+    the log is periodically compacted into a snapshot file laid out so it can
+    be memory-mapped and loaded as NumPy arrays in one pass.
+    """
+    
+    def __init__(self, config: Dict[str, Any]):
+        """
+        Initialize trust state store.
+        
+        Args:
+            config: Configuration dictionary
+        """
+        self.config = config
+        self.directory = config.get('trust_state_path', 'data/trust_state')
+        self.snapshot_path = os.path.join(self.directory, 'trust.snap')
+        self.log_path = os.path.join(self.directory, 'trust.log')
+        
+        self.flush_interval = config.get('trust_state_flush_interval', 1.0)
+        self.compact_interval = config.get('trust_state_compact_interval', 300)
+        self.compact_threshold = config.get('trust_state_compact_threshold', 1_000_000)
+        self.batch_size = config.get('trust_state_batch_size', 65536)
+        self.max_age = config.get('continuous_auth_interval', 300)
+        
+        self._queue = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._log_file = None
+        self._log_records = 0
+        self._last_compaction = time.monotonic()
+        
+        self.stats = {
+            'records_written': 0,
+            'compactions': 0,
+            'last_compaction_ms': 0.0,
+            'last_load_ms': 0.0,
+            'loaded': 0,
+            'skipped_expired': 0,
+            'dropped': 0,
+            'rejected': 0
+        }
+    
+    def start(self):
+        """Start the background writer thread."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._log_file = self._open_log()
+        self._thread = threading.Thread(
+            target=self._run, name="ztso-trust-state", daemon=True
+        )
+        self._thread.start()
+        logger.info(f"Trust state persistence enabled at {self.directory}")
+    
+    def stop(self):
+        """Flush pending records and stop the writer thread."""
+        if not self._thread:
+            return
+        self._queue.put(None)
+        self._thread.join()
+        self._thread = None
+        self._log_file.close()
+        self._log_file = None
+    
+    def record(self, user_id: str, timestamp: float, score: float, factors: Dict[str, float]):
+        """
+        Queue a trust update for persistence. Never blocks.
+        
+        Updates are dropped (and counted) while the writer is not running,
+        and rejected if the user ID cannot be stored.
+        
+        Args:
+            user_id: User identifier
+            timestamp: Verification time (epoch seconds)
+            score: Trust score
+            factors: Factor name -> score
+        """
+        if self._thread is None:
+            self.stats['dropped'] += 1
+            return
+        if '\x00' in user_id or len(user_id.encode('utf-8')) > MAX_USER_ID_BYTES:
+            self.stats['rejected'] += 1
+            logger.warning(f"Not persisting trust state for unstorable user ID {user_id[:64]!r}")
+            return
+        self._queue.put((user_id, timestamp, score, tuple(factors[name] for name in TRUST_FACTORS)))
+    
+    # Writer thread
+    
+    def _open_log(self):
+        """Open the log for appending, writing its header if new."""
+        log_file = open(self.log_path, 'ab')
+        if log_file.tell() == 0:
+            log_file.write(LOG_MAGIC)
+            log_file.flush()
+        return log_file
+    
+    def _run(self):
+        """Drain the queue in batches, append to the log and compact."""
+        running = True
+        while running:
+            batch = []
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+                while item is not None:
+                    batch.append(item)
+                    if len(batch) >= self.batch_size:
+                        break
+                    item = self._queue.get_nowait()
+                else:
+                    running = False
+            except queue.Empty:
+                pass
+            
+            if batch:
+                self._append(batch)
+            
+            due = time.monotonic() - self._last_compaction >= self.compact_interval
+            if self._log_records and (due or self._log_records >= self.compact_threshold):
+                try:
+                    self.compact()
+                except Exception as e:
+                    logger.error(f"Trust state compaction failed: {e}")
+    
+    def _append(self, batch: List[Tuple]):
+        """Append a batch of records to the log."""
+        parts = []
+        for user_id, timestamp, score, factors in batch:
+            uid = user_id.encode('utf-8')
+            parts.append(LOG_RECORD.pack(timestamp, score, *factors, len(uid)))
+            parts.append(uid)
+        self._log_file.write(b''.join(parts))
+        self._log_file.flush()
+        self._log_records += len(batch)
+        self.stats['records_written'] += len(batch)
+    
+    def compact(self):
+        """
+        Merge the log into a new snapshot and truncate the log.
+        
+        Runs on the writer thread; request handlers keep queueing meanwhile.
+        """
+        started = time.perf_counter()
+        
+        user_ids, records = self._read_snapshot(time.time() - self.max_age)
+        latest = self._read_log(time.time() - self.max_age)
+        
+        if latest:
+            if user_ids:
+                keep = np.fromiter((uid not in latest for uid in user_ids), dtype=bool, count=len(user_ids))
+                user_ids = [uid for uid, k in zip(user_ids, keep) if k]
+                records = records[keep]
+            
+            log_records = np.empty(len(latest), dtype=SNAPSHOT_RECORD)
+            log_fields = np.array(list(latest.values()), dtype=np.float64)
+            log_records['key'] = np.fromiter((session_key(uid) for uid in latest), dtype=np.uint64, count=len(latest))
+            log_records['timestamp'] = log_fields[:, 0]
+            log_records['score'] = log_fields[:, 1]
+            log_records['factors'] = log_fields[:, 2:]
+            
+            records = np.concatenate([records, log_records])
+            user_ids = user_ids + list(latest)
+            order = np.argsort(records['key'], kind='stable')
+            records = records[order]
+            user_ids = [user_ids[i] for i in order]
+        
+        tmp_path = self.snapshot_path + '.tmp'
+        blob = '\x00'.join(user_ids).encode('utf-8')
+        
+        with open(tmp_path, 'wb') as f:
+            f.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, FORMAT_VERSION, len(user_ids), len(blob)))
+            f.write(records.tobytes())
+            f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.snapshot_path)
+        
+        # Records appended after the read above are still queued, so the log
+        # can be truncated safely.
+        reopen = self._log_file is not None
+        if reopen:
+            self._log_file.close()
+        with open(self.log_path, 'wb') as f:
+            f.write(LOG_MAGIC)
+        if reopen:
+            self._log_file = self._open_log()
+        self._log_records = 0
+        self._last_compaction = time.monotonic()
+        
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats['compactions'] += 1
+        self.stats['last_compaction_ms'] = elapsed_ms
+        logger.debug(f"Compacted trust state: {len(user_ids)} entries in {elapsed_ms:.1f} ms")
+    
+    # Loading
+    
+    def _read_snapshot(self, cutoff: float) -> Tuple[List[str], np.ndarray]:
+        """Map the snapshot file and return unexpired user IDs and records."""
+        if not os.path.exists(self.snapshot_path) or os.path.getsize(self.snapshot_path) == 0:
+            return [], np.empty(0, dtype=SNAPSHOT_RECORD)
+        
+        with open(self.snapshot_path, 'rb') as f, \
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            magic, version, count, blob_len = SNAPSHOT_HEADER.unpack_from(mm, 0)
+            if magic != SNAPSHOT_MAGIC or version != FORMAT_VERSION:
+                raise ValueError(f"Unrecognized trust snapshot: {self.snapshot_path}")
+            
+            offset = SNAPSHOT_HEADER.size
+            records = np.frombuffer(mm, dtype=SNAPSHOT_RECORD, count=count, offset=offset)
+            keep = records['timestamp'] >= cutoff
+            kept = records[keep]
+            del records
+            
+            blob_offset = offset + count * SNAPSHOT_RECORD.itemsize
+            user_ids = mm[blob_offset:blob_offset + blob_len].decode('utf-8').split('\x00') if count else []
+        
+        if not keep.all():
+            user_ids = [uid for uid, k in zip(user_ids, keep) if k]
+        self.stats['skipped_expired'] += count - len(user_ids)
+        
+        return user_ids, kept
+    
+    def _read_log(self, cutoff: float) -> Dict[str, Tuple]:
+        """Replay the log, keeping the latest unexpired record per user."""
+        latest = {}
+        if not os.path.exists(self.log_path):
+            return latest
+        
+        with open(self.log_path, 'rb') as f:
+            data = f.read()
+        if not data.startswith(LOG_MAGIC):
+            raise ValueError(f"Unrecognized trust log: {self.log_path}")
+        
+        offset = len(LOG_MAGIC)
+        end = len(data)
+        while offset + LOG_RECORD.size <= end:
+            fields = LOG_RECORD.unpack_from(data, offset)
+            offset += LOG_RECORD.size
+            uid_len = fields[-1]
+            if offset + uid_len > end:
+                break  # Torn final record from a crash
+            user_id = data[offset:offset + uid_len].decode('utf-8')
+            offset += uid_len
+            latest[user_id] = fields[:-1]
+        
+        expired = [uid for uid, fields in latest.items() if fields[0] < cutoff]
+        for uid in expired:
+            del latest[uid]
+        self.stats['skipped_expired'] += len(expired)
+        
+        return latest
+    
+    def load_into(self, table: TrustScoreTable, thresholds: Dict[str, float]) -> int:
+        """
+        Restore persisted trust state into a trust table.
+        
+        Args:
+            table: Destination table
+            thresholds: Trust decision thresholds
+        
+        Returns:
+            Number of sessions restored
+        """
+        started = time.perf_counter()
+        cutoff = time.time() - self.max_age
+        
+        user_ids, records = self._read_snapshot(cutoff)
+        table.bulk_load(
+            user_ids,
+            np.ascontiguousarray(records['factors'].T),
+            records['score'],
+            records['timestamp'],
+            thresholds,
+            keys=records['key']
+        )
+        
+        # Log entries are newer than the snapshot and few enough to upsert
+        latest = self._read_log(cutoff)
+        for user_id, (timestamp, score, *factors) in latest.items():
+            table.upsert(
+                user_id,
+                dict(zip(TRUST_FACTORS, factors)),
+                score,
+                score >= thresholds['verified'],
+                score < thresholds['requires_mfa'],
+                timestamp
+            )
+        
+        loaded = len(table)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        self.stats['loaded'] = loaded
+        self.stats['last_load_ms'] = elapsed_ms
+        logger.info(f"Restored {loaded} trust entries in {elapsed_ms:.1f} ms")
+        
+        return loaded
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get persistence statistics."""
+        return {"pending": self._queue.qsize(), **self.stats}
@@ -0,0 +1,105 @@
+"""
+Binary Wire Formats for the API
+"""
+
+import logging
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for application/msgpack bodies
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # optional: only needed for application/cbor bodies
+    cbor2 = None
+
+logger = logging.getLogger(__name__)
+
+
+JSON = 'application/json'
+OCTET_STREAM = 'application/octet-stream'
+MSGPACK = 'application/msgpack'
+CBOR = 'application/cbor'
+PARQUET = 'application/vnd.apache.parquet'
+ARROW_FILE = 'application/vnd.apache.arrow.file'
+
+# Aliases seen in the wild
+MEDIA_TYPE_ALIASES = {
+    'application/x-msgpack': MSGPACK,
+    'application/vnd.msgpack': MSGPACK,
+}
+
+# Response headers carrying metadata for raw binary bodies
+HEADER_PREFIX = 'X-ZTSO-'
+
+# Request header naming the recipient of a streamed octet-stream body (hex)
+PUBLIC_KEY_HEADER = HEADER_PREFIX + 'Public-Key'
+
+
+class UnsupportedMediaType(ValueError):
+    """Raised for media types we cannot decode or encode."""
+
+
+def media_type(header: Optional[str]) -> str:
+    """Normalize a Content-Type header to its bare media type."""
+    if not header:
+        return JSON
+    value = header.split(';', 1)[0].strip().lower()
+    return MEDIA_TYPE_ALIASES.get(value, value)
+
+
+def accepts(header: Optional[str], candidate: str) -> bool:
+    """Whether an Accept header explicitly lists a media type."""
+    if not header:
+        return False
+    return any(media_type(part) == candidate for part in header.split(','))
+
+
+def structured_codec(kind: str) -> Tuple[Callable[[bytes], Any], Callable[[Any], bytes]]:
+    """
+    Get (decode, encode) functions for a structured binary media type.
+    
+    Args:
+        kind: MSGPACK or CBOR
+    
+    Returns:
+        (decode, encode) tuple
+    """
+    if kind == MSGPACK:
+        if msgpack is None:
+            raise UnsupportedMediaType("msgpack is not installed on this server")
+        return (_strict(lambda body: msgpack.unpackb(body, raw=False)),
+                lambda value: msgpack.packb(value, use_bin_type=True))
+    if kind == CBOR:
+        if cbor2 is None:
+            raise UnsupportedMediaType("cbor2 is not installed on this server")
+        return _strict(cbor2.loads), cbor2.dumps
+    raise UnsupportedMediaType(f"Unsupported media type: {kind}")
+
+
+def _strict(decode: Callable[[bytes], Any]) -> Callable[[bytes], Any]:
+    """Wrap a decoder so every malformed body surfaces as ValueError."""
+    def wrapped(body: bytes) -> Any:
+        try:
+            return decode(body)
+        except ValueError:
+            raise
+        except Exception as e:
+            raise ValueError(f"Malformed body: {e}") from e
+    return wrapped
+
+
+def metadata_headers(metadata: Dict[str, Any]) -> Dict[str, str]:
+    """Flatten encryption metadata into X-ZTSO-* response headers."""
+    headers = {}
+    for key, value in metadata.items():
+        if isinstance(value, dict):
+            headers.update(metadata_headers(value))
+            continue
+        if isinstance(value, bool):
+            value = str(value).lower()
+        name = '-'.join(part.capitalize() for part in key.split('_'))
+        headers[HEADER_PREFIX + name] = str(value)
+    return headers
@@ -2,14 +2,83 @@
 Zero-Trust Policy Engine
 """
 
+import asyncio
 import logging
+import time
+import weakref
+from collections import deque, OrderedDict
+from types import MappingProxyType
 from typing import Dict, Any, List, Optional
 from datetime import datetime, timedelta
 import hashlib
 
+from .trust import TrustScoreTable, TRUST_FACTORS, DEFAULT_TRUST_WEIGHTS, weighted_trust_score
+from .telemetry import stage
+from .trust_state import TrustStateStore
+
 logger = logging.getLogger(__name__)
 
 
+# A few microseconds per call: timed sparsely, with the cycle's step bound once
+VERIFY_STAGE = stage('policy_verify', sample_every=64)
+VERIFY_TICK = VERIFY_STAGE.tick
+
+
+# Default zero-trust policy set
+DEFAULT_POLICIES = {
+    'continuous_authentication': True,
+    'least_privilege_access': True,
+    'micro_segmentation': True,
+    'device_trust_verification': True,
+    'context_aware_access': True
+}
+
+
+def _mark_snapshot_retired(stats: Dict[str, Any], version: int):
+    """Finalizer callback invoked once a snapshot has no remaining readers."""
+    stats['retired_snapshots'] += 1
+    logger.debug(f"Retired policy snapshot v{version}")
+
+
+class PolicySnapshot:
+    """
+    Immutable, versioned view of the compiled policy set.
+    
+    Request handlers read the engine's current snapshot reference once and
+    use it for the whole request, so a concurrent reload can never expose a
+    half-updated policy set.
+    """
+    
+    __slots__ = ('version', 'policies', 'active_policies', 'thresholds', 'weights',
+                 'created_at', '__weakref__')
+    
+    def __init__(self, version: int, policies: Dict[str, bool], thresholds: Dict[str, float],
+                 weights: Dict[str, float]):
+        """
+        Create a snapshot.
+        
+        Args:
+            version: Monotonic snapshot version
+            policies: Policy name -> enabled flag
+            thresholds: Trust decision thresholds
+            weights: Trust factor weights
+        """
+        object.__setattr__(self, 'version', version)
+        object.__setattr__(self, 'policies', MappingProxyType(dict(policies)))
+        object.__setattr__(self, 'active_policies',
+                           frozenset(name for name, enabled in policies.items() if enabled))
+        object.__setattr__(self, 'thresholds', MappingProxyType(dict(thresholds)))
+        object.__setattr__(self, 'weights', MappingProxyType(dict(weights)))
+        object.__setattr__(self, 'created_at', datetime.utcnow())
+    
+    def __setattr__(self, name, value):
+        raise AttributeError("PolicySnapshot is immutable")
+    
+    def is_active(self, policy: str) -> bool:
+        """Check whether a policy is enabled in this snapshot."""
+        return policy in self.active_policies
+
+
 class PolicyEngine:
     """
     Zero-Trust policy enforcement engine.
@@ -25,43 +94,316 @@ class PolicyEngine:
         """
         self.config = config
         self.enabled = False
-        self.policies = {}
-        self.policy_count = 0
-        self.trust_scores = {}
+        self.trust_scores = TrustScoreTable(config.get('trust_table_capacity', 1024))
+        
+        # Optional on-disk trust state so restarts don't force re-authentication
+        self.trust_store = TrustStateStore(config) if config.get('trust_state_path') else None
         
         # Zero-trust parameters
         self.continuous_auth_interval = config.get('continuous_auth_interval', 300)  # 5 minutes
         self.device_trust_threshold = config.get('device_trust_threshold', 0.80)
         
+        # Copy-on-write policy state: readers take self._snapshot without locking,
+        # reloads build a new snapshot and swap the reference.
+        self.reload_stats = {
+            'reloads': 0,
+            'rollbacks': 0,
+            'last_reload_ms': 0.0,
+            'max_reload_ms': 0.0,
+            'retired_snapshots': 0
+        }
+        self._snapshot = self._compile_snapshot(
+            0, {}, self._default_thresholds(), config.get('trust_weights', DEFAULT_TRUST_WEIGHTS)
+        )
+        self._snapshot_history = deque(maxlen=config.get('policy_history_size', 5))
+        self._reload_lock = asyncio.Lock()
+        self._recompute_lock = asyncio.Lock()
+        self._last_eviction = time.time()
+        
+        # Last verification time of evicted sessions, so they still report
+        # auth_expired; bounded, oldest evictions are forgotten first
+        self._expired_sessions: OrderedDict = OrderedDict()
+        self.expired_session_memory = config.get('expired_session_memory', 100000)
+        
         logger.info("Zero-Trust Policy Engine initialized")
     
+    @property
+    def policies(self) -> MappingProxyType:
+        """Policies of the current snapshot (read-only)."""
+        return self._snapshot.policies
+    
+    @property
+    def policy_count(self) -> int:
+        """Number of enabled policies in the current snapshot."""
+        return len(self._snapshot.active_policies)
+    
+    @property
+    def snapshot(self) -> PolicySnapshot:
+        """Current policy snapshot."""
+        return self._snapshot
+    
     async def start(self):
         """Start policy engine."""
         logger.info("Starting Zero-Trust Policy Engine...")
         self.enabled = True
         await self._load_policies()
+        await self._restore_trust_state()
     
     async def stop(self):
         """Stop policy engine."""
         logger.info("Stopping Zero-Trust Policy Engine...")
         self.enabled = False
+        
+        if self.trust_store:
+            await asyncio.get_running_loop().run_in_executor(None, self.trust_store.stop)
+    
+    async def _restore_trust_state(self):
+        """Restore persisted trust state and start the snapshot writer."""
+        if not self.trust_store:
+            return
+        
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                None, self.trust_store.load_into, self.trust_scores, dict(self._snapshot.thresholds)
+            )
+        except (OSError, ValueError) as e:
+            logger.error(f"Could not restore trust state: {e}")
+        
+        self.trust_store.start()
     
     async def _load_policies(self):
         """Load zero-trust policies."""
         logger.info("Loading zero-trust policies...")
         
-        # Default policies
-        self.policies = {
-            'continuous_authentication': True,
-            'least_privilege_access': True,
-            'micro_segmentation': True,
-            'device_trust_verification': True,
-            'context_aware_access': True
-        }
+        await self.reload_policies(self.config.get('policies', DEFAULT_POLICIES))
         
-        self.policy_count = len(self.policies)
         logger.info(f"Loaded {self.policy_count} policies")
     
+    def _default_thresholds(self) -> Dict[str, float]:
+        """Trust decision thresholds from configuration."""
+        return {
+            'verified': self.config.get('trust_verified_threshold', 0.75),
+            'requires_mfa': self.config.get('trust_mfa_threshold', 0.90)
+        }
+    
+    def _compile_snapshot(self, version: int, policies: Dict[str, Any],
+                          thresholds: Dict[str, float],
+                          weights: Dict[str, float]) -> PolicySnapshot:
+        """
+        Validate and compile a policy set into an immutable snapshot.
+        
+        Args:
+            version: Version number for the new snapshot
+            policies: Policy name -> enabled flag
+            thresholds: Trust decision thresholds
+            weights: Trust factor weights
+        
+        Returns:
+            Compiled snapshot
+        """
+        for name, enabled in policies.items():
+            if not isinstance(name, str) or not isinstance(enabled, bool):
+                raise ValueError(f"Invalid policy entry: {name!r} -> {enabled!r}")
+        
+        for name, value in thresholds.items():
+            if not 0.0 <= float(value) <= 1.0:
+                raise ValueError(f"Threshold {name} out of range: {value}")
+        
+        if thresholds['requires_mfa'] < thresholds['verified']:
+            raise ValueError("requires_mfa threshold must not be below verified threshold")
+        
+        if set(weights) != set(TRUST_FACTORS) or abs(sum(weights.values()) - 1.0) > 1e-6:
+            raise ValueError(f"Trust weights must cover {TRUST_FACTORS} and sum to 1.0")
+        
+        snapshot = PolicySnapshot(version, policies, thresholds, weights)
+        weakref.finalize(snapshot, _mark_snapshot_retired, self.reload_stats, version)
+        return snapshot
+    
+    def _swap_snapshot(self, snapshot: PolicySnapshot):
+        """Atomically publish a snapshot, keeping the previous one for rollback."""
+        previous = self._snapshot
+        if previous.version > 0:
+            self._snapshot_history.append(previous)
+        self._snapshot = snapshot
+    
+    async def reload_policies(self, policies: Optional[Dict[str, bool]] = None,
+                              thresholds: Optional[Dict[str, float]] = None,
+                              weights: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+        """
+        Hot-reload policies without blocking readers.
+        
+        The new snapshot is compiled in a worker thread and published with a
+        single reference swap. In-flight requests keep the snapshot they
+        started with; it is retired once the last of them finishes. If the
+        trust weights or thresholds change, active sessions are re-scored.
+        
+        Args:
+            policies: New policy set (default: keep current policies)
+            thresholds: New trust thresholds (default: keep current thresholds)
+            weights: New trust factor weights (default: keep current weights)
+        
+        Returns:
+            Reload status
+        """
+        async with self._reload_lock:
+            started = time.perf_counter()
+            current = self._snapshot
+            
+            new_policies = dict(policies if policies is not None else current.policies)
+            new_thresholds = dict(current.thresholds)
+            new_thresholds.update(thresholds or {})
+            new_weights = dict(weights if weights is not None else current.weights)
+            
+            loop = asyncio.get_running_loop()
+            snapshot = await loop.run_in_executor(
+                None, self._compile_snapshot, current.version + 1,
+                new_policies, new_thresholds, new_weights
+            )
+            self._swap_snapshot(snapshot)
+            
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.reload_stats['reloads'] += 1
+            self.reload_stats['last_reload_ms'] = elapsed_ms
+            self.reload_stats['max_reload_ms'] = max(self.reload_stats['max_reload_ms'], elapsed_ms)
+        
+        logger.info(f"Policy snapshot v{snapshot.version} active ({elapsed_ms:.2f} ms)")
+        
+        result = {
+            "status": "reloaded",
+            "version": snapshot.version,
+            "policies_active": len(snapshot.active_policies),
+            "reload_ms": elapsed_ms
+        }
+        
+        if snapshot.weights != current.weights or snapshot.thresholds != current.thresholds:
+            rescore = await self.recompute_trust_scores()
+            result["rescored_sessions"] = rescore["sessions"]
+        
+        return result
+    
+    async def recompute_trust_scores(self) -> Dict[str, Any]:
+        """
+        Re-score all active sessions against the current snapshot.
+        
+        Sessions older than the continuous-authentication interval are
+        evicted first. Scoring runs in a worker thread; the capture and the
+        write-back run on the event loop, so sessions verified meanwhile keep
+        the score they were just given.
+        
+        Returns:
+            Session count and the user IDs that crossed the verified or
+            requires_mfa thresholds
+        """
+        async with self._recompute_lock:
+            evicted = self._evict_expired_sessions()
+            snapshot = self._snapshot
+            weights = dict(snapshot.weights)
+            thresholds = dict(snapshot.thresholds)
+            
+            loop = asyncio.get_running_loop()
+            result = None
+            for _ in range(2):
+                state = self.trust_scores.begin_recompute()
+                scores = await loop.run_in_executor(None, self.trust_scores.score_rows, state, weights)
+                result = self.trust_scores.apply_scores(state, scores, thresholds)
+                if result is not None:
+                    break
+            else:
+                # Rows kept moving under us; finish on the loop thread
+                result = self.trust_scores.recompute(weights, thresholds)
+        
+        result['evicted'] = evicted
+        
+        logger.info(
+            f"Re-scored {result['sessions']} sessions: "
+            f"{len(result['verified_lost'])} lost verification, "
+            f"{len(result['mfa_required'])} now require MFA"
+        )
+        
+        return result
+    
+    def _evict_expired_sessions(self, now: Optional[float] = None) -> int:
+        """Drop sessions not verified within the continuous-authentication interval."""
+        now = time.time() if now is None else now
+        self._last_eviction = now
+        cutoff = now - self.continuous_auth_interval
+        expired = self.trust_scores.verified_before(cutoff)
+        evicted = self.trust_scores.evict_before(cutoff)
+        if evicted:
+            self._expired_sessions.update(expired)
+            while len(self._expired_sessions) > self.expired_session_memory:
+                self._expired_sessions.popitem(last=False)
+            logger.debug(f"Evicted {evicted} expired trust sessions")
+        return evicted
+    
+    async def flag_device_class(self, device_class: str, device_score: float = 0.0) -> Dict[str, Any]:
+        """
+        Flag a device class and re-score every affected session.
+        
+        Args:
+            device_class: Device class (context['device']['type'])
+            device_score: Device factor applied to sessions of that class
+        
+        Returns:
+            Recompute result
+        """
+        logger.warning(f"Flagging device class {device_class} (device score {device_score})")
+        self.trust_scores.flag_device_class(device_class, device_score)
+        return await self.recompute_trust_scores()
+    
+    async def rollback_policies(self, version: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Roll back to a previously active snapshot.
+        
+        Active sessions are re-scored if the restored weights or thresholds
+        differ from the current ones.
+        
+        Args:
+            version: Snapshot version to restore (default: the previous one)
+        
+        Returns:
+            Rollback status
+        """
+        async with self._reload_lock:
+            if not self._snapshot_history:
+                raise ValueError("No policy snapshot available for rollback")
+            
+            if version is None:
+                target = self._snapshot_history.pop()
+            else:
+                matches = [s for s in self._snapshot_history if s.version == version]
+                if not matches:
+                    raise ValueError(f"Policy snapshot v{version} not in history")
+                target = matches[0]
+                self._snapshot_history.remove(target)
+            
+            current = self._snapshot
+            self._swap_snapshot(target)
+            self.reload_stats['rollbacks'] += 1
+        
+        logger.warning(f"Rolled back to policy snapshot v{target.version}")
+        
+        result = {
+            "status": "rolled_back",
+            "version": target.version,
+            "policies_active": len(target.active_policies)
+        }
+        
+        if target.weights != current.weights or target.thresholds != current.thresholds:
+            rescore = await self.recompute_trust_scores()
+            result["rescored_sessions"] = rescore["sessions"]
+        
+        return result
+    
+    def get_reload_stats(self) -> Dict[str, Any]:
+        """Get policy reload latency and snapshot history."""
+        return {
+            "current_version": self._snapshot.version,
+            "history": [s.version for s in self._snapshot_history],
+            **self.reload_stats
+        }
+    
     def enforce_all_policies(self) -> Dict[str, Any]:
         """
         Enforce all zero-trust policies.
@@ -84,12 +426,16 @@ class PolicyEngine:
         Args:
             user_id: User identifier
             context: Contextual information (device, location, time, etc.)
-            
+        
         Returns:
             Verification result
         """
+        started = time.perf_counter() if VERIFY_TICK() else 0.0
         logger.debug(f"Verifying identity for user: {user_id}")
         
+        # Pin the policy snapshot for the duration of this request
+        snapshot = self._snapshot
+        
         # Multi-factor verification
         verification_factors = {
             'credentials': self._verify_credentials(user_id, context),
@@ -98,22 +444,48 @@ class PolicyEngine:
             'behavior': self._verify_behavior(user_id, context)
         }
         
-        # Calculate trust score
-        trust_score = sum(verification_factors.values()) / len(verification_factors)
+        # Flagged device classes override the device factor; the raw factor
+        # is still stored so clearing the flag restores it
+        device_class = (context.get('device') or {}).get('type')
+        scored_factors = verification_factors
+        device_flag = self.trust_scores.device_flag(device_class)
+        if device_flag is not None:
+            scored_factors = dict(verification_factors, device=device_flag)
         
-        self.trust_scores[user_id] = {
-            'score': trust_score,
-            'timestamp': datetime.utcnow(),
-            'factors': verification_factors
-        }
+        # Calculate weighted trust score
+        trust_score = weighted_trust_score(scored_factors, snapshot.weights)
+        verified = trust_score >= snapshot.thresholds['verified']
+        requires_mfa = trust_score < snapshot.thresholds['requires_mfa']
         
-        return {
+        verified_at = time.time()
+        if verified_at - self._last_eviction >= self.continuous_auth_interval:
+            self._evict_expired_sessions(verified_at)
+        
+        self._expired_sessions.pop(user_id, None)
+        self.trust_scores.upsert(
+            user_id,
+            verification_factors,
+            trust_score,
+            verified,
+            requires_mfa,
+            timestamp=verified_at,
+            device_class=device_class
+        )
+        
+        if self.trust_store:
+            self.trust_store.record(user_id, verified_at, trust_score, verification_factors)
+        
+        result = {
             "user_id": user_id,
-            "verified": trust_score >= 0.75,
+            "verified": verified,
             "trust_score": trust_score,
-            "factors": verification_factors,
-            "requires_mfa": trust_score < 0.90
+            "factors": scored_factors,
+            "requires_mfa": requires_mfa,
+            "policy_version": snapshot.version
         }
+        if started:
+            VERIFY_STAGE.record(time.perf_counter() - started)
+        return result
     
     def _verify_credentials(self, user_id: str, context: Dict[str, Any]) -> float:
         """Verify user credentials."""
@@ -153,7 +525,7 @@ class PolicyEngine:
         Args:
             user_id: User identifier
             resource: Resource being accessed
-            
+        
         Returns:
             Access decision
         """
@@ -190,7 +562,7 @@ class PolicyEngine:
         
         Args:
             user_id: User identifier
-            
+        
         Returns:
             Authentication status
         """
@@ -198,6 +570,8 @@ class PolicyEngine:
         
         # Check if re-authentication is needed
         last_auth = self.trust_scores.get(user_id, {}).get('timestamp')
+        if last_auth is None and user_id in self._expired_sessions:
+            last_auth = datetime.utcfromtimestamp(self._expired_sessions[user_id])
         
         if not last_auth:
             return {"requires_auth": True, "reason": "no_previous_auth"}
@@ -226,7 +600,7 @@ class PolicyEngine:
         
         Args:
             network_segment: Network segment identifier
-            
+        
         Returns:
             Segmentation status
         """